@@ -0,0 +1,9 @@
+"""Benchmarks of Rasa Core.
+
+Every benchmark is a script which writes its results as json, so that
+runs of different versions can be compared, e.g.
+
+    python -m benchmarks.conversations --bot moodbot --output results.json
+    python -m benchmarks.micro --output micro.json --baseline old_micro.json
+    python benchmarks/import_time.py --output import_times.json
+"""
@@ -0,0 +1,168 @@
+"""Bots which are used by the benchmarks.
+
+Besides the example bots, bots of any size can be generated with
+`synthetic_bot`. Their stories are random sequences of intents and
+utterances, which is enough to put load on the dialogue engine."""
+import json
+import logging
+import os
+import random
+from collections import namedtuple
+from typing import List, Optional, Text
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# same policies as the default configuration, but faster to train
+POLICY_CONFIG = os.path.join(ROOT_DIR, "benchmarks", "policy_config.yml")
+
+BenchmarkBot = namedtuple("BenchmarkBot",
+                          "name domain_file stories_file actions_dir")
+
+
+def _example_bot(name: Text, has_actions: bool = False) -> BenchmarkBot:
+    bot_dir = os.path.join(ROOT_DIR, "examples", name)
+    return BenchmarkBot(name,
+                        os.path.join(bot_dir, "domain.yml"),
+                        os.path.join(bot_dir, "data", "stories.md"),
+                        bot_dir if has_actions else None)
+
+
+EXAMPLE_BOTS = {
+    "moodbot": _example_bot("moodbot"),
+    "formbot": _example_bot("formbot", has_actions=True),
+    "restaurantbot": _example_bot("restaurantbot", has_actions=True),
+}
+
+
+def synthetic_bot(directory: Text,
+                  num_intents: int = 20,
+                  num_utterances: int = 40,
+                  num_slots: int = 10,
+                  num_stories: int = 200,
+                  max_turns: int = 8,
+                  seed: int = 42) -> BenchmarkBot:
+    """Writes the domain and stories of a generated bot to `directory`.
+
+    Every slot can be filled by an entity of the same name. A story has
+    between one and `max_turns` turns, every turn is a user message,
+    which sets a slot at random, followed by one or two utterances."""
+
+    rand = random.Random(seed)
+
+    intents = ["intent_{}".format(i) for i in range(num_intents)]
+    utterances = ["utter_{}".format(i) for i in range(num_utterances)]
+    slots = ["slot_{}".format(i) for i in range(num_slots)]
+
+    domain = {
+        "intents": intents,
+        "entities": slots,
+        "slots": {slot: {"type": "text"} for slot in slots},
+        "templates": {utterance: [{"text": "Response {}".format(utterance)}]
+                      for utterance in utterances},
+        "actions": utterances
+    }
+
+    stories = []
+    for i in range(num_stories):
+        lines = ["## story {}".format(i)]
+        for _ in range(rand.randint(1, max_turns)):
+            intent = rand.choice(intents)
+            if slots and rand.random() < 0.3:
+                entities = {rand.choice(slots): "value"}
+                lines.append("* {}{}".format(intent, json.dumps(entities)))
+            else:
+                lines.append("* {}".format(intent))
+
+            for utterance in rand.sample(utterances, rand.randint(1, 2)):
+                lines.append("  - {}".format(utterance))
+        stories.append("\n".join(lines))
+
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    domain_file = os.path.join(directory, "domain.yml")
+    with open(domain_file, "w") as f:
+        yaml.safe_dump(domain, f, default_flow_style=False)
+
+    stories_file = os.path.join(directory, "stories.md")
+    with open(stories_file, "w") as f:
+        f.write("\n\n".join(stories) + "\n")
+
+    return BenchmarkBot("synthetic", domain_file, stories_file, None)
+
+
+def _train(bot: BenchmarkBot, model_path: Text, policy_config: Text) -> None:
+    import asyncio
+    from rasa.core.interpreter import RegexInterpreter
+    from rasa.core.train import train
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(train(bot.domain_file, bot.stories_file,
+                                  model_path,
+                                  interpreter=RegexInterpreter(),
+                                  policy_config=policy_config))
+
+
+def trained_model(bot: BenchmarkBot,
+                  model_dir: Text,
+                  policy_config: Text = POLICY_CONFIG,
+                  retrain: bool = False) -> Text:
+    """Returns the path of the trained model of a bot.
+
+    Models are trained in a separate process, so the training doesn't
+    count towards the memory usage of the benchmark. A model which was
+    trained before is reused unless `retrain` is set."""
+    import multiprocessing
+
+    model_path = os.path.join(model_dir, bot.name)
+    if os.path.isfile(os.path.join(model_path, "metadata.json")) and \
+            not retrain:
+        return model_path
+
+    logger.info("Training model of '{}'.".format(bot.name))
+    process = multiprocessing.get_context("spawn").Process(
+        target=_train, args=(bot, model_path, policy_config))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError("Failed to train the model of '{}'."
+                           "".format(bot.name))
+    return model_path
+
+
+def _message_text(intent: Text, entities: List[dict]) -> Text:
+    """Message which is parsed into `intent` and `entities` by the
+    `RegexInterpreter`."""
+
+    if not entities:
+        return "/" + intent
+    entities = {e["entity"]: e["value"] for e in entities}
+    return "/{}{}".format(intent, json.dumps(entities))
+
+
+async def scripted_conversations(bot: BenchmarkBot,
+                                 max_conversations: Optional[int] = None
+                                 ) -> List[List[Text]]:
+    """Creates the user messages of the conversations in the stories of
+    a bot."""
+    from rasa.core import training
+    from rasa.core.domain import Domain
+    from rasa.core.events import UserUttered
+
+    domain = Domain.load(bot.domain_file)
+    trackers = await training.load_data(bot.stories_file, domain,
+                                        augmentation_factor=0,
+                                        tracker_limit=max_conversations)
+
+    conversations = []
+    for tracker in trackers:
+        messages = [_message_text(e.intent.get("name"), e.entities)
+                    for e in tracker.events
+                    if isinstance(e, UserUttered) and e.intent]
+        if messages and messages not in conversations:
+            conversations.append(messages)
+    return conversations
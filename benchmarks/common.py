@@ -0,0 +1,130 @@
+import asyncio
+import json
+import logging
+import resource
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Text
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# metrics which are compared against a baseline, all other metrics of
+# a benchmark are only reported
+LOWER_IS_BETTER = {"latency_p50", "latency_p95", "latency_p99",
+                   "latency_mean", "peak_rss_mb"}
+HIGHER_IS_BETTER = {"messages_per_second", "ops_per_second"}
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in megabytes."""
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        # macOS reports bytes, Linux kilobytes
+        return peak / 1024 / 1024
+    return peak / 1024
+
+
+def latency_summary(latencies: List[float]) -> Dict[Text, float]:
+    """Summarises latencies given in seconds, the percentiles are in
+    milliseconds."""
+
+    if not latencies:
+        return {}
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"latency_p50": p50 * 1000,
+            "latency_p95": p95 * 1000,
+            "latency_p99": p99 * 1000,
+            "latency_mean": float(np.mean(latencies)) * 1000}
+
+
+class StageTimer(object):
+    """Collects how much time is spent in the stages of a benchmark."""
+
+    def __init__(self) -> None:
+        self.durations = defaultdict(list)
+
+    @contextmanager
+    def measure(self, stage: Text) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[stage].append(time.perf_counter() - start)
+
+    def wrap(self, obj: Any, method_name: Text,
+             stage: Optional[Text] = None) -> None:
+        """Times every call of `obj.method_name` as `stage`."""
+
+        stage = stage or method_name
+        method = getattr(obj, method_name)
+
+        if asyncio.iscoroutinefunction(method):
+            async def timed(*args, **kwargs):
+                with self.measure(stage):
+                    return await method(*args, **kwargs)
+        else:
+            def timed(*args, **kwargs):
+                with self.measure(stage):
+                    return method(*args, **kwargs)
+
+        setattr(obj, method_name, timed)
+
+    def summary(self) -> Dict[Text, Dict[Text, float]]:
+        return {stage: dict(calls=len(durations),
+                            total_seconds=sum(durations),
+                            **latency_summary(durations))
+                for stage, durations in sorted(self.durations.items())}
+
+
+def write_results(results: Dict[Text, Any], output: Optional[Text]) -> None:
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        logger.info("Wrote results to '{}'.".format(output))
+
+
+def compare_to_baseline(results: Dict[Text, Dict[Text, float]],
+                        baseline_file: Text,
+                        tolerance: float) -> List[Text]:
+    """Lists the metrics which regressed compared to an earlier run.
+
+    `results` maps benchmark names to their metrics, metrics which
+    aren't numbers or are missing in the baseline are ignored."""
+
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+
+    regressions = []
+    for name, metrics in sorted(results.items()):
+        for metric, value in sorted(metrics.items()):
+            before = baseline.get(name, {}).get(metric)
+            if (not isinstance(value, (int, float)) or
+                    not isinstance(before, (int, float)) or not before):
+                continue
+
+            if metric in LOWER_IS_BETTER:
+                regressed = value > before * (1 + tolerance)
+            elif metric in HIGHER_IS_BETTER:
+                regressed = value < before * (1 - tolerance)
+            else:
+                continue
+
+            if regressed:
+                regressions.append("{} {}: {:.4g} -> {:.4g}".format(
+                    name, metric, before, value))
+    return regressions
+
+
+def report_regressions(regressions: List[Text]) -> None:
+    """Logs the regressions and exits with an error if there are any."""
+
+    for regression in regressions:
+        logger.error("Performance regression - {}".format(regression))
+    if regressions:
+        sys.exit(1)
@@ -0,0 +1,280 @@
+"""Measures the throughput and latency of `Agent.handle_message`.
+
+Conversations from the stories of a bot are replayed by concurrent
+users. The benchmark reports the processed messages per second, the
+latency percentiles of a message, the peak memory usage and how much
+time is spent in every stage of the message processing.
+
+    python -m benchmarks.conversations --bot moodbot --concurrency 20
+    python -m benchmarks.conversations --bot synthetic --num_stories 2000 \\
+        --tracker_stores memory redis --output results.json
+
+Custom actions of the example bots are run by an action server in the
+same process. With `--baseline` the script exits with a non-zero code if
+the throughput or latency got worse by more than `--tolerance`.
+"""
+import argparse
+import asyncio
+import logging
+import socket
+import sys
+import tempfile
+import time
+import typing
+from typing import Any, Dict, List, Optional, Text
+
+from benchmarks import bots, common
+
+if typing.TYPE_CHECKING:
+    from sanic import Sanic
+    from rasa.core.agent import Agent
+    from rasa.core.domain import Domain
+    from rasa.core.tracker_store import TrackerStore
+
+logger = logging.getLogger(__name__)
+
+TRACKER_STORES = ["memory", "redis"]
+
+# methods of the `MessageProcessor` which are timed and their stage names
+PROCESSOR_STAGES = [("_get_tracker", "get_tracker"),
+                    ("_parse_message", "parse_message"),
+                    ("predict_next_action", "predict_next_action"),
+                    ("_run_action", "run_action"),
+                    ("_save_tracker", "save_tracker")]
+
+
+def create_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Measures the throughput and latency of the dialogue "
+                    "engine.")
+    parser.add_argument(
+        "--bot", default="moodbot",
+        choices=sorted(bots.EXAMPLE_BOTS) + ["synthetic"],
+        help="Bot whose conversations are replayed.")
+    parser.add_argument(
+        "--tracker_stores", nargs="+", default=TRACKER_STORES,
+        choices=TRACKER_STORES,
+        help="Tracker stores to benchmark, `redis` uses an in-process "
+             "fake redis server.")
+    parser.add_argument(
+        "--concurrency", type=int, default=10,
+        help="Number of conversations which run at the same time.")
+    parser.add_argument(
+        "--conversations", type=int, default=200,
+        help="Number of conversations which are replayed.")
+    parser.add_argument(
+        "--num_stories", type=int, default=200,
+        help="Number of stories of the synthetic bot.")
+    parser.add_argument(
+        "--model_dir", default=None,
+        help="Directory in which trained models are kept, by default a "
+             "temporary directory is used.")
+    parser.add_argument(
+        "--retrain", action="store_true",
+        help="Trains the model even if there is a trained one.")
+    parser.add_argument(
+        "--output", default=None,
+        help="Writes the results as json to this file.")
+    parser.add_argument(
+        "--baseline", default=None,
+        help="Results of an earlier run to compare against.")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2,
+        help="Relative change compared to the baseline which is accepted.")
+    return parser
+
+
+def create_tracker_store(name: Text, domain: 'Domain') -> 'TrackerStore':
+    from rasa.core.tracker_store import (
+        InMemoryTrackerStore, RedisTrackerStore, TrackerStore)
+
+    if name == "memory":
+        return InMemoryTrackerStore(domain)
+
+    class FakeRedisTrackerStore(RedisTrackerStore):
+        def __init__(self, domain):
+            import fakeredis
+
+            self.red = fakeredis.FakeStrictRedis()
+            self.red.flushall()
+            self.record_exp = None
+            TrackerStore.__init__(self, domain)
+
+    return FakeRedisTrackerStore(domain)
+
+
+def _create_action_app(actions_dir: Text) -> 'Sanic':
+    """Action server which runs the custom actions of a bot."""
+    from rasa_core_sdk import ActionExecutionRejection
+    from rasa_core_sdk.executor import ActionExecutor
+    from sanic import Sanic, response
+
+    # the actions of the example bots import modules next to them
+    sys.path.insert(0, actions_dir)
+    executor = ActionExecutor()
+    executor.register_package("actions")
+
+    app = Sanic(__name__, configure_logging=False)
+
+    @app.post("/webhook")
+    async def webhook(request):
+        try:
+            result = executor.run(request.json)
+        except ActionExecutionRejection as e:
+            return response.json({"error": e.message,
+                                  "action_name": e.action_name},
+                                 status=400)
+        return response.json(result)
+
+    return app
+
+
+async def start_action_server(actions_dir: Text) -> Text:
+    """Starts an action server on a free port and returns its url."""
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+
+    app = _create_action_app(actions_dir)
+    await app.create_server(sock=sock, access_log=False)
+    return "http://127.0.0.1:{}/webhook".format(port)
+
+
+def _time_stages(timer: common.StageTimer, agent: 'Agent') -> None:
+    """Times the stages of the message processing."""
+
+    create_processor = agent.create_processor
+
+    def create_timed_processor(*args, **kwargs):
+        # the agent creates a new processor for every message
+        processor = create_processor(*args, **kwargs)
+        for method, stage in PROCESSOR_STAGES:
+            timer.wrap(processor, method, stage)
+        return processor
+
+    agent.create_processor = create_timed_processor
+
+    for i, policy in enumerate(agent.policy_ensemble.policies):
+        timer.wrap(policy, "predict_action_probabilities",
+                   "policy_{}_{}".format(i, type(policy).__name__))
+
+    timer.wrap(agent.tracker_store, "retrieve", "tracker_store_retrieve")
+    timer.wrap(agent.tracker_store, "save", "tracker_store_save")
+
+
+async def replay(agent: 'Agent',
+                 conversations: List[List[Text]],
+                 num_conversations: int,
+                 concurrency: int,
+                 sender_prefix: Text = "user") -> Dict[Text, Any]:
+    """Replays `num_conversations` conversations, `concurrency` of them
+    at the same time."""
+    from rasa.core.channels import CollectingOutputChannel, UserMessage
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def converse(sender_id: Text, messages: List[Text]) -> None:
+        async with semaphore:
+            for text in messages:
+                start = time.perf_counter()
+                await agent.handle_message(UserMessage(
+                    text, CollectingOutputChannel(), sender_id))
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        converse("{}-{}".format(sender_prefix, i),
+                 conversations[i % len(conversations)])
+        for i in range(num_conversations)])
+    duration = time.perf_counter() - start
+
+    results = {"conversations": num_conversations,
+               "concurrency": concurrency,
+               "messages": len(latencies),
+               "seconds": duration,
+               "messages_per_second": len(latencies) / duration}
+    results.update(common.latency_summary(latencies))
+    return results
+
+
+async def run_benchmark(bot: bots.BenchmarkBot,
+                        model_path: Text,
+                        tracker_store: Text,
+                        num_conversations: int,
+                        concurrency: int,
+                        action_url: Optional[Text] = None
+                        ) -> Dict[Text, Any]:
+    from rasa.core.agent import Agent
+    from rasa.core.domain import Domain
+    from rasa.core.utils import EndpointConfig
+
+    conversations = await bots.scripted_conversations(bot)
+    agent = Agent.load(
+        model_path,
+        tracker_store=create_tracker_store(tracker_store,
+                                           Domain.load(bot.domain_file)),
+        action_endpoint=EndpointConfig(action_url) if action_url else None)
+
+    # the first messages are slower, e.g. because of lazy initialisations
+    await replay(agent, conversations, min(len(conversations), 5), 1,
+                 sender_prefix="warmup")
+
+    timer = common.StageTimer()
+    _time_stages(timer, agent)
+    results = await replay(agent, conversations, num_conversations,
+                           concurrency)
+    results["stages"] = timer.summary()
+    results["peak_rss_mb"] = common.peak_rss_mb()
+    return results
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # the processing of every message would be logged otherwise
+    logging.getLogger("rasa").setLevel(logging.WARNING)
+    args = create_argument_parser().parse_args()
+
+    model_dir = args.model_dir or tempfile.mkdtemp()
+    if args.bot == "synthetic":
+        bot = bots.synthetic_bot(tempfile.mkdtemp(),
+                                 num_stories=args.num_stories)
+    else:
+        bot = bots.EXAMPLE_BOTS[args.bot]
+    model_path = bots.trained_model(bot, model_dir, retrain=args.retrain)
+
+    loop = asyncio.get_event_loop()
+    action_url = None
+    if bot.actions_dir:
+        action_url = loop.run_until_complete(
+            start_action_server(bot.actions_dir))
+
+    results = {}
+    for tracker_store in args.tracker_stores:
+        name = "{}-{}".format(bot.name, tracker_store)
+        results[name] = loop.run_until_complete(run_benchmark(
+            bot, model_path, tracker_store, args.conversations,
+            args.concurrency, action_url))
+        logger.info("{}: {:.1f} messages/s, latency p50 {:.1f}ms, "
+                    "p95 {:.1f}ms, p99 {:.1f}ms, peak RSS {:.0f}MB"
+                    "".format(name,
+                              results[name]["messages_per_second"],
+                              results[name]["latency_p50"],
+                              results[name]["latency_p95"],
+                              results[name]["latency_p99"],
+                              results[name]["peak_rss_mb"]))
+        for stage, summary in results[name]["stages"].items():
+            logger.info("    {:<40} {:>8.1f}ms total, p50 {:.2f}ms"
+                        "".format(stage, summary["total_seconds"] * 1000,
+                                  summary["latency_p50"]))
+
+    common.write_results(results, args.output)
+
+    if args.baseline:
+        common.report_regressions(common.compare_to_baseline(
+            results, args.baseline, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
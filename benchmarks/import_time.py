@@ -0,0 +1,177 @@
+"""Measures the import time of the main entry points of Rasa.
+
+Every entry point is imported in a fresh interpreter. On Python 3.7+ the
+cumulative import time is read from `python -X importtime`, on older
+versions the wall clock time of the import is measured. The script also
+reports which heavy dependencies were imported, as they shouldn't be
+imported by entry points which don't need them.
+
+    python benchmarks/import_time.py --output import_times.json
+    python benchmarks/import_time.py --baseline import_times.json
+
+With `--baseline` the script exits with a non-zero code if an entry point
+got slower by more than `--tolerance` or imports heavy dependencies which
+it didn't import before.
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Text
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = [
+    "rasa",
+    "rasa.__main__",
+    "rasa.core",
+    "rasa.core.policies",
+    "rasa.core.agent",
+    "rasa.core.server",
+    "rasa.core.run",
+    "rasa.core.policies.memoization",
+]
+
+HEAVY_DEPENDENCIES = [
+    "tensorflow",
+    "keras",
+    "sklearn",
+    "networkx",
+    "matplotlib",
+    "rasa_nlu",
+]
+
+# prints the imported heavy dependencies as the last line of the output
+_REPORT_MODULES = (
+    "import json, sys, time\n"
+    "start = time.time()\n"
+    "import {module}\n"
+    "duration = time.time() - start\n"
+    "print(json.dumps({{'duration': duration, 'modules': "
+    "[m for m in {heavy} if m in sys.modules]}}))\n"
+)
+
+
+def _cumulative_import_time(stderr: Text, module: Text) -> Optional[float]:
+    """Reads the cumulative import time of `module` from the output of
+    `python -X importtime` in seconds."""
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        # import time: self [us] | cumulative | imported package
+        parts = line[len("import time:"):].split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1e6
+    return None
+
+
+def measure(module: Text, repeat: int = 3) -> Dict[Text, Any]:
+    """Imports `module` `repeat` times in fresh interpreters and returns
+    the fastest import time."""
+
+    use_importtime = sys.version_info >= (3, 7)
+    command = [sys.executable]
+    if use_importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", _REPORT_MODULES.format(module=module,
+                                             heavy=HEAVY_DEPENDENCIES)]
+
+    durations = []
+    report = {}
+    for _ in range(repeat):
+        result = subprocess.run(command, cwd=ROOT_DIR,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE,
+                                universal_newlines=True)
+        if result.returncode != 0:
+            raise RuntimeError("Failed to import '{}':\n{}"
+                               "".format(module, result.stderr))
+
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        duration = None
+        if use_importtime:
+            # `import rasa.core` also lists the time of `rasa`, the
+            # time of the last module in the path includes both
+            duration = _cumulative_import_time(result.stderr, module)
+        durations.append(duration or report["duration"])
+
+    return {"seconds": min(durations),
+            "heavy_dependencies": report["modules"]}
+
+
+def compare(results: Dict[Text, Dict[Text, Any]],
+            baseline: Dict[Text, Dict[Text, Any]],
+            tolerance: float) -> List[Text]:
+    """Lists the entry points which regressed compared to the baseline."""
+
+    regressions = []
+    for module, result in results.items():
+        if module not in baseline:
+            continue
+        before = baseline[module]
+        if result["seconds"] > before["seconds"] * (1 + tolerance):
+            regressions.append("{}: {:.3f}s -> {:.3f}s".format(
+                module, before["seconds"], result["seconds"]))
+
+        new_dependencies = (set(result["heavy_dependencies"]) -
+                            set(before["heavy_dependencies"]))
+        if new_dependencies:
+            regressions.append("{}: now imports {}".format(
+                module, ", ".join(sorted(new_dependencies))))
+    return regressions
+
+
+def create_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Measures the import time of Rasa entry points.")
+    parser.add_argument(
+        "--modules", nargs="*", default=ENTRY_POINTS,
+        help="Modules to import.")
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Number of imports per module, the fastest one is reported.")
+    parser.add_argument(
+        "--output", type=str, default=None,
+        help="Writes the results as json to this file.")
+    parser.add_argument(
+        "--baseline", type=str, default=None,
+        help="Results of an earlier run to compare against.")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25,
+        help="Relative slowdown compared to the baseline which is "
+             "accepted.")
+    return parser
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    args = create_argument_parser().parse_args()
+
+    results = {}
+    for module in args.modules:
+        results[module] = measure(module, args.repeat)
+        logger.info("{:<35} {:>7.3f}s  {}".format(
+            module, results[module]["seconds"],
+            ", ".join(results[module]["heavy_dependencies"])))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            logger.error("Import time regression - {}".format(regression))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Micro benchmarks of the building blocks of training and prediction.
+
+    python -m benchmarks.micro --bot restaurantbot --output micro.json
+    python -m benchmarks.micro --bot synthetic --num_stories 2000 \\
+        --baseline micro.json
+
+Every benchmark is repeated `--repeat` times, the fastest repetition is
+reported to reduce the noise of other processes on the machine.
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+import typing
+from typing import Any, Callable, Dict, List, Text
+
+from benchmarks import bots, common
+
+if typing.TYPE_CHECKING:
+    from rasa.core.domain import Domain
+    from rasa.core.trackers import DialogueStateTracker
+
+logger = logging.getLogger(__name__)
+
+MAX_HISTORY = 5
+
+
+def create_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Micro benchmarks of training and prediction.")
+    parser.add_argument(
+        "--bot", default="restaurantbot",
+        choices=sorted(bots.EXAMPLE_BOTS) + ["synthetic"],
+        help="Bot whose stories are used.")
+    parser.add_argument(
+        "--num_stories", type=int, default=200,
+        help="Number of stories of the synthetic bot.")
+    parser.add_argument(
+        "--augmentation", type=int, default=20,
+        help="Augmentation factor of the training data generation.")
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="How often every benchmark is repeated.")
+    parser.add_argument(
+        "--output", default=None,
+        help="Writes the results as json to this file.")
+    parser.add_argument(
+        "--baseline", default=None,
+        help="Results of an earlier run to compare against.")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2,
+        help="Relative change compared to the baseline which is accepted.")
+    return parser
+
+
+def measure(function: Callable[[], Any],
+            num_ops: int,
+            repeat: int) -> Dict[Text, float]:
+    """Runs `function`, which does `num_ops` operations, `repeat` times
+    and reports the fastest run."""
+
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+
+    seconds = min(durations)
+    return {"ops": num_ops,
+            "seconds": seconds,
+            "ops_per_second": num_ops / seconds if seconds else 0.0}
+
+
+def _prediction_trackers(trackers: List['DialogueStateTracker'],
+                         domain: 'Domain') -> List['DialogueStateTracker']:
+    """Plain trackers, the trackers of the training data cache their
+    states which would make the featurization look faster."""
+    from rasa.core.trackers import DialogueStateTracker
+
+    return [DialogueStateTracker.from_events(t.sender_id, t.events,
+                                             domain.slots)
+            for t in trackers]
+
+
+def run_benchmarks(bot: bots.BenchmarkBot,
+                   augmentation_factor: int,
+                   repeat: int) -> Dict[Text, Dict[Text, float]]:
+    from rasa.core import training
+    from rasa.core.domain import Domain
+    from rasa.core.featurizers import (
+        BinarySingleStateFeaturizer, MaxHistoryTrackerFeaturizer)
+    from rasa.core.policies.memoization import MemoizationPolicy
+    from rasa.core.tracker_store import InMemoryTrackerStore
+
+    loop = asyncio.get_event_loop()
+    domain = Domain.load(bot.domain_file)
+    results = {}
+
+    def generate_training_data():
+        return loop.run_until_complete(training.load_data(
+            bot.stories_file, domain,
+            augmentation_factor=augmentation_factor))
+
+    training_trackers = generate_training_data()
+    results["training_data_generation"] = measure(
+        generate_training_data, len(training_trackers), repeat)
+
+    featurizer = MaxHistoryTrackerFeaturizer(BinarySingleStateFeaturizer(),
+                                             max_history=MAX_HISTORY)
+
+    results["featurize_trackers"] = measure(
+        lambda: featurizer.featurize_trackers(training_trackers, domain),
+        len(training_trackers), repeat)
+
+    trackers = _prediction_trackers(
+        loop.run_until_complete(training.load_data(
+            bot.stories_file, domain, augmentation_factor=0)), domain)
+
+    results["create_X"] = measure(
+        lambda: [featurizer.create_X([t], domain) for t in trackers],
+        len(trackers), repeat)
+    results["create_X_batches"] = measure(
+        lambda: featurizer.create_X_batches(trackers, domain),
+        len(trackers), repeat)
+
+    policy = MemoizationPolicy(max_history=MAX_HISTORY)
+    policy.train(training_trackers, domain)
+    results["memoization_recall"] = measure(
+        lambda: [policy.predict_action_probabilities(t, domain)
+                 for t in trackers],
+        len(trackers), repeat)
+
+    store = InMemoryTrackerStore(domain)
+    serialised = [store.serialise_tracker(t) for t in trackers]
+    results["tracker_serialisation"] = measure(
+        lambda: [store.serialise_tracker(t) for t in trackers],
+        len(trackers), repeat)
+    results["tracker_deserialisation"] = measure(
+        lambda: [store.deserialise_tracker(t.sender_id, s)
+                 for t, s in zip(trackers, serialised)],
+        len(trackers), repeat)
+
+    return results
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("rasa").setLevel(logging.WARNING)
+    args = create_argument_parser().parse_args()
+
+    if args.bot == "synthetic":
+        bot = bots.synthetic_bot(tempfile.mkdtemp(),
+                                 num_stories=args.num_stories)
+    else:
+        bot = bots.EXAMPLE_BOTS[args.bot]
+
+    results = {}
+    benchmarks = run_benchmarks(bot, args.augmentation, args.repeat)
+    for benchmark, metrics in benchmarks.items():
+        name = "{}-{}".format(bot.name, benchmark)
+        results[name] = metrics
+        logger.info("{:<50} {:>10.1f} ops/s ({} ops in {:.3f}s)"
+                    "".format(name, metrics["ops_per_second"],
+                              metrics["ops"], metrics["seconds"]))
+
+    common.write_results(results, args.output)
+
+    if args.baseline:
+        common.report_regressions(common.compare_to_baseline(
+            results, args.baseline, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
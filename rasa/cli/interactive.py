@@ -1,5 +1,4 @@
 import argparse
-import shutil
 from typing import List
 
 import rasa.cli.run as run
@@ -45,4 +44,4 @@ def interactive(args: argparse.Namespace):
 
     do_interactive_learning(args, stories_directory)
 
-    shutil.rmtree(model_path)
+    model.remove_unpacked_model(model_path)
@@ -1,7 +1,7 @@
 import argparse
 import tempfile
 import typing
-from typing import List, Optional, Text
+from typing import Any, Dict, List, Optional, Text
 
 from rasa.cli.default_arguments import (
     add_config_param, add_domain_param, add_nlu_data_param, add_stories_param)
@@ -56,6 +56,9 @@ def add_joint_parser_arguments(parser: argparse.ArgumentParser):
     parser.add_argument("--force", action="store_true",
                         help="Force a model training even if the data "
                              "has not changed.")
+    parser.add_argument("--uncompressed", action="store_true",
+                        help="Store the model as an uncompressed package "
+                             "which is loaded without extracting it.")
     parser.add_argument("--data", default=[DEFAULT_DATA_PATH],
                         nargs='+',
                         help="Paths to the Core and NLU training files.")
@@ -82,6 +85,12 @@ def _add_core_compare_arguments(parser: argparse.ArgumentParser):
         type=int,
         default=3,
         help="Number of runs for experiments")
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Random seed for the exclusion of stories, comparisons "
+             "with the same seed exclude the same stories.")
     parser.add_argument(
         "-c", "--config",
         nargs='+',
@@ -91,6 +100,16 @@ def _add_core_compare_arguments(parser: argparse.ArgumentParser):
              "models are trained to compare policies.")
 
 
+def _core_training_arguments(args: argparse.Namespace) -> Dict[Text, Any]:
+    """Extracts arguments which are passed on to the Core training.
+
+    Commands like `rasa interactive` don't have all Core training
+    arguments, their defaults are used instead."""
+
+    return {"cache_dir": getattr(args, "cache_dir", None),
+            "num_workers": getattr(args, "num_workers", 1)}
+
+
 def train(args: argparse.Namespace) -> Optional[Text]:
     import rasa
     domain = get_validated_path(args.domain, "domain", DEFAULT_DOMAIN_PATH)
@@ -99,7 +118,9 @@ def train(args: argparse.Namespace) -> Optional[Text]:
     training_files = [get_validated_path(f, "data", DEFAULT_DATA_PATH)
                       for f in args.data]
 
-    return rasa.train(domain, config, training_files, args.out, args.force)
+    return rasa.train(domain, config, training_files, args.out, args.force,
+                      _core_training_arguments(args),
+                      getattr(args, "uncompressed", False))
 
 
 def train_core(args: argparse.Namespace,
@@ -123,10 +144,12 @@ def train_core(args: argparse.Namespace,
 
         config = get_validated_path(args.config, "config", DEFAULT_CONFIG_PATH)
 
-        return train_core(args.domain, config, stories, output, train_path)
+        return train_core(args.domain, config, stories, output, train_path,
+                          _core_training_arguments(args))
     else:
         from rasa.core.train import do_compare_training
-        loop.run_until_complete(do_compare_training(args, stories, None))
+        loop.run_until_complete(do_compare_training(
+            args, stories, _core_training_arguments(args)))
         return None
 
 
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Optional, Text
+
+from rasa.core import metrics
+from rasa.core.exceptions import OverloadedError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_QUEUED_TURNS = 100
+
+# seconds a turn waits to be admitted before it is rejected
+DEFAULT_MAX_QUEUE_TIME = 5.0
+
+# the adaptive limit is decreased if turns take longer or the event loop
+# lags more than this (in seconds)
+DEFAULT_TARGET_LATENCY = 1.0
+DEFAULT_TARGET_LOOP_LAG = 0.05
+
+# weight of a new measurement in the moving averages of the latency and lag
+SMOOTHING = 0.2
+
+# factor by which the adaptive limit is decreased when the agent is slow
+DECREASE_FACTOR = 0.9
+
+# reasons for rejecting a turn
+QUEUE_FULL = "queue_full"
+DEADLINE_EXCEEDED = "deadline_exceeded"
+
+
+class Admission(object):
+    """Async context manager which holds the admission of a turn."""
+
+    def __init__(self, controller: 'AdmissionController') -> None:
+        self.controller = controller
+        self.start = None
+
+    async def __aenter__(self) -> 'Admission':
+        await self.controller.acquire()
+        self.start = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.controller.release(time.perf_counter() - self.start)
+
+
+class AdmissionController(object):
+    """Limits the number of turns which are processed at the same time.
+
+    Turns above the limit wait in a queue in the order in which they
+    arrived. Turns are rejected with an `OverloadedError` if the queue is
+    full or if they waited longer than `max_queue_time`, so that clients
+    get a fast answer instead of a timeout.
+
+    With `adaptive`, the limit starts at `max_concurrent_turns` and is
+    adjusted to the measured turn latency and event loop lag: it is
+    decreased by a factor if either is above its target and increased by
+    one per round of turns while turns have to wait although both are on
+    target."""
+
+    def __init__(self,
+                 max_concurrent_turns: int,
+                 max_queued_turns: int = DEFAULT_MAX_QUEUED_TURNS,
+                 max_queue_time: float = DEFAULT_MAX_QUEUE_TIME,
+                 adaptive: bool = False,
+                 min_concurrent_turns: int = 1,
+                 target_latency: float = DEFAULT_TARGET_LATENCY,
+                 target_loop_lag: float = DEFAULT_TARGET_LOOP_LAG,
+                 fallback_utterance: Optional[Text] = None) -> None:
+        self.max_concurrent_turns = max_concurrent_turns
+        self.max_queued_turns = max_queued_turns
+        self.max_queue_time = max_queue_time
+        self.adaptive = adaptive
+        self.min_concurrent_turns = min(min_concurrent_turns,
+                                        max_concurrent_turns)
+        self.target_latency = target_latency
+        self.target_loop_lag = target_loop_lag
+        # text channels send instead of a response if a turn is rejected
+        self.fallback_utterance = fallback_utterance
+
+        self.limit = float(max_concurrent_turns)
+        self.num_processing = 0
+        self.num_queued_total = 0
+        self.num_shed = 0
+        # moving averages of the measurements of the adaptive limit
+        self.latency = 0.0
+        self.loop_lag = 0.0
+        self._waiters = deque()  # type: Deque[asyncio.Future]
+
+    @property
+    def num_queued(self) -> int:
+        return len(self._waiters)
+
+    def admit(self) -> Admission:
+        """Admission of a turn.
+
+        Usage: `async with controller.admit(): ...`"""
+
+        return Admission(self)
+
+    def _has_capacity(self) -> bool:
+        return self.num_processing < int(self.limit)
+
+    async def _measure_loop_lag(self) -> None:
+        # a coroutine which yields is resumed after all callbacks which are
+        # ready to run, which is how long every callback is delayed
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        await asyncio.sleep(0)
+        lag = loop.time() - start
+        self.loop_lag += SMOOTHING * (lag - self.loop_lag)
+
+    def _shed(self, reason: Text) -> None:
+        self.num_shed += 1
+        metrics.increment(metrics.ADMISSION_SHED_TOTAL, reason=reason)
+        logger.warning("Rejected a message as the agent is overloaded ({})."
+                       "".format(reason))
+        raise OverloadedError("The server is overloaded, please try again "
+                              "later.", self.fallback_utterance)
+
+    async def acquire(self) -> None:
+        if self.adaptive:
+            await self._measure_loop_lag()
+
+        if self._has_capacity() and not self._waiters:
+            self.num_processing += 1
+            return
+
+        if len(self._waiters) >= self.max_queued_turns:
+            self._shed(QUEUE_FULL)
+
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiters.append(waiter)
+        self.num_queued_total += 1
+        metrics.increment(metrics.ADMISSION_QUEUED_TOTAL)
+        try:
+            # `release` hands its slot over to the waiter
+            await asyncio.wait_for(waiter, self.max_queue_time)
+        except asyncio.TimeoutError:
+            self._shed(DEADLINE_EXCEEDED)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over before the turn was cancelled
+                self.release(None)
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, latency: Optional[float]) -> None:
+        self.num_processing -= 1
+        if latency is not None:
+            self._adapt(latency)
+
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.num_processing += 1
+                waiter.set_result(None)
+
+    def _adapt(self, latency: float) -> None:
+        self.latency += SMOOTHING * (latency - self.latency)
+        if not self.adaptive:
+            return
+
+        if (self.latency > self.target_latency or
+                self.loop_lag > self.target_loop_lag):
+            self.limit = max(float(self.min_concurrent_turns),
+                             self.limit * DECREASE_FACTOR)
+        elif self._waiters:
+            # the limit is reached and turns are still fast enough
+            self.limit = min(float(self.max_concurrent_turns),
+                             self.limit + 1.0 / self.limit)
@@ -11,21 +11,26 @@ from typing import Any, Callable, Dict, List, Optional, Text, Union
 import aiohttp
 
 from rasa.core import constants, jobs, training, utils
+from rasa.core.admission import AdmissionController
 from rasa.core.channels import InputChannel, OutputChannel, UserMessage
 from rasa.core.constants import DEFAULT_REQUEST_TIMEOUT
 from rasa.core.dispatcher import Dispatcher
 from rasa.core.domain import Domain, InvalidDomain, check_domain_sanity
+from rasa.core.events import ReminderScheduled
 from rasa.core.exceptions import AgentNotReady
-from rasa.core.interpreter import NaturalLanguageInterpreter
+from rasa.core.interpreter import NaturalLanguageInterpreter, RegexInterpreter
+from rasa.core.lock_store import InMemoryLockStore, LockStore
 from rasa.core.nlg import NaturalLanguageGenerator
+from rasa.core.parse_cache import CachingInterpreter, ParseCache
 from rasa.core.policies import FormPolicy, Policy
 from rasa.core.policies.ensemble import PolicyEnsemble, SimplePolicyEnsemble
 from rasa.core.policies.memoization import MemoizationPolicy
 from rasa.core.processor import MessageProcessor
+from rasa.core.reminders import (
+    InMemoryReminderStore, ReminderScheduler, ReminderStore)
 from rasa.core.tracker_store import InMemoryTrackerStore
 from rasa.core.trackers import DialogueStateTracker
-from rasa.core.utils import EndpointConfig, LockCounter
-from rasa_nlu.utils import is_url
+from rasa.core.utils import EndpointConfig
 
 logger = logging.getLogger(__name__)
 
@@ -97,7 +102,8 @@ def _load_and_set_updated_model(agent: 'Agent',
     # noinspection PyBroadException
     try:
         policy_ensemble = PolicyEnsemble.load(core_model)
-        agent.update_model(domain, policy_ensemble, fingerprint, interpreter)
+        agent.update_model(domain, policy_ensemble, fingerprint, interpreter,
+                           core_model)
         logger.debug("Finished updating agent to new model.")
     except Exception:
         logger.exception("Failed to load policy and update agent. "
@@ -107,6 +113,7 @@ def _load_and_set_updated_model(agent: 'Agent',
 async def _update_model_from_server(model_server: EndpointConfig,
                                     agent: 'Agent') -> None:
     """Load a zipped Rasa Core model from a URL and update the passed agent."""
+    from rasa_nlu.utils import is_url
 
     if not is_url(model_server.url):
         raise aiohttp.InvalidURL(model_server.url)
@@ -220,7 +227,12 @@ class Agent(object):
             generator: Union[EndpointConfig, 'NLG', None] = None,
             tracker_store: Optional['TrackerStore'] = None,
             action_endpoint: Optional[EndpointConfig] = None,
-            fingerprint: Optional[Text] = None
+            fingerprint: Optional[Text] = None,
+            model_directory: Optional[Text] = None,
+            lock_store: Optional[LockStore] = None,
+            admission_controller: Optional[AdmissionController] = None,
+            reminder_store: Optional[ReminderStore] = None,
+            parse_cache: Optional[ParseCache] = None
     ):
         # Initializing variables with the passed parameters.
         self.domain = self._create_domain(domain)
@@ -233,13 +245,24 @@ class Agent(object):
                 "FormPolicy to your policy ensemble."
             )
 
-        self.interpreter = NaturalLanguageInterpreter.create(interpreter)
+        # caches the parse results of the interpreter if it is set
+        self.parse_cache = parse_cache
+        self.interpreter = self._create_interpreter(interpreter)
 
         self.nlg = NaturalLanguageGenerator.create(generator, self.domain)
         self.tracker_store = self.create_tracker_store(
             tracker_store, self.domain)
         self.action_endpoint = action_endpoint
-        self.conversations_in_processing = {}
+        self.lock_store = self._create_lock_store(lock_store)
+        # limits the turns which are processed at the same time, all turns
+        # are processed if there is none
+        self.admission_controller = admission_controller
+        self.reminder_scheduler = ReminderScheduler(
+            self._create_reminder_store(reminder_store),
+            self.handle_reminder)
+        # directory the model was loaded from, allows worker processes to
+        # load the same model
+        self.model_directory = model_directory
 
         self._set_fingerprint(fingerprint)
 
@@ -247,13 +270,16 @@ class Agent(object):
                      domain: Union[Text, Domain],
                      policy_ensemble: PolicyEnsemble,
                      fingerprint: Optional[Text],
-                     interpreter: Optional[NaturalLanguageInterpreter] = None
+                     interpreter: Optional[NaturalLanguageInterpreter] = None,
+                     model_directory: Optional[Text] = None
                      ) -> None:
         self.domain = domain
         self.policy_ensemble = policy_ensemble
+        self.model_directory = model_directory
 
         if interpreter:
-            self.interpreter = NaturalLanguageInterpreter.create(interpreter)
+            self.interpreter = self._create_interpreter(interpreter,
+                                                        self.interpreter)
 
         self._set_fingerprint(fingerprint)
 
@@ -268,7 +294,11 @@ class Agent(object):
              interpreter: Optional[NaturalLanguageInterpreter] = None,
              generator: Union[EndpointConfig, 'NLG'] = None,
              tracker_store: Optional['TrackerStore'] = None,
-             action_endpoint: Optional[EndpointConfig] = None
+             action_endpoint: Optional[EndpointConfig] = None,
+             lock_store: Optional[LockStore] = None,
+             admission_controller: Optional[AdmissionController] = None,
+             reminder_store: Optional[ReminderStore] = None,
+             parse_cache: Optional[ParseCache] = None
              ) -> 'Agent':
         """Load a persisted model from the passed path."""
 
@@ -297,7 +327,12 @@ class Agent(object):
                    interpreter=interpreter,
                    generator=generator,
                    tracker_store=tracker_store,
-                   action_endpoint=action_endpoint)
+                   action_endpoint=action_endpoint,
+                   model_directory=path,
+                   lock_store=lock_store,
+                   admission_controller=admission_controller,
+                   reminder_store=reminder_store,
+                   parse_cache=parse_cache)
 
     def is_ready(self):
         """Check if all necessary components are instantiated to use agent."""
@@ -331,31 +366,24 @@ class Agent(object):
 
         processor = self.create_processor(message_preprocessor)
 
-        # get the lock for the current conversation
-        lock = self.conversations_in_processing.get(message.sender_id)
-        if not lock:
-            logger.debug("created a new lock for conversation '{}'"
-                         "".format(message.sender_id))
-            lock = LockCounter()
-            self.conversations_in_processing[message.sender_id] = lock
+        if self.admission_controller is None:
+            return await self._handle_message_in_order(processor, message)
 
-        try:
-            async with lock:
-                # this makes sure that there can always only be one coroutine
-                # handling a conversation at any point in time
-                # Note: this doesn't support multi-processing, it just works
-                # for coroutines. If there are multiple processes handling
-                # messages, an external system needs to make sure messages
-                # for the same conversation are always processed by the same
-                # process.
-                return await processor.handle_message(message)
-        finally:
-            if not lock.is_someone_waiting():
-                # dispose of the lock if no one needs it to avoid
-                # accumulating locks
-                del self.conversations_in_processing[message.sender_id]
-                logger.debug("deleted lock for conversation '{}' (unused)"
-                             "".format(message.sender_id))
+        # raises an `OverloadedError` if the turn is rejected
+        async with self.admission_controller.admit():
+            return await self._handle_message_in_order(processor, message)
+
+    async def _handle_message_in_order(
+        self,
+        processor: MessageProcessor,
+        message: UserMessage
+    ) -> Optional[List[Text]]:
+        # this makes sure that there can always only be one turn of a
+        # conversation processed at any point in time, in the order in
+        # which the messages arrived. If the lock store is shared, e.g.
+        # a `RedisLockStore`, this holds across processes.
+        async with self.lock_store.lock(message.sender_id):
+            return await processor.handle_message(message)
 
     # noinspection PyUnusedLocal
     def predict_next(
@@ -368,6 +396,15 @@ class Agent(object):
         processor = self.create_processor()
         return processor.predict_next(sender_id)
 
+    def predict_next_batch(
+            self,
+            sender_ids: List[Text]
+    ) -> List[Optional[Dict[Text, Any]]]:
+        """Predicts the next action of several conversations at once."""
+
+        processor = self.create_processor()
+        return processor.predict_next_batch(sender_ids)
+
     # noinspection PyUnusedLocal
     async def log_message(
         self,
@@ -378,7 +415,23 @@ class Agent(object):
         """Append a message to a dialogue - does not predict actions."""
 
         processor = self.create_processor(message_preprocessor)
-        return await processor.log_message(message)
+        async with self.lock_store.lock(message.sender_id):
+            return await processor.log_message(message)
+
+    async def handle_reminder(
+        self,
+        reminder_event: ReminderScheduled,
+        sender_id: Text,
+        output_channel: OutputChannel
+    ) -> None:
+        """Runs the action of a due reminder."""
+
+        processor = self.create_processor()
+        dispatcher = Dispatcher(sender_id,
+                                output_channel,
+                                self.nlg)
+        async with self.lock_store.lock(sender_id):
+            await processor.handle_reminder(reminder_event, dispatcher)
 
     async def execute_action(
         self,
@@ -394,9 +447,10 @@ class Agent(object):
         dispatcher = Dispatcher(sender_id,
                                 output_channel,
                                 self.nlg)
-        return await processor.execute_action(sender_id, action, dispatcher,
-                                              policy,
-                                              confidence)
+        async with self.lock_store.lock(sender_id):
+            return await processor.execute_action(sender_id, action,
+                                                  dispatcher, policy,
+                                                  confidence)
 
     async def handle_text(
         self,
@@ -496,17 +550,10 @@ class Agent(object):
                 return False
         return True
 
-    async def load_data(self,
-                        resource_name: Text,
-                        remove_duplicates: bool = True,
-                        unique_last_num_states: Optional[int] = None,
-                        augmentation_factor: int = 20,
-                        tracker_limit: Optional[int] = None,
-                        use_story_concatenation: bool = True,
-                        debug_plots: bool = False,
-                        exclusion_percentage: int = None
-                        ) -> List[DialogueStateTracker]:
-        """Load training data from a resource."""
+    def _unique_last_num_states(self,
+                                unique_last_num_states: Optional[int] = None
+                                ) -> Optional[int]:
+        """Number of last states which make a generated tracker unique."""
 
         max_history = self._max_history()
 
@@ -527,13 +574,38 @@ class Agent(object):
                            "at least maximum max_history."
                            "".format(unique_last_num_states, max_history))
 
+        return unique_last_num_states
+
+    async def load_data(self,
+                        resource_name: Text,
+                        remove_duplicates: bool = True,
+                        unique_last_num_states: Optional[int] = None,
+                        augmentation_factor: int = 20,
+                        tracker_limit: Optional[int] = None,
+                        use_story_concatenation: bool = True,
+                        debug_plots: bool = False,
+                        exclusion_percentage: int = None,
+                        cache_dir: Optional[Text] = None,
+                        num_workers: int = 1
+                        ) -> List[DialogueStateTracker]:
+        """Load training data from a resource.
+
+        If `cache_dir` is set, parsed stories and generated trackers are
+        cached there and reused across training runs. Story files are
+        parsed in `num_workers` processes."""
+
+        unique_last_num_states = self._unique_last_num_states(
+            unique_last_num_states)
+
         return await training.load_data(
             resource_name, self.domain,
             remove_duplicates, unique_last_num_states,
             augmentation_factor,
             tracker_limit, use_story_concatenation,
             debug_plots,
-            exclusion_percentage=exclusion_percentage)
+            exclusion_percentage=exclusion_percentage,
+            cache_dir=cache_dir,
+            num_workers=num_workers)
 
     def train(self,
               training_trackers: List[DialogueStateTracker],
@@ -649,6 +721,7 @@ class Agent(object):
         self.policy_ensemble.persist(model_path, dump_flattened_stories)
         self.domain.persist(os.path.join(model_path, "domain.yml"))
         self.domain.persist_specification(model_path)
+        self.model_directory = model_path
 
         logger.info("Persisted model to '{}'"
                     "".format(os.path.abspath(model_path)))
@@ -701,7 +774,8 @@ class Agent(object):
             self.tracker_store,
             self.nlg,
             action_endpoint=self.action_endpoint,
-            message_preprocessor=preprocessor)
+            message_preprocessor=preprocessor,
+            reminder_scheduler=self.reminder_scheduler)
 
     @staticmethod
     def _create_domain(domain: Union[None, Domain, Text]) -> Domain:
@@ -716,6 +790,26 @@ class Agent(object):
                 "specification or a domain instance. But got "
                 "type '{}' with value '{}'".format(type(domain), domain))
 
+    def _create_interpreter(self,
+                            interpreter: Any,
+                            previous: Optional[
+                                NaturalLanguageInterpreter] = None
+                            ) -> NaturalLanguageInterpreter:
+        """Creates the interpreter, which caches its parse results if the
+        agent has a parse cache."""
+
+        interpreter = NaturalLanguageInterpreter.create(interpreter)
+        if (self.parse_cache is None or
+                isinstance(interpreter, RegexInterpreter)):
+            return interpreter
+
+        interpreter = CachingInterpreter(interpreter, self.parse_cache)
+        if (isinstance(previous, CachingInterpreter) and
+                previous.fingerprint != interpreter.fingerprint):
+            # the results of the previous model aren't used anymore
+            self.parse_cache.invalidate()
+        return interpreter
+
     @staticmethod
     def create_tracker_store(store: Optional['TrackerStore'],
                              domain: Domain) -> 'TrackerStore':
@@ -725,6 +819,19 @@ class Agent(object):
         else:
             return InMemoryTrackerStore(domain)
 
+    @staticmethod
+    def _create_lock_store(store: Optional[LockStore]) -> LockStore:
+        if store is not None:
+            return store
+        return InMemoryLockStore()
+
+    @staticmethod
+    def _create_reminder_store(store: Optional[ReminderStore]
+                               ) -> ReminderStore:
+        if store is not None:
+            return store
+        return InMemoryReminderStore()
+
     @staticmethod
     def _create_ensemble(
         policies: Union[List[Policy], PolicyEnsemble, None]
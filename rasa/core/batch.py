@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional,
+    Text, Tuple)
+
+from rasa.core.channels import UserMessage
+from rasa.core.exceptions import OverloadedError
+
+logger = logging.getLogger(__name__)
+
+# senders whose items are processed at the same time
+DEFAULT_MAX_CONCURRENT_SENDERS = 10
+
+# trackers which are predicted at once by the policy ensemble
+DEFAULT_BATCH_SIZE = 64
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+Item = Dict[Text, Any]
+Result = Dict[Text, Any]
+
+
+def parse_items(body: Optional[bytes],
+                content_type: Optional[Text],
+                key: Text) -> List[Item]:
+    """Items of the body of a batch request.
+
+    The body is either a JSON object with the list of items under `key`
+    or, if its content type is NDJSON, one JSON object per line. Raises a
+    `ValueError` if the body isn't valid."""
+
+    text = (body or b"").decode("utf-8")
+    if content_type and content_type.startswith(NDJSON_CONTENT_TYPE):
+        items = [json.loads(line) for line in text.splitlines()
+                 if line.strip()]
+    else:
+        data = json.loads(text) if text.strip() else {}
+        if not isinstance(data, dict):
+            raise ValueError("Expected an object with the key '{}'."
+                             "".format(key))
+        items = data.get(key, [])
+
+    if not isinstance(items, list):
+        raise ValueError("Expected a list under the key '{}'.".format(key))
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("Expected every item to be an object, got "
+                             "'{}'.".format(item))
+    return items
+
+
+def sender_id_of(item: Item) -> Text:
+    return item.get("sender_id") or UserMessage.DEFAULT_SENDER_ID
+
+
+def chunks(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def error_result(index: int, sender_id: Text, error: Exception) -> Result:
+    return {"index": index,
+            "sender_id": sender_id,
+            "error": type(error).__name__,
+            "message": str(error)}
+
+
+async def process_by_sender(
+        items: List[Item],
+        process: Callable[[Text, Item], Awaitable[Result]],
+        max_concurrent_senders: int = DEFAULT_MAX_CONCURRENT_SENDERS
+) -> AsyncIterator[Result]:
+    """Processes the items of every sender in their order and the items
+    of up to `max_concurrent_senders` senders at the same time.
+
+    Yields the result of every item as soon as it is done, together with
+    the index of the item. An item which fails yields its error and the
+    following items of its sender are still processed."""
+
+    senders = OrderedDict()  # type: Dict[Text, List[Tuple[int, Item]]]
+    for index, item in enumerate(items):
+        senders.setdefault(sender_id_of(item), []).append((index, item))
+
+    results = asyncio.Queue()
+    semaphore = asyncio.Semaphore(max_concurrent_senders)
+
+    async def process_sender(sender_id, indexed_items):
+        async with semaphore:
+            for index, item in indexed_items:
+                try:
+                    result = await process(sender_id, item)
+                    result = dict(result, index=index, sender_id=sender_id)
+                except asyncio.CancelledError:
+                    raise
+                except OverloadedError as e:
+                    result = error_result(index, sender_id, e)
+                except Exception as e:
+                    logger.exception("Failed to process item {} of the "
+                                     "batch.".format(index))
+                    result = error_result(index, sender_id, e)
+                await results.put(result)
+
+    # `asyncio.gather` doesn't start its coroutines in order
+    tasks = [asyncio.ensure_future(process_sender(sender_id, indexed_items))
+             for sender_id, indexed_items in senders.items()]
+    try:
+        for _ in range(len(items)):
+            yield await results.get()
+    finally:
+        # the client disconnected or the batch is done
+        for task in tasks:
+            task.cancel()
@@ -17,6 +17,7 @@ from rasa.core.channels.callback import CallbackInput  # nopep8
 from rasa.core.channels.console import CmdlineInput  # nopep8
 from rasa.core.channels.facebook import FacebookInput  # nopep8
 from rasa.core.channels.mattermost import MattermostInput  # nopep8
+from rasa.core.channels.message_queue import MessageQueueInput  # nopep8
 from rasa.core.channels.rasa_chat import RasaChatInput  # nopep8
 from rasa.core.channels.rocketchat import RocketChatInput  # nopep8
 from rasa.core.channels.slack import SlackInput  # nopep8
@@ -27,7 +28,8 @@ from rasa.core.channels.webexteams import WebexTeamsInput  # nopep8
 input_channel_classes = [
     CmdlineInput, FacebookInput, SlackInput, TelegramInput, MattermostInput,
     TwilioInput, RasaChatInput, BotFrameworkInput, RocketChatInput,
-    CallbackInput, RestInput, SocketIOInput, WebexTeamsInput
+    CallbackInput, RestInput, SocketIOInput, WebexTeamsInput,
+    MessageQueueInput
 ]  # type: List[InputChannel]
 
 # Mapping from a input channel name to its class to allow name based lookup.
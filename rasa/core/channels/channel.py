@@ -11,6 +11,7 @@ from typing import (
 import uuid
 from rasa.core import utils
 from rasa.core.constants import DOCS_BASE_URL
+from rasa.core.exceptions import OverloadedError
 
 try:
     from urlparse import urljoin
@@ -64,15 +65,22 @@ def register(input_channels: List['InputChannel'],
              app: Sanic,
              route: Optional[Text]
              ) -> None:
-    async def handler(*args, **kwargs):
-        await app.agent.handle_message(*args, **kwargs)
+    def create_handler(channel):
+        async def handler(message, *args, **kwargs):
+            try:
+                await app.agent.handle_message(message, *args, **kwargs)
+            except OverloadedError as e:
+                await channel.on_overload(message, e)
+
+        return handler
 
     for channel in input_channels:
         if route:
             p = urljoin(route, channel.url_prefix())
         else:
             p = None
-        app.blueprint(channel.blueprint(handler), url_prefix=p)
+        app.blueprint(channel.blueprint(create_handler(channel)),
+                      url_prefix=p)
 
 
 def button_to_string(button, idx=0):
@@ -137,6 +145,23 @@ class InputChannel(object):
         raise NotImplementedError(
             "Component listener needs to provide blueprint.")
 
+    async def on_overload(self,
+                          message: UserMessage,
+                          error: OverloadedError) -> None:
+        """Called if the agent rejected a message because it is overloaded.
+
+        Sends the fallback utterance of the agent's admission controller
+        to the user or drops the message if there is none. Channels which
+        can answer with an error re-raise it."""
+
+        if error.fallback_utterance is None:
+            logger.warning("Dropped message of user '{}': {}"
+                           "".format(message.sender_id, error))
+            return
+
+        await message.output_channel.send_text_message(
+            message.sender_id, error.fallback_utterance)
+
     @classmethod
     def raise_missing_credentials_exception(cls):
         raise Exception("To use the {} input channel, you need to "
@@ -348,15 +373,30 @@ class RestInput(InputChannel):
     def name(cls):
         return "rest"
 
+    async def on_overload(self,
+                          message: UserMessage,
+                          error: OverloadedError) -> None:
+        # the webhook answers with an error instead
+        raise error
+
     @staticmethod
     async def on_message_wrapper(on_new_message, text, queue, sender_id):
         collector = QueueOutputChannel(queue)
 
         message = UserMessage(text, collector, sender_id,
                               input_channel=RestInput.name())
-        await on_new_message(message)
-
-        await queue.put("DONE")
+        try:
+            await on_new_message(message)
+        except OverloadedError as e:
+            await queue.put({"status": "failure",
+                             "reason": "Overloaded",
+                             "message": str(e)})
+        except Exception:
+            logger.exception("An exception occured while handling "
+                             "user message '{}'.".format(text))
+        finally:
+            # ends the stream, whatever happened to the message
+            await queue.put("DONE")
 
     async def _extract_sender(self, req):
         return req.json.get("sender", None)
@@ -407,6 +447,10 @@ class RestInput(InputChannel):
                 try:
                     await on_new_message(UserMessage(text, collector, sender_id,
                                                      input_channel=self.name()))
+                except OverloadedError as e:
+                    return response.json({"status": "failure",
+                                          "reason": "Overloaded",
+                                          "message": str(e)}, status=503)
                 except CancelledError:
                     logger.error("Message handling timed out for "
                                  "user message '{}'.".format(text))
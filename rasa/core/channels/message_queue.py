@@ -0,0 +1,456 @@
+import asyncio
+import itertools
+import json
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Text
+
+from sanic import Blueprint, response
+
+from rasa.core.channels.channel import (
+    CollectingOutputChannel, InputChannel, UserMessage)
+from rasa.core.exceptions import OverloadedError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = "rasa_core_messages"
+DEFAULT_OUTPUT_QUEUE = "rasa_core_responses"
+DEFAULT_DEAD_LETTER_QUEUE = "rasa_core_dead_letters"
+
+# conversations whose messages are processed at the same time
+DEFAULT_MAX_IN_FLIGHT = 10
+
+# header of dead letters which contains the reason of the failure
+ERROR_HEADER = "x-rasa-error"
+
+# seconds after which a message which the overloaded agent rejected is
+# processed again
+OVERLOAD_RETRY_DELAY = 0.5
+
+
+class Delivery(object):
+    """Message which was taken from a queue and still needs to be acked."""
+
+    def __init__(self,
+                 body: bytes,
+                 tag: Any,
+                 headers: Optional[Dict[Text, Any]] = None) -> None:
+        self.body = body
+        self.tag = tag
+        self.headers = headers or {}
+
+
+class MessageQueue(object):
+    """Connection to the queues of the message queue channel."""
+
+    def __init__(self,
+                 queue: Text = DEFAULT_QUEUE,
+                 dead_letter_queue: Text = DEFAULT_DEAD_LETTER_QUEUE) -> None:
+        self.queue = queue
+        self.dead_letter_queue = dead_letter_queue
+
+    @staticmethod
+    def create(queue_type: Text = "pika", **kwargs: Any) -> 'MessageQueue':
+        if queue_type == "pika":
+            return PikaMessageQueue(**kwargs)
+        elif queue_type == "in_memory":
+            return InMemoryMessageQueue(**kwargs)
+        else:
+            raise ValueError("Unknown message queue type '{}', use 'pika' "
+                             "or 'in_memory'.".format(queue_type))
+
+    async def connect(self, prefetch_count: int) -> None:
+        """Connects to the queues.
+
+        At most `prefetch_count` messages are taken from the input queue
+        without being acked."""
+        pass
+
+    async def get(self) -> Delivery:
+        """Waits for the next message of the input queue."""
+        raise NotImplementedError
+
+    async def ack(self, delivery: Delivery) -> None:
+        """Removes a processed message from the input queue."""
+        raise NotImplementedError
+
+    async def publish(self,
+                      queue: Text,
+                      body: bytes,
+                      headers: Optional[Dict[Text, Any]] = None) -> None:
+        raise NotImplementedError
+
+    async def dead_letter(self, delivery: Delivery, reason: Text) -> None:
+        """Moves a message which couldn't be processed to the dead letter
+        queue."""
+
+        headers = dict(delivery.headers)
+        headers[ERROR_HEADER] = reason
+        await self.publish(self.dead_letter_queue, delivery.body, headers)
+        await self.ack(delivery)
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryMessageQueue(MessageQueue):
+    """Queues of the process, e.g. to feed messages in tests."""
+
+    def __init__(self,
+                 queue: Text = DEFAULT_QUEUE,
+                 dead_letter_queue: Text = DEFAULT_DEAD_LETTER_QUEUE) -> None:
+        super(InMemoryMessageQueue, self).__init__(queue, dead_letter_queue)
+        self.queues = {}  # type: Dict[Text, asyncio.Queue]
+        self.acked = []
+        self._tags = itertools.count()
+
+    def messages(self, queue: Text) -> asyncio.Queue:
+        if queue not in self.queues:
+            self.queues[queue] = asyncio.Queue()
+        return self.queues[queue]
+
+    def put(self, message: Dict[Text, Any]) -> None:
+        """Adds a user message to the input queue."""
+
+        body = json.dumps(message).encode("utf-8")
+        self.messages(self.queue).put_nowait(Delivery(body,
+                                                      next(self._tags)))
+
+    async def get(self) -> Delivery:
+        return await self.messages(self.queue).get()
+
+    async def ack(self, delivery: Delivery) -> None:
+        self.acked.append(delivery.tag)
+
+    async def publish(self,
+                      queue: Text,
+                      body: bytes,
+                      headers: Optional[Dict[Text, Any]] = None) -> None:
+        self.messages(queue).put_nowait(Delivery(body, next(self._tags),
+                                                 headers))
+
+
+class PikaMessageQueue(MessageQueue):
+    """Queues of a RabbitMQ server.
+
+    Pika connections are not thread safe, so the consuming and the
+    publishing connection each use their own thread."""
+
+    def __init__(self,
+                 host: Text = "localhost",
+                 username: Optional[Text] = None,
+                 password: Optional[Text] = None,
+                 queue: Text = DEFAULT_QUEUE,
+                 dead_letter_queue: Text = DEFAULT_DEAD_LETTER_QUEUE,
+                 inactivity_timeout: float = 0.05,
+                 loglevel: int = logging.WARNING) -> None:
+        import pika
+
+        logging.getLogger('pika').setLevel(loglevel)
+
+        super(PikaMessageQueue, self).__init__(queue, dead_letter_queue)
+        self.host = host
+        self.credentials = pika.PlainCredentials(username, password)
+        # seconds the consuming thread waits for a message before it
+        # acks the processed messages
+        self.inactivity_timeout = inactivity_timeout
+
+        self._consuming_thread = ThreadPoolExecutor(max_workers=1)
+        self._publishing_thread = ThreadPoolExecutor(max_workers=1)
+        self._consuming_connection = None
+        self._consuming_channel = None
+        self._publishing_connection = None
+        self._publishing_channel = None
+        self._messages = None
+        self._declared_queues = set()
+
+    def _open_connection(self):
+        import pika
+
+        parameters = pika.ConnectionParameters(self.host,
+                                               credentials=self.credentials,
+                                               connection_attempts=20,
+                                               retry_delay=5)
+        return pika.BlockingConnection(parameters)
+
+    def _open_consuming_channel(self, prefetch_count: int) -> None:
+        self._consuming_connection = self._open_connection()
+        self._consuming_channel = self._consuming_connection.channel()
+        self._consuming_channel.queue_declare(self.queue, durable=True)
+        self._consuming_channel.basic_qos(prefetch_count=prefetch_count)
+        self._messages = self._consuming_channel.consume(
+            self.queue, inactivity_timeout=self.inactivity_timeout)
+
+    def _open_publishing_channel(self) -> None:
+        self._publishing_connection = self._open_connection()
+        self._publishing_channel = self._publishing_connection.channel()
+
+    @staticmethod
+    async def _run(thread: ThreadPoolExecutor, function: Callable) -> Any:
+        return await asyncio.get_event_loop().run_in_executor(thread,
+                                                              function)
+
+    async def connect(self, prefetch_count: int) -> None:
+        await self._run(self._consuming_thread,
+                        partial(self._open_consuming_channel, prefetch_count))
+        await self._run(self._publishing_thread,
+                        self._open_publishing_channel)
+        logger.debug("Consuming messages of queue '{}' at {}."
+                     "".format(self.queue, self.host))
+
+    def _next_delivery(self) -> Optional[Delivery]:
+        method, properties, body = next(self._messages)
+        if method is None:
+            return None
+        return Delivery(body, method.delivery_tag, properties.headers)
+
+    async def get(self) -> Delivery:
+        while True:
+            delivery = await self._run(self._consuming_thread,
+                                       self._next_delivery)
+            if delivery is not None:
+                return delivery
+
+    async def ack(self, delivery: Delivery) -> None:
+        await self._run(self._consuming_thread,
+                        partial(self._consuming_channel.basic_ack,
+                                delivery.tag))
+
+    def _publish(self,
+                 queue: Text,
+                 body: bytes,
+                 headers: Optional[Dict[Text, Any]]) -> None:
+        import pika
+
+        if queue not in self._declared_queues:
+            self._publishing_channel.queue_declare(queue, durable=True)
+            self._declared_queues.add(queue)
+
+        self._publishing_channel.basic_publish(
+            '', queue, body,
+            properties=pika.BasicProperties(delivery_mode=2,
+                                            headers=headers))
+
+    async def publish(self,
+                      queue: Text,
+                      body: bytes,
+                      headers: Optional[Dict[Text, Any]] = None) -> None:
+        await self._run(self._publishing_thread,
+                        partial(self._publish, queue, body, headers))
+
+    async def close(self) -> None:
+        # messages which weren't acked are delivered again by the server
+        if self._consuming_connection is not None:
+            await self._run(self._consuming_thread,
+                            self._consuming_connection.close)
+        if self._publishing_connection is not None:
+            await self._run(self._publishing_thread,
+                            self._publishing_connection.close)
+        self._consuming_thread.shutdown(wait=False)
+        self._publishing_thread.shutdown(wait=False)
+
+
+class MessageQueueOutput(CollectingOutputChannel):
+    """Publishes the bot messages to a queue."""
+
+    @classmethod
+    def name(cls):
+        return "message_queue"
+
+    def __init__(self,
+                 message_queue: MessageQueue,
+                 queue: Text = DEFAULT_OUTPUT_QUEUE) -> None:
+        super(MessageQueueOutput, self).__init__()
+        self.message_queue = message_queue
+        self.queue = queue
+
+    async def _persist_message(self, message: Dict[Text, Any]) -> None:
+        await super(MessageQueueOutput, self)._persist_message(message)
+        await self.message_queue.publish(
+            self.queue, json.dumps(message).encode("utf-8"))
+
+
+class MessageQueueInput(InputChannel):
+    """Consumes user messages from a queue.
+
+    Messages are json objects with a `sender` and a `message`, like the
+    payload of the rest channel. The messages of a conversation are
+    processed one after another, the messages of at most `max_in_flight`
+    conversations at the same time. A message is acked once its turn is
+    processed and the tracker is saved, messages whose turn fails are moved
+    to the dead letter queue."""
+
+    @classmethod
+    def name(cls):
+        return "message_queue"
+
+    @classmethod
+    def from_credentials(cls, credentials):
+        if not credentials:
+            cls.raise_missing_credentials_exception()
+
+        credentials = dict(credentials)
+        max_in_flight = credentials.pop("max_in_flight",
+                                        DEFAULT_MAX_IN_FLIGHT)
+        prefetch_count = credentials.pop("prefetch_count", None)
+        output_queue = credentials.pop("output_queue", DEFAULT_OUTPUT_QUEUE)
+        queue_type = credentials.pop("type", "pika")
+
+        return cls(MessageQueue.create(queue_type, **credentials),
+                   max_in_flight=max_in_flight,
+                   prefetch_count=prefetch_count,
+                   output_queue=output_queue)
+
+    def __init__(self,
+                 message_queue: MessageQueue,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 prefetch_count: Optional[int] = None,
+                 output_queue: Text = DEFAULT_OUTPUT_QUEUE) -> None:
+        self.message_queue = message_queue
+        self.max_in_flight = max_in_flight
+        # messages which are taken from the queue but not acked yet, the
+        # messages of busy conversations wait in the process
+        self.prefetch_count = prefetch_count or 2 * max_in_flight
+        self.output_queue = output_queue
+
+        self.conversations = {}  # type: Dict[Text, Deque]
+        self._conversation_slots = None  # type: Optional[asyncio.Semaphore]
+        self._unacked = None  # type: Optional[asyncio.Semaphore]
+        self._consumer = None  # type: Optional[asyncio.Future]
+        self._turns = set()
+
+    def _user_message(self, delivery: Delivery) -> Optional[UserMessage]:
+        try:
+            payload = json.loads(delivery.body.decode("utf-8"))
+        except ValueError:
+            return None
+
+        if not isinstance(payload, dict) or "sender" not in payload:
+            return None
+
+        output_channel = MessageQueueOutput(self.message_queue,
+                                            self.output_queue)
+        return UserMessage(payload.get("message"),
+                           output_channel,
+                           payload["sender"],
+                           parse_data=payload.get("parse_data"),
+                           input_channel=self.name(),
+                           message_id=payload.get("message_id"))
+
+    async def consume(self,
+                      on_new_message: Callable[[UserMessage], Awaitable[None]]
+                      ) -> None:
+        """Takes messages from the queue while there is capacity to
+        process them. Runs until it is cancelled."""
+
+        self._conversation_slots = asyncio.Semaphore(self.max_in_flight)
+        self._unacked = asyncio.Semaphore(self.prefetch_count)
+        await self.message_queue.connect(self.prefetch_count)
+
+        while True:
+            await self._unacked.acquire()
+            delivery = await self.message_queue.get()
+
+            message = self._user_message(delivery)
+            if message is None:
+                logger.error("Message without a sender, moving it to the "
+                             "dead letter queue.")
+                await self.message_queue.dead_letter(delivery,
+                                                     "InvalidMessage")
+                self._unacked.release()
+                continue
+
+            pending = self.conversations.get(message.sender_id)
+            if pending is not None:
+                # the conversation is already processed, the message is
+                # processed after the earlier messages
+                pending.append((delivery, message))
+                continue
+
+            await self._conversation_slots.acquire()
+            self.conversations[message.sender_id] = deque([(delivery,
+                                                            message)])
+            turn = asyncio.ensure_future(self._process_conversation(
+                message.sender_id, on_new_message))
+            self._turns.add(turn)
+            turn.add_done_callback(self._turns.discard)
+
+    async def _process_conversation(
+            self,
+            sender_id: Text,
+            on_new_message: Callable[[UserMessage], Awaitable[None]]
+    ) -> None:
+        pending = self.conversations[sender_id]
+        try:
+            while pending:
+                delivery, message = pending[0]
+                try:
+                    await on_new_message(message)
+                except OverloadedError:
+                    # the message waits in the process, which keeps the
+                    # following messages in the queue
+                    await asyncio.sleep(OVERLOAD_RETRY_DELAY)
+                    continue
+                except Exception as e:
+                    logger.exception("Failed to process message of "
+                                     "conversation '{}', moving it to the "
+                                     "dead letter queue.".format(sender_id))
+                    await self._finish(pending, e)
+                else:
+                    await self._finish(pending)
+        finally:
+            del self.conversations[sender_id]
+            self._conversation_slots.release()
+
+    async def _finish(self,
+                      pending: Deque,
+                      error: Optional[Exception] = None) -> None:
+        delivery, _ = pending.popleft()
+        try:
+            if error is None:
+                await self.message_queue.ack(delivery)
+            else:
+                await self.message_queue.dead_letter(
+                    delivery, "{}: {}".format(type(error).__name__, error))
+        finally:
+            self._unacked.release()
+
+    async def on_overload(self,
+                          message: UserMessage,
+                          error: OverloadedError) -> None:
+        # the message is retried instead of answered with a fallback
+        raise error
+
+    def start(self,
+              on_new_message: Callable[[UserMessage], Awaitable[None]]
+              ) -> None:
+        self._consumer = asyncio.ensure_future(self.consume(on_new_message))
+
+    async def stop(self) -> None:
+        """Stops taking messages and waits for the running turns."""
+
+        if self._consumer is not None:
+            self._consumer.cancel()
+        if self._turns:
+            await asyncio.wait(list(self._turns))
+        await self.message_queue.close()
+
+    def blueprint(self, on_new_message):
+        message_queue_webhook = Blueprint('message_queue_webhook', __name__)
+
+        @message_queue_webhook.listener('after_server_start')
+        async def start_consuming(app, loop):
+            self.start(on_new_message)
+
+        @message_queue_webhook.listener('before_server_stop')
+        async def stop_consuming(app, loop):
+            await self.stop()
+
+        @message_queue_webhook.route("/", methods=['GET'])
+        async def health(request):
+            return response.json({"status": "ok",
+                                  "conversations": len(self.conversations)})
+
+        return message_queue_webhook
@@ -1,4 +1,4 @@
-from rasa.core import constants
+from rasa.core import admission, constants, executors
 
 
 def add_run_arguments(parser):
@@ -23,6 +23,76 @@ def add_run_arguments(parser):
         '--enable_api',
         action="store_true",
         help="Start the web server api in addition to the input channel")
+    server_arguments.add_argument(
+        '--enable_metrics',
+        action="store_true",
+        help="Collect latency metrics of the message processing and "
+             "expose them in the Prometheus format at `/metrics`")
+    server_arguments.add_argument(
+        '--workers',
+        default=1,
+        type=int,
+        help="Number of server processes. Messages of a conversation are "
+             "always handled by the same process. The processes listen "
+             "on the ports following `--port` on localhost.")
+
+    admission_arguments = parser.add_argument_group("Admission Control")
+    admission_arguments.add_argument(
+        '--max_concurrent_turns',
+        type=int,
+        default=None,
+        help="Maximum number of messages which are processed at the same "
+             "time, further messages wait. All messages are processed "
+             "if it isn't set.")
+    admission_arguments.add_argument(
+        '--max_queued_turns',
+        type=int,
+        default=admission.DEFAULT_MAX_QUEUED_TURNS,
+        help="Maximum number of messages which wait to be processed, "
+             "further messages are rejected.")
+    admission_arguments.add_argument(
+        '--max_queue_time',
+        type=float,
+        default=admission.DEFAULT_MAX_QUEUE_TIME,
+        help="Seconds after which a waiting message is rejected.")
+    admission_arguments.add_argument(
+        '--adaptive_concurrency',
+        action="store_true",
+        help="Lower the number of messages which are processed at the "
+             "same time while the responses are slow or the event loop "
+             "lags.")
+    admission_arguments.add_argument(
+        '--overload_utterance',
+        type=str,
+        default=None,
+        help="Text which is sent to users of chat channels if their "
+             "message is rejected. Without it, the message is dropped. "
+             "The REST channel and API answer with status 503.")
+
+    executor_arguments = parser.add_argument_group("Executors")
+    executor_arguments.add_argument(
+        '--parse_workers',
+        type=int,
+        default=0,
+        help="Number of threads which parse messages with a local NLU "
+             "model. Messages are parsed on the event loop if it is 0.")
+    executor_arguments.add_argument(
+        '--parse_in_processes',
+        action="store_true",
+        help="Parse messages in processes instead of threads, every "
+             "process loads its own copy of the NLU model.")
+    executor_arguments.add_argument(
+        '--predict_workers',
+        type=int,
+        default=0,
+        help="Number of threads which predict the next actions. Actions "
+             "are predicted on the event loop if it is 0.")
+    executor_arguments.add_argument(
+        '--max_queued_executions',
+        type=int,
+        default=executors.DEFAULT_MAX_QUEUED,
+        help="Maximum number of parses or predictions which are pending "
+             "on an executor, further messages are rejected.")
 
     parser.add_argument(
         '-o', '--log_file',
@@ -31,5 +31,11 @@ def add_evaluation_arguments(parser):
         help="If a prediction error is encountered, an exception "
              "is thrown. This can be used to validate stories during "
              "tests, e.g. on travis.")
+    parser.add_argument(
+        '--num_workers',
+        type=int,
+        default=1,
+        help="Number of worker processes used to evaluate the stories in "
+             "parallel.")
 
     arguments.add_core_model_arg(parser)
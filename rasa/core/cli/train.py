@@ -13,6 +13,12 @@ def add_compare_args(parser):
         type=int,
         default=3,
         help="Number of runs for experiments")
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help="Random seed for the exclusion of stories, comparisons "
+             "with the same seed exclude the same stories.")
 
     arguments.add_output_arg(
         parser,
@@ -100,6 +106,19 @@ def add_general_args(parser):
         help="If enabled, will create plots showing checkpoints "
              "and their connections between story blocks in a  "
              "file called `story_blocks_connections.html`.")
+    parser.add_argument(
+        '--cache_dir',
+        type=str,
+        default=None,
+        help="If set, parsed stories and generated training data are "
+             "cached in this directory and reused by later trainings "
+             "on the same stories and domain.")
+    parser.add_argument(
+        '--num_workers',
+        type=int,
+        default=1,
+        help="Number of worker processes used to parse the stories and "
+             "to train the policies in parallel.")
 
     arguments.add_logging_option_arguments(parser)
 
@@ -1,6 +1,6 @@
 import os
 import typing
-from typing import Optional, Text, List
+from typing import Any, Dict, Optional, Text, List
 
 from rasa.core import utils
 
@@ -8,15 +8,29 @@ if typing.TYPE_CHECKING:
     from rasa.core.policies import Policy
 
 
-def load(config_file: Optional[Text]) -> List['Policy']:
-    """Load policy data stored in the specified file."""
-    from rasa.core.policies import PolicyEnsemble
-
+def _read_config(config_file: Optional[Text]) -> Dict[Text, Any]:
     if config_file and os.path.isfile(config_file):
-        config_data = utils.read_yaml_file(config_file)
+        return utils.read_yaml_file(config_file)
     else:
         raise ValueError("You have to provide a valid path to a config file. "
                          "The file '{}' could not be found."
                          "".format(os.path.abspath(config_file)))
 
+
+def load(config_file: Optional[Text]) -> List['Policy']:
+    """Load policy data stored in the specified file."""
+    from rasa.core.policies import PolicyEnsemble
+
+    config_data = _read_config(config_file)
+
     return PolicyEnsemble.from_dict(config_data)
+
+
+def fingerprint_policies(config_file: Optional[Text],
+                         data_fingerprint: Text) -> List[Text]:
+    """Fingerprint the policies configured in the specified file."""
+    from rasa.core.policies import PolicyEnsemble
+
+    config_data = _read_config(config_file)
+
+    return PolicyEnsemble.fingerprint_policies(config_data, data_fingerprint)
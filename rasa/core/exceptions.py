@@ -34,3 +34,40 @@ class AgentNotReady(RasaCoreException):
 
     def __init__(self, message):
         self.message = message
+
+
+class PolicyTrainingError(RasaCoreException):
+    """Raised if policies failed to train in worker processes.
+
+    Attributes:
+        errors -- maps the names of the failed policies to their tracebacks
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        self.message = ("Failed to train {}. See the log for details."
+                        "".format(", ".join(sorted(errors))))
+
+    def __str__(self):
+        return self.message
+
+
+class LockError(RasaCoreException):
+    """Raised if a conversation lock can't be acquired."""
+
+
+class OverloadedError(RasaCoreException):
+    """Raised if a message is rejected because too many messages are
+    processed at the same time.
+
+    Attributes:
+        message -- explanation of why the message was rejected
+        fallback_utterance -- text which channels send instead of a response
+    """
+
+    def __init__(self, message, fallback_utterance=None):
+        self.message = message
+        self.fallback_utterance = fallback_utterance
+
+    def __str__(self):
+        return self.message
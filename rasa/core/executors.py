@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Text
+
+from rasa.core import metrics
+from rasa.core.exceptions import OverloadedError
+
+logger = logging.getLogger(__name__)
+
+# executors of the message processing
+PARSE = "parse"
+PREDICT = "predict"
+
+# calls which wait for or run on an executor, further calls are rejected
+DEFAULT_MAX_QUEUED = 100
+
+__executors = {}  # type: Dict[Text, Executor]
+
+
+class Executor(object):
+    """Runs blocking functions outside of the event loop.
+
+    Uses a pool of threads or, with `use_processes`, of processes, which
+    helps with pipelines that hold the GIL while they compute. Functions
+    which run in processes and their arguments have to be picklable.
+    Calls are rejected with an `OverloadedError` if `max_queued` calls
+    are already pending."""
+
+    def __init__(self,
+                 name: Text,
+                 max_workers: int,
+                 max_queued: int = DEFAULT_MAX_QUEUED,
+                 use_processes: bool = False) -> None:
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.use_processes = use_processes
+
+        self.num_pending = 0
+        self.num_rejected = 0
+
+        if use_processes:
+            # the processes are spawned instead of forked, as a forked
+            # child can deadlock on locks held by threads of the parent
+            context = multiprocessing.get_context("spawn")
+            self._pool = context.Pool(max_workers)
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers, thread_name_prefix="rasa-{}".format(name))
+
+    def _submit(self, function: Callable, args: tuple) -> asyncio.Future:
+        loop = asyncio.get_event_loop()
+        if not self.use_processes:
+            return loop.run_in_executor(self._pool, function, *args)
+
+        future = loop.create_future()
+
+        def set_result(result):
+            if not future.done():
+                future.set_result(result)
+
+        def set_exception(exception):
+            if not future.done():
+                future.set_exception(exception)
+
+        # the callbacks are called in a thread of the pool
+        self._pool.apply_async(
+            function, args,
+            callback=lambda r: loop.call_soon_threadsafe(set_result, r),
+            error_callback=lambda e: loop.call_soon_threadsafe(
+                set_exception, e))
+        return future
+
+    async def run(self, function: Callable, *args: Any) -> Any:
+        if self.num_pending >= self.max_queued:
+            self.num_rejected += 1
+            metrics.increment(metrics.EXECUTOR_REJECTED_TOTAL,
+                              executor=self.name)
+            logger.warning("Rejected a call as the '{}' executor is "
+                           "overloaded.".format(self.name))
+            raise OverloadedError("The server is overloaded, please try "
+                                  "again later.")
+
+        self.num_pending += 1
+        metrics.set_gauge(metrics.EXECUTOR_PENDING, self.num_pending,
+                          executor=self.name)
+        start = time.perf_counter()
+        try:
+            return await self._submit(function, args)
+        finally:
+            self.num_pending -= 1
+            metrics.set_gauge(metrics.EXECUTOR_PENDING, self.num_pending,
+                              executor=self.name)
+            metrics.observe(metrics.EXECUTOR_SECONDS,
+                            time.perf_counter() - start,
+                            executor=self.name)
+
+    def shutdown(self) -> None:
+        if self.use_processes:
+            self._pool.terminate()
+        else:
+            self._pool.shutdown(wait=False)
+
+
+def enable(name: Text,
+           max_workers: int,
+           max_queued: int = DEFAULT_MAX_QUEUED,
+           use_processes: bool = False) -> Executor:
+    """Runs the calls of the executor `name` in a pool of `max_workers`
+    threads or processes, replacing an existing executor of that name."""
+
+    disable(name)
+    executor = Executor(name, max_workers, max_queued, use_processes)
+    __executors[name] = executor
+    return executor
+
+
+def disable(name: Optional[Text] = None) -> None:
+    """Runs the calls of the executor `name` (or of all executors) on
+    the event loop again."""
+
+    names = [name] if name else list(__executors)
+    for n in names:
+        executor = __executors.pop(n, None)
+        if executor is not None:
+            executor.shutdown()
+
+
+def configure(parse_workers: int = 0,
+              parse_in_processes: bool = False,
+              predict_workers: int = 0,
+              max_queued: int = DEFAULT_MAX_QUEUED) -> None:
+    """Enables the executors of the message processing which have
+    workers, the others run their calls on the event loop."""
+
+    if parse_workers:
+        enable(PARSE, parse_workers, max_queued, parse_in_processes)
+    if predict_workers:
+        # the policies keep their models in the memory of this process
+        enable(PREDICT, predict_workers, max_queued)
+
+
+def get(name: Text) -> Optional[Executor]:
+    return __executors.get(name)
+
+
+def is_enabled(name: Text) -> bool:
+    return name in __executors
+
+
+async def run(name: Text, function: Callable, *args: Any) -> Any:
+    """Calls `function` on the executor `name`.
+
+    If the executor isn't enabled, the function is called directly on
+    the event loop."""
+
+    executor = __executors.get(name)
+    if executor is None:
+        return function(*args)
+    return await executor.run(function, *args)
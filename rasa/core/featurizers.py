@@ -1,4 +1,5 @@
 import io
+from collections import OrderedDict
 import jsonpickle
 import logging
 import numpy as np
@@ -38,6 +39,38 @@ class SingleStateFeaturizer(object):
                                   "the capacity to "
                                   "encode states to a feature vector")
 
+    def encode_states(self, states: List[Dict[Text, float]]) -> np.ndarray:
+        """Encodes a list of distinct states into a matrix.
+
+        Each row of the returned matrix is the encoding of the state
+        at the same position. Subclasses can override this to encode
+        all states in one vectorised pass instead of calling `encode`
+        for every single state."""
+
+        return np.array([self.encode(state) for state in states])
+
+    @staticmethod
+    def _fill_encoded_states(num_states: int,
+                             num_features: int,
+                             rows: List[int],
+                             cols: List[int],
+                             values: List[float]) -> np.ndarray:
+        """Creates a matrix of encoded states from its non zero entries.
+
+        Entries with the same row and column are summed up. The matrix
+        is converted to ints if all of its values are integers."""
+
+        values = np.array(values, dtype=np.float)
+        encoded = np.zeros((num_states, num_features), dtype=np.float)
+        np.add.at(encoded, (np.array(rows, dtype=int),
+                            np.array(cols, dtype=int)), values)
+
+        if np.all(np.mod(values, 1) == 0):
+            # this is an optimization - saves us a bit of memory
+            return encoded.astype(np.int32)
+        else:
+            return encoded
+
     @staticmethod
     def action_as_one_hot(action: Text, domain: Domain) -> np.ndarray:
         if action is None:
@@ -106,10 +139,10 @@ class BinarySingleStateFeaturizer(SingleStateFeaturizer):
         used_features = np.zeros(self.num_features, dtype=np.float)
         using_only_ints = True
         for state_name, prob in state.items():
+            using_only_ints = using_only_ints and utils.is_int(prob)
             if state_name in self.input_state_map:
                 idx = self.input_state_map[state_name]
                 used_features[idx] = prob
-                using_only_ints = using_only_ints and utils.is_int(prob)
             else:
                 logger.debug(
                     "Feature '{}' (value: '{}') could not be found in "
@@ -122,6 +155,40 @@ class BinarySingleStateFeaturizer(SingleStateFeaturizer):
         else:
             return used_features
 
+    def encode_states(self, states: List[Dict[Text, float]]) -> np.ndarray:
+        """Encodes all states with a single scatter into a binary matrix.
+
+        The resulting matrix is equal to stacking `encode(state)`
+        for every state."""
+
+        if not self.num_features:
+            raise Exception("BinarySingleStateFeaturizer "
+                            "was not prepared "
+                            "before encoding.")
+
+        rows, cols, values = [], [], []
+        # the dtype decision in `encode` also looks at unknown features
+        unknown_values = []
+        for row, state in enumerate(states):
+            for state_name, prob in state.items():
+                idx = self.input_state_map.get(state_name)
+                if idx is not None:
+                    rows.append(row)
+                    cols.append(idx)
+                    values.append(prob)
+                else:
+                    unknown_values.append(prob)
+                    logger.debug(
+                        "Feature '{}' (value: '{}') could not be found in "
+                        "feature map. Make sure you added all intents and "
+                        "entities to the domain".format(state_name, prob))
+
+        encoded = self._fill_encoded_states(len(states), self.num_features,
+                                            rows, cols, values)
+        if not all(utils.is_int(v) for v in unknown_values):
+            encoded = encoded.astype(np.float)
+        return encoded
+
     def create_encoded_all_actions(self, domain: Domain) -> np.ndarray:
         """Create matrix with all actions from domain
             encoded in rows as bag of words."""
@@ -236,6 +303,77 @@ class LabelTokenizerSingleStateFeaturizer(SingleStateFeaturizer):
         else:
             return used_features
 
+    def _feature_indices(self) -> Tuple[Dict[Text, List[int]],
+                                        Dict[Text, List[int]]]:
+        """Maps every known state name to the feature indices it sets.
+
+        Returns separate lookups for user labels (which are only used
+        after `action_listen`) and for slots and previous bot actions."""
+
+        user_indices = {
+            label: [self.user_vocab[t]
+                    for t in label.split(self.split_symbol)]
+            for label in self.user_labels}
+
+        other_indices = {}
+        slot_offset = len(self.user_vocab)
+        for idx, label in enumerate(self.slot_labels):
+            if label not in user_indices:
+                other_indices.setdefault(label, [slot_offset + idx])
+
+        bot_offset = len(self.user_vocab) + len(self.slot_labels)
+        for label in self.bot_labels:
+            prev_label = PREV_PREFIX + label
+            if (prev_label not in user_indices and
+                    prev_label not in other_indices):
+                other_indices[prev_label] = [
+                    bot_offset + self.bot_vocab[t]
+                    for t in label.split(self.split_symbol)]
+
+        return user_indices, other_indices
+
+    def encode_states(self, states: List[Dict[Text, float]]) -> np.ndarray:
+        """Encodes all states with a single scatter into a matrix.
+
+        The resulting matrix is equal to stacking `encode(state)`
+        for every state."""
+
+        if not self.num_features:
+            raise Exception("LabelTokenizerSingleStateFeaturizer "
+                            "was not prepared before encoding.")
+
+        user_indices, other_indices = self._feature_indices()
+        listen_state = PREV_PREFIX + ACTION_LISTEN_NAME
+
+        rows, cols, values = [], [], []
+        # the dtype decision in `encode` also looks at unknown features
+        unknown_values = []
+        for row, state in enumerate(states):
+            after_listen = listen_state in state
+            for state_name, prob in state.items():
+                if state_name in user_indices:
+                    if not after_listen:
+                        unknown_values.append(prob)
+                        continue
+                    indices = user_indices[state_name]
+                elif state_name in other_indices:
+                    indices = other_indices[state_name]
+                else:
+                    unknown_values.append(prob)
+                    logger.warning("Feature '{}' could not be found in "
+                                   "feature map.".format(state_name))
+                    continue
+
+                rows.extend([row] * len(indices))
+                cols.extend(indices)
+                values.extend([prob] * len(indices))
+
+        encoded = self._fill_encoded_states(len(states), self.num_features,
+                                            rows, cols, values)
+        if not all(utils.is_int(v) for v in unknown_values):
+            encoded = encoded.astype(np.float)
+        return encoded
+
     def create_encoded_all_actions(self, domain: Domain) -> np.ndarray:
         """Create matrix with all actions from domain
             encoded in rows as bag of words."""
@@ -302,12 +440,65 @@ class TrackerFeaturizer(object):
     def _pad_states(self, states: List[Any]) -> List[Any]:
         return states
 
+    @staticmethod
+    def _intern_states(
+        trackers_as_states: List[List[Optional[Dict[Text, float]]]]
+    ) -> Tuple[List[Dict[Text, float]], List[List[int]]]:
+        """Assigns an index to every distinct state.
+
+        Returns the distinct states and, for every tracker, the
+        indices of its states. Padding states (`None` or `[None]`)
+        get the index `-1`, which points to the padding row appended
+        by `_encode_unique_states`."""
+
+        state_to_idx = {}
+        unique_states = []
+        trackers_as_indices = []
+
+        for tracker_states in trackers_as_states:
+            indices = []
+            for state in tracker_states:
+                if state is None or None in state:
+                    indices.append(-1)
+                    continue
+
+                key = frozenset(state.items())
+                idx = state_to_idx.get(key)
+                if idx is None:
+                    idx = len(unique_states)
+                    state_to_idx[key] = idx
+                    unique_states.append(state)
+                indices.append(idx)
+            trackers_as_indices.append(indices)
+
+        return unique_states, trackers_as_indices
+
+    def _encode_unique_states(
+        self,
+        unique_states: List[Dict[Text, float]]
+    ) -> np.ndarray:
+        """Encodes distinct states and appends a padding row of `-1`."""
+
+        padding = np.array([self.state_featurizer.encode(None)])
+
+        if unique_states:
+            encoded = self.state_featurizer.encode_states(unique_states)
+        else:
+            encoded = np.zeros((0, padding.shape[1]), dtype=padding.dtype)
+
+        return np.concatenate([encoded, padding.astype(encoded.dtype)])
+
     def _featurize_states(
         self,
-        trackers_as_states: List[List[Dict[Text, float]]]
+        trackers_as_states: List[List[Dict[Text, float]]],
+        pad: bool = True
     ) -> Tuple[np.ndarray, List[int]]:
-        """Create X"""
-        features = []
+        """Create X
+
+        Every distinct state is encoded only once. `X` is then created
+        by indexing the matrix of encoded states."""
+
+        padded_states = []
         true_lengths = []
 
         for tracker_states in trackers_as_states:
@@ -317,26 +508,40 @@ class TrackerFeaturizer(object):
             # it is called during prediction or we have
             # only one story, so no padding is needed
 
-            if len(trackers_as_states) > 1:
+            if pad and len(trackers_as_states) > 1:
                 tracker_states = self._pad_states(tracker_states)
 
-            story_features = [self.state_featurizer.encode(state)
-                              for state in tracker_states]
-
-            features.append(story_features)
+            padded_states.append(tracker_states)
             true_lengths.append(dialogue_len)
 
-        # noinspection PyPep8Naming
-        X = np.array(features)
+        if not padded_states:
+            return np.array([]), true_lengths
+
+        unique_states, trackers_as_indices = self._intern_states(
+            padded_states)
+        encoded_states = self._encode_unique_states(unique_states)
+
+        if len(set(len(indices) for indices in trackers_as_indices)) == 1:
+            # noinspection PyPep8Naming
+            X = encoded_states[np.array(trackers_as_indices, dtype=int)]
+        else:
+            # dialogues of different length can't be stacked
+            # noinspection PyPep8Naming
+            X = np.array([encoded_states[np.array(indices, dtype=int)]
+                          for indices in trackers_as_indices])
 
         return X, true_lengths
 
     def _featurize_labels(
         self,
         trackers_as_actions: List[List[Text]],
-        domain: Domain
+        domain: Domain,
+        squeeze: bool = True
     ) -> np.ndarray:
-        """Create y"""
+        """Create y
+
+        If `squeeze` is set, axes of length one are removed from y, e.g.
+        the time axis of max history training data."""
 
         labels = []
         for tracker_actions in trackers_as_actions:
@@ -350,8 +555,10 @@ class TrackerFeaturizer(object):
 
             labels.append(story_labels)
 
-        # if it is MaxHistoryFeaturizer, squeeze out time axis
-        y = np.array(labels).squeeze()
+        y = np.array(labels)
+        if squeeze:
+            # if it is MaxHistoryFeaturizer, squeeze out time axis
+            y = y.squeeze()
 
         return y
 
@@ -400,6 +607,31 @@ class TrackerFeaturizer(object):
         X, _ = self._featurize_states(trackers_as_states)
         return X
 
+    # noinspection PyPep8Naming
+    def create_X_batches(self,
+                         trackers: List[DialogueStateTracker],
+                         domain: Domain
+                         ) -> List[Tuple[List[int], np.ndarray]]:
+        """Create X for the prediction of several trackers at once.
+
+        Trackers are grouped by the number of their states, so every
+        group can be stacked without padding and is featurized exactly
+        like a single tracker. Returns the indices of the trackers of
+        every group together with their X."""
+
+        trackers_as_states = self.prediction_states(trackers, domain)
+
+        groups = OrderedDict()
+        for i, tracker_states in enumerate(trackers_as_states):
+            groups.setdefault(len(tracker_states), []).append(i)
+
+        batches = []
+        for ids in groups.values():
+            X, _ = self._featurize_states(
+                [trackers_as_states[i] for i in ids], pad=False)
+            batches.append((ids, X))
+        return batches
+
     def persist(self, path):
         featurizer_file = os.path.join(path, "featurizer.json")
         utils.create_dir_for_file(featurizer_file)
@@ -498,6 +730,73 @@ class FullDialogueTrackerFeaturizer(TrackerFeaturizer):
 
         return trackers_as_states, trackers_as_actions
 
+    def _featurize_labels(
+        self,
+        trackers_as_actions: List[List[Text]],
+        domain: Domain,
+        squeeze: bool = False
+    ) -> np.ndarray:
+        """Create y
+
+        Unlike for max history training data, there is no time axis
+        to squeeze out, so y always has the shape
+        (num dialogues, dialogue length, num actions)."""
+
+        return super(FullDialogueTrackerFeaturizer, self)._featurize_labels(
+            trackers_as_actions, domain, squeeze)
+
+    @staticmethod
+    def _length_buckets(lengths: List[int],
+                        num_buckets: int) -> List[np.ndarray]:
+        """Splits dialogue indices into buckets of similar length.
+
+        Dialogues are sorted by length and split into `num_buckets`
+        buckets containing roughly the same number of dialogues."""
+
+        sorted_ids = np.argsort(lengths, kind="mergesort")
+        buckets = np.array_split(sorted_ids, max(1, num_buckets))
+        return [np.sort(bucket) for bucket in buckets if len(bucket)]
+
+    def featurize_trackers_in_buckets(self,
+                                      trackers: List[DialogueStateTracker],
+                                      domain: Domain,
+                                      num_buckets: int
+                                      ) -> List[DialogueTrainingData]:
+        """Create training data grouped into buckets by dialogue length.
+
+        Every bucket is only padded up to its longest dialogue instead
+        of the longest dialogue of all trackers."""
+
+        self.state_featurizer.prepare_from_domain(domain)
+
+        (trackers_as_states,
+         trackers_as_actions) = self.training_states_and_actions(trackers,
+                                                                 domain)
+        lengths = [len(actions) for actions in trackers_as_actions]
+
+        max_len = self.max_len
+        buckets = []
+        try:
+            for ids in self._length_buckets(lengths, num_buckets):
+                # padding is done up to `self.max_len`
+                self.max_len = max(lengths[i] for i in ids)
+
+                # noinspection PyPep8Naming
+                X, true_lengths = self._featurize_states(
+                    [trackers_as_states[i] for i in ids])
+                y = self._featurize_labels(
+                    [trackers_as_actions[i] for i in ids], domain)
+
+                buckets.append(DialogueTrainingData(X, y, true_lengths))
+        finally:
+            self.max_len = max_len
+
+        logger.debug("Created {} buckets of dialogues with lengths up to {}."
+                     "".format(len(buckets),
+                               [b.max_history() for b in buckets]))
+
+        return buckets
+
     def prediction_states(self,
                           trackers: List[DialogueStateTracker],
                           domain: Domain
@@ -554,6 +853,116 @@ class MaxHistoryTrackerFeaturizer(TrackerFeaturizer):
         frozen_actions = (action,)
         return hash((frozen_states, frozen_actions))
 
+    @staticmethod
+    def _sliding_windows(buffer: np.ndarray,
+                         window_length: int) -> np.ndarray:
+        """Returns all windows of `window_length` over `buffer`.
+
+        Row `i` of the result is `buffer[i:i + window_length]`. The
+        windows are a read-only view, so no data is copied."""
+
+        num_windows = max(0, len(buffer) - window_length + 1)
+        stride = buffer.strides[0]
+        return np.lib.stride_tricks.as_strided(
+            buffer,
+            shape=(num_windows, window_length),
+            strides=(stride, stride),
+            writeable=False)
+
+    @staticmethod
+    def _predictable_action_offsets(
+        tracker: DialogueStateTracker
+    ) -> List[Tuple[int, Text]]:
+        """Returns the state offset and name of every predictable action."""
+
+        offsets = []
+        idx = 0
+        for event in tracker.applied_events():
+            if isinstance(event, ActionExecuted):
+                if not event.unpredictable:
+                    # only actions which can be
+                    # predicted at a stories start
+                    offsets.append((idx, event.action_name))
+                idx += 1
+        return offsets
+
+    def featurize_trackers(self,
+                           trackers: List[DialogueStateTracker],
+                           domain: Domain
+                           ) -> DialogueTrainingData:
+        """Create training data
+
+        A training example is the window of `max_history` states ending
+        at the state before an action. The states of all trackers are
+        interned into a single buffer of state indices in which every
+        tracker is prefixed with `max_history` padding states, so the
+        window of each example is a strided view on that buffer and
+        every state is encoded only once."""
+
+        self.state_featurizer.prepare_from_domain(domain)
+
+        buffer_states = []
+        examples = []
+
+        logger.debug("Creating states and action examples from "
+                     "collected trackers (by {}({}))..."
+                     "".format(type(self).__name__,
+                               type(self.state_featurizer).__name__))
+        pbar = tqdm(trackers, desc="Processed trackers",
+                    disable=(not logger.isEnabledFor(logging.DEBUG)))
+        for tracker in pbar:
+            states = self._create_states(tracker, domain, True)
+            tracker_start = len(buffer_states)
+            buffer_states.extend([None] * self.max_history)
+            buffer_states.extend(states)
+
+            for offset, action in self._predictable_action_offsets(tracker):
+                # the window ending at state `offset` starts at
+                # buffer row `tracker_start + offset + 1`
+                offset = min(offset, len(states) - 1)
+                examples.append((tracker_start + offset + 1, action))
+
+        if not examples:
+            return DialogueTrainingData(np.array([]), np.array([]), [])
+
+        unique_states, (buffer_indices,) = self._intern_states(
+            [buffer_states])
+        windows = self._sliding_windows(np.array(buffer_indices, dtype=int),
+                                        self.max_history)
+
+        if self.remove_duplicates:
+            # from multiple states that create equal featurizations
+            # we only need to keep one.
+            hashed_examples = set()
+            unique_examples = []
+            for row, action in examples:
+                hashed = (windows[row].tobytes(), action)
+                if hashed not in hashed_examples:
+                    hashed_examples.add(hashed)
+                    unique_examples.append((row, action))
+            examples = unique_examples
+
+        logger.debug("Created {} action examples.".format(len(examples)))
+
+        example_windows = windows[[row for row, _ in examples]]
+
+        # only encode states which are part of an example
+        used = np.unique(example_windows[example_windows >= 0])
+        remapped = np.full(len(unique_states), -1, dtype=int)
+        remapped[used] = np.arange(len(used))
+        example_windows = np.where(example_windows >= 0,
+                                   remapped[example_windows], -1)
+        encoded_states = self._encode_unique_states(
+            [unique_states[idx] for idx in used])
+
+        # noinspection PyPep8Naming
+        X = encoded_states[example_windows]
+        y = self._featurize_labels([[action] for _, action in examples],
+                                   domain)
+        true_lengths = [self.max_history] * len(examples)
+
+        return DialogueTrainingData(X, y, true_lengths)
+
     def training_states_and_actions(
         self,
         trackers: List[DialogueStateTracker],
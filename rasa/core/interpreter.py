@@ -7,7 +7,7 @@ import re
 import os
 from typing import Text, List, Dict, Any
 
-from rasa.core import constants
+from rasa.core import constants, executors
 from rasa.core.utils import EndpointConfig
 from rasa.core.constants import INTENT_MESSAGE_PREFIX
 
@@ -145,6 +145,11 @@ class RegexInterpreter(NaturalLanguageInterpreter):
     async def parse(self, text, message_id=None):
         """Parse a text message."""
 
+        return self.synchronous_parse(text)
+
+    def synchronous_parse(self, text):
+        """Parse a text message without waiting for the event loop."""
+
         intent, confidence, entities = self.extract_intent_and_entities(text)
 
         if self._starts_with_intent_prefix(text):
@@ -245,9 +250,17 @@ class RasaNLUInterpreter(NaturalLanguageInterpreter):
 
         Return a default value if the parsing of the text failed."""
 
-        if self.lazy_init and self.interpreter is None:
-            self._load_interpreter()
-        result = self.interpreter.parse(text)
+        executor = executors.get(executors.PARSE)
+        if executor is not None and executor.use_processes:
+            # the interpreter can't be sent to another process, every
+            # process of the executor loads the model itself
+            result = await executor.run(_parse_in_process,
+                                        self.model_directory, text)
+        else:
+            if self.lazy_init and self.interpreter is None:
+                self._load_interpreter()
+            result = await executors.run(executors.PARSE,
+                                         self.interpreter.parse, text)
 
         # TODO: hotfix to append attributes that NLU is adding as a server
         #   but where the interpreter does not add them
@@ -260,3 +273,19 @@ class RasaNLUInterpreter(NaturalLanguageInterpreter):
         from rasa_nlu.model import Interpreter
 
         self.interpreter = Interpreter.load(self.model_directory)
+
+
+# interpreters which are loaded in the processes of the parse executor
+_process_interpreters = {}
+
+
+def _parse_in_process(model_directory, text):
+    interpreter = _process_interpreters.get(model_directory)
+    if interpreter is None:
+        from rasa_nlu.model import Interpreter
+
+        # only keep the current model if the model is replaced
+        _process_interpreters.clear()
+        interpreter = Interpreter.load(model_directory)
+        _process_interpreters[model_directory] = interpreter
+    return interpreter.parse(text)
@@ -0,0 +1,445 @@
+import asyncio
+import json
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional, Text
+
+from rasa.core.exceptions import LockError
+from rasa.core.utils import EndpointConfig, class_from_module_path
+
+logger = logging.getLogger(__name__)
+
+# a ticket expires after this many seconds unless it is refreshed, so that
+# the conversation isn't locked forever if the process holding the lock dies
+DEFAULT_LOCK_LIFETIME = 60
+
+# seconds between two checks whether a waiting ticket is served, if the lock
+# store can't notify the waiting tickets
+DEFAULT_WAIT_TIME = 0.05
+
+DEFAULT_REDIS_KEY_PREFIX = "lock:"
+
+
+class Ticket(object):
+    """Place in the queue of a conversation lock."""
+
+    def __init__(self, number: int, expires: float) -> None:
+        self.number = number
+        self.expires = expires
+
+    def has_expired(self) -> bool:
+        return time.time() > self.expires
+
+    def as_dict(self) -> Dict[Text, Any]:
+        return {"number": self.number, "expires": self.expires}
+
+    @classmethod
+    def from_dict(cls, data: Dict[Text, Any]) -> 'Ticket':
+        return cls(data["number"], data["expires"])
+
+    def __repr__(self):
+        return "Ticket(number: {}, expires: {})".format(self.number,
+                                                        self.expires)
+
+
+class TicketLock(object):
+    """FIFO lock of a conversation.
+
+    Every turn takes a ticket with an increasing number and is served once
+    all tickets with lower numbers are returned or expired."""
+
+    def __init__(self,
+                 conversation_id: Text,
+                 tickets: Optional[List[Ticket]] = None) -> None:
+        self.conversation_id = conversation_id
+        self.tickets = tickets or []
+
+    @property
+    def last_issued(self) -> int:
+        if not self.tickets:
+            return -1
+        return self.tickets[-1].number
+
+    def issue_ticket(self, lifetime: float) -> int:
+        number = self.last_issued + 1
+        self.tickets.append(Ticket(number, time.time() + lifetime))
+        return number
+
+    def refresh_ticket(self, number: int, lifetime: float) -> None:
+        for ticket in self.tickets:
+            if ticket.number == number:
+                ticket.expires = time.time() + lifetime
+
+    def remove_ticket(self, number: int) -> None:
+        self.tickets = [t for t in self.tickets if t.number != number]
+
+    def has_ticket(self, number: int) -> bool:
+        return any(t.number == number for t in self.tickets)
+
+    def is_locked(self, number: int) -> bool:
+        """Checks whether a ticket has to wait for tickets in front of it.
+
+        Expired tickets don't block the queue, even if the process which
+        holds them never returns them."""
+
+        return any(t.number < number and not t.has_expired()
+                   for t in self.tickets)
+
+    def is_expired(self) -> bool:
+        """Checks whether the lock can be deleted."""
+
+        return all(t.has_expired() for t in self.tickets)
+
+    def expires(self) -> float:
+        """Time at which the last ticket of the lock expires."""
+
+        return max((t.expires for t in self.tickets), default=time.time())
+
+    def dumps(self) -> Text:
+        return json.dumps({"conversation_id": self.conversation_id,
+                           "tickets": [t.as_dict() for t in self.tickets]})
+
+    @classmethod
+    def loads(cls, dump: Text) -> 'TicketLock':
+        data = json.loads(dump)
+        return cls(data["conversation_id"],
+                   [Ticket.from_dict(t) for t in data["tickets"]])
+
+
+class ConversationLock(object):
+    """Async context manager which holds the lock of a conversation."""
+
+    def __init__(self,
+                 lock_store: 'LockStore',
+                 conversation_id: Text,
+                 lock_lifetime: float,
+                 wait_time: float) -> None:
+        self.lock_store = lock_store
+        self.conversation_id = conversation_id
+        self.lock_lifetime = lock_lifetime
+        self.wait_time = wait_time
+        self.ticket = None
+        self._refresher = None
+
+    async def _refresh_ticket(self) -> None:
+        """Keeps the ticket alive while the lock is held, however long the
+        turn takes."""
+
+        while True:
+            await asyncio.sleep(self.lock_lifetime / 4)
+            self.lock_store.update_lock(
+                self.conversation_id,
+                lambda lock: lock.refresh_ticket(self.ticket,
+                                                 self.lock_lifetime))
+
+    async def __aenter__(self) -> 'ConversationLock':
+        store = self.lock_store
+        self.ticket = store.issue_ticket(self.conversation_id,
+                                         self.lock_lifetime)
+        store.num_waiting += 1
+        try:
+            await store.wait_for_ticket(self.conversation_id, self.ticket,
+                                        self.lock_lifetime, self.wait_time)
+        except BaseException:
+            store.finish_serving(self.conversation_id, self.ticket)
+            raise
+        finally:
+            store.num_waiting -= 1
+
+        store.num_processing += 1
+        self._refresher = asyncio.ensure_future(self._refresh_ticket())
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._refresher.cancel()
+        self.lock_store.num_processing -= 1
+        self.lock_store.finish_serving(self.conversation_id, self.ticket)
+
+
+class ConversationsLock(object):
+    """Async context manager which holds the locks of several
+    conversations.
+
+    The locks are taken one after another in the order of their
+    conversation ids, so turns which lock overlapping conversations
+    can't wait for each other."""
+
+    def __init__(self, locks: List[ConversationLock]) -> None:
+        self.locks = locks
+        self._held = []  # type: List[ConversationLock]
+
+    async def __aenter__(self) -> 'ConversationsLock':
+        try:
+            for lock in self.locks:
+                await lock.__aenter__()
+                self._held.append(lock)
+        except BaseException:
+            await self._release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self._release()
+
+    async def _release(self) -> None:
+        while self._held:
+            await self._held.pop().__aexit__(None, None, None)
+
+
+class LockStore(object):
+    """Stores the locks which order the turns of a conversation.
+
+    Storing the locks outside of the process, e.g. in Redis, orders the
+    turns of a conversation across several processes and servers."""
+
+    def __init__(self, lock_lifetime: float = DEFAULT_LOCK_LIFETIME) -> None:
+        self.lock_lifetime = lock_lifetime
+        # turns of this process which wait for or hold a lock
+        self.num_waiting = 0
+        self.num_processing = 0
+
+    @staticmethod
+    def find_lock_store(store: Optional[EndpointConfig] = None
+                        ) -> 'LockStore':
+        if store is None or store.type is None:
+            return InMemoryLockStore()
+        elif store.type == 'redis':
+            return RedisLockStore(host=store.url, **store.kwargs)
+        else:
+            return LockStore.load_lock_store_from_module_string(store)
+
+    @staticmethod
+    def load_lock_store_from_module_string(store: EndpointConfig
+                                           ) -> 'LockStore':
+        try:
+            lock_store_class = class_from_module_path(store.type)
+            return lock_store_class(url=store.url, **store.kwargs)
+        except (AttributeError, ImportError):
+            logger.warning("Lock store type '{}' not found. "
+                           "Using InMemoryLockStore instead."
+                           "".format(store.type))
+            return InMemoryLockStore()
+
+    def get_lock(self, conversation_id: Text) -> Optional[TicketLock]:
+        raise NotImplementedError
+
+    def save_lock(self, lock: TicketLock) -> None:
+        raise NotImplementedError
+
+    def delete_lock(self, conversation_id: Text) -> None:
+        raise NotImplementedError
+
+    def update_lock(self,
+                    conversation_id: Text,
+                    update: Callable[[TicketLock], Any]) -> Any:
+        """Applies `update` to the lock of a conversation and saves it.
+
+        `update` gets the lock, which is created if it doesn't exist, and
+        returns the result of the update. Empty and expired locks are
+        deleted. Stores which are shared between processes need to make
+        this atomic."""
+
+        lock = self.get_lock(conversation_id) or TicketLock(conversation_id)
+        result = update(lock)
+        if lock.is_expired():
+            self.delete_lock(conversation_id)
+        else:
+            self.save_lock(lock)
+        return result
+
+    def issue_ticket(self,
+                     conversation_id: Text,
+                     lock_lifetime: Optional[float] = None) -> int:
+        lock_lifetime = lock_lifetime or self.lock_lifetime
+        return self.update_lock(
+            conversation_id, lambda lock: lock.issue_ticket(lock_lifetime))
+
+    def finish_serving(self, conversation_id: Text, ticket: int) -> None:
+        self.update_lock(conversation_id,
+                         lambda lock: lock.remove_ticket(ticket))
+
+    async def wait_for_ticket(self,
+                              conversation_id: Text,
+                              ticket: int,
+                              lock_lifetime: float,
+                              wait_time: float) -> None:
+        """Waits until all tickets in front of `ticket` are returned."""
+
+        while True:
+            lock = self.get_lock(conversation_id)
+            if lock is None or not lock.has_ticket(ticket):
+                raise LockError("Ticket {} of conversation '{}' expired "
+                                "while it was waiting for the lock."
+                                "".format(ticket, conversation_id))
+
+            if not lock.is_locked(ticket):
+                return
+
+            own_ticket = next(t for t in lock.tickets if t.number == ticket)
+            if own_ticket.expires - time.time() < lock_lifetime / 2:
+                # the ticket is still in use, it only waits for a slow turn
+                self.update_lock(conversation_id,
+                                 lambda lock: lock.refresh_ticket(
+                                     ticket, lock_lifetime))
+
+            # check again once a ticket in front of it expires, and often
+            # enough to refresh the ticket in time
+            expirations = [t.expires for t in lock.tickets
+                           if t.number < ticket and not t.has_expired()]
+            timeout = min(expirations + [time.time() + lock_lifetime / 4])
+            await self.wait_for_update(conversation_id,
+                                       max(timeout - time.time(), 0),
+                                       wait_time)
+
+    async def wait_for_update(self,
+                              conversation_id: Text,
+                              timeout: float,
+                              wait_time: float) -> None:
+        """Waits at most `timeout` seconds for a change of the lock of a
+        conversation.
+
+        Locks which are shared between processes can change at any time,
+        so they are checked again after `wait_time` seconds."""
+
+        await asyncio.sleep(min(timeout, wait_time))
+
+    def lock(self,
+             conversation_id: Text,
+             lock_lifetime: Optional[float] = None,
+             wait_time: float = DEFAULT_WAIT_TIME) -> ConversationLock:
+        """Lock which makes sure that only one turn of a conversation is
+        processed at any time, in the order in which they arrived.
+
+        Usage: `async with lock_store.lock(conversation_id): ...`"""
+
+        return ConversationLock(self, conversation_id,
+                                lock_lifetime or self.lock_lifetime,
+                                wait_time)
+
+    def lock_all(self,
+                 conversation_ids: List[Text],
+                 lock_lifetime: Optional[float] = None,
+                 wait_time: float = DEFAULT_WAIT_TIME) -> ConversationsLock:
+        """Lock which holds the locks of all `conversation_ids` at once.
+
+        Usage: `async with lock_store.lock_all(conversation_ids): ...`"""
+
+        return ConversationsLock([self.lock(conversation_id, lock_lifetime,
+                                            wait_time)
+                                  for conversation_id in
+                                  sorted(set(conversation_ids))])
+
+
+class InMemoryLockStore(LockStore):
+    """Keeps the locks in memory, which orders the turns of the
+    coroutines of a single process.
+
+    Waiting turns are woken up as soon as a ticket of their conversation
+    is returned."""
+
+    def __init__(self, lock_lifetime: float = DEFAULT_LOCK_LIFETIME) -> None:
+        self.locks = {}  # type: Dict[Text, TicketLock]
+        self.waiters = {}  # type: Dict[Text, List[asyncio.Future]]
+        super(InMemoryLockStore, self).__init__(lock_lifetime)
+
+    def get_lock(self, conversation_id: Text) -> Optional[TicketLock]:
+        return self.locks.get(conversation_id)
+
+    def save_lock(self, lock: TicketLock) -> None:
+        self.locks[lock.conversation_id] = lock
+
+    def delete_lock(self, conversation_id: Text) -> None:
+        self.locks.pop(conversation_id, None)
+        self._wake_up_waiters(conversation_id)
+
+    def finish_serving(self, conversation_id: Text, ticket: int) -> None:
+        super(InMemoryLockStore, self).finish_serving(conversation_id, ticket)
+        self._wake_up_waiters(conversation_id)
+
+    def _wake_up_waiters(self, conversation_id: Text) -> None:
+        for waiter in self.waiters.pop(conversation_id, []):
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def wait_for_update(self,
+                              conversation_id: Text,
+                              timeout: float,
+                              wait_time: float) -> None:
+        # only this process changes the locks, so there is no need to poll
+        waiter = asyncio.get_event_loop().create_future()
+        waiters = self.waiters.setdefault(conversation_id, [])
+        waiters.append(waiter)
+        try:
+            await asyncio.wait([waiter], timeout=timeout)
+        finally:
+            if waiter in waiters:
+                waiters.remove(waiter)
+            if not waiters and self.waiters.get(conversation_id) is waiters:
+                del self.waiters[conversation_id]
+
+
+class RedisLockStore(LockStore):
+    """Keeps the locks in Redis, which orders the turns of a
+    conversation across processes and servers.
+
+    Locks are updated in optimistic transactions and expire in Redis
+    together with their last ticket."""
+
+    def __init__(self,
+                 host: Text = "localhost",
+                 port: int = 6379,
+                 db: int = 1,
+                 password: Optional[Text] = None,
+                 key_prefix: Text = DEFAULT_REDIS_KEY_PREFIX,
+                 lock_lifetime: float = DEFAULT_LOCK_LIFETIME) -> None:
+        import redis
+
+        self.red = redis.StrictRedis(host=host, port=int(port), db=int(db),
+                                     password=password)
+        self.key_prefix = key_prefix
+        super(RedisLockStore, self).__init__(float(lock_lifetime))
+
+    def _key(self, conversation_id: Text) -> Text:
+        return self.key_prefix + conversation_id
+
+    def get_lock(self, conversation_id: Text) -> Optional[TicketLock]:
+        dump = self.red.get(self._key(conversation_id))
+        if dump is None:
+            return None
+        return TicketLock.loads(dump.decode("utf-8"))
+
+    def _set_lock(self, client: Any, lock: TicketLock) -> None:
+        ttl = max(int(math.ceil(lock.expires() - time.time())), 1)
+        client.set(self._key(lock.conversation_id), lock.dumps(), ex=ttl)
+
+    def save_lock(self, lock: TicketLock) -> None:
+        self._set_lock(self.red, lock)
+
+    def delete_lock(self, conversation_id: Text) -> None:
+        self.red.delete(self._key(conversation_id))
+
+    def update_lock(self,
+                    conversation_id: Text,
+                    update: Callable[[TicketLock], Any]) -> Any:
+        key = self._key(conversation_id)
+        result = []
+
+        def transaction(pipe):
+            # retried by redis-py if another process changed the lock
+            del result[:]
+            dump = pipe.get(key)
+            if dump is None:
+                lock = TicketLock(conversation_id)
+            else:
+                lock = TicketLock.loads(dump.decode("utf-8"))
+            result.append(update(lock))
+
+            pipe.multi()
+            if lock.is_expired():
+                pipe.delete(key)
+            else:
+                self._set_lock(pipe, lock)
+
+        self.red.transaction(transaction, key)
+        return result[0]
@@ -0,0 +1,349 @@
+import asyncio
+import functools
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Text, Tuple
+
+logger = logging.getLogger(__name__)
+
+# time spent in the stages of the message processing
+STAGE_SECONDS = "rasa_core_stage_seconds"
+# prediction time of every policy of the ensemble
+POLICY_SECONDS = "rasa_core_policy_prediction_seconds"
+TRACKER_STORE_SECONDS = "rasa_core_tracker_store_seconds"
+BROKER_SECONDS = "rasa_core_event_broker_seconds"
+# requests to action servers, NLG servers and other endpoints
+REMOTE_REQUEST_SECONDS = "rasa_core_remote_request_seconds"
+REMOTE_REQUEST_ERRORS = "rasa_core_remote_request_errors_total"
+EVENT_LOOP_LAG_SECONDS = "rasa_core_event_loop_lag_seconds"
+CONVERSATION_LOCKS = "rasa_core_conversation_locks"
+CONVERSATION_LOCK_WAITERS = "rasa_core_conversation_lock_waiters"
+# admission control of the agent
+ADMISSION_LIMIT = "rasa_core_admission_limit"
+ADMISSION_QUEUED = "rasa_core_admission_queued_turns"
+ADMISSION_QUEUED_TOTAL = "rasa_core_admission_queued_total"
+ADMISSION_SHED_TOTAL = "rasa_core_admission_shed_total"
+# executors which run blocking calls outside of the event loop
+EXECUTOR_SECONDS = "rasa_core_executor_seconds"
+EXECUTOR_PENDING = "rasa_core_executor_pending_calls"
+EXECUTOR_REJECTED_TOTAL = "rasa_core_executor_rejected_total"
+# lookups in the parse cache by their result (hit, miss or coalesced)
+PARSE_CACHE_REQUESTS = "rasa_core_parse_cache_requests_total"
+
+HISTOGRAM = "histogram"
+COUNTER = "counter"
+GAUGE = "gauge"
+
+# type and help text of the metrics, metrics which aren't listed here
+# are reported as untyped
+METRICS = {
+    STAGE_SECONDS: (
+        HISTOGRAM, "Time spent in the stages of the message processing."),
+    POLICY_SECONDS: (
+        HISTOGRAM, "Time a policy needs to predict the next action."),
+    TRACKER_STORE_SECONDS: (
+        HISTOGRAM, "Time needed to retrieve or save a tracker."),
+    BROKER_SECONDS: (
+        HISTOGRAM, "Time needed to publish an event to the event broker."),
+    REMOTE_REQUEST_SECONDS: (
+        HISTOGRAM, "Duration of requests to remote endpoints."),
+    REMOTE_REQUEST_ERRORS: (
+        COUNTER, "Failed requests to remote endpoints."),
+    EVENT_LOOP_LAG_SECONDS: (
+        HISTOGRAM, "Delay of the event loop in running scheduled callbacks."),
+    CONVERSATION_LOCKS: (
+        GAUGE, "Conversations which are currently processed."),
+    CONVERSATION_LOCK_WAITERS: (
+        GAUGE, "Messages which wait for their conversation to be "
+               "processed."),
+    ADMISSION_LIMIT: (
+        GAUGE, "Number of turns which are admitted at the same time."),
+    ADMISSION_QUEUED: (
+        GAUGE, "Turns which wait to be admitted."),
+    ADMISSION_QUEUED_TOTAL: (
+        COUNTER, "Turns which had to wait to be admitted."),
+    ADMISSION_SHED_TOTAL: (
+        COUNTER, "Turns which were rejected because the agent is "
+                 "overloaded."),
+    EXECUTOR_SECONDS: (
+        HISTOGRAM, "Time a call waits for and runs on an executor."),
+    EXECUTOR_PENDING: (
+        GAUGE, "Calls which wait for or run on an executor."),
+    EXECUTOR_REJECTED_TOTAL: (
+        COUNTER, "Calls which were rejected because an executor is "
+                 "overloaded."),
+    PARSE_CACHE_REQUESTS: (
+        COUNTER, "Messages which were looked up in the parse cache."),
+}
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Dict[Text, Text]
+
+__instrumentation = None  # type: Optional[Instrumentation]
+
+
+class Instrumentation(object):
+    """Receives the measurements of the instrumented code.
+
+    Subclasses can forward the measurements to any monitoring system,
+    `PrometheusInstrumentation` keeps them in memory and renders them in
+    the Prometheus text format."""
+
+    def observe(self, name: Text, value: float, labels: Labels) -> None:
+        """Records a measurement, e.g. a duration in seconds."""
+        raise NotImplementedError
+
+    def increment(self, name: Text, amount: float, labels: Labels) -> None:
+        """Increments a counter."""
+        raise NotImplementedError
+
+    def set_gauge(self, name: Text, value: float, labels: Labels) -> None:
+        """Sets a gauge to its current value."""
+        raise NotImplementedError
+
+    def render(self) -> Text:
+        """Exposition of the collected metrics for the `/metrics` route."""
+        return ""
+
+
+class _Histogram(object):
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        # buckets are few, a linear scan is as fast as a bisection
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+
+
+def _format_labels(labels: Tuple[Tuple[Text, Text], ...],
+                   extra: Optional[Tuple[Text, Text]] = None) -> Text:
+    if extra:
+        labels = labels + (extra,)
+    if not labels:
+        return ""
+
+    def escape(value):
+        return (str(value).replace("\\", "\\\\")
+                .replace("\n", "\\n").replace('"', '\\"'))
+
+    return "{{{}}}".format(",".join('{}="{}"'.format(k, escape(v))
+                                    for k, v in labels))
+
+
+def _format_value(value: float) -> Text:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class PrometheusInstrumentation(Instrumentation):
+    """Keeps the metrics in memory and renders them in the Prometheus
+    text exposition format."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        # measurements can come from executor threads
+        self._lock = threading.Lock()
+        self.histograms = defaultdict(dict)
+        self.counters = defaultdict(dict)
+        self.gauges = defaultdict(dict)
+
+    @staticmethod
+    def _key(labels: Labels) -> Tuple[Tuple[Text, Text], ...]:
+        return tuple(sorted(labels.items()))
+
+    def observe(self, name: Text, value: float, labels: Labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            histogram = self.histograms[name].get(key)
+            if histogram is None:
+                histogram = _Histogram(self.buckets)
+                self.histograms[name][key] = histogram
+            histogram.observe(value)
+
+    def increment(self, name: Text, amount: float, labels: Labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counters = self.counters[name]
+            counters[key] = counters.get(key, 0) + amount
+
+    def set_gauge(self, name: Text, value: float, labels: Labels) -> None:
+        with self._lock:
+            self.gauges[name][self._key(labels)] = value
+
+    @staticmethod
+    def _header(name: Text, default_type: Text) -> List[Text]:
+        metric_type, description = METRICS.get(name, (default_type, None))
+        lines = []
+        if description:
+            lines.append("# HELP {} {}".format(name, description))
+        lines.append("# TYPE {} {}".format(name, metric_type))
+        return lines
+
+    def render(self) -> Text:
+        lines = []
+        with self._lock:
+            for name, histograms in sorted(self.histograms.items()):
+                lines.extend(self._header(name, HISTOGRAM))
+                for labels, histogram in sorted(histograms.items()):
+                    cumulative = 0
+                    bounds = histogram.buckets + (float("inf"),)
+                    for bound, count in zip(bounds, histogram.counts):
+                        cumulative += count
+                        lines.append("{}_bucket{} {}".format(
+                            name,
+                            _format_labels(labels,
+                                           ("le", _format_value(bound))),
+                            cumulative))
+                    lines.append("{}_sum{} {}".format(
+                        name, _format_labels(labels),
+                        _format_value(histogram.sum)))
+                    lines.append("{}_count{} {}".format(
+                        name, _format_labels(labels), cumulative))
+
+            for metrics, default_type in [(self.counters, COUNTER),
+                                          (self.gauges, GAUGE)]:
+                for name, values in sorted(metrics.items()):
+                    lines.extend(self._header(name, default_type))
+                    for labels, value in sorted(values.items()):
+                        lines.append("{}{} {}".format(
+                            name, _format_labels(labels),
+                            _format_value(value)))
+
+        return "\n".join(lines) + "\n"
+
+
+def enable(instrumentation: Optional[Instrumentation] = None
+           ) -> Instrumentation:
+    """Starts collecting metrics.
+
+    Uses a `PrometheusInstrumentation` if no instrumentation is passed.
+    If metrics are already collected, the existing instrumentation is
+    kept unless a different one is passed."""
+
+    global __instrumentation
+
+    if instrumentation is not None:
+        __instrumentation = instrumentation
+    elif __instrumentation is None:
+        __instrumentation = PrometheusInstrumentation()
+    return __instrumentation
+
+
+def disable() -> None:
+    """Stops collecting metrics, instrumented code runs without
+    measurements afterwards."""
+
+    global __instrumentation
+    __instrumentation = None
+
+
+def instrumentation() -> Optional[Instrumentation]:
+    return __instrumentation
+
+
+def is_enabled() -> bool:
+    return __instrumentation is not None
+
+
+def observe(name: Text, value: float, **labels: Text) -> None:
+    if __instrumentation is not None:
+        __instrumentation.observe(name, value, labels)
+
+
+def increment(name: Text, amount: float = 1, **labels: Text) -> None:
+    if __instrumentation is not None:
+        __instrumentation.increment(name, amount, labels)
+
+
+def set_gauge(name: Text, value: float, **labels: Text) -> None:
+    if __instrumentation is not None:
+        __instrumentation.set_gauge(name, value, labels)
+
+
+class _NoMeasurement(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NO_MEASUREMENT = _NoMeasurement()
+
+
+@contextmanager
+def _measure(instrumentation: Instrumentation,
+             name: Text,
+             labels: Labels) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        instrumentation.observe(name, time.perf_counter() - start, labels)
+
+
+def measure(name: Text, **labels: Text):
+    """Context manager which observes the duration of its block.
+
+    If metrics are disabled, a shared context manager which does nothing
+    is returned."""
+
+    if __instrumentation is None:
+        return _NO_MEASUREMENT
+    return _measure(__instrumentation, name, labels)
+
+
+def timed(name: Text, **labels: Text) -> Callable:
+    """Decorator which observes the duration of every call of a function
+    or coroutine while metrics are enabled."""
+
+    def decorator(f: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(f):
+            @functools.wraps(f)
+            async def timed_coroutine(*args, **kwargs):
+                if __instrumentation is None:
+                    return await f(*args, **kwargs)
+                with _measure(__instrumentation, name, labels):
+                    return await f(*args, **kwargs)
+
+            return timed_coroutine
+
+        @functools.wraps(f)
+        def timed_function(*args, **kwargs):
+            if __instrumentation is None:
+                return f(*args, **kwargs)
+            with _measure(__instrumentation, name, labels):
+                return f(*args, **kwargs)
+
+        return timed_function
+
+    return decorator
+
+
+async def monitor_event_loop(interval: float = 1.0) -> None:
+    """Measures how late the event loop wakes up a sleeping coroutine.
+
+    A large lag means that callbacks block the loop, e.g. CPU heavy work
+    which isn't run in an executor. Runs until it is cancelled."""
+
+    loop = asyncio.get_event_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - start - interval, 0.0)
+        observe(EVENT_LOOP_LAG_SECONDS, lag)
@@ -0,0 +1,267 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Text
+
+from rasa.core import metrics
+from rasa.core.interpreter import (
+    NaturalLanguageInterpreter, RasaNLUHttpInterpreter, RasaNLUInterpreter)
+from rasa.core.utils import EndpointConfig, class_from_module_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 10000
+
+# seconds after which a parse result is parsed again, which limits how
+# long a remote NLU server can answer with results of an outdated model
+DEFAULT_TTL = 3600
+
+DEFAULT_REDIS_KEY_PREFIX = "parse:"
+
+# results of the lookups in the cache
+HIT = "hit"
+MISS = "miss"
+COALESCED = "coalesced"
+
+ParseData = Dict[Text, Any]
+
+
+def normalise_text(text: Text) -> Text:
+    """Removes surrounding whitespace and collapses inner whitespace, so
+    that messages which only differ in it share a parse result."""
+
+    return " ".join(text.split())
+
+
+def model_fingerprint(interpreter: NaturalLanguageInterpreter) -> Text:
+    """Fingerprint of the model an interpreter parses with.
+
+    The fingerprint is part of the keys of the cached results, results of
+    a replaced model are not found anymore."""
+
+    if isinstance(interpreter, CachingInterpreter):
+        return interpreter.fingerprint
+    elif isinstance(interpreter, RasaNLUInterpreter):
+        # the metadata contains the time the model was trained
+        metadata_file = os.path.join(interpreter.model_directory,
+                                     "metadata.json")
+        metadata = ""
+        if os.path.isfile(metadata_file):
+            with open(metadata_file, "rb") as f:
+                metadata = hashlib.sha1(f.read()).hexdigest()
+        parts = [interpreter.model_directory, metadata]
+    elif isinstance(interpreter, RasaNLUHttpInterpreter):
+        parts = [interpreter.endpoint.url, interpreter.project_name,
+                 interpreter.model_name]
+    else:
+        parts = [type(interpreter).__name__]
+
+    fingerprint = json.dumps(parts).encode("utf-8")
+    return hashlib.sha1(fingerprint).hexdigest()
+
+
+class ParseCache(object):
+    """Stores the parse results of messages for `ttl` seconds."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL) -> None:
+        self.ttl = ttl
+
+    @staticmethod
+    def find_parse_cache(store: Optional[EndpointConfig] = None
+                         ) -> Optional['ParseCache']:
+        """Creates the cache of the endpoint configuration, messages
+        aren't cached if none is configured."""
+
+        if store is None:
+            return None
+        elif store.type is None or store.type == 'in_memory':
+            return InMemoryParseCache(**store.kwargs)
+        elif store.type == 'redis':
+            return RedisParseCache(host=store.url, **store.kwargs)
+        else:
+            return ParseCache.load_parse_cache_from_module_string(store)
+
+    @staticmethod
+    def load_parse_cache_from_module_string(store: EndpointConfig
+                                            ) -> 'ParseCache':
+        try:
+            parse_cache_class = class_from_module_path(store.type)
+            return parse_cache_class(url=store.url, **store.kwargs)
+        except (AttributeError, ImportError):
+            logger.warning("Parse cache type '{}' not found. "
+                           "Using InMemoryParseCache instead."
+                           "".format(store.type))
+            return InMemoryParseCache()
+
+    def get(self, key: Text) -> Optional[ParseData]:
+        raise NotImplementedError
+
+    def set(self, key: Text, parse_data: ParseData) -> None:
+        raise NotImplementedError
+
+    def invalidate(self) -> None:
+        """Called if the model is replaced.
+
+        The keys of the new model differ, caches only need to remove the
+        old results to free their space."""
+        pass
+
+
+class InMemoryParseCache(ParseCache):
+    """Keeps up to `max_size` parse results, the least recently used
+    results are removed first."""
+
+    def __init__(self,
+                 max_size: int = DEFAULT_MAX_SIZE,
+                 ttl: float = DEFAULT_TTL) -> None:
+        super(InMemoryParseCache, self).__init__(ttl)
+        self.max_size = max_size
+        # values are the expiry time and the parse result
+        self._results = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get(self, key: Text) -> Optional[ParseData]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+
+        expires, parse_data = entry
+        if expires < time.time():
+            del self._results[key]
+            return None
+
+        self._results.move_to_end(key)
+        return parse_data
+
+    def set(self, key: Text, parse_data: ParseData) -> None:
+        self._results[key] = (time.time() + self.ttl, parse_data)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+
+    def invalidate(self) -> None:
+        self._results.clear()
+
+
+class RedisParseCache(ParseCache):
+    """Keeps the parse results in Redis, where all processes which use
+    the same Redis instance share them. Redis removes expired results."""
+
+    def __init__(self,
+                 host: Text = "localhost",
+                 port: int = 6379,
+                 db: int = 3,
+                 password: Optional[Text] = None,
+                 ttl: float = DEFAULT_TTL,
+                 key_prefix: Text = DEFAULT_REDIS_KEY_PREFIX) -> None:
+        import redis
+
+        super(RedisParseCache, self).__init__(ttl)
+        self.red = redis.StrictRedis(host=host, port=int(port), db=int(db),
+                                     password=password)
+        self.key_prefix = key_prefix
+
+    def get(self, key: Text) -> Optional[ParseData]:
+        dump = self.red.get(self.key_prefix + key)
+        if dump is None:
+            return None
+        return json.loads(dump.decode("utf-8"))
+
+    def set(self, key: Text, parse_data: ParseData) -> None:
+        self.red.setex(self.key_prefix + key, int(math.ceil(self.ttl)),
+                       json.dumps(parse_data))
+
+
+class CachingInterpreter(NaturalLanguageInterpreter):
+    """Parses messages with `interpreter` and caches the results.
+
+    The results are keyed by the normalised text and the fingerprint of
+    the model. Messages are parsed as they were sent, results which are
+    taken from the cache get the text and message id of their message.
+    While a message is parsed, identical messages wait for its result
+    instead of being parsed again."""
+
+    def __init__(self,
+                 interpreter: NaturalLanguageInterpreter,
+                 cache: ParseCache) -> None:
+        if isinstance(interpreter, CachingInterpreter):
+            interpreter = interpreter.interpreter
+
+        self.interpreter = interpreter
+        self.cache = cache
+        self.fingerprint = model_fingerprint(interpreter)
+
+        self.num_hits = 0
+        self.num_misses = 0
+        self._parsing = {}  # type: Dict[Text, asyncio.Future]
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.num_hits + self.num_misses
+        return self.num_hits / requests if requests else 0.0
+
+    def _key(self, text: Text) -> Text:
+        return hashlib.sha1("{}:{}".format(self.fingerprint, text)
+                            .encode("utf-8")).hexdigest()
+
+    def _count(self, result: Text) -> None:
+        if result == MISS:
+            self.num_misses += 1
+        else:
+            self.num_hits += 1
+        metrics.increment(metrics.PARSE_CACHE_REQUESTS, result=result)
+
+    async def parse(self, text, message_id=None):
+        key = self._key(normalise_text(text))
+
+        parse_data = self.cache.get(key)
+        if parse_data is not None:
+            self._count(HIT)
+            return self._for_message(parse_data, text, message_id)
+
+        parsing = self._parsing.get(key)
+        if parsing is not None:
+            self._count(COALESCED)
+            # a cancelled message mustn't cancel the parse of the others
+            return self._for_message(await asyncio.shield(parsing), text,
+                                     message_id)
+
+        self._count(MISS)
+        parsing = asyncio.ensure_future(
+            self._parse_and_cache(key, text, message_id))
+        self._parsing[key] = parsing
+        return copy.deepcopy(await asyncio.shield(parsing))
+
+    @staticmethod
+    def _for_message(parse_data: ParseData,
+                     text: Text,
+                     message_id: Optional[Text]) -> ParseData:
+        """Copy of a result of another message with the same normalised
+        text, which refers to `text` and `message_id` instead."""
+
+        parse_data = copy.deepcopy(parse_data)
+        # failed parses of remote interpreters don't contain the text
+        if parse_data.get("text"):
+            parse_data["text"] = text
+        if "message_id" in parse_data:
+            parse_data["message_id"] = message_id
+        return parse_data
+
+    async def _parse_and_cache(self, key, text, message_id):
+        try:
+            parse_data = await self.interpreter.parse(text, message_id)
+        finally:
+            del self._parsing[key]
+
+        # failed parses of remote interpreters don't contain the text
+        if parse_data and parse_data.get("text") == text:
+            self.cache.set(key, parse_data)
+        return parse_data
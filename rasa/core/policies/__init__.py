@@ -1,15 +1,47 @@
+import importlib
+import sys
+import types
+
 # we need to import the policy first
 from rasa.core.policies.policy import Policy
 
-pass
-# and after that any implementation
-from rasa.core.policies.ensemble import SimplePolicyEnsemble, PolicyEnsemble
-from rasa.core.policies.embedding_policy import EmbeddingPolicy
-from rasa.core.policies.fallback import FallbackPolicy
-from rasa.core.policies.keras_policy import KerasPolicy
-from rasa.core.policies.memoization import (
-    MemoizationPolicy, AugmentedMemoizationPolicy)
-from rasa.core.policies.sklearn_policy import SklearnPolicy
-from rasa.core.policies.form_policy import FormPolicy
-from rasa.core.policies.two_stage_fallback import TwoStageFallbackPolicy
-from rasa.core.policies.mapping_policy import MappingPolicy
+# the implementations are only imported once they are used, as some of them
+# depend on heavy libraries like tensorflow or scikit-learn
+_LAZY_IMPORTS = {
+    "SimplePolicyEnsemble": "rasa.core.policies.ensemble",
+    "PolicyEnsemble": "rasa.core.policies.ensemble",
+    "EmbeddingPolicy": "rasa.core.policies.embedding_policy",
+    "FallbackPolicy": "rasa.core.policies.fallback",
+    "KerasPolicy": "rasa.core.policies.keras_policy",
+    "MemoizationPolicy": "rasa.core.policies.memoization",
+    "AugmentedMemoizationPolicy": "rasa.core.policies.memoization",
+    "SklearnPolicy": "rasa.core.policies.sklearn_policy",
+    "FormPolicy": "rasa.core.policies.form_policy",
+    "TwoStageFallbackPolicy": "rasa.core.policies.two_stage_fallback",
+    "MappingPolicy": "rasa.core.policies.mapping_policy",
+}
+
+__all__ = ["Policy"] + list(_LAZY_IMPORTS)
+
+
+class _LazyPolicyModule(types.ModuleType):
+    """Imports the policy implementations on first attribute access.
+
+    Python 3.6 doesn't support module level `__getattr__` functions, so
+    the class of this module is replaced instead."""
+
+    def __getattr__(self, name):
+        if name not in _LAZY_IMPORTS:
+            raise AttributeError("module '{}' has no attribute '{}'"
+                                 "".format(self.__name__, name))
+
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(super(_LazyPolicyModule, self).__dir__()) |
+                      set(__all__))
+
+
+sys.modules[__name__].__class__ = _LazyPolicyModule
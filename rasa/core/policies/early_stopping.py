@@ -0,0 +1,76 @@
+import logging
+from typing import Any, Dict, Optional, Text, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EarlyStopping(object):
+    """Decides when to stop training a neural policy.
+
+    Training should stop once the validation accuracy did not improve by
+    more than `min_delta` for `patience` consecutive epochs. The epoch
+    with the best validation accuracy is tracked, so the weights of that
+    epoch can be restored."""
+
+    def __init__(self, patience: int, min_delta: float = 0.0) -> None:
+        self.patience = patience
+        self.min_delta = min_delta
+
+        self.best_accuracy = None
+        self.best_epoch = None
+        self.stopped_epoch = None
+        self._epochs_without_improvement = 0
+
+    def update(self, epoch: int, accuracy: float) -> bool:
+        """Records the validation accuracy after an epoch.
+
+        Returns `True` if the accuracy is the best one so far."""
+
+        if (self.best_accuracy is None or
+                accuracy > self.best_accuracy + self.min_delta):
+            self.best_accuracy = accuracy
+            self.best_epoch = epoch
+            self._epochs_without_improvement = 0
+            return True
+
+        self._epochs_without_improvement += 1
+        if self._epochs_without_improvement >= self.patience:
+            self.stopped_epoch = epoch
+            logger.info("Stopping training after epoch {}, the validation "
+                        "accuracy did not improve since epoch {} "
+                        "(accuracy={:.3f})."
+                        "".format(epoch, self.best_epoch,
+                                  self.best_accuracy))
+        return False
+
+    @property
+    def should_stop(self) -> bool:
+        return self.stopped_epoch is not None
+
+    def as_dict(self) -> Dict[Text, Any]:
+        """Summary of the training which is persisted with the policy."""
+
+        return {"best_epoch": self.best_epoch,
+                "stopped_epoch": self.stopped_epoch}
+
+
+def validation_split_ids(num_examples: int,
+                         validation_split: float,
+                         max_validation_examples: Optional[int] = None
+                         ) -> Tuple[np.ndarray, np.ndarray]:
+    """Randomly splits example indices into training and validation ones.
+
+    `validation_split` of the examples are held out from training. Only
+    up to `max_validation_examples` of them are used for validation, to
+    keep evaluating the accuracy after every epoch cheap."""
+
+    ids = np.random.permutation(num_examples)
+    split_at = num_examples - int(num_examples * validation_split)
+
+    validation_ids = ids[split_at:]
+    if max_validation_examples:
+        validation_ids = validation_ids[:max_validation_examples]
+
+    return ids[:split_at], validation_ids
@@ -9,7 +9,7 @@ import numpy as np
 import typing
 from tqdm import tqdm
 from typing import (
-    Any, List, Optional, Text, Dict, Tuple, Union)
+    Any, Iterator, List, Optional, Text, Dict, Tuple, Union)
 
 from rasa.core import utils
 from rasa.core.actions.action import ACTION_LISTEN_NAME
@@ -18,6 +18,8 @@ from rasa.core.featurizers import (
     TrackerFeaturizer,
     FullDialogueTrackerFeaturizer,
     LabelTokenizerSingleStateFeaturizer)
+from rasa.core.policies.early_stopping import (
+    EarlyStopping, validation_split_ids)
 from rasa.core.policies.policy import Policy
 
 import tensorflow as tf
@@ -25,6 +27,7 @@ from rasa.core.policies.tf_utils import (
     TimeAttentionWrapper,
     ChronoBiasLayerNormBasicLSTMCell)
 from rasa.core.trackers import DialogueStateTracker
+from rasa.core.training.data import bucketed_batch_ids, prefetch
 
 if typing.TYPE_CHECKING:
     from rasa.core.policies.tf_utils import TimeAttentionWrapperState
@@ -74,6 +77,18 @@ class EmbeddingPolicy(Policy):
         "batch_size": [8, 32],
         # number of epochs
         "epochs": 1,
+        # number of buckets dialogues of similar length are grouped into,
+        # every bucket is only padded up to its longest dialogue
+        "num_length_buckets": 1,
+        # stop training once the validation accuracy did not improve by
+        # more than `early_stopping_min_delta` for `early_stopping_patience`
+        # epochs and restore the weights of the best epoch
+        "early_stopping": False,
+        "early_stopping_patience": 5,
+        "early_stopping_min_delta": 0.0,
+        # fraction of the training examples held out for early stopping,
+        # up to `evaluate_on_num_examples` of them are evaluated per epoch
+        "validation_split": 0.1,
         # set random seed to any int to get reproducible results
         "random_seed": None,
 
@@ -220,6 +235,9 @@ class EmbeddingPolicy(Policy):
         self._is_training = None
         self._loss_scales = None
 
+        # summary of early stopping, if it was used during training
+        self.early_stopping_summary = None
+
     # init helpers
     def _load_nn_architecture_params(self, config: Dict[Text, Any]) -> None:
         self.hidden_layer_sizes = {'a': config['hidden_layers_sizes_a'],
@@ -241,6 +259,12 @@ class EmbeddingPolicy(Policy):
         self.batch_size = config['batch_size']
 
         self.epochs = config['epochs']
+        self.num_length_buckets = config['num_length_buckets']
+
+        self.early_stopping = config['early_stopping']
+        self.early_stopping_patience = config['early_stopping_patience']
+        self.early_stopping_min_delta = config['early_stopping_min_delta']
+        self.validation_split = config['validation_split']
 
         self.random_seed = config['random_seed']
 
@@ -928,11 +952,12 @@ class EmbeddingPolicy(Policy):
         np.random.seed(self.random_seed)
 
         # dealing with training data
-        training_data = self.featurize_for_training(training_trackers,
-                                                    domain,
-                                                    **kwargs)
+        training_buckets = self.featurize_for_training_in_buckets(
+            training_trackers, domain, self.num_length_buckets, **kwargs)
         # assume that characteristic time is the mean length of the dialogues
-        self.characteristic_time = np.mean(training_data.true_length)
+        self.characteristic_time = np.mean([length
+                                            for bucket in training_buckets
+                                            for length in bucket.true_length])
         if self.attn_shift_range is None:
             self.attn_shift_range = int(self.characteristic_time / 2)
 
@@ -949,9 +974,16 @@ class EmbeddingPolicy(Policy):
         self.num_neg = min(self.num_neg, domain.num_actions - 1)
 
         # extract actual training data to feed to tf session
-        session_data = self._create_tf_session_data(domain,
-                                                    training_data.X,
-                                                    training_data.y)
+        session_data = [self._create_tf_session_data(domain,
+                                                     bucket.X,
+                                                     bucket.y)
+                        for bucket in training_buckets]
+
+        if self.early_stopping:
+            session_data, validation_data = self._split_validation_data(
+                session_data)
+        else:
+            validation_data = None
 
         self.graph = tf.Graph()
 
@@ -964,25 +996,25 @@ class EmbeddingPolicy(Policy):
             self.a_in = tf.placeholder(
                 dtype=tf.float32,
                 shape=(None, dialogue_len,
-                       session_data.X.shape[-1]),
+                       session_data[0].X.shape[-1]),
                 name='a'
             )
             self.b_in = tf.placeholder(
                 dtype=tf.float32,
                 shape=(None, dialogue_len,
-                       None, session_data.Y.shape[-1]),
+                       None, session_data[0].Y.shape[-1]),
                 name='b'
             )
             self.c_in = tf.placeholder(
                 dtype=tf.float32,
                 shape=(None, dialogue_len,
-                       session_data.slots.shape[-1]),
+                       session_data[0].slots.shape[-1]),
                 name='slt'
             )
             self.b_prev_in = tf.placeholder(
                 dtype=tf.float32,
                 shape=(None, dialogue_len,
-                       session_data.Y.shape[-1]),
+                       session_data[0].Y.shape[-1]),
                 name='b_prev'
             )
             self._dialogue_len = tf.placeholder(
@@ -992,17 +1024,17 @@ class EmbeddingPolicy(Policy):
             )
             self._x_for_no_intent_in = tf.placeholder(
                 dtype=tf.float32,
-                shape=(1, session_data.X.shape[-1]),
+                shape=(1, session_data[0].X.shape[-1]),
                 name='x_for_no_intent'
             )
             self._y_for_no_action_in = tf.placeholder(
                 dtype=tf.float32,
-                shape=(1, session_data.Y.shape[-1]),
+                shape=(1, session_data[0].Y.shape[-1]),
                 name='y_for_no_action'
             )
             self._y_for_action_listen_in = tf.placeholder(
                 dtype=tf.float32,
-                shape=(1, session_data.Y.shape[-1]),
+                shape=(1, session_data[0].Y.shape[-1]),
                 name='y_for_action_listen'
             )
             self._is_training = tf.placeholder_with_default(False, shape=())
@@ -1056,7 +1088,7 @@ class EmbeddingPolicy(Policy):
             # train tensorflow graph
             self.session = tf.Session(config=self._tf_config)
 
-            self._train_tf(session_data, loss, mask)
+            self._train_tf(session_data, loss, mask, validation_data)
 
     # training helpers
     def _linearly_increasing_batch_size(self, epoch: int) -> int:
@@ -1087,25 +1119,15 @@ class EmbeddingPolicy(Policy):
 
         batch_pos_b = batch_pos_b[:, :, np.newaxis, :]
 
-        # sample negatives
-        batch_neg_b = np.zeros((batch_pos_b.shape[0],
-                                batch_pos_b.shape[1],
-                                self.num_neg,
-                                batch_pos_b.shape[-1]),
-                               dtype=int)
-        for b in range(batch_pos_b.shape[0]):
-            for h in range(batch_pos_b.shape[1]):
-                # create negative indexes out of possible ones
-                # except for correct index of b
-                negative_indexes = [
-                    i
-                    for i in range(self.encoded_all_actions.shape[0])
-                    if i != intent_ids[b, h]
-                ]
-
-                negs = np.random.choice(negative_indexes, size=self.num_neg)
-
-                batch_neg_b[b, h] = self.encoded_all_actions[negs]
+        # sample negatives out of all actions except for the correct one:
+        # draw from one index less and skip the correct index by shifting
+        # all indices at or above it
+        num_actions = self.encoded_all_actions.shape[0]
+        negs = np.random.randint(max(num_actions - 1, 1),
+                                 size=intent_ids.shape + (self.num_neg,))
+        negs += negs >= intent_ids[:, :, np.newaxis]
+
+        batch_neg_b = self.encoded_all_actions[negs]
 
         return np.concatenate([batch_pos_b, batch_neg_b], -2)
 
@@ -1134,14 +1156,73 @@ class EmbeddingPolicy(Policy):
         else:
             return [[None]]
 
+    @staticmethod
+    def _session_data_subset(data: SessionData,
+                             ids: np.ndarray) -> SessionData:
+        return data._replace(X=data.X[ids],
+                             Y=data.Y[ids],
+                             slots=data.slots[ids],
+                             previous_actions=data.previous_actions[ids],
+                             actions_for_Y=data.actions_for_Y[ids])
+
+    def _split_validation_data(self,
+                               session_data: List[SessionData]
+                               ) -> Tuple[List[SessionData],
+                                          Optional[List[SessionData]]]:
+        """Hold out `validation_split` of every length bucket.
+
+        Only up to `evaluate_on_num_examples` validation examples are kept,
+        sampled from every bucket proportionally to its size."""
+
+        n = self.evaluate_on_num_examples
+        num_examples = sum(len(data.X) for data in session_data)
+
+        train_data = []
+        validation_data = []
+        for data in session_data:
+            n_bucket = (int(np.ceil(n * len(data.X) / num_examples))
+                        if n else None)
+            train_ids, validation_ids = validation_split_ids(
+                len(data.X), self.validation_split, n_bucket)
+
+            if len(train_ids):
+                train_data.append(self._session_data_subset(data,
+                                                            train_ids))
+            if len(validation_ids):
+                validation_data.append(
+                    self._session_data_subset(data, validation_ids))
+
+        if not validation_data or not train_data:
+            logger.warning("Not enough training data to hold out a "
+                           "validation set for early stopping. Training "
+                           "for all {} epochs.".format(self.epochs))
+            return session_data, None
+
+        return train_data, validation_data
+
     def _train_tf(self,
-                  session_data: SessionData,
+                  session_data: List[SessionData],
                   loss: tf.Tensor,
-                  mask: tf.Tensor) -> None:
-        """Train tf graph."""
+                  mask: tf.Tensor,
+                  validation_data: Optional[List[SessionData]] = None
+                  ) -> None:
+        """Train tf graph.
+
+        `session_data` contains the data of every length bucket,
+        a batch only contains examples of a single bucket.
+        If `validation_data` is given, training stops early once
+        the validation accuracy stopped improving."""
 
         self.session.run(tf.global_variables_initializer())
 
+        if validation_data:
+            early_stopping = EarlyStopping(self.early_stopping_patience,
+                                           self.early_stopping_min_delta)
+            variables = tf.global_variables()
+            best_weights = None
+        else:
+            early_stopping = None
+
         if self.evaluate_on_num_examples:
             logger.info("Accuracy is updated every {} epochs"
                         "".format(self.evaluate_every_num_epochs))
@@ -1149,38 +1230,23 @@ class EmbeddingPolicy(Policy):
         train_acc = 0
         last_loss = 0
         for ep in pbar:
-            # randomize training data for the current epoch
-            ids = np.random.permutation(session_data.X.shape[0])
-
             # calculate batch size for the current epoch
             batch_size = self._linearly_increasing_batch_size(ep)
-            # calculate number of batches in the current epoch
-            batches_per_epoch = (
-                session_data.X.shape[0] // batch_size +
-                int(session_data.X.shape[0] % batch_size > 0))
+
+            # randomize training data for the current epoch
+            batches = bucketed_batch_ids([len(data.X)
+                                          for data in session_data],
+                                         batch_size)
+            batches_per_epoch = len(batches)
 
             # collect average loss over the batches
             ep_loss = 0
-            for i in range(batches_per_epoch):
-                start_idx = i * batch_size
-                end_idx = (i + 1) * batch_size
-                batch_ids = ids[start_idx:end_idx]
-
-                # get randomized data for current batch
-                batch_a = session_data.X[batch_ids]
-                batch_pos_b = session_data.Y[batch_ids]
-                actions_for_b = session_data.actions_for_Y[batch_ids]
-
-                # add negatives - incorrect bot actions predictions
-                batch_b = self._create_batch_b(batch_pos_b, actions_for_b)
-
-                batch_c = session_data.slots[batch_ids]
-                batch_b_prev = session_data.previous_actions[batch_ids]
-
-                # calculate how much the loss from each action
-                # should be scaled based on action rarity
-                batch_loss_scales = self._scale_loss_by_count_actions(
-                    batch_a, batch_c, batch_b_prev, actions_for_b)
+            # the next batches are prepared while the current one is trained
+            prepared_batches = prefetch(
+                self._prepare_batches(session_data, batches))
+            for data, batch in prepared_batches:
+                (batch_a, batch_b, batch_c,
+                 batch_b_prev, batch_loss_scales) = batch
 
                 # minimize and calculate loss
                 _loss, _ = self.session.run(
@@ -1190,13 +1256,13 @@ class EmbeddingPolicy(Policy):
                         self.b_in: batch_b,
                         self.c_in: batch_c,
                         self.b_prev_in: batch_b_prev,
-                        self._dialogue_len: session_data.X.shape[1],
+                        self._dialogue_len: data.X.shape[1],
                         self._x_for_no_intent_in:
-                            session_data.x_for_no_intent,
+                            data.x_for_no_intent,
                         self._y_for_no_action_in:
-                            session_data.y_for_no_action,
+                            data.y_for_no_action,
                         self._y_for_action_listen_in:
-                            session_data.y_for_action_listen,
+                            data.y_for_action_listen,
                         self._is_training: True,
                         self._loss_scales: batch_loss_scales
                     }
@@ -1221,42 +1287,105 @@ class EmbeddingPolicy(Policy):
                     "loss": "{:.3f}".format(ep_loss)
                 })
 
+            if early_stopping:
+                validation_acc = self._calc_accuracy(validation_data, mask)
+                if early_stopping.update(ep + 1, validation_acc):
+                    best_weights = self.session.run(variables)
+                elif early_stopping.should_stop:
+                    break
+
+        if early_stopping:
+            # restore the weights of the epoch with the best accuracy
+            for variable, value in zip(variables, best_weights):
+                variable.load(value, self.session)
+            self.early_stopping_summary = early_stopping.as_dict()
+
         if self.evaluate_on_num_examples:
             logger.info("Finished training embedding policy, "
                         "loss={:.3f}, train accuracy={:.3f}"
                         "".format(last_loss, train_acc))
 
+    def _prepare_batches(self,
+                         session_data: List[SessionData],
+                         batches: List[Tuple[int, np.ndarray]]
+                         ) -> Iterator[Tuple[SessionData, Tuple]]:
+        """Create the inputs of every batch of an epoch."""
+
+        for bucket_idx, batch_ids in batches:
+            data = session_data[bucket_idx]
+
+            # get randomized data for current batch
+            batch_a = data.X[batch_ids]
+            batch_pos_b = data.Y[batch_ids]
+            actions_for_b = data.actions_for_Y[batch_ids]
+
+            # add negatives - incorrect bot actions predictions
+            batch_b = self._create_batch_b(batch_pos_b, actions_for_b)
+
+            batch_c = data.slots[batch_ids]
+            batch_b_prev = data.previous_actions[batch_ids]
+
+            # calculate how much the loss from each action
+            # should be scaled based on action rarity
+            batch_loss_scales = self._scale_loss_by_count_actions(
+                batch_a, batch_c, batch_b_prev, actions_for_b)
+
+            yield data, (batch_a, batch_b, batch_c, batch_b_prev,
+                         batch_loss_scales)
+
     def _calc_train_acc(self,
-                        session_data: SessionData,
+                        session_data: List[SessionData],
                         mask: tf.Tensor) -> np.float32:
-        """Calculate training accuracy."""
+        """Calculate training accuracy.
+
+        The examples are sampled from every length bucket
+        proportionally to its size."""
 
         # choose n examples to calculate train accuracy
         n = self.evaluate_on_num_examples
-        ids = np.random.permutation(len(session_data.X))[:n]
-        # noinspection PyPep8Naming
-        all_Y_d_x = np.stack([session_data.all_Y_d
-                              for _ in range(session_data.X[ids].shape[0])])
+        num_examples = sum(len(data.X) for data in session_data)
+
+        sampled_data = []
+        for data in session_data:
+            n_bucket = int(np.ceil(n * len(data.X) / num_examples))
+            ids = np.random.permutation(len(data.X))[:n_bucket]
+            sampled_data.append(self._session_data_subset(data, ids))
+
+        return self._calc_accuracy(sampled_data, mask)
+
+    def _calc_accuracy(self,
+                       session_data: List[SessionData],
+                       mask: tf.Tensor) -> np.float32:
+        """Calculate the accuracy of action predictions on all examples."""
+
+        num_correct = 0
+        num_predictions = 0
+        for data in session_data:
+            # noinspection PyPep8Naming
+            all_Y_d_x = np.stack([data.all_Y_d
+                                  for _ in range(data.X.shape[0])])
+
+            _sim, _mask = self.session.run(
+                [self.sim_op, mask],
+                feed_dict={
+                    self.a_in: data.X,
+                    self.b_in: all_Y_d_x,
+                    self.c_in: data.slots,
+                    self.b_prev_in: data.previous_actions,
+                    self._dialogue_len: data.X.shape[1],
+                    self._x_for_no_intent_in:
+                        data.x_for_no_intent,
+                    self._y_for_no_action_in:
+                        data.y_for_no_action,
+                    self._y_for_action_listen_in:
+                        data.y_for_action_listen
+                }
+            )
+            num_correct += np.sum((np.argmax(_sim, -1) ==
+                                   data.actions_for_Y) * _mask)
+            num_predictions += np.sum(_mask)
 
-        _sim, _mask = self.session.run(
-            [self.sim_op, mask],
-            feed_dict={
-                self.a_in: session_data.X[ids],
-                self.b_in: all_Y_d_x,
-                self.c_in: session_data.slots[ids],
-                self.b_prev_in: session_data.previous_actions[ids],
-                self._dialogue_len: session_data.X.shape[1],
-                self._x_for_no_intent_in:
-                    session_data.x_for_no_intent,
-                self._y_for_no_action_in:
-                    session_data.y_for_no_action,
-                self._y_for_action_listen_in:
-                    session_data.y_for_action_listen
-            }
-        )
-        return np.sum((np.argmax(_sim, -1) ==
-                       session_data.actions_for_Y[ids]) *
-                      _mask) / np.sum(_mask)
+        return num_correct / num_predictions
 
     def continue_training(self,
                           training_trackers: List[DialogueStateTracker],
@@ -1321,6 +1450,37 @@ class EmbeddingPolicy(Policy):
 
         # noinspection PyPep8Naming
         data_X = self.featurizer.create_X([tracker], domain)
+        return self._predict_for_X(domain, data_X)[0]
+
+    def predict_action_probabilities_batch(
+        self,
+        trackers: List[DialogueStateTracker],
+        domain: Domain
+    ) -> List[List[float]]:
+        """Runs the session once for every group of trackers with the
+        same dialogue length."""
+
+        if self.session is None:
+            return [self.predict_action_probabilities(tracker, domain)
+                    for tracker in trackers]
+
+        results = [None] * len(trackers)
+
+        # noinspection PyPep8Naming
+        for ids, data_X in self.featurizer.create_X_batches(trackers,
+                                                            domain):
+            for i, probabilities in zip(ids,
+                                        self._predict_for_X(domain, data_X)):
+                results[i] = probabilities
+        return results
+
+    # noinspection PyPep8Naming
+    def _predict_for_X(self,
+                       domain: Domain,
+                       data_X: np.ndarray) -> List[List[float]]:
+        """Predicts the next action after the last turn of every dialogue
+        in `data_X`."""
+
         session_data = self._create_tf_session_data(domain, data_X)
         # noinspection PyPep8Naming
         all_Y_d_x = np.stack([session_data.all_Y_d
@@ -1343,14 +1503,14 @@ class EmbeddingPolicy(Policy):
             }
         )
 
-        result = _sim[0, -1, :]
+        result = _sim[:, -1, :]
         if self.similarity_type == 'cosine':
             # clip negative values to zero
             result[result < 0] = 0
         elif self.similarity_type == 'inner':
             # normalize result to [0, 1] with softmax
             result = np.exp(result)
-            result /= np.sum(result)
+            result /= np.sum(result, axis=-1, keepdims=True)
 
         return result.tolist()
 
@@ -1370,7 +1530,8 @@ class EmbeddingPolicy(Policy):
 
         self.featurizer.persist(path)
 
-        meta = {"priority": self.priority}
+        meta = {"priority": self.priority,
+                "early_stopping": self.early_stopping_summary}
 
         meta_file = os.path.join(path, 'embedding_policy.json')
         utils.dump_obj_as_json_to_file(meta_file, meta)
@@ -1494,26 +1655,28 @@ class EmbeddingPolicy(Policy):
         with open(encoded_actions_file, 'rb') as f:
             encoded_all_actions = pickle.load(f)
 
-        return cls(featurizer=featurizer,
-                   priority=meta["priority"],
-                   encoded_all_actions=encoded_all_actions,
-                   graph=graph,
-                   session=sess,
-                   intent_placeholder=a_in,
-                   action_placeholder=b_in,
-                   slots_placeholder=c_in,
-                   prev_act_placeholder=b_prev_in,
-                   dialogue_len=dialogue_len,
-                   x_for_no_intent=x_for_no_intent,
-                   y_for_no_action=y_for_no_action,
-                   y_for_action_listen=y_for_action_listen,
-                   similarity_op=sim_op,
-                   alignment_history=alignment_history,
-                   user_embed=user_embed,
-                   bot_embed=bot_embed,
-                   slot_embed=slot_embed,
-                   dial_embed=dial_embed,
-                   rnn_embed=rnn_embed,
-                   attn_embed=attn_embed,
-                   copy_attn_debug=copy_attn_debug,
-                   all_time_masks=all_time_masks)
+        policy = cls(featurizer=featurizer,
+                     priority=meta["priority"],
+                     encoded_all_actions=encoded_all_actions,
+                     graph=graph,
+                     session=sess,
+                     intent_placeholder=a_in,
+                     action_placeholder=b_in,
+                     slots_placeholder=c_in,
+                     prev_act_placeholder=b_prev_in,
+                     dialogue_len=dialogue_len,
+                     x_for_no_intent=x_for_no_intent,
+                     y_for_no_action=y_for_no_action,
+                     y_for_action_listen=y_for_action_listen,
+                     similarity_op=sim_op,
+                     alignment_history=alignment_history,
+                     user_embed=user_embed,
+                     bot_embed=bot_embed,
+                     slot_embed=slot_embed,
+                     dial_embed=dial_embed,
+                     rnn_embed=rnn_embed,
+                     attn_embed=attn_embed,
+                     copy_attn_debug=copy_attn_debug,
+                     all_time_masks=all_time_masks)
+        policy.early_stopping_summary = meta.get("early_stopping")
+        return policy
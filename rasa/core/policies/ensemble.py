@@ -2,7 +2,12 @@ import importlib
 import json
 import logging
 import os
+import pickle
+import shutil
 import sys
+import tempfile
+import traceback
+import typing
 from collections import defaultdict
 from datetime import datetime
 from typing import Text, Optional, Any, List, Dict, Tuple
@@ -10,11 +15,12 @@ from typing import Text, Optional, Any, List, Dict, Tuple
 import numpy as np
 
 import rasa.core
-from rasa.core import utils, training, constants
+from rasa.core import utils, training, constants, metrics
 from rasa.core.actions.action import ACTION_LISTEN_NAME
 from rasa.core.domain import Domain
 from rasa.core.events import SlotSet, ActionExecuted, ActionExecutionRejected
-from rasa.core.exceptions import UnsupportedDialogueModelError
+from rasa.core.exceptions import (
+    UnsupportedDialogueModelError, PolicyTrainingError)
 from rasa.core.featurizers import MaxHistoryTrackerFeaturizer
 from rasa.core.policies import Policy
 from rasa.core.policies.mapping_policy import MappingPolicy
@@ -25,6 +31,9 @@ from rasa.core.policies.memoization import (
 from rasa.core.trackers import DialogueStateTracker
 from rasa.core import registry
 
+if typing.TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,6 +46,11 @@ class PolicyEnsemble(object):
         self.policies = policies
         self.training_trackers = None
         self.date_trained = None
+        self.policy_fingerprints = None
+        # maps indices of policies which were not trained in this process
+        # (reused from a previous model or trained by a worker process)
+        # to the directories containing their persisted version
+        self.persisted_policy_paths = {}
 
         if action_fingerprints:
             self.action_fingerprints = action_fingerprints
@@ -77,22 +91,200 @@ class PolicyEnsemble(object):
 
     def train(self,
               training_trackers: List[DialogueStateTracker],
-              domain: Domain, **kwargs: Any) -> None:
+              domain: Domain,
+              policy_fingerprints: Optional[List[Text]] = None,
+              previous_model_path: Optional[Text] = None,
+              num_workers: int = 1,
+              **kwargs: Any) -> None:
+        """Trains the policies of the ensemble.
+
+        If `policy_fingerprints` are given, policies whose fingerprint is
+        the same as in the model stored at `previous_model_path` are not
+        retrained, but loaded from the previous model.
+
+        If `num_workers` is larger than one, the policies are trained
+        in parallel by that many worker processes."""
+
+        self.policy_fingerprints = policy_fingerprints
+        self.persisted_policy_paths = self._reusable_policy_paths(
+            policy_fingerprints, previous_model_path)
+
         if training_trackers:
-            for policy in self.policies:
-                policy.train(training_trackers, domain, **kwargs)
+            to_train = []
+            for i, policy in enumerate(self.policies):
+                if i in self.persisted_policy_paths:
+                    logger.info("Configuration and training data of {} did "
+                                "not change. Loading it from the previous "
+                                "model instead of retraining it."
+                                "".format(type(policy).__name__))
+                    self.policies[i] = self._load_persisted_policy(
+                        policy, self.persisted_policy_paths[i])
+                else:
+                    to_train.append(i)
+
+            if num_workers > 1 and len(to_train) > 1:
+                self._train_in_workers(to_train, training_trackers, domain,
+                                       num_workers, **kwargs)
+            else:
+                for i in to_train:
+                    self.policies[i].train(training_trackers, domain,
+                                           **kwargs)
         else:
             logger.info("Skipped training, because there are no "
                         "training samples.")
         self.training_trackers = training_trackers
         self.date_trained = datetime.now().strftime('%Y%m%d-%H%M%S')
 
+    def _reusable_policy_paths(self,
+                               policy_fingerprints: Optional[List[Text]],
+                               previous_model_path: Optional[Text]
+                               ) -> Dict[int, Text]:
+        """Finds the policies which did not change since the previous model.
+
+        A policy can be reused if it has the same position and fingerprint
+        in both ensembles."""
+
+        if not policy_fingerprints or not previous_model_path:
+            return {}
+
+        try:
+            metadata = self.load_metadata(previous_model_path)
+        except (IOError, ValueError):
+            logger.debug("Could not read the metadata of the previous model "
+                         "at '{}'. Retraining all policies."
+                         "".format(previous_model_path))
+            return {}
+
+        previous_fingerprints = metadata.get("policy_fingerprints") or []
+        previous_names = metadata.get("policy_names", [])
+
+        reusable = {}
+        for i, policy in enumerate(self.policies):
+            if (i >= len(previous_fingerprints) or
+                    i >= len(previous_names) or
+                    previous_fingerprints[i] != policy_fingerprints[i] or
+                    previous_names[i] !=
+                    utils.module_path_from_instance(policy)):
+                continue
+
+            dir_name = 'policy_{}_{}'.format(i, type(policy).__name__)
+            policy_path = os.path.join(previous_model_path, dir_name)
+            if os.path.isdir(policy_path):
+                reusable[i] = policy_path
+        return reusable
+
+    @classmethod
+    def _load_persisted_policy(cls, policy: Policy,
+                               policy_path: Text) -> Policy:
+        policy_cls = type(policy)
+        policy_name = utils.module_path_from_instance(policy)
+
+        logger.debug("Loading trained {} from '{}'."
+                     "".format(policy_cls.__name__, policy_path))
+        loaded = policy_cls.load(policy_path)
+        cls._ensure_loaded_policy(loaded, policy_cls, policy_name)
+        return loaded
+
+    def _train_in_workers(self,
+                          policy_indices: List[int],
+                          training_trackers: List[DialogueStateTracker],
+                          domain: Domain,
+                          num_workers: int,
+                          **kwargs: Any) -> None:
+        """Trains and persists every policy in a separate worker process.
+
+        The trained policies are loaded from the directories they were
+        persisted to. A worker which dies, e.g. because it ran out of
+        memory, fails the training of its policy."""
+        import multiprocessing
+        from multiprocessing.connection import wait
+
+        num_workers = min(num_workers, len(policy_indices))
+        # budget the threads tensorflow may use in every worker, so the
+        # workers don't compete for the same cores
+        num_threads = max(1, multiprocessing.cpu_count() // num_workers)
+
+        logger.info("Training {} policies using {} worker processes."
+                    "".format(len(policy_indices), num_workers))
+
+        # tensorflow doesn't support forking a process which already
+        # created a session, hence the workers are spawned
+        context = multiprocessing.get_context("spawn")
+        training_dir = tempfile.mkdtemp()
+        pending = list(policy_indices)
+        running = {}
+        errors = {}
+        try:
+            # the workers share a single snapshot of the training data
+            snapshot_path = os.path.join(training_dir, "training_data.pkl")
+            with open(snapshot_path, 'wb') as f:
+                pickle.dump((training_trackers, domain), f,
+                            pickle.HIGHEST_PROTOCOL)
+
+            while pending or running:
+                while pending and len(running) < num_workers:
+                    i = pending.pop(0)
+                    name = 'policy_{}_{}'.format(
+                        i, type(self.policies[i]).__name__)
+                    policy_path = os.path.join(training_dir, name)
+                    receiver, sender = context.Pipe(duplex=False)
+                    process = context.Process(
+                        target=_train_policy_in_worker,
+                        args=(self.policies[i], snapshot_path, policy_path,
+                              num_threads, kwargs, sender))
+                    process.start()
+                    # the receiver only sees the end of the pipe once
+                    # every copy of the sender is closed
+                    sender.close()
+                    running[receiver] = (i, name, policy_path, process)
+
+                for receiver in wait(list(running)):
+                    i, name, policy_path, process = running.pop(receiver)
+                    try:
+                        error = receiver.recv()
+                        process.join()
+                    except EOFError:
+                        # the worker died before it sent its result
+                        process.join()
+                        error = ("The worker process died with exit code "
+                                 "{}.".format(process.exitcode))
+                    receiver.close()
+
+                    if error:
+                        logger.error("Failed to train {}:\n{}"
+                                     "".format(name, error))
+                        errors[name] = error
+                    else:
+                        self.policies[i] = self._load_persisted_policy(
+                            self.policies[i], policy_path)
+        finally:
+            for receiver, (_, _, _, process) in running.items():
+                process.terminate()
+                process.join()
+                receiver.close()
+            shutil.rmtree(training_dir, ignore_errors=True)
+
+        if errors:
+            raise PolicyTrainingError(errors)
+
     def probabilities_using_best_policy(self,
                                         tracker: DialogueStateTracker,
                                         domain: Domain
                                         ) -> Tuple[List[float], Text]:
         raise NotImplementedError
 
+    def predict_batch(self,
+                      trackers: List[DialogueStateTracker],
+                      domain: Domain
+                      ) -> List[Tuple[List[float], Text]]:
+        """Predicts the next action of several trackers at once.
+
+        Returns the probabilities and the name of the best policy for
+        every tracker, in the order of the trackers."""
+
+        return [self.probabilities_using_best_policy(tracker, domain)
+                for tracker in trackers]
+
     def _max_histories(self):
         # type: () -> List[Optional[int]]
         """Return max history."""
@@ -154,6 +346,7 @@ class PolicyEnsemble(object):
             "max_histories": self._max_histories(),
             "ensemble_name": self.__module__ + "." + self.__class__.__name__,
             "policy_names": policy_names,
+            "policy_fingerprints": self.policy_fingerprints,
             "trained_at": self.date_trained
         }
 
@@ -175,7 +368,15 @@ class PolicyEnsemble(object):
         for i, policy in enumerate(self.policies):
             dir_name = 'policy_{}_{}'.format(i, type(policy).__name__)
             policy_path = os.path.join(path, dir_name)
-            policy.persist(policy_path)
+            previous_path = self.persisted_policy_paths.get(i)
+
+            if previous_path and os.path.isdir(previous_path):
+                # unchanged policies are copied instead of persisted again
+                if os.path.exists(policy_path):
+                    shutil.rmtree(policy_path)
+                shutil.copytree(previous_path, policy_path)
+            else:
+                policy.persist(policy_path)
 
     @classmethod
     def load_metadata(cls, path):
@@ -234,6 +435,22 @@ class PolicyEnsemble(object):
         ensemble = ensemble_cls(policies, fingerprints)
         return ensemble
 
+    @staticmethod
+    def fingerprint_policies(dictionary: Dict[Text, Any],
+                             data_fingerprint: Text) -> List[Text]:
+        """Fingerprints each policy of a policy configuration.
+
+        The fingerprint of a policy changes if its configuration (including
+        its featurizer) or the training data changes."""
+
+        policies = dictionary.get('policies') or dictionary.get('policy')
+        return [utils.get_text_hash(json.dumps({
+            "policy": policy,
+            "data": data_fingerprint,
+            "version": rasa.__version__
+        }, sort_keys=True, default=str))
+            for policy in policies or []]
+
     @classmethod
     def from_dict(cls, dictionary: Dict[Text, Any]) -> List[Policy]:
         policies = dictionary.get('policies') or dictionary.get('policy')
@@ -313,10 +530,56 @@ class PolicyEnsemble(object):
                           **kwargs: Any) -> None:
 
         self.training_trackers.extend(trackers)
+        # the policies diverge from their persisted versions
+        self.policy_fingerprints = None
+        self.persisted_policy_paths = {}
         for p in self.policies:
             p.continue_training(self.training_trackers, domain, **kwargs)
 
 
+def _train_policy_in_worker(policy: Policy,
+                            snapshot_path: Text,
+                            policy_path: Text,
+                            num_threads: int,
+                            kwargs: Dict[Text, Any],
+                            connection: 'Connection') -> None:
+    """Trains and persists a policy inside a worker process.
+
+    Sends the formatted traceback through `connection` if the training
+    failed and `None` otherwise."""
+
+    connection.send(_train_policy(policy, snapshot_path, policy_path,
+                                  num_threads, kwargs))
+    connection.close()
+
+
+def _train_policy(policy: Policy,
+                  snapshot_path: Text,
+                  policy_path: Text,
+                  num_threads: int,
+                  kwargs: Dict[Text, Any]) -> Optional[Text]:
+    try:
+        with open(snapshot_path, 'rb') as f:
+            training_trackers, domain = pickle.load(f)
+
+        tf_config = getattr(policy, "_tf_config", None)
+        if hasattr(policy, "_tf_config") and tf_config is None:
+            import tensorflow as tf
+            policy._tf_config = tf.ConfigProto(
+                intra_op_parallelism_threads=num_threads,
+                inter_op_parallelism_threads=num_threads)
+
+        policy.train(training_trackers, domain, **kwargs)
+
+        # the thread budget only applies to the training
+        if hasattr(policy, "_tf_config"):
+            policy._tf_config = tf_config
+        policy.persist(policy_path)
+        return None
+    except Exception:
+        return traceback.format_exc()
+
+
 class SimplePolicyEnsemble(PolicyEnsemble):
 
     @staticmethod
@@ -331,14 +594,50 @@ class SimplePolicyEnsemble(PolicyEnsemble):
                                         tracker: DialogueStateTracker,
                                         domain: Domain
                                         ) -> Tuple[List[float], Text]:
+        predictions = []
+        for p in self.policies:
+            with metrics.measure(metrics.POLICY_SECONDS,
+                                 policy=type(p).__name__):
+                predictions.append(p.predict_action_probabilities(tracker,
+                                                                  domain))
+        return self._best_policy_prediction(tracker, domain, predictions)
+
+    def predict_batch(self,
+                      trackers: List[DialogueStateTracker],
+                      domain: Domain
+                      ) -> List[Tuple[List[float], Text]]:
+        """Every policy predicts the next action of all trackers at once,
+        the best policy is then picked for every tracker separately."""
+
+        batch_predictions = [p.predict_action_probabilities_batch(trackers,
+                                                                  domain)
+                             for p in self.policies]
+
+        results = []
+        for i, tracker in enumerate(trackers):
+            predictions = [policy_predictions[i]
+                           for policy_predictions in batch_predictions]
+            results.append(self._best_policy_prediction(tracker, domain,
+                                                        predictions))
+        return results
+
+    def _best_policy_prediction(self,
+                                tracker: DialogueStateTracker,
+                                domain: Domain,
+                                predictions: List[List[float]]
+                                ) -> Tuple[List[float], Text]:
+        """Picks the prediction of the best policy.
+
+        `predictions` contains the probabilities predicted by every
+        policy of the ensemble, in the order of the policies."""
+
         result = None
         max_confidence = -1
         best_policy_name = None
         best_policy_priority = -1
 
-        for i, p in enumerate(self.policies):
-            probabilities = p.predict_action_probabilities(tracker, domain)
-
+        for i, (p, probabilities) in enumerate(zip(self.policies,
+                                                   predictions)):
             if isinstance(tracker.events[-1], ActionExecutionRejected):
                 probabilities[domain.index_for_action(
                     tracker.events[-1].action_name)] = 0.0
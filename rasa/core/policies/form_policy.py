@@ -129,3 +129,13 @@ class FormPolicy(MemoizationPolicy):
             logger.debug("There is no active form")
 
         return result
+
+    def predict_action_probabilities_batch(
+        self,
+        trackers: List[DialogueStateTracker],
+        domain: Domain
+    ) -> List[List[float]]:
+        # predictions might update the tracker, so they aren't
+        # made from the states of the memoization policy
+        return [self.predict_action_probabilities(tracker, domain)
+                for tracker in trackers]
@@ -12,8 +12,10 @@ from rasa.core.domain import Domain
 from rasa.core.featurizers import (
     MaxHistoryTrackerFeaturizer, BinarySingleStateFeaturizer)
 from rasa.core.featurizers import TrackerFeaturizer
+from rasa.core.policies.early_stopping import EarlyStopping
 from rasa.core.policies.policy import Policy
 from rasa.core.trackers import DialogueStateTracker
+from rasa.core.training.data import DialogueTrainingData, bucketed_batch_ids
 
 try:
     import cPickle as pickle
@@ -32,6 +34,15 @@ class KerasPolicy(Policy):
         "epochs": 100,
         "batch_size": 32,
         "validation_split": 0.1,
+        # number of buckets dialogues of similar length are grouped into,
+        # only used with a `FullDialogueTrackerFeaturizer`
+        "num_length_buckets": 1,
+        # stop training once the accuracy on the `validation_split` did
+        # not improve by more than `early_stopping_min_delta` for
+        # `early_stopping_patience` epochs and restore the best weights
+        "early_stopping": False,
+        "early_stopping_patience": 5,
+        "early_stopping_min_delta": 0.0,
         # set random seed to any int to get reproducible results
         "random_seed": None
     }
@@ -63,6 +74,8 @@ class KerasPolicy(Policy):
         self.session = session
 
         self.current_epoch = current_epoch
+        # summary of early stopping, if it was used during training
+        self.early_stopping_summary = None
 
     def _load_params(self, **kwargs: Dict[Text, Any]) -> None:
         config = copy.deepcopy(self.defaults)
@@ -74,6 +87,10 @@ class KerasPolicy(Policy):
         self.epochs = config.pop('epochs')
         self.batch_size = config.pop('batch_size')
         self.validation_split = config.pop('validation_split')
+        self.num_length_buckets = config.pop('num_length_buckets')
+        self.early_stopping = config.pop('early_stopping')
+        self.early_stopping_patience = config.pop('early_stopping_patience')
+        self.early_stopping_min_delta = config.pop('early_stopping_min_delta')
         self.random_seed = config.pop('random_seed')
 
         self._train_params = config
@@ -152,11 +169,17 @@ class KerasPolicy(Policy):
         # set numpy random seed
         np.random.seed(self.random_seed)
 
-        training_data = self.featurize_for_training(training_trackers,
-                                                    domain,
-                                                    **kwargs)
-        # noinspection PyPep8Naming
-        shuffled_X, shuffled_y = training_data.shuffled_X_y()
+        training_buckets = self.featurize_for_training_in_buckets(
+            training_trackers, domain, self.num_length_buckets, **kwargs)
+        if len(training_buckets) == 1:
+            # noinspection PyPep8Naming
+            shuffled_X, shuffled_y = training_buckets[0].shuffled_X_y()
+        else:
+            # the buckets are shuffled in `_fit_in_buckets`,
+            # the first one only determines the model's input shape
+            # noinspection PyPep8Naming
+            shuffled_X, shuffled_y = (training_buckets[0].X,
+                                      training_buckets[0].y)
 
         self.graph = tf.Graph()
         with self.graph.as_default():
@@ -171,22 +194,111 @@ class KerasPolicy(Policy):
 
                 logger.info("Fitting model with {} total samples and a "
                             "validation split of {}"
-                            "".format(training_data.num_examples(),
+                            "".format(sum(bucket.num_examples()
+                                          for bucket in training_buckets),
                                       self.validation_split))
 
-                # filter out kwargs that cannot be passed to fit
-                self._train_params = self._get_valid_params(
-                    self.model.fit, **self._train_params)
-
-                self.model.fit(shuffled_X, shuffled_y,
-                               epochs=self.epochs,
-                               batch_size=self.batch_size,
-                               shuffle=False,
-                               **self._train_params)
+                callbacks = self._early_stopping_callbacks()
+
+                if len(training_buckets) > 1:
+                    self._fit_in_buckets(training_buckets, callbacks)
+                else:
+                    # filter out kwargs that cannot be passed to fit
+                    self._train_params = self._get_valid_params(
+                        self.model.fit, **self._train_params)
+
+                    if callbacks:
+                        # early stopping monitors the validation accuracy
+                        self._train_params['validation_split'] = \
+                            self.validation_split
+
+                    self.model.fit(shuffled_X, shuffled_y,
+                                   epochs=self.epochs,
+                                   batch_size=self.batch_size,
+                                   shuffle=False,
+                                   callbacks=callbacks,
+                                   **self._train_params)
                 # the default parameter for epochs in keras fit is 1
                 self.current_epoch = self.defaults.get("epochs", 1)
+
+                if callbacks:
+                    stopping = callbacks[0].early_stopping
+                    self.early_stopping_summary = stopping.as_dict()
+                    if stopping.should_stop:
+                        self.current_epoch = stopping.stopped_epoch
+                # keras creates the prediction function lazily, which isn't
+                # thread safe if the first predictions run concurrently
+                self.model._make_predict_function()
                 logger.info("Done fitting keras policy model")
 
+    def _early_stopping_callbacks(self) -> List[tf.keras.callbacks.Callback]:
+        if not self.early_stopping:
+            return []
+        elif not self.validation_split:
+            logger.warning("Early stopping of {} requires a "
+                           "`validation_split` larger than 0. Training "
+                           "for all {} epochs."
+                           "".format(type(self).__name__, self.epochs))
+            return []
+
+        return [EarlyStoppingCallback(
+            EarlyStopping(self.early_stopping_patience,
+                          self.early_stopping_min_delta))]
+
+    def _bucketed_batches(self, buckets: List[Tuple[np.ndarray, np.ndarray]]):
+        """Endlessly yields shuffled batches of `(X, y)` buckets."""
+
+        while True:
+            for bucket_idx, ids in bucketed_batch_ids(
+                    [len(y) for _, y in buckets], self.batch_size):
+                X, y = buckets[bucket_idx]
+                yield X[ids], y[ids]
+
+    def _num_batches(self, buckets: List[Tuple[np.ndarray, np.ndarray]]
+                     ) -> int:
+        return len(bucketed_batch_ids([len(y) for _, y in buckets],
+                                      self.batch_size, shuffle=False))
+
+    def _fit_in_buckets(self,
+                        training_buckets: List[DialogueTrainingData],
+                        callbacks: List[tf.keras.callbacks.Callback]
+                        ) -> None:
+        """Fits the model on batches which contain only one length bucket.
+
+        Like keras' `validation_split`, the last part of every
+        shuffled bucket is used for validation."""
+
+        train_buckets = []
+        validation_buckets = []
+        for bucket in training_buckets:
+            # noinspection PyPep8Naming
+            X, y = bucket.shuffled_X_y()
+            split_at = int(len(y) * (1. - self.validation_split))
+            train_buckets.append((X[:split_at], y[:split_at]))
+            if split_at < len(y):
+                validation_buckets.append((X[split_at:], y[split_at:]))
+
+        if validation_buckets:
+            validation_data = self._bucketed_batches(validation_buckets)
+            validation_steps = self._num_batches(validation_buckets)
+        else:
+            validation_data = None
+            validation_steps = None
+
+        # filter out kwargs that cannot be passed to fit_generator
+        train_params = self._get_valid_params(self.model.fit_generator,
+                                              **self._train_params)
+
+        self.model.fit_generator(self._bucketed_batches(train_buckets),
+                                 steps_per_epoch=self._num_batches(
+                                     train_buckets),
+                                 epochs=self.epochs,
+                                 validation_data=validation_data,
+                                 validation_steps=validation_steps,
+                                 shuffle=False,
+                                 callbacks=callbacks,
+                                 **train_params)
+
     def continue_training(self,
                           training_trackers: List[DialogueStateTracker],
                           domain: Domain,
@@ -231,6 +343,30 @@ class KerasPolicy(Policy):
         elif len(y_pred.shape) == 3:
             return y_pred[0, -1].tolist()
 
+    def predict_action_probabilities_batch(
+        self,
+        trackers: List[DialogueStateTracker],
+        domain: Domain
+    ) -> List[List[float]]:
+        """Runs the model once for every group of trackers with the
+        same dialogue length."""
+
+        results = [None] * len(trackers)
+
+        # noinspection PyPep8Naming
+        for ids, X in self.featurizer.create_X_batches(trackers, domain):
+            with self.graph.as_default(), self.session.as_default():
+                y_pred = self.model.predict(X, batch_size=len(ids))
+
+            if len(y_pred.shape) == 3:
+                # probabilities after the last turn of every dialogue
+                y_pred = y_pred[:, -1]
+
+            for i, probabilities in zip(ids, y_pred):
+                results[i] = probabilities.tolist()
+
+        return results
+
     def persist(self, path: Text) -> None:
 
         if self.model:
@@ -238,7 +374,8 @@ class KerasPolicy(Policy):
 
             meta = {"priority": self.priority,
                     "model": "keras_model.h5",
-                    "epochs": self.current_epoch}
+                    "epochs": self.current_epoch,
+                    "early_stopping": self.early_stopping_summary}
 
             meta_file = os.path.join(path, 'keras_policy.json')
             utils.dump_obj_as_json_to_file(meta_file, meta)
@@ -282,15 +419,46 @@ class KerasPolicy(Policy):
                         with warnings.catch_warnings():
                             warnings.simplefilter("ignore")
                             model = load_model(model_file)
-
-                return cls(featurizer=featurizer,
-                           priority=meta["priority"],
-                           model=model,
-                           graph=graph,
-                           session=session,
-                           current_epoch=meta["epochs"])
+                        # see `train`, predictions run in several threads
+                        model._make_predict_function()
+
+                policy = cls(featurizer=featurizer,
+                             priority=meta["priority"],
+                             model=model,
+                             graph=graph,
+                             session=session,
+                             current_epoch=meta["epochs"])
+                policy.early_stopping_summary = meta.get("early_stopping")
+                return policy
             else:
                 return cls(featurizer=featurizer)
         else:
             raise Exception("Failed to load dialogue model. Path {} "
                             "doesn't exist".format(os.path.abspath(path)))
+
+
+class EarlyStoppingCallback(tf.keras.callbacks.Callback):
+    """Stops the training of a keras model using `EarlyStopping`.
+
+    The weights of the epoch with the best validation accuracy are
+    restored at the end of the training."""
+
+    def __init__(self, early_stopping: EarlyStopping) -> None:
+        super(EarlyStoppingCallback, self).__init__()
+        self.early_stopping = early_stopping
+        self.best_weights = None
+
+    def on_epoch_end(self, epoch, logs=None):
+        accuracy = (logs or {}).get('val_acc')
+        if accuracy is None:
+            return
+
+        # keras counts epochs from 0
+        if self.early_stopping.update(epoch + 1, accuracy):
+            self.best_weights = self.model.get_weights()
+        elif self.early_stopping.should_stop:
+            self.model.stop_training = True
+
+    def on_train_end(self, logs=None):
+        if self.best_weights is not None:
+            self.model.set_weights(self.best_weights)
@@ -4,8 +4,11 @@ import base64
 import json
 import logging
 import os
+from collections.abc import Mapping
 from tqdm import tqdm
-from typing import Optional, Any, Dict, List, Text
+from typing import Optional, Any, Dict, Iterator, List, Text
+
+import numpy as np
 
 from rasa.core import utils
 from rasa.core.domain import Domain
@@ -17,6 +20,83 @@ from rasa.core.trackers import DialogueStateTracker
 
 logger = logging.getLogger(__name__)
 
+LOOKUP_KEYS_FILE = "memorized_turns_keys.npy"
+
+LOOKUP_VALUES_FILE = "memorized_turns_values.npy"
+
+
+class MemoryMappedLookup(Mapping):
+    """Read only lookup whose feature keys and values are memory mapped.
+
+    The keys are stored sorted, so they are found with a binary search.
+    Loading the lookup doesn't decode it and processes which load the
+    same files share their pages."""
+
+    def __init__(self, keys: np.ndarray, values: np.ndarray) -> None:
+        self.key_array = keys
+        self.value_array = values
+
+    @classmethod
+    def load(cls, path: Text) -> 'MemoryMappedLookup':
+        keys = np.load(os.path.join(path, LOOKUP_KEYS_FILE), mmap_mode="r")
+        values = np.load(os.path.join(path, LOOKUP_VALUES_FILE),
+                         mmap_mode="r")
+        return cls(keys, values)
+
+    @staticmethod
+    def persist(lookup: Dict[Text, Any], path: Text) -> bool:
+        """Stores the lookup as arrays.
+
+        Returns `False` if the values can't be stored in a single array."""
+
+        value_types = {type(v) for v in lookup.values()}
+        if not (value_types <= {int} or value_types <= {str}):
+            return False
+
+        feature_keys = sorted(lookup)
+        keys = np.array([k.encode("utf-8") for k in feature_keys],
+                        dtype=bytes)
+        values = np.array([lookup[k] for k in feature_keys])
+        MemoryMappedLookup._save_array(keys, path, LOOKUP_KEYS_FILE)
+        MemoryMappedLookup._save_array(values, path, LOOKUP_VALUES_FILE)
+        return True
+
+    @staticmethod
+    def _save_array(array: np.ndarray, path: Text, file_name: Text) -> None:
+        # the old file might still be mapped, so it is replaced instead of
+        # being overwritten
+        tmp_path = os.path.join(path, file_name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, os.path.join(path, file_name))
+
+    def __getitem__(self, feature_key: Text) -> Any:
+        encoded = feature_key.encode("utf-8")
+        idx = np.searchsorted(self.key_array, encoded)
+        if idx < len(self.key_array) and self.key_array[idx] == encoded:
+            return self.value_array[idx].item()
+        raise KeyError(feature_key)
+
+    def __iter__(self) -> Iterator[Text]:
+        return (k.decode("utf-8") for k in self.key_array)
+
+    def __len__(self) -> int:
+        return len(self.key_array)
+
+
+def _is_in_uncompressed_package(path: Text) -> bool:
+    """Checks whether `path` is inside an uncompressed model package."""
+    from rasa.model import is_uncompressed_package
+
+    path = os.path.abspath(path)
+    while True:
+        if is_uncompressed_package(path):
+            return True
+        parent = os.path.dirname(path)
+        if parent == path:
+            return False
+        path = parent
+
 
 class MemoizationPolicy(Policy):
     """The policy that remembers exact examples of
@@ -152,6 +232,10 @@ class MemoizationPolicy(Policy):
                           domain: Domain,
                           **kwargs: Any) -> None:
 
+        if not isinstance(self.lookup, dict):
+            # a loaded lookup is read only
+            self.lookup = dict(self.lookup)
+
         # add only the last tracker, because it is the only new one
         (trackers_as_states,
          trackers_as_actions) = self.featurizer.training_states_and_actions(
@@ -180,14 +264,36 @@ class MemoizationPolicy(Policy):
             Returns the list of probabilities for the next actions.
             If memorized action was found returns 1.1 for its index,
             else returns 0.0 for all actions."""
-        result = [0.0] * domain.num_actions
-
         if not self.is_enabled:
-            return result
+            return [0.0] * domain.num_actions
 
         tracker_as_states = self.featurizer.prediction_states(
             [tracker], domain)
-        states = tracker_as_states[0]
+        return self._probabilities_for_states(tracker_as_states[0],
+                                              tracker, domain)
+
+    def predict_action_probabilities_batch(
+        self,
+        trackers: List[DialogueStateTracker],
+        domain: Domain
+    ) -> List[List[float]]:
+        """Creates the states of all trackers at once and looks up the
+        memorised action of each of them."""
+
+        if not self.is_enabled:
+            return [[0.0] * domain.num_actions for _ in trackers]
+
+        trackers_as_states = self.featurizer.prediction_states(trackers,
+                                                               domain)
+        return [self._probabilities_for_states(states, tracker, domain)
+                for states, tracker in zip(trackers_as_states, trackers)]
+
+    def _probabilities_for_states(self,
+                                  states: List[Dict[Text, float]],
+                                  tracker: DialogueStateTracker,
+                                  domain: Domain) -> List[float]:
+        result = [0.0] * domain.num_actions
+
         logger.debug("Current tracker state {}".format(states))
         recalled = self.recall(states, tracker, domain)
         if recalled is not None:
@@ -214,10 +320,12 @@ class MemoizationPolicy(Policy):
         memorized_file = os.path.join(path, 'memorized_turns.json')
         data = {
             "priority": self.priority,
-            "max_history": self.max_history,
-            "lookup": self.lookup
+            "max_history": self.max_history
         }
         utils.create_dir_for_file(memorized_file)
+        # the lookup can be large, it's stored in memory mappable arrays
+        if not MemoryMappedLookup.persist(self.lookup, path):
+            data["lookup"] = dict(self.lookup)
         utils.dump_obj_as_json_to_file(memorized_file, data)
 
     @classmethod
@@ -227,8 +335,16 @@ class MemoizationPolicy(Policy):
         memorized_file = os.path.join(path, 'memorized_turns.json')
         if os.path.isfile(memorized_file):
             data = json.loads(utils.read_file(memorized_file))
+            if "lookup" in data:
+                lookup = data["lookup"]
+            elif _is_in_uncompressed_package(path):
+                # the files stay where they are, so they can be mapped
+                lookup = MemoryMappedLookup.load(path)
+            else:
+                # a dictionary is faster than searching the arrays
+                lookup = dict(MemoryMappedLookup.load(path))
             return cls(featurizer=featurizer, priority=data["priority"],
-                       lookup=data["lookup"])
+                       lookup=lookup)
         else:
             logger.info("Couldn't load memoization for policy. "
                         "File '{}' doesn't exist. Falling back to empty "
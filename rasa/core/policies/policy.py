@@ -1,17 +1,21 @@
 import copy
 import logging
-import tensorflow as tf
+import typing
 from typing import (
     Any, List, Optional, Text, Dict, Callable)
 
 from rasa.core import utils
 from rasa.core.domain import Domain
 from rasa.core.featurizers import (
-    MaxHistoryTrackerFeaturizer, BinarySingleStateFeaturizer)
+    MaxHistoryTrackerFeaturizer, BinarySingleStateFeaturizer,
+    FullDialogueTrackerFeaturizer)
 from rasa.core.featurizers import TrackerFeaturizer
 from rasa.core.trackers import DialogueStateTracker
 from rasa.core.training.data import DialogueTrainingData
 
+if typing.TYPE_CHECKING:
+    import tensorflow as tf
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,9 +34,12 @@ class Policy(object):
             return cls._standard_featurizer()
 
     @staticmethod
-    def _load_tf_config(config: Dict[Text, Any]) -> Optional[tf.ConfigProto]:
+    def _load_tf_config(config: Dict[Text, Any]
+                        ) -> Optional['tf.ConfigProto']:
         """Prepare tf.ConfigProto for training"""
         if config.get("tf_config") is not None:
+            # only policies which use tensorflow have a `tf_config`
+            import tensorflow as tf
             return tf.ConfigProto(**config.pop("tf_config"))
         else:
             return None
@@ -83,6 +90,36 @@ class Policy(object):
 
         return training_data
 
+    def featurize_for_training_in_buckets(
+        self,
+        training_trackers: List[DialogueStateTracker],
+        domain: Domain,
+        num_buckets: int,
+        **kwargs: Any
+    ) -> List[DialogueTrainingData]:
+        """Transform training trackers into buckets of training data.
+
+        Only a `FullDialogueTrackerFeaturizer` creates examples of
+        different length, so the dialogues are only grouped into
+        `num_buckets` length buckets if the policy uses one. Otherwise
+        a single bucket with all training data is returned."""
+
+        if (num_buckets is None or num_buckets <= 1 or
+                not isinstance(self.featurizer,
+                               FullDialogueTrackerFeaturizer)):
+            return [self.featurize_for_training(training_trackers, domain,
+                                                **kwargs)]
+
+        max_training_samples = kwargs.get('max_training_samples')
+        if max_training_samples is not None:
+            # every dialogue is one training example
+            logger.debug("Limit training data to {} training samples."
+                         "".format(max_training_samples))
+            training_trackers = training_trackers[:max_training_samples]
+
+        return self.featurizer.featurize_trackers_in_buckets(
+            training_trackers, domain, num_buckets)
+
     def train(self,
               training_trackers: List[DialogueStateTracker],
               domain: Domain,
@@ -139,6 +176,20 @@ class Policy(object):
         raise NotImplementedError("Policy must have the capacity "
                                   "to predict.")
 
+    def predict_action_probabilities_batch(
+        self,
+        trackers: List[DialogueStateTracker],
+        domain: Domain
+    ) -> List[List[float]]:
+        """Predicts the next action for several trackers at once.
+
+        Returns the probabilities in the order of the trackers. Policies
+        which can featurize and run several trackers at once should
+        override this, by default every tracker is predicted on its own."""
+
+        return [self.predict_action_probabilities(tracker, domain)
+                for tracker in trackers]
+
     def persist(self, path: Text) -> None:
         """Persists the policy to a storage."""
         raise NotImplementedError("Policy must have the capacity "
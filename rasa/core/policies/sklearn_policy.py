@@ -171,6 +171,17 @@ class SklearnPolicy(Policy):
         y_proba = self.model.predict_proba(Xt)
         return self._postprocess_prediction(y_proba, domain)
 
+    def predict_action_probabilities_batch(
+        self,
+        trackers: List[DialogueStateTracker],
+        domain: Domain
+    ) -> List[List[float]]:
+        X = self.featurizer.create_X(trackers, domain)
+        Xt = self._preprocess_data(X)
+        y_proba = self.model.predict_proba(Xt)
+        return [self._postprocess_prediction(y_proba[i:i + 1], domain)
+                for i in range(len(trackers))]
+
     def persist(self, path: Text) -> None:
 
         if self.model:
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 from types import LambdaType
@@ -6,15 +7,13 @@ from typing import Any, Dict, List, Optional, Text, Tuple
 import numpy as np
 import time
 
-from rasa.core import jobs
+from rasa.core import executors, metrics
 from rasa.core.actions import Action
 from rasa.core.actions.action import (
     ACTION_LISTEN_NAME,
     ActionExecutionRejection)
 from rasa.core.channels import CollectingOutputChannel, UserMessage
-from rasa.core.constants import (
-    ACTION_NAME_SENDER_ID_CONNECTOR_STR,
-    USER_INTENT_RESTART)
+from rasa.core.constants import USER_INTENT_RESTART
 from rasa.core.dispatcher import Dispatcher
 from rasa.core.domain import Domain
 from rasa.core.events import (
@@ -26,6 +25,7 @@ from rasa.core.interpreter import (
     NaturalLanguageInterpreter, RegexInterpreter)
 from rasa.core.nlg import NaturalLanguageGenerator
 from rasa.core.policies.ensemble import PolicyEnsemble
+from rasa.core.reminders import ReminderScheduler
 from rasa.core.tracker_store import TrackerStore
 from rasa.core.trackers import DialogueStateTracker, EventVerbosity
 from rasa.core.utils import EndpointConfig
@@ -44,6 +44,7 @@ class MessageProcessor(object):
                  max_number_of_predictions: int = 10,
                  message_preprocessor: Optional[LambdaType] = None,
                  on_circuit_break: Optional[LambdaType] = None,
+                 reminder_scheduler: Optional[ReminderScheduler] = None
                  ):
         self.interpreter = interpreter
         self.nlg = generator
@@ -54,7 +55,11 @@ class MessageProcessor(object):
         self.message_preprocessor = message_preprocessor
         self.on_circuit_break = on_circuit_break
         self.action_endpoint = action_endpoint
+        # the scheduler of the agent, which fires the reminders of all
+        # of its processors
+        self.reminder_scheduler = reminder_scheduler
 
+    @metrics.timed(metrics.STAGE_SECONDS, stage="handle_message")
     async def handle_message(self,
                              message: UserMessage) -> Optional[List[Text]]:
         """Handle a single message with this processor."""
@@ -87,6 +92,38 @@ class MessageProcessor(object):
             self._get_next_action_probabilities(tracker)
         # save tracker state to continue conversation from this state
         self._save_tracker(tracker)
+        return self._prediction(tracker, probabilities, policy)
+
+    def predict_next_batch(self,
+                           sender_ids: List[Text]
+                           ) -> List[Optional[Dict[Text, Any]]]:
+        """Predicts the next action of several conversations at once.
+
+        The trackers are predicted as one batch by the policy ensemble,
+        the result for every conversation is the same as the one of
+        `predict_next`."""
+
+        trackers = [self._get_tracker(sender_id) for sender_id in sender_ids]
+        found = [tracker for tracker in trackers if tracker]
+        predictions = iter(self._get_next_action_probabilities_batch(found))
+
+        results = []
+        for sender_id, tracker in zip(sender_ids, trackers):
+            if not tracker:
+                logger.warning("Failed to retrieve or create tracker for "
+                               "sender '{}'.".format(sender_id))
+                results.append(None)
+                continue
+
+            probabilities, policy = next(predictions)
+            self._save_tracker(tracker)
+            results.append(self._prediction(tracker, probabilities, policy))
+        return results
+
+    def _prediction(self,
+                    tracker: DialogueStateTracker,
+                    probabilities: List[float],
+                    policy: Text) -> Dict[Text, Any]:
         scores = [{"action": a, "score": p}
                   for a, p in zip(self.domain.action_names, probabilities)]
         return {
@@ -103,14 +140,33 @@ class MessageProcessor(object):
         # preprocess message if necessary
         if self.message_preprocessor is not None:
             message.text = self.message_preprocessor(message.text)
+
+        parse_data = self._parse_message_without_interpreter(message)
+        parsing = None
+        if parse_data is None:
+            # the parsing doesn't depend on the conversation, so the
+            # message is parsed while its tracker is retrieved
+            parsing = asyncio.ensure_future(self._parse_message(message))
+
         # we have a Tracker instance for each user
         # which maintains conversation state
-        tracker = self._get_tracker(message.sender_id)
+        try:
+            tracker = await self._get_tracker_async(message.sender_id)
+        except Exception:
+            if parsing is not None:
+                parsing.cancel()
+            raise
+
         if tracker:
-            await self._handle_message_with_tracker(message, tracker)
+            if parsing is not None:
+                parse_data = await parsing
+            await self._handle_message_with_tracker(message, tracker,
+                                                    parse_data)
             # save tracker state to continue conversation from this state
             self._save_tracker(tracker)
         else:
+            if parsing is not None:
+                parsing.cancel()
             logger.warning("Failed to retrieve or create tracker for sender "
                            "'{}'.".format(message.sender_id))
         return tracker
@@ -138,6 +194,7 @@ class MessageProcessor(object):
                            "'{}'.".format(sender_id))
         return tracker
 
+    @metrics.timed(metrics.STAGE_SECONDS, stage="predict_next_action")
     def predict_next_action(self,
                             tracker: DialogueStateTracker
                             ) -> Tuple[Action, Text, float]:
@@ -154,6 +211,24 @@ class MessageProcessor(object):
             action.name(), probabilities[max_index]))
         return action, policy, probabilities[max_index]
 
+    def predict_next_actions(self,
+                             trackers: List[DialogueStateTracker]
+                             ) -> List[Tuple[Action, Text, float]]:
+        """Predicts the next action of several trackers at once.
+
+        The trackers are predicted as one batch by the policy ensemble,
+        the result for every tracker is the same as the one of
+        `predict_next_action`."""
+
+        predictions = self._get_next_action_probabilities_batch(trackers)
+        predicted = []
+        for probabilities, policy in predictions:
+            max_index = int(np.argmax(probabilities))
+            action = self.domain.action_for_index(max_index,
+                                                  self.action_endpoint)
+            predicted.append((action, policy, probabilities[max_index]))
+        return predicted
+
     @staticmethod
     def _is_reminder(e: Event, name: Text) -> bool:
         return isinstance(e, ReminderScheduled) and e.name == name
@@ -226,31 +301,55 @@ class MessageProcessor(object):
     def _get_action(self, action_name):
         return self.domain.action_for_name(action_name, self.action_endpoint)
 
-    async def _parse_message(self, message):
+    @staticmethod
+    def _log_parse_data(message, parse_data):
+        logger.debug("Received user message '{}' with intent '{}' "
+                     "and entities '{}'".format(message.text,
+                                                parse_data["intent"],
+                                                parse_data["entities"]))
+
+    def _parse_message_without_interpreter(self, message
+                                           ) -> Optional[Dict[Text, Any]]:
+        """Returns the parse data of messages which don't need the
+        interpreter, `None` for all other messages."""
+
+        if message.parse_data:
+            return message.parse_data
+        elif message.text.startswith(INTENT_MESSAGE_PREFIX):
+            with metrics.measure(metrics.STAGE_SECONDS,
+                                 stage="parse_message"):
+                return self._parse_intent_message(message)
+        else:
+            return None
+
+    def _parse_intent_message(self, message):
         # for testing - you can short-cut the NLU part with a message
         # in the format /intent{"entity1": val1, "entity2": val2}
         # parse_data is a dict of intent & entities
+        parse_data = RegexInterpreter().synchronous_parse(message.text)
+        self._log_parse_data(message, parse_data)
+        return parse_data
+
+    @metrics.timed(metrics.STAGE_SECONDS, stage="parse_message")
+    async def _parse_message(self, message):
         if message.text.startswith(INTENT_MESSAGE_PREFIX):
-            parse_data = await RegexInterpreter().parse(message.text,
-                                                        message.message_id)
-        else:
-            parse_data = await self.interpreter.parse(message.text,
-                                                      message.message_id)
+            return self._parse_intent_message(message)
 
-        logger.debug("Received user message '{}' with intent '{}' "
-                     "and entities '{}'".format(message.text,
-                                                parse_data["intent"],
-                                                parse_data["entities"]))
+        parse_data = await self.interpreter.parse(message.text,
+                                                  message.message_id)
+        self._log_parse_data(message, parse_data)
         return parse_data
 
     async def _handle_message_with_tracker(self,
                                            message: UserMessage,
-                                           tracker: DialogueStateTracker
+                                           tracker: DialogueStateTracker,
+                                           parse_data: Optional[
+                                               Dict[Text, Any]] = None
                                            ) -> None:
 
-        if message.parse_data:
-            parse_data = message.parse_data
-        else:
+        if parse_data is None:
+            parse_data = self._parse_message_without_interpreter(message)
+        if parse_data is None:
             parse_data = await self._parse_message(message)
 
         # don't ever directly mutate the tracker
@@ -293,7 +392,8 @@ class MessageProcessor(object):
                self._should_handle_message(tracker) and
                num_predicted_actions < self.max_number_of_predictions):
             # this actually just calls the policy's method by the same name
-            action, policy, confidence = self.predict_next_action(tracker)
+            action, policy, confidence = await executors.run(
+                executors.PREDICT, self.predict_next_action, tracker)
 
             should_predict_another_action = await self._run_action(action,
                                                                    tracker,
@@ -326,33 +426,29 @@ class MessageProcessor(object):
         (i.e. only one of them will eventually run)."""
 
         for e in events:
-            if isinstance(e, ReminderScheduled):
-                (await jobs.scheduler()).add_job(
-                    self.handle_reminder, "date",
-                    run_date=e.trigger_date_time,
-                    args=[e, dispatcher],
-                    id=e.name,
-                    replace_existing=True,
-                    name=(str(e.action_name) +
-                          ACTION_NAME_SENDER_ID_CONNECTOR_STR +
-                          tracker.sender_id))
-
-    @staticmethod
-    async def _cancel_reminders(events: List[Event],
+            if not isinstance(e, ReminderScheduled):
+                continue
+            if self.reminder_scheduler is None:
+                logger.warning("Reminder '{}' isn't scheduled, the "
+                               "processor has no reminder scheduler."
+                               "".format(e.name))
+                continue
+            self.reminder_scheduler.schedule(e, tracker.sender_id,
+                                             dispatcher.output_channel)
+
+    async def _cancel_reminders(self,
+                                events: List[Event],
                                 tracker: DialogueStateTracker) -> None:
         """Cancel reminders by action_name"""
 
         # All Reminders with the same action name will be cancelled
         for e in events:
-            if isinstance(e, ReminderCancelled):
-                name_to_check = (str(e.action_name) +
-                                 ACTION_NAME_SENDER_ID_CONNECTOR_STR +
-                                 tracker.sender_id)
-                scheduler = await jobs.scheduler()
-                for j in scheduler.get_jobs():
-                    if j.name == name_to_check:
-                        scheduler.remove_job(j.id)
+            if (isinstance(e, ReminderCancelled) and
+                    self.reminder_scheduler is not None):
+                self.reminder_scheduler.cancel(tracker.sender_id,
+                                               str(e.action_name))
 
+    @metrics.timed(metrics.STAGE_SECONDS, stage="run_action")
     async def _run_action(self, action, tracker, dispatcher, policy=None,
                           confidence=None):
         # events and return values are used to update
@@ -446,12 +542,21 @@ class MessageProcessor(object):
             e.timestamp = time.time()
             tracker.update(e)
 
+    @metrics.timed(metrics.STAGE_SECONDS, stage="get_tracker")
     def _get_tracker(self, sender_id: Text) -> Optional[DialogueStateTracker]:
 
         sender_id = sender_id or UserMessage.DEFAULT_SENDER_ID
         tracker = self.tracker_store.get_or_create_tracker(sender_id)
         return tracker
 
+    @metrics.timed(metrics.STAGE_SECONDS, stage="get_tracker")
+    async def _get_tracker_async(self, sender_id: Text
+                                 ) -> Optional[DialogueStateTracker]:
+
+        sender_id = sender_id or UserMessage.DEFAULT_SENDER_ID
+        return await self.tracker_store.get_or_create_tracker_async(sender_id)
+
+    @metrics.timed(metrics.STAGE_SECONDS, stage="save_tracker")
     def _save_tracker(self, tracker):
         self.tracker_store.save(tracker)
 
@@ -466,6 +571,28 @@ class MessageProcessor(object):
         else:
             return None, None
 
+    def _get_next_action_probabilities_batch(
+            self,
+            trackers: List[DialogueStateTracker]
+    ) -> List[Tuple[Optional[List[float]], Optional[Text]]]:
+        """Collects the predictions of several trackers, trackers without a
+        followup action are predicted as one batch by the ensemble."""
+
+        results = [None] * len(trackers)
+        batch = []
+        for i, tracker in enumerate(trackers):
+            if tracker.followup_action:
+                results[i] = self._get_next_action_probabilities(tracker)
+            else:
+                batch.append(i)
+
+        if batch:
+            predictions = self.policy_ensemble.predict_batch(
+                [trackers[i] for i in batch], self.domain)
+            for i, prediction in zip(batch, predictions):
+                results[i] = prediction
+        return results
+
     def _get_next_action_probabilities(self,
                                        tracker: DialogueStateTracker
                                        ) -> Tuple[Optional[List[float]],
@@ -0,0 +1,540 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import (
+    Any, Awaitable, Callable, Dict, List, Optional, Set, Text, Tuple)
+
+from rasa.core.channels import CollectingOutputChannel, OutputChannel
+from rasa.core.constants import ACTION_NAME_SENDER_ID_CONNECTOR_STR
+from rasa.core.events import Event, ReminderScheduled
+from rasa.core.utils import EndpointConfig, class_from_module_path
+
+logger = logging.getLogger(__name__)
+
+# maximum number of due reminders which are claimed and fired together
+DEFAULT_BATCH_SIZE = 100
+
+# seconds after its trigger time for which the output channel of a reminder
+# is kept, if the reminder is fired by another process
+OUTPUT_CHANNEL_RETENTION = 60
+
+DEFAULT_REDIS_KEY_PREFIX = "reminder:"
+
+
+def _conversation_key(sender_id: Text, action_name: Text) -> Text:
+    return "{}{}{}".format(action_name, ACTION_NAME_SENDER_ID_CONNECTOR_STR,
+                           sender_id)
+
+
+class Reminder(object):
+    """Reminder of a conversation which is stored until it is due."""
+
+    def __init__(self,
+                 name: Text,
+                 sender_id: Text,
+                 action_name: Text,
+                 trigger_time: float,
+                 event_data: Dict[Text, Any],
+                 input_channel: Optional[Text] = None) -> None:
+        self.name = name
+        self.sender_id = sender_id
+        self.action_name = action_name
+        # unix timestamp at which the reminder is due
+        self.trigger_time = trigger_time
+        # the `ReminderScheduled` event which scheduled the reminder
+        self.event_data = event_data
+        self.input_channel = input_channel
+
+    @classmethod
+    def from_event(cls,
+                   event: ReminderScheduled,
+                   sender_id: Text,
+                   input_channel: Optional[Text] = None) -> 'Reminder':
+        # naive dates are local times, like the dates of the scheduler
+        # which handled reminders before
+        return cls(event.name, sender_id, event.action_name,
+                   event.trigger_date_time.timestamp(), event.as_dict(),
+                   input_channel)
+
+    def event(self) -> ReminderScheduled:
+        return Event.from_parameters(self.event_data)
+
+    @property
+    def conversation_key(self) -> Text:
+        return _conversation_key(self.sender_id, self.action_name)
+
+    def dumps(self) -> Text:
+        return json.dumps({"name": self.name,
+                           "sender_id": self.sender_id,
+                           "action_name": self.action_name,
+                           "trigger_time": self.trigger_time,
+                           "event": self.event_data,
+                           "input_channel": self.input_channel})
+
+    @classmethod
+    def loads(cls, dump: Text) -> 'Reminder':
+        data = json.loads(dump)
+        return cls(data["name"], data["sender_id"], data["action_name"],
+                   data["trigger_time"], data["event"],
+                   data.get("input_channel"))
+
+    def __repr__(self):
+        return ("Reminder(name: {}, sender_id: {}, action: {}, "
+                "trigger_time: {})".format(self.name, self.sender_id,
+                                           self.action_name,
+                                           self.trigger_time))
+
+
+class ReminderStore(object):
+    """Stores the reminders which aren't due yet.
+
+    Reminders are found by their trigger time, to fire them, and by their
+    conversation and action, to cancel them. Storing them outside of the
+    process, e.g. in Redis or a SQL database, keeps them across restarts
+    and shares them between processes."""
+
+    @staticmethod
+    def find_reminder_store(store: Optional[EndpointConfig] = None
+                            ) -> 'ReminderStore':
+        if store is None or store.type is None:
+            return InMemoryReminderStore()
+        elif store.type == 'redis':
+            return RedisReminderStore(host=store.url, **store.kwargs)
+        elif store.type.lower() == 'sql':
+            return SQLReminderStore(url=store.url, **store.kwargs)
+        else:
+            return ReminderStore.load_reminder_store_from_module_string(store)
+
+    @staticmethod
+    def load_reminder_store_from_module_string(store: EndpointConfig
+                                               ) -> 'ReminderStore':
+        try:
+            reminder_store_class = class_from_module_path(store.type)
+            return reminder_store_class(url=store.url, **store.kwargs)
+        except (AttributeError, ImportError):
+            logger.warning("Reminder store type '{}' not found. "
+                           "Using InMemoryReminderStore instead."
+                           "".format(store.type))
+            return InMemoryReminderStore()
+
+    def add(self, reminder: Reminder) -> None:
+        """Stores a reminder, it replaces a reminder with the same name."""
+
+        raise NotImplementedError
+
+    def cancel(self, sender_id: Text, action_name: Text) -> List[Text]:
+        """Removes the reminders of an action in a conversation.
+
+        Returns the names of the removed reminders."""
+
+        raise NotImplementedError
+
+    def claim_due(self, now: float, limit: int) -> List[Reminder]:
+        """Removes and returns up to `limit` reminders which are due.
+
+        Stores which are shared between processes need to make sure that
+        every reminder is only claimed by one of them."""
+
+        raise NotImplementedError
+
+    def next_due(self) -> Optional[float]:
+        """Trigger time of the next reminder."""
+
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class InMemoryReminderStore(ReminderStore):
+    """Keeps the reminders in a heap, they are lost when the process
+    stops."""
+
+    def __init__(self) -> None:
+        self.reminders = {}  # type: Dict[Text, Reminder]
+        self.index = defaultdict(set)  # type: Dict[Text, Set[Text]]
+        # cancelled and replaced reminders stay in the heap until they are
+        # popped, the counter orders reminders with the same trigger time
+        self._heap = []  # type: List[Tuple[float, int, Reminder]]
+        self._counter = itertools.count()
+
+    def add(self, reminder: Reminder) -> None:
+        if reminder.name in self.reminders:
+            self._unindex(self.reminders[reminder.name])
+
+        self.reminders[reminder.name] = reminder
+        self.index[reminder.conversation_key].add(reminder.name)
+        heapq.heappush(self._heap, (reminder.trigger_time,
+                                    next(self._counter), reminder))
+        self._compact()
+
+    def _unindex(self, reminder: Reminder) -> None:
+        key = reminder.conversation_key
+        self.index[key].discard(reminder.name)
+        if not self.index[key]:
+            del self.index[key]
+
+    def _compact(self) -> None:
+        # drops the removed reminders once they make up most of the heap
+        if len(self._heap) > 2 * len(self.reminders) + DEFAULT_BATCH_SIZE:
+            self._heap = [entry for entry in self._heap
+                          if self._is_stored(entry[2])]
+            heapq.heapify(self._heap)
+
+    def _is_stored(self, reminder: Reminder) -> bool:
+        return self.reminders.get(reminder.name) is reminder
+
+    def cancel(self, sender_id: Text, action_name: Text) -> List[Text]:
+        names = self.index.pop(_conversation_key(sender_id, action_name),
+                               set())
+        for name in names:
+            del self.reminders[name]
+        return list(names)
+
+    def claim_due(self, now: float, limit: int) -> List[Reminder]:
+        claimed = []
+        while (self._heap and self._heap[0][0] <= now and
+               len(claimed) < limit):
+            reminder = heapq.heappop(self._heap)[2]
+            if self._is_stored(reminder):
+                del self.reminders[reminder.name]
+                self._unindex(reminder)
+                claimed.append(reminder)
+        return claimed
+
+    def next_due(self) -> Optional[float]:
+        while self._heap and not self._is_stored(self._heap[0][2]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def __len__(self) -> int:
+        return len(self.reminders)
+
+
+class RedisReminderStore(ReminderStore):
+    """Keeps the reminders in Redis, where all processes which use the
+    same Redis instance share them.
+
+    The reminders are ordered by their trigger time in a sorted set.
+    Removing a reminder from the sorted set claims it, which only succeeds
+    for one process."""
+
+    def __init__(self,
+                 host: Text = "localhost",
+                 port: int = 6379,
+                 db: int = 2,
+                 password: Optional[Text] = None,
+                 key_prefix: Text = DEFAULT_REDIS_KEY_PREFIX) -> None:
+        import redis
+
+        self.red = redis.StrictRedis(host=host, port=int(port), db=int(db),
+                                     password=password)
+        self.key_prefix = key_prefix
+
+    @property
+    def _data_key(self) -> Text:
+        return self.key_prefix + "data"
+
+    @property
+    def _due_key(self) -> Text:
+        return self.key_prefix + "due"
+
+    def _index_key(self, conversation_key: Text) -> Text:
+        return self.key_prefix + "index:" + conversation_key
+
+    def _get(self, name: Text) -> Optional[Reminder]:
+        dump = self.red.hget(self._data_key, name)
+        if dump is None:
+            return None
+        return Reminder.loads(dump.decode("utf-8"))
+
+    def add(self, reminder: Reminder) -> None:
+        previous = self._get(reminder.name)
+
+        pipe = self.red.pipeline()
+        if previous is not None:
+            pipe.srem(self._index_key(previous.conversation_key),
+                      reminder.name)
+        pipe.hset(self._data_key, reminder.name, reminder.dumps())
+        pipe.sadd(self._index_key(reminder.conversation_key), reminder.name)
+        pipe.zadd(self._due_key, reminder.trigger_time, reminder.name)
+        pipe.execute()
+
+    def cancel(self, sender_id: Text, action_name: Text) -> List[Text]:
+        key = self._index_key(_conversation_key(sender_id, action_name))
+        names = [n.decode("utf-8") for n in self.red.smembers(key)]
+        if not names:
+            return []
+
+        pipe = self.red.pipeline()
+        pipe.zrem(self._due_key, *names)
+        pipe.hdel(self._data_key, *names)
+        pipe.delete(key)
+        pipe.execute()
+        return names
+
+    def claim_due(self, now: float, limit: int) -> List[Reminder]:
+        names = self.red.zrangebyscore(self._due_key, "-inf", now,
+                                       start=0, num=limit)
+        claimed = []
+        for name in names:
+            if not self.red.zrem(self._due_key, name):
+                # claimed by another process
+                continue
+
+            dump = self.red.hget(self._data_key, name)
+            if dump is None:
+                continue
+            reminder = Reminder.loads(dump.decode("utf-8"))
+
+            pipe = self.red.pipeline()
+            pipe.hdel(self._data_key, name)
+            pipe.srem(self._index_key(reminder.conversation_key), name)
+            pipe.execute()
+            claimed.append(reminder)
+        return claimed
+
+    def next_due(self) -> Optional[float]:
+        first = self.red.zrange(self._due_key, 0, 0, withscores=True)
+        return first[0][1] if first else None
+
+    def __len__(self) -> int:
+        return self.red.zcard(self._due_key)
+
+
+class SQLReminderStore(ReminderStore):
+    """Keeps the reminders in a SQL database, where all processes which
+    use the same database share them.
+
+    Deleting the row of a reminder claims it, which only succeeds for one
+    process."""
+
+    from sqlalchemy.ext.declarative import declarative_base
+
+    Base = declarative_base()
+
+    class SQLReminder(Base):
+        from sqlalchemy import Column, Float, Index, String
+
+        __tablename__ = 'reminders'
+        __table_args__ = (Index('ix_reminders_conversation',
+                                'sender_id', 'action_name'),)
+
+        name = Column(String, primary_key=True)
+        sender_id = Column(String, nullable=False)
+        action_name = Column(String, nullable=False)
+        trigger_time = Column(Float, nullable=False, index=True)
+        data = Column(String)
+
+    def __init__(self,
+                 dialect: Text = 'sqlite',
+                 url: Text = None,
+                 db: Text = 'rasa.db',
+                 username: Text = None,
+                 password: Text = None) -> None:
+        from sqlalchemy.orm import sessionmaker
+        from sqlalchemy.engine.url import URL
+        from sqlalchemy import create_engine
+
+        engine_url = URL(dialect, username, password, url, database=db)
+
+        logger.debug('Attempting to connect to database '
+                     'via "{}"'.format(engine_url.__to_string__()))
+
+        self.engine = create_engine(engine_url)
+        self.session = sessionmaker(bind=self.engine)()
+
+        self.Base.metadata.create_all(self.engine)
+
+    def add(self, reminder: Reminder) -> None:
+        # noinspection PyArgumentList
+        self.session.merge(self.SQLReminder(
+            name=reminder.name,
+            sender_id=reminder.sender_id,
+            action_name=reminder.action_name,
+            trigger_time=reminder.trigger_time,
+            data=reminder.dumps()))
+        self.session.commit()
+
+    def cancel(self, sender_id: Text, action_name: Text) -> List[Text]:
+        query = self.session.query(self.SQLReminder).filter_by(
+            sender_id=sender_id, action_name=action_name)
+        names = [row.name for row in query]
+        query.delete(synchronize_session=False)
+        self.session.commit()
+        return names
+
+    def claim_due(self, now: float, limit: int) -> List[Reminder]:
+        query = self.session.query(self.SQLReminder)
+        rows = (query.filter(self.SQLReminder.trigger_time <= now)
+                     .order_by(self.SQLReminder.trigger_time)
+                     .limit(limit)
+                     .all())
+        claimed = []
+        for row in rows:
+            reminder = Reminder.loads(row.data)
+            deleted = query.filter_by(
+                name=row.name, trigger_time=row.trigger_time
+            ).delete(synchronize_session=False)
+            self.session.commit()
+            if deleted:
+                claimed.append(reminder)
+        return claimed
+
+    def next_due(self) -> Optional[float]:
+        from sqlalchemy import func
+
+        return self.session.query(
+            func.min(self.SQLReminder.trigger_time)).scalar()
+
+    def __len__(self) -> int:
+        return self.session.query(self.SQLReminder).count()
+
+
+class ReminderScheduler(object):
+    """Fires the reminders of a reminder store when they are due.
+
+    Due reminders are claimed and fired in batches. The output channels of
+    the reminders which were scheduled by this process are kept in memory.
+    Reminders which were scheduled before a restart or by another process
+    collect the bot messages, they are still logged on the tracker."""
+
+    def __init__(self,
+                 store: ReminderStore,
+                 handle_reminder: Callable[
+                     [ReminderScheduled, Text, OutputChannel],
+                     Awaitable[Any]],
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        self.store = store
+        self.handle_reminder = handle_reminder
+        self.batch_size = batch_size
+
+        self._output_channels = {}  # type: Dict[Text, Tuple[float, Any]]
+        self._task = None  # type: Optional[asyncio.Future]
+        self._wakeup = None  # type: Optional[asyncio.Event]
+        self._loop = None
+        self._sleeping_until = None  # type: Optional[float]
+        self._last_cleanup = time.time()
+
+    def schedule(self,
+                 event: ReminderScheduled,
+                 sender_id: Text,
+                 output_channel: OutputChannel) -> None:
+        """Stores the reminder of a `ReminderScheduled` event.
+
+        Reminders with the same name replace each other."""
+
+        reminder = Reminder.from_event(event, sender_id,
+                                       output_channel.name())
+        self.store.add(reminder)
+        self._output_channels[reminder.name] = (reminder.trigger_time,
+                                                output_channel)
+
+        self.start()
+        if (self._sleeping_until is None or
+                reminder.trigger_time < self._sleeping_until):
+            self._wakeup.set()
+
+    def cancel(self, sender_id: Text, action_name: Text) -> int:
+        """Cancels the reminders of an action in a conversation."""
+
+        names = self.store.cancel(sender_id, action_name)
+        for name in names:
+            self._output_channels.pop(name, None)
+        return len(names)
+
+    def start(self) -> None:
+        """Starts firing the due reminders on the current event loop."""
+
+        loop = asyncio.get_event_loop()
+        if self._task is not None and not self._task.done():
+            if self._loop is loop:
+                return
+            self._task.cancel()
+
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.fire_due_reminders()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Failed to fire due reminders: {}"
+                                 "".format(e))
+            self._remove_old_output_channels()
+            await self._sleep()
+
+    async def _sleep(self) -> None:
+        """Sleeps until the next reminder is due or a reminder is
+        scheduled, if there are no reminders only the latter."""
+
+        next_due = self.store.next_due()
+        if next_due is None:
+            delay = None
+            self._sleeping_until = float("inf")
+        else:
+            now = time.time()
+            delay = max(next_due - now, 0)
+            self._sleeping_until = now + delay
+
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._sleeping_until = None
+            self._wakeup.clear()
+
+    async def fire_due_reminders(self) -> int:
+        """Claims and fires the due reminders, returns how many."""
+
+        num_fired = 0
+        while True:
+            reminders = self.store.claim_due(time.time(), self.batch_size)
+            if reminders:
+                await asyncio.gather(*[self._fire(r) for r in reminders])
+                num_fired += len(reminders)
+            if len(reminders) < self.batch_size:
+                return num_fired
+
+    async def _fire(self, reminder: Reminder) -> None:
+        _, output_channel = self._output_channels.pop(
+            reminder.name, (None, None))
+        if output_channel is None:
+            logger.debug("Reminder '{}' wasn't scheduled by this process, "
+                         "its messages are only logged on the tracker."
+                         "".format(reminder.name))
+            output_channel = CollectingOutputChannel()
+
+        try:
+            await self.handle_reminder(reminder.event(), reminder.sender_id,
+                                       output_channel)
+        except Exception as e:
+            logger.exception("Failed to handle reminder '{}' of sender "
+                             "'{}': {}".format(reminder.name,
+                                               reminder.sender_id, e))
+
+    def _remove_old_output_channels(self) -> None:
+        # reminders which were fired or cancelled by other processes
+        now = time.time()
+        if now - self._last_cleanup < OUTPUT_CHANNEL_RETENTION:
+            return
+
+        self._last_cleanup = now
+        cutoff = now - OUTPUT_CHANNEL_RETENTION
+        self._output_channels = {
+            name: entry for name, entry in self._output_channels.items()
+            if entry[0] > cutoff}
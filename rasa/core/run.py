@@ -11,7 +11,7 @@ import rasa.core.cli.arguments
 import rasa.utils
 
 import rasa.core
-from rasa.core import constants, utils, cli
+from rasa.core import admission, cli, constants, executors, utils
 from rasa.core.channels import (BUILTIN_CHANNELS, InputChannel, console)
 from rasa.core.interpreter import NaturalLanguageInterpreter
 from rasa.core.tracker_store import TrackerStore
@@ -84,7 +84,8 @@ def configure_app(input_channels=None,
                   jwt_secret=None,
                   jwt_method=None,
                   route="/webhooks/",
-                  port=None):
+                  port=None,
+                  enable_metrics=False):
     """Run the agent."""
     from rasa.core import server
 
@@ -92,12 +93,15 @@ def configure_app(input_channels=None,
         app = server.create_app(cors_origins=cors,
                                 auth_token=auth_token,
                                 jwt_secret=jwt_secret,
-                                jwt_method=jwt_method)
+                                jwt_method=jwt_method,
+                                enable_metrics=enable_metrics)
     else:
         app = Sanic(__name__)
         CORS(app,
              resources={r"/*": {"origins": cors or ""}},
              automatic_options=True)
+        if enable_metrics:
+            server.add_metrics_route(app, auth_token)
 
     if input_channels:
         rasa.core.channels.channel.register(input_channels,
@@ -117,18 +121,24 @@ def configure_app(input_channels=None,
     app.add_task(configure_logging)
 
     if "cmdline" in {c.name() for c in input_channels}:
-        async def run_cmdline_io(running_app: Sanic):
-            """Small wrapper to shut down the server once cmd io is done."""
-            await asyncio.sleep(1)  # allow server to start
-            await console.record_messages(
-                server_url=constants.DEFAULT_SERVER_FORMAT.format(port))
+        add_cmdline_io(app, port)
 
-            logger.info("Killing Sanic server now.")
-            running_app.stop()  # kill the sanic serverx
+    return app
 
-        app.add_task(run_cmdline_io)
 
-    return app
+def add_cmdline_io(app: Sanic, port: int) -> None:
+    """Runs the interactive console once the server is started."""
+
+    async def run_cmdline_io(running_app: Sanic):
+        """Small wrapper to shut down the server once cmd io is done."""
+        await asyncio.sleep(1)  # allow server to start
+        await console.record_messages(
+            server_url=constants.DEFAULT_SERVER_FORMAT.format(port))
+
+        logger.info("Killing Sanic server now.")
+        running_app.stop()  # kill the sanic serverx
+
+    app.add_task(run_cmdline_io)
 
 
 def serve_application(core_model=None,
@@ -141,34 +151,69 @@ def serve_application(core_model=None,
                       enable_api=True,
                       jwt_secret=None,
                       jwt_method=None,
-                      endpoints=None
+                      endpoints=None,
+                      enable_metrics=False,
+                      workers=1,
+                      max_concurrent_turns=None,
+                      max_queued_turns=admission.DEFAULT_MAX_QUEUED_TURNS,
+                      max_queue_time=admission.DEFAULT_MAX_QUEUE_TIME,
+                      adaptive_concurrency=False,
+                      overload_utterance=None,
+                      parse_workers=0,
+                      parse_in_processes=False,
+                      predict_workers=0,
+                      max_queued_executions=executors.DEFAULT_MAX_QUEUED
                       ):
     if not channel and not credentials_file:
         channel = "cmdline"
 
+    executor_settings = {"parse_workers": parse_workers,
+                         "parse_in_processes": parse_in_processes,
+                         "predict_workers": predict_workers,
+                         "max_queued": max_queued_executions}
+
+    if max_concurrent_turns:
+        admission_controller = admission.AdmissionController(
+            max_concurrent_turns, max_queued_turns, max_queue_time,
+            adaptive=adaptive_concurrency,
+            fallback_utterance=overload_utterance)
+    else:
+        admission_controller = None
+
+    if workers > 1:
+        from rasa.core.workers import serve_with_workers
+
+        serve_with_workers(workers, core_model, nlu_model, channel, port,
+                           credentials_file, cors, auth_token, enable_api,
+                           jwt_secret, jwt_method, endpoints, enable_metrics,
+                           admission_controller, executor_settings)
+        return
+
+    executors.configure(**executor_settings)
+
     input_channels = create_http_input_channels(channel, credentials_file)
 
     app = configure_app(input_channels, cors, auth_token, enable_api,
-                        jwt_secret, jwt_method, port=port)
+                        jwt_secret, jwt_method, port=port,
+                        enable_metrics=enable_metrics)
 
     logger.info("Starting Rasa Core server on "
                 "{}".format(constants.DEFAULT_SERVER_FORMAT.format(port)))
 
     app.register_listener(
-        partial(load_agent_on_start, core_model, endpoints, nlu_model),
+        partial(load_agent_on_start, core_model, endpoints, nlu_model,
+                admission_controller=admission_controller),
         'before_server_start')
     app.run(host='0.0.0.0', port=port,
             access_log=logger.isEnabledFor(logging.DEBUG))
 
 
-# noinspection PyUnusedLocal
-async def load_agent_on_start(core_model, endpoints, nlu_model, app, loop):
-    """Load an agent.
-
-    Used to be scheduled on server start
-    (hence the `app` and `loop` arguments)."""
+def create_agent_components(nlu_model, endpoints, admission_controller=None):
+    """Creates the interpreter, stores and endpoints of an agent."""
     from rasa.core import broker
-    from rasa.core.agent import Agent
+    from rasa.core.lock_store import LockStore
+    from rasa.core.parse_cache import ParseCache
+    from rasa.core.reminders import ReminderStore
 
     _interpreter = NaturalLanguageInterpreter.create(nlu_model,
                                                      endpoints.nlu)
@@ -176,24 +221,45 @@ async def load_agent_on_start(core_model, endpoints, nlu_model, app, loop):
 
     _tracker_store = TrackerStore.find_tracker_store(
         None, endpoints.tracker_store, _broker)
+    _lock_store = LockStore.find_lock_store(endpoints.lock_store)
+    _reminder_store = ReminderStore.find_reminder_store(
+        endpoints.reminder_store)
+    _parse_cache = ParseCache.find_parse_cache(endpoints.parse_cache)
+
+    return {"interpreter": _interpreter,
+            "generator": endpoints.nlg,
+            "tracker_store": _tracker_store,
+            "action_endpoint": endpoints.action,
+            "lock_store": _lock_store,
+            "reminder_store": _reminder_store,
+            "parse_cache": _parse_cache,
+            "admission_controller": admission_controller}
+
+
+# noinspection PyUnusedLocal
+async def load_agent_on_start(core_model, endpoints, nlu_model, app, loop,
+                              admission_controller=None):
+    """Load an agent.
+
+    Used to be scheduled on server start
+    (hence the `app` and `loop` arguments)."""
+    from rasa.core.agent import Agent
+
+    components = create_agent_components(nlu_model, endpoints,
+                                         admission_controller)
 
     if endpoints and endpoints.model:
         from rasa.core import agent
 
-        app.agent = Agent(interpreter=_interpreter,
-                          generator=endpoints.nlg,
-                          tracker_store=_tracker_store,
-                          action_endpoint=endpoints.action)
+        app.agent = Agent(**components)
 
         await agent.load_from_server(app.agent,
                                      model_server=endpoints.model)
     else:
-        app.agent = Agent.load(core_model,
-                               interpreter=_interpreter,
-                               generator=endpoints.nlg,
-                               tracker_store=_tracker_store,
-                               action_endpoint=endpoints.action)
+        app.agent = Agent.load(core_model, **components)
 
+    # fires the reminders which were stored before the server started
+    app.agent.reminder_scheduler.start()
     return app.agent
 
 
@@ -223,4 +289,15 @@ if __name__ == '__main__':
                       cmdline_args.enable_api,
                       cmdline_args.jwt_secret,
                       cmdline_args.jwt_method,
-                      _endpoints)
+                      _endpoints,
+                      cmdline_args.enable_metrics,
+                      cmdline_args.workers,
+                      cmdline_args.max_concurrent_turns,
+                      cmdline_args.max_queued_turns,
+                      cmdline_args.max_queue_time,
+                      cmdline_args.adaptive_concurrency,
+                      cmdline_args.overload_utterance,
+                      cmdline_args.parse_workers,
+                      cmdline_args.parse_in_processes,
+                      cmdline_args.predict_workers,
+                      cmdline_args.max_queued_executions)
@@ -1,3 +1,4 @@
+import asyncio
 import glob
 import logging
 import os
@@ -5,28 +6,32 @@ import tempfile
 import zipfile
 from functools import wraps
 from inspect import isawaitable
-from typing import Any, Callable, List, Optional, Text, Union, Tuple
+from typing import (
+    Any, AsyncIterator, Callable, Dict, List, Optional, Text, Union, Tuple)
 
 from sanic import Sanic, response
 from sanic.exceptions import NotFound
 from sanic.request import Request
+from sanic.response import json_dumps
 from sanic_cors import CORS
 from sanic_jwt import Initialize, exceptions
 
 import rasa
-from rasa.core import constants, utils
+from rasa.core import batch, constants, executors, metrics, utils
 from rasa.core.channels import CollectingOutputChannel, UserMessage
 from rasa.core.domain import Domain
 from rasa.core.events import Event
+from rasa.core.exceptions import OverloadedError
 from rasa.core.policies import PolicyEnsemble
 from rasa.core.test import test
 from rasa.core.trackers import DialogueStateTracker, EventVerbosity
 from rasa.core.utils import dump_obj_as_str_to_file, write_request_body_to_file
 from rasa.model import unpack_model, FINGERPRINT_FILE_PATH
-from rasa_nlu.test import run_evaluation
 
 logger = logging.getLogger(__name__)
 
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
 
 class ErrorResponse(Exception):
     def __init__(self, status, reason, message, details=None, help_url=None):
@@ -169,6 +174,43 @@ def event_verbosity_parameter(request, default_verbosity):
                             {"parameter": "include_events", "in": "query"})
 
 
+def positive_int_parameter(request: Request, name: Text, default: int) -> int:
+    try:
+        value = int(utils.default_arg(request, name, default))
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise ErrorResponse(400, "InvalidParameter",
+                            "Parameter '{}' has to be a positive integer."
+                            "".format(name),
+                            {"parameter": name, "in": "query"})
+    return value
+
+
+def batch_items(request: Request, key: Text) -> List[Dict[Text, Any]]:
+    try:
+        return batch.parse_items(request.body,
+                                 request.headers.get("Content-Type"), key)
+    except ValueError as e:
+        raise ErrorResponse(400, "InvalidParameter",
+                            "Invalid batch. {}".format(e),
+                            {"parameter": key, "in": "body"})
+
+
+def ndjson_stream(results: AsyncIterator[Dict[Text, Any]]
+                  ) -> response.StreamingHTTPResponse:
+    """Streams every result as a line of JSON as soon as it is done."""
+
+    async def stream(resp):
+        try:
+            async for result in results:
+                await resp.write(json_dumps(result) + "\n")
+        finally:
+            await results.aclose()
+
+    return response.stream(stream, content_type=batch.NDJSON_CONTENT_TYPE)
+
+
 async def nlu_model_and_evaluation_files_from_archive(
         zipped_model_path: Text,
         directory: Text
@@ -215,11 +257,56 @@ async def authenticate(request):
         "sure that the token is valid, but not issue new tokens.")
 
 
+def _update_lock_gauges(agent) -> None:
+    lock_store = agent.lock_store if agent else None
+    metrics.set_gauge(metrics.CONVERSATION_LOCKS,
+                      lock_store.num_processing if lock_store else 0)
+    metrics.set_gauge(metrics.CONVERSATION_LOCK_WAITERS,
+                      lock_store.num_waiting if lock_store else 0)
+
+
+def _update_admission_gauges(agent) -> None:
+    controller = agent.admission_controller if agent else None
+    if controller is None:
+        return
+
+    metrics.set_gauge(metrics.ADMISSION_LIMIT, int(controller.limit))
+    metrics.set_gauge(metrics.ADMISSION_QUEUED, controller.num_queued)
+
+
+def add_metrics_route(app: Sanic, auth_token: Optional[Text] = None) -> None:
+    """Collects metrics and exposes them in the Prometheus text format."""
+
+    metrics.enable()
+
+    @app.listener('after_server_start')
+    async def start_event_loop_monitor(app, loop):
+        app.event_loop_monitor = loop.create_task(
+            metrics.monitor_event_loop())
+
+    @app.listener('before_server_stop')
+    async def stop_event_loop_monitor(app, loop):
+        app.event_loop_monitor.cancel()
+
+    @app.get("/metrics")
+    @requires_auth(app, auth_token)
+    async def get_metrics(request: Request):
+        instrumentation = metrics.instrumentation()
+        if not instrumentation:
+            return response.text("", content_type=PROMETHEUS_CONTENT_TYPE)
+
+        _update_lock_gauges(app.agent)
+        _update_admission_gauges(app.agent)
+        return response.text(instrumentation.render(),
+                             content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 def create_app(agent=None,
                cors_origins: Union[Text, List[Text]] = "*",
                auth_token: Optional[Text] = None,
                jwt_secret: Optional[Text] = None,
                jwt_method: Text = "HS256",
+               enable_metrics: bool = False,
                ):
     """Class representing a Rasa Core HTTP server."""
 
@@ -253,6 +340,9 @@ def create_app(agent=None,
                            "some endpoints are not available until the agent "
                            "is ready though.")
 
+    if enable_metrics:
+        add_metrics_route(app, auth_token)
+
     @app.exception(NotFound)
     @app.exception(ErrorResponse)
     async def ignore_404s(request: Request, exception: ErrorResponse):
@@ -465,6 +555,8 @@ def create_app(agent=None,
                                                     sender_id=sender_id)
             return response.json(responses)
 
+        except OverloadedError as e:
+            raise ErrorResponse(503, "Overloaded", str(e))
         except Exception as e:
             logger.exception("Caught an exception during respond.")
             raise ErrorResponse(500, "ActionException",
@@ -554,7 +646,8 @@ def create_app(agent=None,
                                    "domain.yml")
         domain = Domain.load(domain_path)
         ensemble = PolicyEnsemble.load(model_directory)
-        app.agent.update_model(domain, ensemble, None)
+        app.agent.update_model(domain, ensemble, None,
+                               model_directory=model_directory)
         logger.debug("Finished loading new agent.")
         return response.text('', 204)
 
@@ -562,13 +655,19 @@ def create_app(agent=None,
     @requires_auth(app, auth_token)
     async def evaluate_stories(request: Request):
         """Evaluate stories against the currently loaded model."""
+        import multiprocessing
         import rasa_nlu.utils
 
+        # the workers of one request must not starve the server
+        num_workers = min(positive_int_parameter(request, 'num_workers', 1),
+                          multiprocessing.cpu_count())
+
         tmp_file = rasa_nlu.utils.create_temporary_file(request.body,
                                                         mode='w+b')
         use_e2e = utils.bool_arg(request, 'e2e', default=False)
         try:
-            evaluation = await test(tmp_file, app.agent, use_e2e=use_e2e)
+            evaluation = await test(tmp_file, app.agent, use_e2e=use_e2e,
+                                    num_workers=num_workers)
             return response.json(evaluation)
         except ValueError as e:
             raise ErrorResponse(400, "FailedEvaluation",
@@ -579,6 +678,7 @@ def create_app(agent=None,
     @requires_auth(app, auth_token)
     async def evaluate_intents(request: Request):
         """Evaluate intents against a Rasa NLU model."""
+        from rasa_nlu.test import run_evaluation
 
         # create `tmpdir` and cast as str for py3.5 compatibility
         tmpdir = str(tempfile.mkdtemp())
@@ -760,6 +860,179 @@ def create_app(agent=None,
         parse_data = await app.agent.interpreter.parse(request_params.get("q"))
         return response.json(parse_data)
 
+    @app.post("/batch/messages")
+    @requires_auth(app, auth_token)
+    @ensure_loaded_agent(app)
+    async def log_messages(request: Request):
+        """Logs the user messages of many conversations, like
+        `/conversations/<sender_id>/messages`."""
+
+        messages = batch_items(request, "messages")
+        max_concurrent_senders = positive_int_parameter(
+            request, "max_concurrent_senders",
+            batch.DEFAULT_MAX_CONCURRENT_SENDERS)
+        verbosity = event_verbosity_parameter(request,
+                                              EventVerbosity.AFTER_RESTART)
+
+        async def log(sender_id, message):
+            tracker = await app.agent.log_message(UserMessage(
+                message.get("text"), None, sender_id,
+                message.get("parse_data")))
+            return {"tracker": tracker.current_state(verbosity)}
+
+        return ndjson_stream(batch.process_by_sender(
+            messages, log, max_concurrent_senders))
+
+    @app.post("/batch/respond")
+    @requires_auth(app, auth_token)
+    @ensure_loaded_agent(app)
+    async def respond_to_messages(request: Request):
+        """Handles the messages of many conversations and returns the
+        responses of the bot, like `/conversations/<sender_id>/respond`."""
+
+        messages = batch_items(request, "messages")
+        max_concurrent_senders = positive_int_parameter(
+            request, "max_concurrent_senders",
+            batch.DEFAULT_MAX_CONCURRENT_SENDERS)
+
+        async def respond(sender_id, message):
+            responses = await app.agent.handle_text(
+                message.get("text"),
+                output_channel=CollectingOutputChannel(),
+                sender_id=sender_id)
+            return {"responses": responses}
+
+        return ndjson_stream(batch.process_by_sender(
+            messages, respond, max_concurrent_senders))
+
+    @app.post("/batch/conversations/predict")
+    @requires_auth(app, auth_token)
+    @ensure_loaded_agent(app)
+    async def predict_conversations(request: Request):
+        """Predicts the next action of many conversations, like
+        `/conversations/<sender_id>/predict`."""
+
+        conversations = batch_items(request, "conversations")
+        batch_size = positive_int_parameter(request, "batch_size",
+                                            batch.DEFAULT_BATCH_SIZE)
+
+        async def predict():
+            indices = list(range(len(conversations)))
+            for chunk in batch.chunks(indices, batch_size):
+                sender_ids = [batch.sender_id_of(conversations[i])
+                              for i in chunk]
+                try:
+                    # the predictions are saved in the trackers, which
+                    # must not change in the meantime
+                    async with app.agent.lock_store.lock_all(sender_ids):
+                        predictions = await executors.run(
+                            executors.PREDICT, app.agent.predict_next_batch,
+                            sender_ids)
+                except Exception as e:
+                    if not isinstance(e, OverloadedError):
+                        logger.exception("Caught an exception during "
+                                         "prediction.")
+                    for i, sender_id in zip(chunk, sender_ids):
+                        yield batch.error_result(i, sender_id, e)
+                    continue
+
+                for i, sender_id, prediction in zip(chunk, sender_ids,
+                                                    predictions):
+                    if prediction is None:
+                        yield {"index": i,
+                               "sender_id": sender_id,
+                               "error": "NoTracker",
+                               "message": "Failed to retrieve or create "
+                                          "the tracker."}
+                        continue
+                    prediction["scores"] = sorted(
+                        prediction["scores"],
+                        key=lambda k: (-k["score"], k["action"]))
+                    yield dict(prediction, index=i, sender_id=sender_id)
+                # lets other requests run between the batches
+                await asyncio.sleep(0)
+
+        return ndjson_stream(predict())
+
+    @app.post("/batch/predict")
+    @requires_auth(app, auth_token)
+    @ensure_loaded_agent(app)
+    async def predict_trackers(request: Request):
+        """Predicts the next action of many trackers, like `/predict`.
+
+        Every tracker is an object with a `sender_id` and its `events`."""
+
+        trackers = batch_items(request, "trackers")
+        batch_size = positive_int_parameter(request, "batch_size",
+                                            batch.DEFAULT_BATCH_SIZE)
+        verbosity = event_verbosity_parameter(request,
+                                              EventVerbosity.AFTER_RESTART)
+        domain = app.agent.domain
+        policy_ensemble = app.agent.policy_ensemble
+
+        def prediction_result(index, tracker, prediction):
+            probabilities, policy = prediction
+            scores = [{"action": a, "score": p}
+                      for a, p in zip(domain.action_names, probabilities)]
+            return {"index": index,
+                    "sender_id": tracker.sender_id,
+                    "scores": scores,
+                    "policy": policy,
+                    "tracker": tracker.current_state(verbosity)}
+
+        async def predict():
+            for chunk in batch.chunks(list(enumerate(trackers)), batch_size):
+                valid = []
+                for i, data in chunk:
+                    sender_id = batch.sender_id_of(data)
+                    try:
+                        tracker = DialogueStateTracker.from_dict(
+                            sender_id, data.get("events", []), domain.slots)
+                        valid.append((i, tracker))
+                    except Exception as e:
+                        yield batch.error_result(i, sender_id, e)
+
+                if not valid:
+                    continue
+                try:
+                    predictions = await executors.run(
+                        executors.PREDICT, policy_ensemble.predict_batch,
+                        [tracker for _, tracker in valid], domain)
+                except OverloadedError as e:
+                    for i, tracker in valid:
+                        yield batch.error_result(i, tracker.sender_id, e)
+                    continue
+                except Exception:
+                    logger.exception("Failed to predict a batch of "
+                                     "trackers, predicting them one by "
+                                     "one.")
+                    predictions = None
+
+                if predictions is None:
+                    # only the trackers which fail get an error
+                    for i, tracker in valid:
+                        try:
+                            prediction = (await executors.run(
+                                executors.PREDICT,
+                                policy_ensemble.predict_batch,
+                                [tracker], domain))[0]
+                        except Exception as e:
+                            if not isinstance(e, OverloadedError):
+                                logger.exception("Failed to predict the "
+                                                 "tracker {} of the batch."
+                                                 "".format(i))
+                            yield batch.error_result(i, tracker.sender_id, e)
+                            continue
+                        yield prediction_result(i, tracker, prediction)
+                    continue
+
+                for (i, tracker), prediction in zip(valid, predictions):
+                    yield prediction_result(i, tracker, prediction)
+                # lets other requests run between the batches
+                await asyncio.sleep(0)
+
+        return ndjson_stream(predict())
+
     return app
 
 
@@ -5,8 +5,8 @@ import logging
 import os
 import typing
 import warnings
-from collections import defaultdict, namedtuple
-from typing import Any, Dict, List, Optional, Text, Tuple
+from collections import defaultdict, deque, namedtuple
+from typing import Any, Callable, Dict, List, Optional, Text, Tuple
 
 from rasa.core.events import (
     ActionExecuted, UserUttered,
@@ -18,6 +18,15 @@ if typing.TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# number of shards of test stories which are handed to every worker process
+SHARDS_PER_WORKER = 4
+
+# number of test stories whose actions are predicted in one batch
+PREDICTION_BATCH_SIZE = 64
+
+# stores the results of already evaluated models of a comparison
+COMPARISON_PROGRESS_FILE = "comparison_progress.json"
+
 StoryEvalution = namedtuple("StoryEvaluation",
                             "evaluation_store "
                             "failed_stories "
@@ -302,14 +311,17 @@ def _emulate_form_rejection(processor, partial_tracker):
 
 
 def _collect_action_executed_predictions(processor, partial_tracker, event,
-                                         fail_on_prediction_errors):
+                                         fail_on_prediction_errors,
+                                         prediction=None):
     from rasa.core.policies import FormPolicy
 
     action_executed_eval_store = EvaluationStore()
 
     gold = event.action_name
 
-    action, policy, confidence = processor.predict_next_action(partial_tracker)
+    if prediction is None:
+        prediction = processor.predict_next_action(partial_tracker)
+    action, policy, confidence = prediction
     predicted = action.name()
 
     if predicted != gold and FormPolicy.__name__ in policy:
@@ -345,46 +357,68 @@ def _collect_action_executed_predictions(processor, partial_tracker, event,
     return action_executed_eval_store, policy, confidence
 
 
-def _predict_tracker_actions(tracker, agent: 'Agent',
-                             fail_on_prediction_errors=False,
-                             use_e2e=False):
+def _predict_trackers_actions(trackers, agent: 'Agent',
+                              fail_on_prediction_errors=False,
+                              use_e2e=False):
+    """Replays the trackers in lockstep and predicts their actions.
+
+    Every tracker is replayed up to its next `ActionExecuted` event, the
+    next actions of all trackers are then predicted as one batch."""
     from rasa.core.trackers import DialogueStateTracker
 
     processor = agent.create_processor()
-    tracker_eval_store = EvaluationStore()
 
-    events = list(tracker.events)
+    tracker_eval_stores = [EvaluationStore() for _ in trackers]
+    partial_trackers = []
+    remaining_events = []
+    tracker_actions = [[] for _ in trackers]
+
+    for tracker in trackers:
+        events = list(tracker.events)
+        partial_trackers.append(DialogueStateTracker.from_events(
+            tracker.sender_id, events[:1], agent.domain.slots))
+        remaining_events.append(deque(events[1:]))
+
+    while True:
+        waiting = []
+        for i, events in enumerate(remaining_events):
+            while events and not isinstance(events[0], ActionExecuted):
+                event = events.popleft()
+                if use_e2e and isinstance(event, UserUttered):
+                    user_uttered_result = \
+                        _collect_user_uttered_predictions(
+                            event, partial_trackers[i],
+                            fail_on_prediction_errors)
+
+                    tracker_eval_stores[i].merge_store(user_uttered_result)
+                else:
+                    partial_trackers[i].update(event)
+
+            if events:
+                waiting.append(i)
 
-    partial_tracker = DialogueStateTracker.from_events(tracker.sender_id,
-                                                       events[:1],
-                                                       agent.domain.slots)
+        if not waiting:
+            break
 
-    tracker_actions = []
+        predictions = processor.predict_next_actions(
+            [partial_trackers[i] for i in waiting])
 
-    for event in events[1:]:
-        if isinstance(event, ActionExecuted):
+        for i, prediction in zip(waiting, predictions):
             action_executed_result, policy, confidence = \
                 _collect_action_executed_predictions(
-                    processor, partial_tracker, event,
-                    fail_on_prediction_errors
+                    processor, partial_trackers[i],
+                    remaining_events[i].popleft(),
+                    fail_on_prediction_errors, prediction
                 )
-            tracker_eval_store.merge_store(action_executed_result)
-            tracker_actions.append(
+            tracker_eval_stores[i].merge_store(action_executed_result)
+            tracker_actions[i].append(
                 {"action": action_executed_result.action_targets[0],
                  "predicted": action_executed_result.action_predictions[0],
                  "policy": policy,
                  "confidence": confidence}
             )
-        elif use_e2e and isinstance(event, UserUttered):
-            user_uttered_result = \
-                _collect_user_uttered_predictions(
-                    event, partial_tracker, fail_on_prediction_errors)
 
-            tracker_eval_store.merge_store(user_uttered_result)
-        else:
-            partial_tracker.update(event)
-
-    return tracker_eval_store, partial_tracker, tracker_actions
+    return list(zip(tracker_eval_stores, partial_trackers, tracker_actions))
 
 
 def _in_training_data_fraction(action_list):
@@ -401,13 +435,88 @@ def _in_training_data_fraction(action_list):
     return len(in_training_data) / len(action_list)
 
 
+# agent of an evaluation worker process, see `_predict_in_workers`
+_worker_agent = None
+
+
+def _init_evaluation_worker(model_directory: Text) -> None:
+    from rasa.core.agent import Agent
+
+    global _worker_agent
+    _worker_agent = Agent.load(model_directory)
+
+
+def _predict_shard(trackers: List['DialogueStateTracker'],
+                   fail_on_prediction_errors: bool,
+                   use_e2e: bool) -> List[Tuple[Any, Any, Any]]:
+    return _predict_in_batches(trackers, _worker_agent,
+                               fail_on_prediction_errors, use_e2e)
+
+
+def _predict_in_batches(trackers: List['DialogueStateTracker'],
+                        agent: 'Agent',
+                        fail_on_prediction_errors: bool,
+                        use_e2e: bool,
+                        progress: Optional[Any] = None
+                        ) -> List[Tuple[Any, Any, Any]]:
+    results = []
+    for i in range(0, len(trackers), PREDICTION_BATCH_SIZE):
+        batch = trackers[i:i + PREDICTION_BATCH_SIZE]
+        results.extend(_predict_trackers_actions(
+            batch, agent, fail_on_prediction_errors, use_e2e))
+        if progress is not None:
+            progress.update(len(batch))
+    return results
+
+
+def _predict_in_workers(completed_trackers: List['DialogueStateTracker'],
+                        model_directory: Text,
+                        fail_on_prediction_errors: bool,
+                        use_e2e: bool,
+                        num_workers: int) -> List[Tuple[Any, Any, Any]]:
+    """Predicts the actions of the trackers in multiple processes.
+
+    The trackers are split into shards which are evaluated by worker
+    processes, every worker loads the model once. The results are
+    returned in the order of the trackers."""
+    import multiprocessing
+    from functools import partial
+    from tqdm import tqdm
+
+    num_shards = num_workers * SHARDS_PER_WORKER
+    shard_size = max(1, -(-len(completed_trackers) // num_shards))
+    shards = [completed_trackers[i:i + shard_size]
+              for i in range(0, len(completed_trackers), shard_size)]
+
+    predict = partial(_predict_shard,
+                      fail_on_prediction_errors=fail_on_prediction_errors,
+                      use_e2e=use_e2e)
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(min(num_workers, max(1, len(shards))),
+                  initializer=_init_evaluation_worker,
+                  initargs=(model_directory,)) as pool:
+        with tqdm(total=len(completed_trackers)) as progress:
+            # `imap` keeps the order of the shards
+            for shard_results in pool.imap(predict, shards):
+                results.extend(shard_results)
+                progress.update(len(shard_results))
+    return results
+
+
 def collect_story_predictions(
     completed_trackers: List['DialogueStateTracker'],
     agent: 'Agent',
     fail_on_prediction_errors: bool = False,
-    use_e2e: bool = False
+    use_e2e: bool = False,
+    num_workers: int = 1
 ) -> Tuple[StoryEvalution, int]:
-    """Test the stories from a file, running them through the stored model."""
+    """Test the stories from a file, running them through the stored model.
+
+    If `num_workers` is larger than one, the stories are evaluated in that
+    many worker processes which load the model from
+    `agent.model_directory`."""
     from rasa_nlu.test import get_evaluation_metrics
     from tqdm import tqdm
 
@@ -421,11 +530,21 @@ def collect_story_predictions(
 
     action_list = []
 
-    for tracker in tqdm(completed_trackers):
-        tracker_results, predicted_tracker, tracker_actions = \
-            _predict_tracker_actions(tracker, agent,
-                                     fail_on_prediction_errors, use_e2e)
-
+    if num_workers > 1 and agent.model_directory:
+        results = _predict_in_workers(completed_trackers,
+                                      agent.model_directory,
+                                      fail_on_prediction_errors, use_e2e,
+                                      num_workers)
+    else:
+        if num_workers > 1:
+            logger.warning("The agent wasn't loaded from a model directory, "
+                           "so the stories are evaluated in this process.")
+        with tqdm(total=len(completed_trackers)) as progress:
+            results = _predict_in_batches(completed_trackers, agent,
+                                          fail_on_prediction_errors,
+                                          use_e2e, progress)
+
+    for tracker_results, predicted_tracker, tracker_actions in results:
         story_eval_store.merge_store(tracker_results)
 
         action_list.extend(tracker_actions)
@@ -479,7 +598,8 @@ async def test(stories: Text,
                max_stories: Optional[int] = None,
                out_directory: Optional[Text] = None,
                fail_on_prediction_errors: bool = False,
-               use_e2e: bool = False):
+               use_e2e: bool = False,
+               num_workers: int = 1):
     """Run the evaluation of the stories, optionally plot the results."""
     from rasa_nlu.test import get_evaluation_metrics
 
@@ -488,7 +608,7 @@ async def test(stories: Text,
 
     story_evaluation, _ = collect_story_predictions(completed_trackers, agent,
                                                     fail_on_prediction_errors,
-                                                    use_e2e)
+                                                    use_e2e, num_workers)
 
     evaluation_store = story_evaluation.evaluation_store
 
@@ -569,33 +689,60 @@ def plot_story_evaluation(test_y, predictions,
 
 async def compare(models: Text,
                   stories_file: Text,
-                  output: Text) -> None:
-    """Evaluates multiple trained models on a test set."""
-    from rasa.core.agent import Agent
+                  output: Text,
+                  num_workers: int = 1) -> None:
+    """Evaluates multiple trained models on a test set.
+
+    If there are several models, they are evaluated in `num_workers`
+    processes. The result of every model is stored in `output` once it
+    is evaluated, models with a stored result aren't evaluated again."""
     import rasa_nlu.utils as nlu_utils
     from rasa.core import utils
 
-    num_correct = defaultdict(list)
+    progress_file = os.path.join(output, COMPARISON_PROGRESS_FILE)
+    utils.create_dir_for_file(progress_file)
+    if os.path.isfile(progress_file):
+        evaluated = utils.read_json_file(progress_file)
+        logger.info("Found results of {} evaluated models in '{}'."
+                    "".format(len(evaluated), progress_file))
+    else:
+        evaluated = {}
+
+    def is_evaluated(model):
+        # a result is only reused if the model wasn't retrained since
+        result = evaluated.get(os.path.relpath(model, models))
+        return (result is not None and
+                result["trained_at"] == _model_trained_at(model))
+
+    def store_result(model, num_correct_stories):
+        evaluated[os.path.relpath(model, models)] = {
+            "trained_at": _model_trained_at(model),
+            "num_correct": num_correct_stories}
+        utils.dump_obj_as_json_to_file(progress_file, evaluated)
+
+    runs = nlu_utils.list_subdirectories(models)
+    pending = [model
+               for run in runs
+               for model in sorted(nlu_utils.list_subdirectories(run))
+               if not is_evaluated(model)]
+
+    if num_workers > 1 and len(pending) > 1:
+        _compare_in_workers(pending, stories_file, num_workers,
+                            store_result)
+    else:
+        for model in pending:
+            store_result(model, await _num_correct_stories(
+                model, stories_file, num_workers))
 
-    for run in nlu_utils.list_subdirectories(models):
+    num_correct = defaultdict(list)
+    for run in runs:
         num_correct_run = defaultdict(list)
 
         for model in sorted(nlu_utils.list_subdirectories(run)):
-            logger.info("Evaluating model {}".format(model))
-
-            agent = Agent.load(model)
-
-            completed_trackers = await _generate_trackers(stories_file, agent)
-
-            story_eval_store, no_of_stories = \
-                collect_story_predictions(completed_trackers,
-                                          agent)
-
-            failed_stories = story_eval_store.failed_stories
             policy_name = ''.join(
                 [i for i in os.path.basename(model) if not i.isdigit()])
-            num_correct_run[policy_name].append(no_of_stories -
-                                                len(failed_stories))
+            num_correct_run[policy_name].append(
+                evaluated[os.path.relpath(model, models)]["num_correct"])
 
         for k, v in num_correct_run.items():
             num_correct[k].append(v)
@@ -604,6 +751,63 @@ async def compare(models: Text,
                                    num_correct)
 
 
+def _model_trained_at(model: Text) -> Optional[Text]:
+    from rasa.core import utils
+
+    metadata_file = os.path.join(model, "metadata.json")
+    if not os.path.isfile(metadata_file):
+        return None
+    return utils.read_json_file(metadata_file).get("trained_at")
+
+
+async def _num_correct_stories(model: Text,
+                               stories_file: Text,
+                               num_workers: int = 1) -> int:
+    from rasa.core.agent import Agent
+
+    logger.info("Evaluating model {}".format(model))
+
+    agent = Agent.load(model)
+
+    completed_trackers = await _generate_trackers(stories_file, agent)
+
+    story_eval_store, no_of_stories = \
+        collect_story_predictions(completed_trackers,
+                                  agent, num_workers=num_workers)
+
+    return no_of_stories - len(story_eval_store.failed_stories)
+
+
+def _evaluate_comparison_model(model: Text,
+                               stories_file: Text) -> Tuple[Text, int]:
+    loop = asyncio.get_event_loop()
+    return model, loop.run_until_complete(_num_correct_stories(model,
+                                                               stories_file))
+
+
+def _compare_in_workers(models: List[Text],
+                        stories_file: Text,
+                        num_workers: int,
+                        store_result: Callable[[Text, int], None]) -> None:
+    """Evaluates the models in multiple processes.
+
+    Every worker only uses its share of the CPUs for numerical
+    computations."""
+    import multiprocessing
+    from functools import partial
+    from rasa.core import utils
+
+    num_workers = min(num_workers, len(models))
+    evaluate = partial(_evaluate_comparison_model, stories_file=stories_file)
+    ctx = multiprocessing.get_context("spawn")
+
+    with utils.limited_threads(utils.cpu_budget(num_workers)):
+        with ctx.Pool(num_workers) as pool:
+            for model, num_correct_stories in pool.imap_unordered(evaluate,
+                                                                  models):
+                store_result(model, num_correct_stories)
+
+
 def plot_curve(output: Text, no_stories: List[int]) -> None:
     """Plot the results from run_comparison_evaluation.
 
@@ -680,12 +884,15 @@ def main():
             test(stories, _agent, cmdline_arguments.max_stories,
                  cmdline_arguments.output,
                  cmdline_arguments.fail_on_prediction_errors,
-                 cmdline_arguments.e2e))
+                 cmdline_arguments.e2e,
+                 cmdline_arguments.num_workers))
 
     elif cmdline_arguments.mode == 'compare':
-        compare(cmdline_arguments.core,
-                cmdline_arguments.stories,
-                cmdline_arguments.output)
+        loop.run_until_complete(
+            compare(cmdline_arguments.core,
+                    cmdline_arguments.stories,
+                    cmdline_arguments.output,
+                    cmdline_arguments.num_workers))
 
         story_n_path = os.path.join(cmdline_arguments.core, 'num_stories.json')
 
@@ -1,3 +1,4 @@
+import asyncio
 import itertools
 import json
 import logging
@@ -5,6 +6,7 @@ import pickle
 # noinspection PyPep8Naming
 from typing import Iterator, KeysView, List, Optional, Text
 
+from rasa.core import metrics
 from rasa.core.actions.action import ACTION_LISTEN_NAME
 from rasa.core.broker import EventChannel
 from rasa.core.domain import Domain
@@ -16,6 +18,10 @@ logger = logging.getLogger(__name__)
 
 
 class TrackerStore(object):
+    # stores which wait for the network and whose clients are thread safe
+    # retrieve trackers in a thread, while e.g. the message is parsed
+    retrieves_in_thread = False
+
     def __init__(self,
                  domain: Optional[Domain],
                  event_broker: Optional[EventChannel] = None) -> None:
@@ -68,6 +74,23 @@ class TrackerStore(object):
             tracker = self.create_tracker(sender_id)
         return tracker
 
+    async def get_or_create_tracker_async(self, sender_id,
+                                          max_event_history=None):
+        """Like `get_or_create_tracker`, but lets other coroutines run
+        while the tracker is retrieved if the store `retrieves_in_thread`."""
+
+        if not self.retrieves_in_thread:
+            return self.get_or_create_tracker(sender_id, max_event_history)
+
+        tracker = await asyncio.get_event_loop().run_in_executor(
+            None, self.retrieve, sender_id)
+        self.max_event_history = max_event_history
+        if tracker is None:
+            # new trackers are saved on the loop, as event brokers aren't
+            # thread safe
+            tracker = self.create_tracker(sender_id)
+        return tracker
+
     def init_tracker(self, sender_id):
         if self.domain:
             return DialogueStateTracker(
@@ -104,7 +127,9 @@ class TrackerStore(object):
                 "sender_id": tracker.sender_id,
             }
             body.update(evt.as_dict())
-            self.event_broker.publish(body)
+            with metrics.measure(metrics.BROKER_SECONDS,
+                                 broker=type(self.event_broker).__name__):
+                self.event_broker.publish(body)
 
     def keys(self):
         # type: () -> Optional[List[Text]]
@@ -130,12 +155,16 @@ class InMemoryTrackerStore(TrackerStore):
         self.store = {}
         super(InMemoryTrackerStore, self).__init__(domain, event_broker)
 
+    @metrics.timed(metrics.TRACKER_STORE_SECONDS,
+                   store="in_memory", operation="save")
     def save(self, tracker: DialogueStateTracker) -> None:
         if self.event_broker:
             self.stream_events(tracker)
         serialised = InMemoryTrackerStore.serialise_tracker(tracker)
         self.store[tracker.sender_id] = serialised
 
+    @metrics.timed(metrics.TRACKER_STORE_SECONDS,
+                   store="in_memory", operation="retrieve")
     def retrieve(self, sender_id: Text) -> Optional[DialogueStateTracker]:
         if sender_id in self.store:
             logger.debug('Recreating tracker for '
@@ -151,6 +180,8 @@ class InMemoryTrackerStore(TrackerStore):
 
 
 class RedisTrackerStore(TrackerStore):
+    retrieves_in_thread = True
+
     def keys(self):
         pass
 
@@ -164,6 +195,8 @@ class RedisTrackerStore(TrackerStore):
         self.record_exp = record_exp
         super(RedisTrackerStore, self).__init__(domain, event_broker)
 
+    @metrics.timed(metrics.TRACKER_STORE_SECONDS,
+                   store="redis", operation="save")
     def save(self, tracker, timeout=None):
         if self.event_broker:
             self.stream_events(tracker)
@@ -174,6 +207,8 @@ class RedisTrackerStore(TrackerStore):
         serialised_tracker = self.serialise_tracker(tracker)
         self.red.set(tracker.sender_id, serialised_tracker, ex=timeout)
 
+    @metrics.timed(metrics.TRACKER_STORE_SECONDS,
+                   store="redis", operation="retrieve")
     def retrieve(self, sender_id):
         stored = self.red.get(sender_id)
         if stored is not None:
@@ -183,6 +218,8 @@ class RedisTrackerStore(TrackerStore):
 
 
 class MongoTrackerStore(TrackerStore):
+    retrieves_in_thread = True
+
     def __init__(self,
                  domain,
                  host="mongodb://localhost:27017",
@@ -215,6 +252,8 @@ class MongoTrackerStore(TrackerStore):
     def _ensure_indices(self):
         self.conversations.create_index("sender_id")
 
+    @metrics.timed(metrics.TRACKER_STORE_SECONDS,
+                   store="mongo", operation="save")
     def save(self, tracker, timeout=None):
         if self.event_broker:
             self.stream_events(tracker)
@@ -226,6 +265,8 @@ class MongoTrackerStore(TrackerStore):
             {"$set": state},
             upsert=True)
 
+    @metrics.timed(metrics.TRACKER_STORE_SECONDS,
+                   store="mongo", operation="retrieve")
     def retrieve(self, sender_id):
         stored = self.conversations.find_one({"sender_id": sender_id})
 
@@ -307,6 +348,8 @@ class SQLTrackerStore(TrackerStore):
         # noinspection PyUnresolvedReferences
         return self.SQLEvent.__table__.columns.keys()
 
+    @metrics.timed(metrics.TRACKER_STORE_SECONDS,
+                   store="sql", operation="retrieve")
     def retrieve(self, sender_id: Text) -> DialogueStateTracker:
         """Create a tracker from all previously stored events."""
 
@@ -325,6 +368,8 @@ class SQLTrackerStore(TrackerStore):
                          "sender id '{}' from SQL storage.  "
                          "Returning `None` instead.".format(sender_id))
 
+    @metrics.timed(metrics.TRACKER_STORE_SECONDS,
+                   store="sql", operation="save")
     def save(self, tracker: DialogueStateTracker) -> None:
         """Update database with events from the current conversation."""
 
@@ -2,15 +2,25 @@ import argparse
 import asyncio
 import logging
 import os
+import sys
+import tempfile
 import typing
-from typing import Dict, Optional, Text
+from typing import Any, Dict, List, Optional, Text, Tuple
 
 if typing.TYPE_CHECKING:
+    from rasa.core.agent import Agent
     from rasa.core.interpreter import NaturalLanguageInterpreter
     from rasa.core.run import AvailableEndpoints
+    from rasa.core.policies import Policy
+    from rasa.core.training.cache import TrainingDataCache
 
 logger = logging.getLogger(__name__)
 
+# directory in the output of a policy comparison which contains the
+# training data shared by its models, it is hidden so that it isn't
+# mistaken for a run when the models are evaluated
+COMPARISON_DATA_DIR = ".training_data"
+
 
 def create_argument_parser():
     """Parse all the command line arguments for the training script."""
@@ -57,7 +67,8 @@ async def train(domain_file: Text, stories_file: Text, output_path: Text,
                 dump_stories: bool = False,
                 policy_config: Text = None,
                 exclusion_percentage: int = None,
-                kwargs: Optional[Dict] = None):
+                kwargs: Optional[Dict] = None,
+                previous_model_path: Optional[Text] = None):
     from rasa.core.agent import Agent
     from rasa.core import config, utils
     from rasa.core.run import AvailableEndpoints
@@ -81,22 +92,54 @@ async def train(domain_file: Text, stories_file: Text, output_path: Text,
                                                  "unique_last_num_states",
                                                  "augmentation_factor",
                                                  "remove_duplicates",
-                                                 "debug_plots"})
+                                                 "debug_plots",
+                                                 "cache_dir"})
 
     training_data = await agent.load_data(
         stories_file,
         exclusion_percentage=exclusion_percentage,
+        num_workers=kwargs.get("num_workers", 1),
         **data_load_args)
+
+    if stories_file and not exclusion_percentage:
+        # policies are only fingerprinted if their training data is
+        # deterministic, so they can be reused by later trainings
+        kwargs["policy_fingerprints"] = _policy_fingerprints(
+            policy_config, stories_file, agent, data_load_args)
+        kwargs["previous_model_path"] = previous_model_path
+
     agent.train(training_data, **kwargs)
     agent.persist(output_path, dump_stories)
 
     return agent
 
 
+def _policy_fingerprints(policy_config: Text,
+                         stories_file: Text,
+                         agent: 'Agent',
+                         data_load_args: Dict[Text, Any]) -> List[Text]:
+    from rasa.core import config
+    from rasa.core.training.cache import TrainingDataCache
+
+    # these arguments don't influence the generated training data
+    generator_args = {k: v for k, v in data_load_args.items()
+                      if k not in {"debug_plots", "cache_dir"}}
+    # if it isn't set, it depends on the max history of all policies
+    generator_args["unique_last_num_states"] = agent._unique_last_num_states(
+        data_load_args.get("unique_last_num_states"))
+    data_fingerprint = TrainingDataCache.key_for(
+        TrainingDataCache.data_fingerprint(stories_file, agent.domain),
+        generator_args)
+
+    return config.fingerprint_policies(policy_config, data_fingerprint)
+
+
 def _additional_arguments(args):
     additional = {
         "augmentation_factor": args.augmentation,
-        "debug_plots": args.debug_plots
+        "debug_plots": args.debug_plots,
+        "cache_dir": args.cache_dir,
+        "num_workers": args.num_workers
     }
     # remove None values
     return {k: v for k, v in additional.items() if v is not None}
@@ -109,19 +152,38 @@ async def train_comparison_models(stories,
                                   policy_configs=None,
                                   runs=1,
                                   dump_stories=False,
-                                  kwargs=None):
-    """Train multiple models for comparison of policies"""
-    from rasa.core import config
+                                  kwargs=None,
+                                  seed=None):
+    """Train multiple models for comparison of policies.
+
+    The stories are excluded once per run and exclusion percentage, the
+    remaining stories and the trackers generated from them are shared by
+    all policies. If `seed` is set, the same stories are excluded in
+    every comparison. The models are trained in `num_workers` (passed in
+    `kwargs`) processes. Models which exist already in `output_path` are
+    not trained again, so an interrupted comparison can be resumed."""
+    from rasa.core import config, utils
 
     exclusion_percentages = exclusion_percentages or []
     policy_configs = policy_configs or []
+    kwargs = dict(kwargs or {})
+    num_workers = kwargs.pop("num_workers", 1)
 
-    for r in range(runs):
-        logging.info("Starting run {}/{}".format(r + 1, runs))
+    data_load_args, kwargs = utils.extract_args(kwargs,
+                                                {"use_story_concatenation",
+                                                 "unique_last_num_states",
+                                                 "augmentation_factor",
+                                                 "remove_duplicates",
+                                                 "debug_plots",
+                                                 "cache_dir"})
+    # the comparison keeps its training data in its output directory
+    data_load_args.pop("cache_dir", None)
 
-        for i in exclusion_percentages:
-            current_round = exclusion_percentages.index(i) + 1
+    jobs = []
+    for r in range(runs):
+        logging.info("Preparing run {}/{}".format(r + 1, runs))
 
+        for current_round, percentage in enumerate(exclusion_percentages, 1):
             for policy_config in policy_configs:
                 policies = config.load(policy_config)
 
@@ -134,17 +196,142 @@ async def train_comparison_models(stories,
                                       policy_name +
                                       str(current_round))
 
-                logging.info("Starting to train {} round {}/{}"
-                             " with {}% exclusion"
-                             "".format(policy_name, current_round,
-                                       len(exclusion_percentages), i))
+                if os.path.isdir(output):
+                    logger.info("Model '{}' exists already and won't be "
+                                "trained again.".format(output))
+                    continue
+
+                data_key = await _comparison_training_data(
+                    stories, domain, policies, output_path, r, percentage,
+                    seed, data_load_args)
+                jobs.append((domain, policy_config, output_path, data_key,
+                             output, dump_stories, kwargs))
+
+    if not jobs:
+        logger.info("All models of the comparison are trained already.")
+        return
+
+    logger.info("Training {} models.".format(len(jobs)))
+    if num_workers > 1 and len(jobs) > 1:
+        _train_comparison_models_in_workers(jobs, num_workers)
+    else:
+        for job in jobs:
+            _train_comparison_model(job)
+
+
+async def _comparison_training_data(stories: Text,
+                                    domain: Text,
+                                    policies: List['Policy'],
+                                    output_path: Text,
+                                    run: int,
+                                    exclusion_percentage: int,
+                                    seed: Optional[int],
+                                    data_load_args: Dict[Text, Any]
+                                    ) -> Text:
+    """Creates the training trackers of a comparison model.
+
+    The story graph of a run and exclusion percentage and the trackers
+    generated from it are stored in the output directory of the
+    comparison, models which need the same data share it. Returns the key
+    of the trackers."""
+    import random
+    from rasa.core.agent import Agent
+    from rasa.core.training import extract_story_graph
+    from rasa.core.training.cache import (
+        TrainingDataCache, STORY_GRAPH_ENTRY, TRACKERS_ENTRY)
+    from rasa.core.training.generator import TrainingDataGenerator
+
+    agent = Agent(domain, policies=policies)
+    cache = _comparison_data_cache(output_path)
+
+    graph_key = cache.key_for(
+        cache.data_fingerprint(stories, agent.domain),
+        {"run": run, "exclusion_percentage": exclusion_percentage,
+         "seed": seed})
+
+    generator_args = {
+        "remove_duplicates": data_load_args.get("remove_duplicates", True),
+        "unique_last_num_states": agent._unique_last_num_states(
+            data_load_args.get("unique_last_num_states")),
+        "augmentation_factor": data_load_args.get("augmentation_factor", 20),
+        "use_story_concatenation": data_load_args.get(
+            "use_story_concatenation", True),
+        "debug_plots": data_load_args.get("debug_plots", False)
+    }
+    trackers_key = cache.key_for(graph_key, generator_args)
+
+    if cache.load(TRACKERS_ENTRY, trackers_key, agent.domain) is not None:
+        return trackers_key
+
+    graph = cache.load(STORY_GRAPH_ENTRY, graph_key, agent.domain)
+    if graph is None:
+        rand = None
+        if seed is not None:
+            # excludes the same stories whenever the comparison is run
+            rand = random.Random("{}-{}-{}".format(seed, run,
+                                                   exclusion_percentage))
+        graph = await extract_story_graph(
+            stories, agent.domain,
+            exclusion_percentage=exclusion_percentage,
+            rand=rand)
+        cache.store(STORY_GRAPH_ENTRY, graph_key, graph, agent.domain)
+
+    trackers = TrainingDataGenerator(graph, agent.domain,
+                                     **generator_args).generate()
+    cache.store(TRACKERS_ENTRY, trackers_key, trackers, agent.domain)
+    return trackers_key
+
+
+def _comparison_data_cache(output_path: Text) -> 'TrainingDataCache':
+    from rasa.core.training.cache import TrainingDataCache
+
+    # nothing is evicted, models of a resumed comparison need the
+    # same data as the models which were trained before
+    return TrainingDataCache(os.path.join(output_path, COMPARISON_DATA_DIR),
+                             max_size=sys.maxsize)
+
+
+def _train_comparison_model(job: Tuple) -> Text:
+    """Trains and persists a single model of a comparison."""
+    from rasa.core.agent import Agent
+    from rasa.core import config, utils
+    from rasa.core.training.cache import TRACKERS_ENTRY
+
+    (domain, policy_config, output_path, data_key, output,
+     dump_stories, kwargs) = job
+
+    agent = Agent(domain, policies=config.load(policy_config))
+    training_trackers = _comparison_data_cache(output_path).load(
+        TRACKERS_ENTRY, data_key, agent.domain)
+    agent.train(training_trackers, **kwargs)
+
+    # the model is persisted to a hidden directory first, so that an
+    # interrupted training doesn't leave an incomplete model behind
+    utils.create_dir_for_file(output)
+    tmp_path = tempfile.mkdtemp(dir=os.path.dirname(output), prefix=".")
+    agent.persist(tmp_path, dump_stories)
+    os.replace(tmp_path, output)
+
+    logger.info("Trained comparison model '{}'.".format(output))
+    return output
+
+
+def _train_comparison_models_in_workers(jobs: List[Tuple],
+                                        num_workers: int) -> None:
+    """Trains the models of a comparison in multiple processes.
+
+    Every worker only uses its share of the CPUs for numerical
+    computations."""
+    import multiprocessing
+    from rasa.core import utils
+
+    num_workers = min(num_workers, len(jobs))
+    ctx = multiprocessing.get_context("spawn")
 
-                await train(
-                    domain, stories, output,
-                    policy_config=policy_config,
-                    exclusion_percentage=i,
-                    kwargs=kwargs,
-                    dump_stories=dump_stories)
+    with utils.limited_threads(utils.cpu_budget(num_workers)):
+        with ctx.Pool(num_workers) as pool:
+            for _ in pool.imap_unordered(_train_comparison_model, jobs):
+                pass
 
 
 async def get_no_of_stories(story_file, domain):
@@ -178,7 +365,8 @@ async def do_compare_training(cmdline_args, stories, additional_arguments):
                                   cmdline_args.config,
                                   cmdline_args.runs,
                                   cmdline_args.dump_stories,
-                                  additional_arguments)
+                                  additional_arguments,
+                                  cmdline_args.seed)
 
     no_stories = await get_no_of_stories(cmdline_args.stories,
                                          cmdline_args.domain)
@@ -1,19 +1,25 @@
+import logging
 import typing
 from typing import Text, List, Optional
 
 if typing.TYPE_CHECKING:
+    from random import Random
     from rasa.core.domain import Domain
     from rasa.core.interpreter import NaturalLanguageInterpreter
     from rasa.core.trackers import DialogueStateTracker
     from rasa.core.training.structures import StoryGraph
 
+logger = logging.getLogger(__name__)
+
 
 async def extract_story_graph(
     resource_name: Text,
     domain: 'Domain',
     interpreter: Optional['NaturalLanguageInterpreter'] = None,
     use_e2e: bool = False,
-    exclusion_percentage: int = None
+    exclusion_percentage: int = None,
+    num_workers: int = 1,
+    rand: Optional['Random'] = None
 ) -> 'StoryGraph':
     from rasa.core.interpreter import RegexInterpreter
     from rasa.core.training.dsl import StoryFileReader
@@ -25,7 +31,9 @@ async def extract_story_graph(
         resource_name,
         domain, interpreter,
         use_e2e=use_e2e,
-        exclusion_percentage=exclusion_percentage)
+        exclusion_percentage=exclusion_percentage,
+        num_workers=num_workers,
+        rand=rand)
     return StoryGraph(story_steps)
 
 
@@ -38,15 +46,57 @@ async def load_data(
     tracker_limit: Optional[int] = None,
     use_story_concatenation: bool = True,
     debug_plots=False,
-    exclusion_percentage: int = None
+    exclusion_percentage: int = None,
+    cache_dir: Optional[Text] = None,
+    num_workers: int = 1
 ) -> List['DialogueStateTracker']:
+    """Load training trackers from story files.
+
+    If `cache_dir` is set, the parsed story graph and the generated
+    trackers are cached in this directory and reused by later calls with
+    the same stories, domain and generator configuration. The story files
+    are parsed in `num_workers` processes."""
     from rasa.core.training import extract_story_graph
     from rasa.core.training.generator import TrainingDataGenerator
+    from rasa.core.training.cache import (
+        TrainingDataCache, STORY_GRAPH_ENTRY, TRACKERS_ENTRY)
 
     if resource_name:
-        graph = await extract_story_graph(
-            resource_name, domain,
-            exclusion_percentage=exclusion_percentage)
+        cache = None
+        graph = None
+        trackers_key = None
+
+        if cache_dir and exclusion_percentage:
+            # the excluded stories are sampled randomly for every call
+            logger.debug("Training data is not cached when stories "
+                         "are excluded.")
+        elif cache_dir:
+            cache = TrainingDataCache(cache_dir)
+            data_fingerprint = cache.data_fingerprint(resource_name, domain)
+            graph_key = cache.key_for(data_fingerprint, {})
+            trackers_key = cache.key_for(data_fingerprint, {
+                "remove_duplicates": remove_duplicates,
+                "unique_last_num_states": unique_last_num_states,
+                "augmentation_factor": augmentation_factor,
+                "tracker_limit": tracker_limit,
+                "use_story_concatenation": use_story_concatenation
+            })
+
+            # plotting is a side effect of the tracker generation
+            if not debug_plots:
+                trackers = cache.load(TRACKERS_ENTRY, trackers_key, domain)
+                if trackers is not None:
+                    return trackers
+
+            graph = cache.load(STORY_GRAPH_ENTRY, graph_key, domain)
+
+        if graph is None:
+            graph = await extract_story_graph(
+                resource_name, domain,
+                exclusion_percentage=exclusion_percentage,
+                num_workers=num_workers)
+            if cache:
+                cache.store(STORY_GRAPH_ENTRY, graph_key, graph, domain)
 
         g = TrainingDataGenerator(graph, domain,
                                   remove_duplicates,
@@ -55,7 +105,12 @@ async def load_data(
                                   tracker_limit,
                                   use_story_concatenation,
                                   debug_plots)
-        return g.generate()
+        trackers = g.generate()
+
+        if cache:
+            cache.store(TRACKERS_ENTRY, trackers_key, trackers, domain)
+
+        return trackers
     else:
         return []
 
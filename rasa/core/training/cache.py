@@ -0,0 +1,168 @@
+import io
+import json
+import logging
+import os
+import pickle
+import tempfile
+import typing
+from typing import Any, Dict, List, Optional, Text
+
+from rasa.core import utils
+
+if typing.TYPE_CHECKING:
+    from rasa.core.domain import Domain
+
+logger = logging.getLogger(__name__)
+
+# maximum size of all cached entries in bytes
+DEFAULT_MAX_CACHE_SIZE = 1024 * 1024 * 1024
+
+CACHE_FILE_SUFFIX = ".pkl"
+
+STORY_GRAPH_ENTRY = "story_graph"
+
+TRACKERS_ENTRY = "trackers"
+
+
+class _DomainPickler(pickle.Pickler):
+    """Stores references to the domain instead of the domain itself.
+
+    Trackers keep a reference to the domain they were generated with and
+    compare it by identity, so the domain has to be replaced with the
+    current domain object when the trackers are loaded again."""
+
+    def __init__(self, file, domain: 'Domain') -> None:
+        super(_DomainPickler, self).__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.domain = domain
+
+    def persistent_id(self, obj: Any) -> Optional[Text]:
+        if obj is self.domain:
+            return "domain"
+        return None
+
+
+class _DomainUnpickler(pickle.Unpickler):
+    def __init__(self, file, domain: 'Domain') -> None:
+        super(_DomainUnpickler, self).__init__(file)
+        self.domain = domain
+
+    def persistent_load(self, pid: Text) -> Any:
+        if pid == "domain":
+            return self.domain
+        raise pickle.UnpicklingError("Unsupported persistent object "
+                                     "'{}'.".format(pid))
+
+
+class TrainingDataCache(object):
+    """Caches parsed story graphs and generated trackers on disk.
+
+    Entries are content addressed: their key is a hash of the story
+    files, the domain and the configuration used to create them. Once
+    the cache grows larger than `max_size` bytes, the least recently
+    used entries are removed."""
+
+    def __init__(self,
+                 cache_dir: Text,
+                 max_size: int = DEFAULT_MAX_CACHE_SIZE) -> None:
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    @staticmethod
+    def data_fingerprint(resource_name: Text, domain: 'Domain') -> Text:
+        """Hashes the content of all story files and the domain."""
+        import rasa
+        import rasa_nlu.utils as nlu_utils
+
+        story_hashes = sorted(
+            utils.get_file_hash(f)
+            for f in nlu_utils.list_files(resource_name))
+
+        return utils.get_text_hash(json.dumps({
+            "stories": story_hashes,
+            "domain": domain.as_dict(),
+            "version": rasa.__version__
+        }, sort_keys=True))
+
+    @staticmethod
+    def key_for(data_fingerprint: Text, config: Dict[Text, Any]) -> Text:
+        """Combines the data fingerprint with the configuration that was
+        used to create an entry from the data."""
+
+        return utils.get_text_hash(json.dumps({
+            "data": data_fingerprint,
+            "config": config
+        }, sort_keys=True))
+
+    def _entry_path(self, entry_type: Text, key: Text) -> Text:
+        return os.path.join(self.cache_dir, "{}-{}{}".format(
+            entry_type, key, CACHE_FILE_SUFFIX))
+
+    def load(self,
+             entry_type: Text,
+             key: Text,
+             domain: Optional['Domain'] = None) -> Optional[Any]:
+        """Returns the cached entry or `None` if it isn't cached."""
+
+        path = self._entry_path(entry_type, key)
+        if not os.path.isfile(path):
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                obj = _DomainUnpickler(f, domain).load()
+        except Exception as e:
+            logger.warning("Failed to load cached {} from '{}', the entry "
+                           "will be recreated. Error: {}"
+                           "".format(entry_type, path, e))
+            return None
+
+        # the access time is not reliable on all file systems,
+        # so the modification time is used to track the last usage
+        os.utime(path, None)
+        logger.debug("Loaded cached {} from '{}'.".format(entry_type, path))
+        return obj
+
+    def store(self,
+              entry_type: Text,
+              key: Text,
+              obj: Any,
+              domain: Optional['Domain'] = None) -> None:
+        """Stores an entry and evicts old entries if the cache is full."""
+
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        buffer = io.BytesIO()
+        _DomainPickler(buffer, domain).dump(obj)
+
+        # write to a temporary file first, so concurrent training runs
+        # never read a partially written entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(buffer.getvalue())
+        path = self._entry_path(entry_type, key)
+        os.replace(tmp_path, path)
+        logger.debug("Cached {} in '{}'.".format(entry_type, path))
+
+        self._evict()
+
+    def _cached_files(self) -> List[Text]:
+        if not os.path.isdir(self.cache_dir):
+            return []
+
+        return [os.path.join(self.cache_dir, f)
+                for f in os.listdir(self.cache_dir)
+                if f.endswith(CACHE_FILE_SUFFIX)]
+
+    def _evict(self) -> None:
+        """Removes least recently used entries until the cache fits."""
+
+        files = sorted(self._cached_files(), key=os.path.getmtime)
+        total_size = sum(os.path.getsize(f) for f in files)
+
+        while files and total_size > self.max_size:
+            oldest = files.pop(0)
+            total_size -= os.path.getsize(oldest)
+            os.remove(oldest)
+            logger.debug("Removed '{}' from training data cache."
+                         "".format(oldest))
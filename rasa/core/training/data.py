@@ -1,3 +1,12 @@
+import queue
+import threading
+from typing import Iterable, Iterator, List, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar('T')
+
+
 # noinspection PyPep8Naming
 class DialogueTrainingData(object):
     def __init__(self, X, y, true_length=None):
@@ -21,10 +30,80 @@ class DialogueTrainingData(object):
         return len(self.y)
 
     def shuffled_X_y(self):
-        import numpy as np
-
         idx = np.arange(self.num_examples())
         np.random.shuffle(idx)
         shuffled_X = self.X[idx]
         shuffled_y = self.y[idx]
         return shuffled_X, shuffled_y
+
+
+def bucketed_batch_ids(bucket_sizes: List[int],
+                       batch_size: int,
+                       shuffle: bool = True
+                       ) -> List[Tuple[int, np.ndarray]]:
+    """Splits the examples of every bucket into batches.
+
+    Returns `(bucket index, example indices)` tuples. A batch never
+    mixes examples of different buckets. If `shuffle` is set, the
+    examples of every bucket and the order of the batches are shuffled."""
+
+    batches = []
+    for bucket_idx, size in enumerate(bucket_sizes):
+        if shuffle:
+            ids = np.random.permutation(size)
+        else:
+            ids = np.arange(size)
+
+        for start in range(0, size, batch_size):
+            batches.append((bucket_idx, ids[start:start + batch_size]))
+
+    if shuffle and len(bucket_sizes) > 1:
+        np.random.shuffle(batches)
+
+    return batches
+
+
+def prefetch(items: Iterable[T], buffer_size: int = 2) -> Iterator[T]:
+    """Produces `items` in a background thread.
+
+    Up to `buffer_size` items are prepared ahead of time, so the
+    producer runs while the consumer is busy with the previous item.
+    Exceptions of the producer are raised in the consumer."""
+
+    buffer = queue.Queue(maxsize=buffer_size)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def produce():
+        try:
+            for item in items:
+                if stopped.is_set():
+                    return
+                put((item, None))
+        except Exception as e:
+            put((None, e))
+        put((done, None))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item, error = buffer.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        # lets the producer finish if the consumer stops early
+        stopped.set()
+        producer.join()
@@ -1,19 +1,23 @@
 # -*- coding: utf-8 -*-
 import asyncio
+import copy
 import io
 import json
 import logging
 import os
 import re
 import warnings
-from typing import Optional, List, Text, Any, Dict, AnyStr, TYPE_CHECKING
+from typing import (
+    Optional, List, Text, Any, Dict, AnyStr, Tuple, TYPE_CHECKING)
 
 from rasa.core import utils
 from rasa.core.constants import INTENT_MESSAGE_PREFIX
 from rasa.core.events import (
     ActionExecuted, UserUttered, Event, SlotSet)
 from rasa.core.exceptions import StoryParseError
-from rasa.core.interpreter import RegexInterpreter
+from rasa.core.interpreter import (
+    RegexInterpreter, RasaNLUInterpreter, RasaNLUHttpInterpreter)
+from rasa.core.parse_cache import CachingInterpreter, model_fingerprint
 from rasa.core.training.structures import (
     Checkpoint, STORY_START, StoryStep,
     GENERATED_CHECKPOINT_PREFIX, GENERATED_HASH_LENGTH, FORM_PREFIX)
@@ -21,11 +25,18 @@ from rasa_nlu.training_data.formats import MarkdownReader
 
 
 if TYPE_CHECKING:
+    from rasa.core.domain import Domain
     from rasa_nlu.training_data import Message
 
 
 logger = logging.getLogger(__name__)
 
+# maximum number of messages which are sent to the interpreter concurrently
+MAX_CONCURRENT_PARSES = 64
+
+# number of chunks of stories which are handed to every worker process
+CHUNKS_PER_WORKER = 4
+
 
 class EndToEndReader(MarkdownReader):
     def _parse_item(self, line: Text) -> Optional['Message']:
@@ -151,20 +162,32 @@ class StoryStepBuilder(object):
 class StoryFileReader(object):
     """Helper class to read a story file."""
 
-    def __init__(self, domain, interpreter, template_vars=None, use_e2e=False):
+    def __init__(self, domain, interpreter, template_vars=None, use_e2e=False,
+                 parse_cache=None):
         self.story_steps = []
         self.current_step_builder = None  # type: Optional[StoryStepBuilder]
         self.domain = domain
         self.interpreter = interpreter
         self.template_variables = template_vars if template_vars else {}
         self.use_e2e = use_e2e
+        # parse results by interpreter fingerprint and message text, can
+        # be shared between readers
+        self.parse_cache = parse_cache if parse_cache is not None else {}
+        self.interpreter_fingerprint = self._interpreter_fingerprint(
+            interpreter)
 
     @staticmethod
     async def read_from_folder(resource_name, domain,
                                interpreter=RegexInterpreter(),
                                template_variables=None, use_e2e=False,
-                               exclusion_percentage=None):
-        """Given a path reads all contained story files."""
+                               exclusion_percentage=None, num_workers=1,
+                               rand=None):
+        """Given a path reads all contained story files.
+
+        If `num_workers` is larger than one and the messages are parsed
+        with the `RegexInterpreter`, the stories are parsed in that many
+        worker processes. The excluded stories are chosen with `rand` if
+        it is given, otherwise with the global random state."""
         import rasa_nlu.utils as nlu_utils
 
         if not os.path.exists(resource_name):
@@ -172,43 +195,126 @@ class StoryFileReader(object):
                              "sure '{}' exists and points to a story folder "
                              "or file.".format(os.path.abspath(resource_name)))
 
-        story_steps = []
-        for f in nlu_utils.list_files(resource_name):
-            steps = await StoryFileReader.read_from_file(f, domain,
-                                                         interpreter,
-                                                         template_variables,
-                                                         use_e2e)
-            story_steps.extend(steps)
+        files = nlu_utils.list_files(resource_name)
+        if (num_workers > 1 and not use_e2e and
+                isinstance(interpreter, RegexInterpreter)):
+            story_steps = StoryFileReader._read_in_workers(
+                files, domain, template_variables, num_workers)
+        else:
+            # messages which occur in multiple stories are only parsed once
+            parse_cache = {}
+            story_steps = []
+            for f in files:
+                steps = await StoryFileReader.read_from_file(
+                    f, domain, interpreter, template_variables, use_e2e,
+                    parse_cache)
+                story_steps.extend(steps)
 
         # if exclusion percentage is not 100
         if exclusion_percentage and exclusion_percentage is not 100:
             import random
             idx = int(round(exclusion_percentage / 100.0 * len(story_steps)))
-            random.shuffle(story_steps)
+            (rand or random).shuffle(story_steps)
             story_steps = story_steps[:-idx]
 
         return story_steps
 
     @staticmethod
     async def read_from_file(filename, domain, interpreter=RegexInterpreter(),
-                             template_variables=None, use_e2e=False):
+                             template_variables=None, use_e2e=False,
+                             parse_cache=None):
         """Given a md file reads the contained stories."""
 
         try:
             with open(filename, "r", encoding="utf-8") as f:
                 lines = f.readlines()
             reader = StoryFileReader(domain, interpreter,
-                                     template_variables, use_e2e)
+                                     template_variables, use_e2e,
+                                     parse_cache)
             return await reader.process_lines(lines)
         except ValueError as err:
-            file_info = ("Invalid story file format. Failed to parse "
-                         "'{}'".format(os.path.abspath(filename)))
-            logger.exception(file_info)
-            if not err.args:
-                err.args = ('',)
-            err.args = err.args + (file_info,)
+            StoryFileReader._add_file_info(err, filename)
             raise
 
+    @staticmethod
+    def _add_file_info(err: ValueError, filename: Text) -> None:
+        file_info = ("Invalid story file format. Failed to parse "
+                     "'{}'".format(os.path.abspath(filename)))
+        logger.exception(file_info)
+        if not err.args:
+            err.args = ('',)
+        err.args = err.args + (file_info,)
+
+    @staticmethod
+    def _split_into_chunks(filename: Text,
+                           lines: List[Text],
+                           num_chunks: int
+                           ) -> List[Tuple[Text, int, List[Text]]]:
+        """Splits the lines of a story file at story boundaries.
+
+        Returns tuples of the file name, the offset of the first line
+        in the file and the lines of the chunk."""
+
+        story_starts = [idx for idx, line in enumerate(lines)
+                        if line.lstrip().startswith("#")]
+        if not story_starts or story_starts[0] != 0:
+            story_starts.insert(0, 0)
+
+        chunk_size = max(1, len(lines) // num_chunks)
+        boundaries = [0]
+        for idx in story_starts[1:]:
+            if idx - boundaries[-1] >= chunk_size:
+                boundaries.append(idx)
+        boundaries.append(len(lines))
+
+        return [(filename, start, lines[start:end])
+                for start, end in zip(boundaries, boundaries[1:])]
+
+    @staticmethod
+    def _read_in_workers(files: List[Text],
+                         domain: 'Domain',
+                         template_variables: Optional[Dict[Text, Any]],
+                         num_workers: int) -> List[StoryStep]:
+        """Parses story files in multiple processes.
+
+        The story files are split into chunks of complete stories, so
+        even a single large file is spread over all workers. The story
+        steps are returned in the order of the files."""
+        import multiprocessing
+
+        lines_per_file = []
+        for f in files:
+            with open(f, "r", encoding="utf-8") as story_file:
+                lines_per_file.append((f, story_file.readlines()))
+
+        num_chunks = num_workers * CHUNKS_PER_WORKER
+        total_lines = max(1, sum(len(lines) for _, lines in lines_per_file))
+        chunks = []
+        for f, lines in lines_per_file:
+            # larger files are split into more chunks
+            chunks.extend(StoryFileReader._split_into_chunks(
+                f, lines,
+                max(1, num_chunks * len(lines) // total_lines)))
+
+        logger.debug("Parsing {} story files in {} chunks using {} worker "
+                     "processes.".format(len(files), len(chunks),
+                                         num_workers))
+
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(min(num_workers, max(1, len(chunks))),
+                      initializer=_init_story_worker,
+                      initargs=(domain, template_variables)) as pool:
+            results = pool.map(_read_story_chunk, chunks)
+
+        story_steps = []
+        for (filename, _, _), (steps, error) in zip(chunks, results):
+            if error is not None:
+                err = ValueError(error)
+                StoryFileReader._add_file_info(err, filename)
+                raise err
+            story_steps.extend(steps)
+        return story_steps
+
     @staticmethod
     def _parameters_from_json_string(s: Text, line: Text) -> Dict[Text, Any]:
         """Parse the passed string as json and create a parameter dict."""
@@ -249,10 +355,14 @@ class StoryFileReader(object):
                           "Ignoring this line.".format(line))
             return "", {}
 
-    async def process_lines(self, lines: List[AnyStr]) -> List[StoryStep]:
+    async def process_lines(self,
+                            lines: List[AnyStr],
+                            line_offset: int = 0) -> List[StoryStep]:
+
+        await self._parse_user_messages(lines)
 
         for idx, line in enumerate(lines):
-            line_num = idx + 1
+            line_num = line_offset + idx + 1
             try:
                 line = self._replace_template_variables(
                     self._clean_up_line(line))
@@ -334,11 +444,83 @@ class StoryFileReader(object):
 
         self.current_step_builder.add_checkpoint(name, conditions)
 
-    async def _parse_message(self, message, line_num):
+    @staticmethod
+    def _interpreter_fingerprint(interpreter) -> Any:
+        """Identifies the model of the interpreter in the parse memo."""
+
+        if isinstance(interpreter, (CachingInterpreter, RasaNLUInterpreter,
+                                    RasaNLUHttpInterpreter)):
+            return model_fingerprint(interpreter)
+        # the model of other interpreters is unknown, their parse results
+        # are only reused by the same interpreter
+        return interpreter
+
+    def _parse_key(self, text: Text) -> Tuple[Any, Text]:
+        return self.interpreter_fingerprint, text
+
+    def _user_message_texts(self, lines: List[AnyStr]) -> List[Text]:
+        """Collects the texts of all user messages in the lines which
+        need to be parsed by the interpreter."""
+
+        e2e_reader = EndToEndReader() if self.use_e2e else None
+        texts = []
+        for line in lines:
+            try:
+                line = self._replace_template_variables(
+                    self._clean_up_line(line))
+                if (not line.startswith("*") or
+                        re.match(r'^[*\-]\s+{}'.format(FORM_PREFIX), line)):
+                    continue
+                for m in line[1:].split(" OR "):
+                    m = m.strip()
+                    if e2e_reader:
+                        m = e2e_reader._parse_item(m).text
+                    if not m.startswith(INTENT_MESSAGE_PREFIX):
+                        texts.append(m)
+            except Exception:
+                # invalid lines are reported when they are processed
+                continue
+        return texts
+
+    async def _parse_user_messages(self, lines: List[AnyStr]) -> None:
+        """Parses all user messages of the lines up front.
+
+        Every distinct message is only parsed once and the requests to
+        the interpreter are sent concurrently, which speeds up parsing
+        with interpreters that are served over http."""
+
+        if isinstance(self.interpreter, RegexInterpreter):
+            # parsing doesn't take long enough to benefit from this
+            return
+
+        texts = {t for t in self._user_message_texts(lines)
+                 if self._parse_key(t) not in self.parse_cache}
+        if not texts:
+            return
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_PARSES)
+
+        async def parse(text):
+            async with semaphore:
+                self.parse_cache[self._parse_key(text)] = \
+                    await self.interpreter.parse(text)
+
+        await asyncio.gather(*[parse(t) for t in texts])
+
+    async def _parse_text(self, message: Text) -> Dict[Text, Any]:
         if message.startswith(INTENT_MESSAGE_PREFIX):
-            parse_data = await RegexInterpreter().parse(message)
-        else:
-            parse_data = await self.interpreter.parse(message)
+            return await RegexInterpreter().parse(message)
+        elif isinstance(self.interpreter, RegexInterpreter):
+            return await self.interpreter.parse(message)
+
+        key = self._parse_key(message)
+        if key not in self.parse_cache:
+            self.parse_cache[key] = await self.interpreter.parse(message)
+        # the parse data is changed later on, e.g. for end-to-end stories
+        return copy.deepcopy(self.parse_cache[key])
+
+    async def _parse_message(self, message, line_num):
+        parse_data = await self._parse_text(message)
         utterance = UserUttered(message,
                                 parse_data.get("intent"),
                                 parse_data.get("entities"),
@@ -395,3 +577,37 @@ class StoryFileReader(object):
 
         for p in parsed_events:
             self.current_step_builder.add_event(p)
+
+
+# state of the worker processes which parse stories, see
+# `StoryFileReader._read_in_workers`
+_worker_domain = None
+_worker_template_variables = None
+
+
+def _init_story_worker(domain: 'Domain',
+                       template_variables: Optional[Dict[Text, Any]]) -> None:
+    global _worker_domain, _worker_template_variables
+    _worker_domain = domain
+    _worker_template_variables = template_variables
+
+
+def _read_story_chunk(chunk: Tuple[Text, int, List[Text]]
+                      ) -> Tuple[List[StoryStep], Optional[Text]]:
+    """Parses a chunk of a story file in a worker process.
+
+    Returns the story steps and an error message if the stories are
+    invalid."""
+
+    _, line_offset, lines = chunk
+    reader = StoryFileReader(_worker_domain, RegexInterpreter(),
+                             _worker_template_variables)
+    loop = asyncio.new_event_loop()
+    try:
+        steps = loop.run_until_complete(
+            reader.process_lines(lines, line_offset))
+        return steps, None
+    except ValueError as e:
+        return [], str(e)
+    finally:
+        loop.close()
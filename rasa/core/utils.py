@@ -12,10 +12,11 @@ import tempfile
 import warnings
 import zipfile
 from asyncio import AbstractEventLoop, Future
+from contextlib import contextmanager
 from hashlib import md5, sha1
 from io import BytesIO as IOReader, StringIO
 from typing import (
-    Any, Dict, List, Optional, Set, TYPE_CHECKING, Text, Tuple,
+    Any, Dict, Iterator, List, Optional, Set, TYPE_CHECKING, Text, Tuple,
     Callable)
 
 import aiohttp
@@ -25,6 +26,7 @@ from sanic import Sanic
 from sanic.request import Request
 from sanic.views import CompositionView
 
+from rasa.core import metrics
 from rasa.core.constants import DEFAULT_REQUEST_TIMEOUT
 
 logger = logging.getLogger(__name__)
@@ -567,6 +569,38 @@ async def download_file_from_url(url: Text) -> Text:
     return filename
 
 
+# environment variables which limit the threads of numerical libraries
+THREAD_LIMIT_VARIABLES = ["OMP_NUM_THREADS", "MKL_NUM_THREADS",
+                          "OPENBLAS_NUM_THREADS"]
+
+
+def cpu_budget(num_workers: int) -> int:
+    """Number of CPUs every one of `num_workers` processes may use."""
+    return max(1, (os.cpu_count() or 1) // max(1, num_workers))
+
+
+@contextmanager
+def limited_threads(num_threads: int) -> Iterator[None]:
+    """Limits the threads of numerical libraries in processes which are
+    started within this context.
+
+    Child processes inherit the environment of their parent, which is
+    restored once the context is left."""
+
+    previous = {name: os.environ.get(name)
+                for name in THREAD_LIMIT_VARIABLES}
+    for name in THREAD_LIMIT_VARIABLES:
+        os.environ[name] = str(num_threads)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                del os.environ[name]
+            else:
+                os.environ[name] = value
+
+
 def remove_none_values(obj: Dict[Text, Any]) -> Dict[Text, Any]:
     """Remove all keys that store a `None` value."""
     return {k: v for k, v in obj.items() if v is not None}
@@ -594,8 +628,15 @@ class AvailableEndpoints(object):
             endpoint_file, endpoint_type="tracker_store")
         event_broker = read_endpoint_config(
             endpoint_file, endpoint_type="event_broker")
+        lock_store = read_endpoint_config(
+            endpoint_file, endpoint_type="lock_store")
+        reminder_store = read_endpoint_config(
+            endpoint_file, endpoint_type="reminder_store")
+        parse_cache = read_endpoint_config(
+            endpoint_file, endpoint_type="parse_cache")
 
-        return cls(nlg, nlu, action, model, tracker_store, event_broker)
+        return cls(nlg, nlu, action, model, tracker_store, event_broker,
+                   lock_store, reminder_store, parse_cache)
 
     def __init__(self,
                  nlg=None,
@@ -603,13 +644,19 @@ class AvailableEndpoints(object):
                  action=None,
                  model=None,
                  tracker_store=None,
-                 event_broker=None):
+                 event_broker=None,
+                 lock_store=None,
+                 reminder_store=None,
+                 parse_cache=None):
         self.model = model
         self.action = action
         self.nlu = nlu
         self.nlg = nlg
         self.tracker_store = tracker_store
         self.event_broker = event_broker
+        self.lock_store = lock_store
+        self.reminder_store = reminder_store
+        self.parse_cache = parse_cache
 
 
 class ClientResponseError(aiohttp.ClientError):
@@ -682,19 +729,25 @@ class EndpointConfig(object):
             del kwargs["headers"]
 
         url = concat_url(self.url, subpath)
-        async with self.session() as session:
-            async with session.request(
-                    method,
-                    url,
-                    headers=headers,
-                    params=self.combine_parameters(kwargs),
-                    **kwargs) as resp:
-
-                if resp.status >= 400:
-                    raise ClientResponseError(resp.status,
-                                              resp.reason,
-                                              await resp.content.read())
-                return await resp.json()
+        with metrics.measure(metrics.REMOTE_REQUEST_SECONDS, url=url):
+            try:
+                async with self.session() as session:
+                    async with session.request(
+                            method,
+                            url,
+                            headers=headers,
+                            params=self.combine_parameters(kwargs),
+                            **kwargs) as resp:
+
+                        if resp.status >= 400:
+                            raise ClientResponseError(
+                                resp.status,
+                                resp.reason,
+                                await resp.content.read())
+                        return await resp.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                metrics.increment(metrics.REMOTE_REQUEST_ERRORS, url=url)
+                raise
 
     @classmethod
     def from_dict(cls, data):
@@ -770,29 +823,3 @@ def create_task_error_logger(error_message: Text = ""
                              "{}".format(error_message))
 
     return handler
-
-
-class LockCounter(asyncio.Lock):
-    """Decorated asyncio lock that counts how many coroutines are waiting.
-
-    The counter can be used to discard the lock when there is no coroutine
-    waiting for it. For this to work, there should not be any execution yield
-    between retrieving the lock and acquiring it, otherwise there might be
-    race conditions."""
-
-    def __init__(self) -> None:
-        super().__init__()
-        self.wait_counter = 0
-
-    async def acquire(self) -> Any:
-        """Acquire the lock, makes sure only one coroutine can retrieve it."""
-
-        self.wait_counter += 1
-        try:
-            return await super(LockCounter, self).acquire()
-        finally:
-            self.wait_counter -= 1
-
-    def is_someone_waiting(self) -> bool:
-        """Check if a coroutine is waiting for this lock to be freed."""
-        return self.wait_counter != 0
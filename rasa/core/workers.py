@@ -0,0 +1,930 @@
+import asyncio
+import bisect
+import copy
+import hashlib
+import io
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import signal
+import tempfile
+import typing
+import uuid
+import zipfile
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Dict, List, Optional, Text, Tuple, Union
+from urllib.parse import unquote
+
+import aiohttp
+from sanic import Sanic, response
+from sanic.request import Request
+
+import rasa.utils
+from rasa.core import batch, constants, executors
+from rasa.core.utils import AvailableEndpoints, EndpointConfig
+
+if typing.TYPE_CHECKING:
+    from rasa.core.admission import AdmissionController
+
+logger = logging.getLogger(__name__)
+
+# points of every worker on the hash ring, more points spread the
+# conversations more evenly across the workers
+DEFAULT_VIRTUAL_NODES = 100
+
+# seconds a request waits for its worker to (re)start before it fails
+DEFAULT_WORKER_START_TIMEOUT = 120
+
+# seconds between two checks whether the worker processes are alive
+DEFAULT_SUPERVISION_INTERVAL = 1
+
+# seconds a stopped worker gets to finish the requests it is processing
+DEFAULT_WORKER_STOP_TIMEOUT = 30
+
+# routes of the workers which are only called by the router, they are
+# protected by a token which the router generates on start
+WORKER_ROUTE_PREFIX = "/_worker"
+WORKER_TOKEN_HEADER = "X-Rasa-Worker-Token"
+
+# headers which describe the connection to the router, they are not
+# forwarded to the workers and back to the client
+HOP_BY_HOP_HEADERS = {"connection", "keep-alive", "proxy-authenticate",
+                      "proxy-authorization", "te", "trailers",
+                      "transfer-encoding", "upgrade", "host",
+                      "content-length"}
+
+CONVERSATION_PATH = re.compile(r"^/conversations/([^/]+)")
+
+WEBHOOK_PATH = re.compile(r"^/webhooks/([^/]+)/")
+
+# keys of the sender id in the json payload of the input channels
+SENDER_KEYS = ["sender", "sender_id"]
+
+# batch routes and the key of their items, the items are split by the
+# workers of their conversations
+BATCH_ITEM_KEYS = {
+    "/batch/messages": "messages",
+    "/batch/respond": "messages",
+    "/batch/conversations/predict": "conversations",
+    "/batch/predict": "trackers",
+}
+
+HTTP_METHODS = ["GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"]
+
+
+def _hash(key: Text) -> int:
+    # stable across processes and restarts, unlike the builtin `hash`
+    return int(hashlib.md5(key.encode("utf-8")).hexdigest()[:16], 16)
+
+
+class HashRing(object):
+    """Consistent hashing of conversations to workers.
+
+    Every node owns many points on the ring, a key belongs to the node
+    of the next point. Adding or removing a node only moves the keys
+    of that node."""
+
+    def __init__(self,
+                 nodes: List[Any],
+                 virtual_nodes: int = DEFAULT_VIRTUAL_NODES) -> None:
+        self.nodes = list(nodes)
+        points = sorted((_hash("{}-{}".format(node, i)), node)
+                        for node in self.nodes
+                        for i in range(virtual_nodes))
+        self._points = [p for p, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node(self, key: Text) -> Any:
+        if not self._points:
+            raise ValueError("Can't find a node on an empty hash ring.")
+
+        i = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[i]
+
+
+def _json_payload(request: Request) -> Any:
+    if not request.body:
+        return None
+    try:
+        return json.loads(request.body)
+    except ValueError:
+        return None
+
+
+def _facebook_sender(request: Request) -> Optional[Text]:
+    # the first message of a webhook call decides about the worker
+    entry = _json_payload(request)["entry"][0]
+    return entry["messaging"][0]["sender"]["id"]
+
+
+def _slack_sender(request: Request) -> Optional[Text]:
+    if request.form.get("payload"):
+        return json.loads(request.form.get("payload"))["user"]["id"]
+    return _json_payload(request)["event"]["user"]
+
+
+def _telegram_sender(request: Request) -> Optional[Text]:
+    update = _json_payload(request)
+    if "callback_query" in update:
+        return update["callback_query"]["message"]["chat"]["id"]
+    return update["message"]["chat"]["id"]
+
+
+def _twilio_sender(request: Request) -> Optional[Text]:
+    return request.form.get("From")
+
+
+def _mattermost_sender(request: Request) -> Optional[Text]:
+    return _json_payload(request)["user_id"]
+
+
+def _botframework_sender(request: Request) -> Optional[Text]:
+    return _json_payload(request)["from"]["id"]
+
+
+def _rocketchat_sender(request: Request) -> Optional[Text]:
+    payload = _json_payload(request)
+    if "visitor" in payload:
+        return payload["_id"]
+    return payload["channel_id"]
+
+
+def _webexteams_sender(request: Request) -> Optional[Text]:
+    return _json_payload(request)["data"]["personId"]
+
+
+# finds the sender id in the webhook calls of the input channels whose
+# payload doesn't contain one of the `SENDER_KEYS`
+CHANNEL_SENDERS = {
+    "facebook": _facebook_sender,
+    "slack": _slack_sender,
+    "telegram": _telegram_sender,
+    "twilio": _twilio_sender,
+    "mattermost": _mattermost_sender,
+    "botframework": _botframework_sender,
+    "rocketchat": _rocketchat_sender,
+    "webexteams": _webexteams_sender,
+}
+
+# input channels which are routed by the sender id of their payload
+GENERIC_SENDER_CHANNELS = {"rest", "callback", "cmdline"}
+
+
+def sender_id_from_request(request: Request) -> Optional[Text]:
+    """Finds the conversation of a request.
+
+    The sender id is part of the path of the conversation routes and part
+    of the payload of the webhooks of the input channels. Returns `None`
+    if the request doesn't belong to a conversation."""
+
+    match = CONVERSATION_PATH.match(request.path)
+    if match:
+        return unquote(match.group(1))
+
+    match = WEBHOOK_PATH.match(request.path)
+    if match and match.group(1) in CHANNEL_SENDERS:
+        try:
+            sender_id = CHANNEL_SENDERS[match.group(1)](request)
+        except (KeyError, IndexError, TypeError, ValueError):
+            sender_id = None
+        return str(sender_id) if sender_id is not None else None
+
+    payload = _json_payload(request)
+    if isinstance(payload, dict):
+        for key in SENDER_KEYS:
+            if payload.get(key) is not None:
+                return str(payload[key])
+    return None
+
+
+def unroutable_channels(channel: Optional[Text],
+                        credentials_file: Optional[Text]) -> List[Text]:
+    """Input channels whose requests can't be routed to the worker of
+    their conversation."""
+    from rasa.core.utils import read_yaml_file
+
+    if channel:
+        channels = [channel]
+    elif credentials_file:
+        channels = list(read_yaml_file(credentials_file) or {})
+    else:
+        channels = []
+
+    return [c for c in channels
+            if c not in CHANNEL_SENDERS and c not in GENERIC_SENDER_CHANNELS]
+
+
+def _is_shared(store: Optional[EndpointConfig]) -> bool:
+    return store is not None and store.type is not None
+
+
+class Worker(object):
+    """Server process which handles a share of the conversations."""
+
+    def __init__(self, index: int, url: Text) -> None:
+        self.index = index
+        self.url = url
+        self.process = None  # type: Optional[multiprocessing.Process]
+        # requests are only forwarded to available workers, other requests
+        # wait until the worker is (re)started
+        self.available = False
+        self.restarting = False
+
+    @property
+    def port(self) -> int:
+        return int(self.url.rsplit(":", 1)[1])
+
+    def __repr__(self):
+        return "Worker(index: {}, url: {})".format(self.index, self.url)
+
+
+class WorkerPool(object):
+    """Routes requests to workers, keeps the workers running and updates
+    their model.
+
+    All requests of a conversation go to the same worker, so that caches
+    and locks of a worker stay valid. The workers are only started if the
+    pool gets a `worker_config`, otherwise it routes to running servers."""
+
+    def __init__(self,
+                 workers: List[Worker],
+                 token: Text,
+                 worker_config: Optional[Dict[Text, Any]] = None,
+                 model_server: Optional[EndpointConfig] = None,
+                 start_timeout: float = DEFAULT_WORKER_START_TIMEOUT
+                 ) -> None:
+        self.workers = workers
+        self.token = token
+        self.worker_config = worker_config
+        self.model_server = model_server
+        self.start_timeout = start_timeout
+
+        self.ring = HashRing([w.index for w in workers])
+        self._round_robin = itertools.cycle(workers)
+        self.session = None  # type: Optional[aiohttp.ClientSession]
+        self._tasks = []  # type: List[asyncio.Future]
+
+        # model which was pulled or uploaded through the router, it is
+        # loaded by the workers and by every restarted worker
+        self.model_directory = None  # type: Optional[Text]
+        self.fingerprint = None  # type: Optional[Text]
+        self._previous_model_directory = None  # type: Optional[Text]
+
+    def worker_for(self, sender_id: Optional[Text]) -> Worker:
+        if sender_id is None:
+            return next(self._round_robin)
+        return self.workers[self.ring.node(sender_id)]
+
+    def _headers(self) -> Dict[Text, Text]:
+        return {WORKER_TOKEN_HEADER: self.token}
+
+    async def start(self) -> None:
+        self.session = aiohttp.ClientSession()
+
+        if self.model_server:
+            await self.pull_model()
+
+        if self.worker_config is not None:
+            await asyncio.gather(*[self.restart(w) for w in self.workers])
+            self._tasks.append(asyncio.ensure_future(self.supervise()))
+
+        if self.model_server:
+            self._tasks.append(asyncio.ensure_future(self.pull_models()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+        if self.worker_config is not None:
+            await asyncio.gather(*[self._stop_process(w)
+                                   for w in self.workers])
+
+        if self.session:
+            await self.session.close()
+
+        _remove_model_directory(self._previous_model_directory)
+        _remove_model_directory(self.model_directory)
+
+    def _start_process(self, worker: Worker) -> None:
+        context = multiprocessing.get_context("spawn")
+        worker.process = context.Process(
+            target=run_worker,
+            args=(self.worker_config, worker.port, self.token,
+                  self.model_directory, self.fingerprint),
+            name="rasa-worker-{}".format(worker.index))
+        worker.process.start()
+
+    async def _stop_process(self, worker: Worker) -> None:
+        process = worker.process
+        if process is None or not process.is_alive():
+            return
+
+        # the server of the worker stops gracefully on SIGTERM
+        process.terminate()
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, process.join,
+                                   DEFAULT_WORKER_STOP_TIMEOUT)
+        if process.is_alive():
+            logger.warning("Worker {} didn't stop in time, killing it."
+                           "".format(worker.index))
+            os.kill(process.pid, signal.SIGKILL)
+
+    async def _wait_until_started(self, worker: Worker) -> bool:
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.start_timeout
+        url = worker.url + WORKER_ROUTE_PREFIX + "/status"
+
+        # the agent is loaded before the server of the worker starts, so
+        # the worker can handle messages once it answers
+        while loop.time() < deadline and worker.process.is_alive():
+            try:
+                async with self.session.get(url,
+                                            headers=self._headers()) as resp:
+                    if resp.status == 200:
+                        return True
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+        return False
+
+    async def restart(self, worker: Worker) -> None:
+        """Replaces the process of a worker.
+
+        Requests of the worker's conversations wait until the new process
+        is started."""
+
+        if worker.restarting:
+            # the worker already gets a new process
+            return
+
+        worker.available = False
+        worker.restarting = True
+        try:
+            await self._stop_process(worker)
+            self._start_process(worker)
+            if await self._wait_until_started(worker):
+                logger.info("Worker {} is running at {}."
+                            "".format(worker.index, worker.url))
+                worker.available = True
+            else:
+                logger.error("Worker {} failed to start."
+                             "".format(worker.index))
+        finally:
+            worker.restarting = False
+
+    async def rolling_restart(self) -> None:
+        """Restarts one worker after the other, the conversations of the
+        other workers are processed in the meantime."""
+
+        logger.info("Restarting the workers.")
+        for worker in self.workers:
+            await self.restart(worker)
+
+    async def supervise(self,
+                        interval: float = DEFAULT_SUPERVISION_INTERVAL
+                        ) -> None:
+        """Restarts workers whose process died."""
+
+        while True:
+            await asyncio.sleep(interval)
+            for worker in self.workers:
+                if worker.restarting or worker.process.is_alive():
+                    continue
+
+                logger.warning("Worker {} exited with code {}, restarting "
+                               "it.".format(worker.index,
+                                            worker.process.exitcode))
+                await self.restart(worker)
+
+    async def _wait_until_available(self, worker: Worker) -> bool:
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.start_timeout
+        while not worker.available:
+            if loop.time() > deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    async def _send(self,
+                    worker: Worker,
+                    request: Request,
+                    headers: Dict[Text, Text],
+                    body: Optional[bytes]
+                    ) -> Union[aiohttp.ClientResponse, response.HTTPResponse]:
+        """Sends a request to a worker, returns an error response if the
+        worker isn't available."""
+
+        url = worker.url + request.path
+        if request.query_string:
+            url += "?" + request.query_string
+
+        while True:
+            if not await self._wait_until_available(worker):
+                return _unavailable(worker)
+
+            try:
+                return await self.session.request(request.method, url,
+                                                  headers=headers,
+                                                  data=body)
+            except aiohttp.ClientConnectorError:
+                # the request didn't reach the worker, it is retried
+                # once the worker is restarted
+                if not worker.restarting:
+                    return _unavailable(worker)
+            except aiohttp.ClientError as e:
+                logger.error("Failed to forward request to worker {}: {}"
+                             "".format(worker.index, e))
+                return _unavailable(worker)
+
+    async def forward(self, request: Request, worker: Worker,
+                      stream: bool = True) -> response.BaseHTTPResponse:
+        """Sends a request to a worker and returns the worker's response.
+
+        The body of the response is streamed to the client while the
+        worker sends it, unless `stream` is `False`."""
+
+        headers = {k: v for k, v in request.headers.items()
+                   if k.lower() not in HOP_BY_HOP_HEADERS}
+        resp = await self._send(worker, request, headers, request.body)
+        if not isinstance(resp, aiohttp.ClientResponse):
+            return resp
+        elif stream:
+            return _streamed_response(resp, worker)
+
+        try:
+            async with resp:
+                return _buffered_response(resp, await resp.read())
+        except aiohttp.ClientError as e:
+            logger.error("Failed to read the response of worker {}: {}"
+                         "".format(worker.index, e))
+            return _unavailable(worker)
+
+    async def forward_batch(self, request: Request, key: Text
+                            ) -> response.BaseHTTPResponse:
+        """Splits a batch request by the workers of its conversations.
+
+        Every worker gets the items of its conversations under `key`. The
+        results are streamed back as soon as a worker sends them, with the
+        index of their item in the original batch."""
+
+        try:
+            items = batch.parse_items(request.body,
+                                      request.headers.get("Content-Type"),
+                                      key)
+        except ValueError:
+            # the worker answers with the error
+            return await self.forward(request, self.worker_for(None))
+
+        indices = OrderedDict()  # type: Dict[Worker, List[int]]
+        for index, item in enumerate(items):
+            worker = self.worker_for(batch.sender_id_of(item))
+            indices.setdefault(worker, []).append(index)
+
+        if len(indices) <= 1:
+            worker = next(iter(indices), None) or self.worker_for(None)
+            return await self.forward(request, worker)
+
+        headers = {k: v for k, v in request.headers.items()
+                   if k.lower() not in HOP_BY_HOP_HEADERS and
+                   k.lower() != "content-type"}
+        headers["Content-Type"] = "application/json"
+        responses = await asyncio.gather(*[
+            self._send(worker, request, headers,
+                       json.dumps({key: [items[i] for i in worker_indices]}))
+            for worker, worker_indices in indices.items()])
+
+        parts = list(zip(indices.keys(), indices.values(), responses))
+        failed = [(worker, resp) for worker, _, resp in parts
+                  if not isinstance(resp, aiohttp.ClientResponse) or
+                  resp.status != 200]
+        if not failed:
+            return _merged_batch_response(items, parts)
+
+        # e.g. the authentication failed, which fails every part
+        worker, error = failed[0]
+        try:
+            if isinstance(error, aiohttp.ClientResponse):
+                error = _buffered_response(error, await error.read())
+        except aiohttp.ClientError:
+            error = _unavailable(worker)
+        finally:
+            for resp in responses:
+                if isinstance(resp, aiohttp.ClientResponse):
+                    resp.release()
+        return error
+
+    async def upload_model(self, request: Request) -> response.HTTPResponse:
+        """Forwards an uploaded model to one worker after the other.
+
+        The workers check the authentication of the upload. Once all of
+        them loaded the model, it is also used by restarted workers."""
+
+        for worker in self.workers:
+            result = await self.forward(request, worker, stream=False)
+            if result.status >= 300:
+                return result
+
+        if 'model' in request.files:
+            model_directory = tempfile.mkdtemp()
+            try:
+                zipped = io.BytesIO(request.files['model'].body)
+                with zipfile.ZipFile(zipped) as zip_ref:
+                    zip_ref.extractall(model_directory)
+            except Exception:
+                shutil.rmtree(model_directory, ignore_errors=True)
+                raise
+            # the workers loaded the model already
+            _remove_model_directory(
+                self._replace_model(model_directory, None))
+
+        return response.text('', 204)
+
+    def _replace_model(self,
+                       model_directory: Text,
+                       fingerprint: Optional[Text]) -> Optional[Text]:
+        """Sets the model of the workers, returns the previous model
+        directory."""
+
+        previous = self.model_directory
+        self.model_directory = model_directory
+        self.fingerprint = fingerprint
+        return previous
+
+    async def update_workers(self) -> None:
+        """Lets one worker after the other load the current model, so that
+        the other workers keep serving while a worker loads the model."""
+
+        for worker in self.workers:
+            if not await self._wait_until_available(worker):
+                # the worker loads the current model when it's restarted
+                continue
+
+            url = worker.url + WORKER_ROUTE_PREFIX + "/model"
+            try:
+                async with self.session.post(
+                        url, headers=self._headers(),
+                        json={"model_directory": self.model_directory,
+                              "fingerprint": self.fingerprint}) as resp:
+                    if resp.status != 204:
+                        logger.error("Worker {} failed to load the model "
+                                     "with fingerprint {}."
+                                     "".format(worker.index,
+                                               self.fingerprint))
+            except aiohttp.ClientError as e:
+                logger.error("Failed to update the model of worker {}: {}"
+                             "".format(worker.index, e))
+
+    async def pull_model(self) -> bool:
+        """Pulls the model from the model server on behalf of all workers.
+
+        Returns `True` if a new model was found."""
+        from rasa.core.agent import _pull_model_and_fingerprint
+
+        model_directory = tempfile.mkdtemp()
+        try:
+            fingerprint = await _pull_model_and_fingerprint(
+                self.model_server, model_directory, self.fingerprint)
+        except Exception:
+            logger.exception("An exception was raised while fetching "
+                             "a model. Continuing anyways...")
+            fingerprint = None
+
+        if not fingerprint:
+            shutil.rmtree(model_directory, ignore_errors=True)
+            return False
+
+        self._previous_model_directory = self._replace_model(
+            model_directory, fingerprint)
+        return True
+
+    async def pull_models(self) -> None:
+        wait_time_between_pulls = self.model_server.kwargs.get(
+            'wait_time_between_pulls', 100)
+        if not wait_time_between_pulls:
+            return
+
+        while True:
+            await asyncio.sleep(int(wait_time_between_pulls))
+            if await self.pull_model():
+                logger.info("Updating the workers to the model with "
+                            "fingerprint {}.".format(self.fingerprint))
+                await self.update_workers()
+                # the workers don't need the previous model anymore
+                _remove_model_directory(self._previous_model_directory)
+                self._previous_model_directory = None
+
+
+def _remove_model_directory(model_directory: Optional[Text]) -> None:
+    if model_directory:
+        shutil.rmtree(model_directory, ignore_errors=True)
+
+
+def _response_headers(resp: aiohttp.ClientResponse) -> Dict[Text, Text]:
+    return {k: v for k, v in resp.headers.items()
+            if k.lower() not in HOP_BY_HOP_HEADERS and
+            k.lower() != "content-type"}
+
+
+def _buffered_response(resp: aiohttp.ClientResponse,
+                       body: bytes) -> response.HTTPResponse:
+    return response.raw(
+        body, status=resp.status, headers=_response_headers(resp),
+        content_type=resp.headers.get("Content-Type", "text/plain"))
+
+
+def _streamed_response(resp: aiohttp.ClientResponse,
+                       worker: Worker) -> response.StreamingHTTPResponse:
+    """Passes the body of a worker's response on chunk by chunk."""
+
+    async def stream(out):
+        try:
+            async for chunk in resp.content.iter_any():
+                await out.write(chunk)
+        except aiohttp.ClientError as e:
+            # the status is sent already, the client sees a cut off body
+            logger.error("Failed to stream the response of worker {}: {}"
+                         "".format(worker.index, e))
+        finally:
+            resp.release()
+
+    return response.stream(
+        stream, status=resp.status, headers=_response_headers(resp),
+        content_type=resp.headers.get("Content-Type", "text/plain"))
+
+
+def _merged_batch_response(
+        items: List[Dict[Text, Any]],
+        parts: List[Tuple[Worker, List[int], aiohttp.ClientResponse]]
+) -> response.StreamingHTTPResponse:
+    """Streams the results which the workers send for their parts of a
+    batch, with the indices of their items in the batch.
+
+    Items of a worker which fails before it sent their result get an
+    error result."""
+
+    results = asyncio.Queue()
+
+    async def read_part(worker, indices, resp):
+        done = set()
+        try:
+            async for line in resp.content:
+                if not line.strip():
+                    continue
+                result = json.loads(line.decode("utf-8"))
+                result["index"] = indices[result["index"]]
+                done.add(result["index"])
+                await results.put(result)
+        except (aiohttp.ClientError, ValueError, KeyError, IndexError) as e:
+            logger.error("Failed to read the batch results of worker {}: "
+                         "{}".format(worker.index, e))
+        finally:
+            resp.release()
+
+        for index in indices:
+            if index not in done:
+                await results.put({
+                    "index": index,
+                    "sender_id": batch.sender_id_of(items[index]),
+                    "error": "WorkerUnavailable",
+                    "message": "Worker {} didn't return the result."
+                               "".format(worker.index)})
+
+    async def stream(out):
+        tasks = [asyncio.ensure_future(read_part(*part)) for part in parts]
+        try:
+            for _ in range(len(items)):
+                await out.write(json.dumps(await results.get()) + "\n")
+        finally:
+            # the client disconnected or the batch is done
+            for task in tasks:
+                task.cancel()
+
+    return response.stream(stream, content_type=batch.NDJSON_CONTENT_TYPE)
+
+
+def _unavailable(worker: Worker) -> response.HTTPResponse:
+    return response.json({
+        "version": rasa.__version__,
+        "status": "failure",
+        "message": "Worker {} is not available.".format(worker.index),
+        "reason": "WorkerUnavailable",
+        "details": {},
+        "help": None,
+        "code": 503}, status=503)
+
+
+def create_router_app(pool: WorkerPool) -> Sanic:
+    """Server which forwards every request to the worker of its
+    conversation."""
+
+    app = Sanic(__name__, configure_logging=False)
+
+    @app.listener('before_server_start')
+    async def start_workers(app, loop):
+        await pool.start()
+        if hasattr(signal, "SIGHUP"):
+            loop.add_signal_handler(
+                signal.SIGHUP,
+                lambda: asyncio.ensure_future(pool.rolling_restart()))
+
+    @app.listener('after_server_stop')
+    async def stop_workers(app, loop):
+        await pool.stop()
+
+    async def route(request: Request, path: Text = ""):
+        if request.path.startswith(WORKER_ROUTE_PREFIX):
+            return response.text("Not found.", 404)
+
+        if request.path == "/model" and request.method == "POST":
+            return await pool.upload_model(request)
+
+        if request.path in BATCH_ITEM_KEYS and request.method == "POST":
+            return await pool.forward_batch(request,
+                                            BATCH_ITEM_KEYS[request.path])
+
+        worker = pool.worker_for(sender_id_from_request(request))
+        return await pool.forward(request, worker)
+
+    app.add_route(route, "/", methods=HTTP_METHODS)
+    app.add_route(route, "/<path:path>", methods=HTTP_METHODS)
+
+    return app
+
+
+def add_worker_routes(app: Sanic, token: Text) -> None:
+    """Routes which let the router check and update a worker."""
+    from rasa.core.agent import _load_and_set_updated_model
+
+    def is_router(request: Request) -> bool:
+        return request.headers.get(WORKER_TOKEN_HEADER) == token
+
+    @app.get(WORKER_ROUTE_PREFIX + "/status")
+    async def worker_status(request: Request):
+        if not is_router(request):
+            return response.text("", 401)
+
+        agent = getattr(app, "agent", None)
+        return response.json({
+            "model_fingerprint": agent.fingerprint if agent else None,
+            "is_ready": agent.is_ready() if agent else False
+        })
+
+    @app.post(WORKER_ROUTE_PREFIX + "/model")
+    async def worker_model(request: Request):
+        if not is_router(request):
+            return response.text("", 401)
+
+        _load_and_set_updated_model(app.agent,
+                                    request.json["model_directory"],
+                                    request.json["fingerprint"])
+        return response.text("", 204)
+
+
+# noinspection PyUnusedLocal
+async def load_worker_agent(core_model: Optional[Text],
+                            endpoints: AvailableEndpoints,
+                            nlu_model: Optional[Text],
+                            model_directory: Optional[Text],
+                            fingerprint: Optional[Text],
+                            app: Sanic,
+                            loop: Any,
+                            admission_controller: Optional[
+                                'AdmissionController'] = None):
+    """Loads the agent of a worker.
+
+    If the router passes a model directory, it replaces the core model."""
+    from rasa.core import run
+    from rasa.core.agent import Agent, _load_and_set_updated_model
+
+    if model_directory is None and core_model:
+        return await run.load_agent_on_start(core_model, endpoints,
+                                             nlu_model, app, loop,
+                                             admission_controller)
+
+    app.agent = Agent(**run.create_agent_components(nlu_model, endpoints,
+                                                    admission_controller))
+    if model_directory:
+        _load_and_set_updated_model(app.agent, model_directory, fingerprint)
+    app.agent.reminder_scheduler.start()
+    return app.agent
+
+
+def run_worker(config: Dict[Text, Any],
+               port: int,
+               token: Text,
+               model_directory: Optional[Text] = None,
+               fingerprint: Optional[Text] = None) -> None:
+    """Runs the server of a worker process."""
+    from rasa.core import run
+    from rasa.core.channels import RestInput
+
+    rasa.utils.configure_colored_logging(config["loglevel"])
+    executors.configure(**config["executor_settings"])
+    if hasattr(signal, "SIGHUP"):
+        # the router restarts the workers on SIGHUP, which is also sent to
+        # the workers if it is sent to the process group of the router
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    input_channels = run.create_http_input_channels(
+        config["channel"], config["credentials_file"])
+    # the console runs in the router, the worker only receives the
+    # messages of the console
+    input_channels = [RestInput() if c.name() == "cmdline" else c
+                      for c in input_channels]
+
+    app = run.configure_app(input_channels,
+                            config["cors"],
+                            config["auth_token"],
+                            config["enable_api"],
+                            config["jwt_secret"],
+                            config["jwt_method"],
+                            port=port,
+                            enable_metrics=config["enable_metrics"])
+    add_worker_routes(app, token)
+
+    app.register_listener(
+        partial(load_worker_agent, config["core_model"], config["endpoints"],
+                config["nlu_model"], model_directory, fingerprint,
+                admission_controller=config["admission_controller"]),
+        'before_server_start')
+    app.run(host='127.0.0.1', port=port,
+            access_log=logger.isEnabledFor(logging.DEBUG))
+
+
+def serve_with_workers(num_workers: int,
+                       core_model: Optional[Text] = None,
+                       nlu_model: Optional[Text] = None,
+                       channel: Optional[Text] = None,
+                       port: int = constants.DEFAULT_SERVER_PORT,
+                       credentials_file: Optional[Text] = None,
+                       cors: Any = None,
+                       auth_token: Optional[Text] = None,
+                       enable_api: bool = True,
+                       jwt_secret: Optional[Text] = None,
+                       jwt_method: Optional[Text] = None,
+                       endpoints: Optional[AvailableEndpoints] = None,
+                       enable_metrics: bool = False,
+                       admission_controller: Optional[
+                           'AdmissionController'] = None,
+                       executor_settings: Optional[Dict[Text, Any]] = None
+                       ) -> None:
+    """Serves the bot with several worker processes behind a router.
+
+    The workers listen on the ports following `port` on localhost. If a
+    model server is configured, the router pulls the model and passes it
+    to the workers. Every worker gets its own copy of the admission
+    controller and its own executors, configured by the keyword arguments
+    of `executors.configure` in `executor_settings`."""
+    from rasa.core import run
+
+    endpoints = endpoints or AvailableEndpoints()
+
+    unroutable = unroutable_channels(channel, credentials_file)
+    if unroutable and not (_is_shared(endpoints.tracker_store) and
+                           _is_shared(endpoints.lock_store)):
+        logger.warning("The router can't find the conversation of requests "
+                       "of the input channels {}, they are spread across "
+                       "the workers. Every worker keeps its own trackers "
+                       "and locks, so the messages of a conversation are "
+                       "processed with different trackers and in the "
+                       "wrong order. Configure a shared tracker store and "
+                       "a RedisLockStore in the endpoint configuration or "
+                       "use a single worker.".format(", ".join(unroutable)))
+
+    worker_endpoints = copy.copy(endpoints)
+    worker_endpoints.model = None
+
+    config = {"core_model": core_model,
+              "nlu_model": nlu_model,
+              "channel": channel,
+              "credentials_file": credentials_file,
+              "cors": cors,
+              "auth_token": auth_token,
+              "enable_api": enable_api,
+              "jwt_secret": jwt_secret,
+              "jwt_method": jwt_method,
+              "endpoints": worker_endpoints,
+              "enable_metrics": enable_metrics,
+              "admission_controller": admission_controller,
+              "executor_settings": executor_settings or {},
+              "loglevel": logging.getLogger().level}
+
+    workers = [Worker(i, "http://127.0.0.1:{}".format(port + 1 + i))
+               for i in range(num_workers)]
+    pool = WorkerPool(workers, uuid.uuid4().hex, config, endpoints.model)
+    app = create_router_app(pool)
+
+    if channel == "cmdline":
+        run.add_cmdline_io(app, port)
+
+    logger.info("Starting Rasa Core server with {} workers on {}"
+                "".format(num_workers,
+                          constants.DEFAULT_SERVER_FORMAT.format(port)))
+
+    app.run(host='0.0.0.0', port=port,
+            access_log=logger.isEnabledFor(logging.DEBUG))
@@ -16,6 +16,11 @@ logger = logging.getLogger(__name__)
 
 FINGERPRINT_FILE_PATH = "fingerprint.json"
 
+# lists the files of an uncompressed model package
+PACKAGE_INDEX_FILE_PATH = "package_index.json"
+
+PACKAGE_FORMAT_VERSION = 1
+
 FINGERPRINT_CONFIG_KEY = "config"
 FINGERPRINT_DOMAIN_KEY = "domain"
 FINGERPRINT_NLU_VERSION_KEY = "nlu_version"
@@ -39,7 +44,7 @@ def get_model(model_path: Text = DEFAULT_MODELS_PATH) -> Optional[Text]:
     """
     if not model_path:
         return None
-    elif os.path.isdir(model_path):
+    elif os.path.isdir(model_path) and not is_uncompressed_package(model_path):
         model_path = get_latest_model(model_path)
 
     return unpack_model(model_path)
@@ -49,7 +54,8 @@ def get_latest_model(model_path: Text = DEFAULT_MODELS_PATH) -> Optional[Text]:
     """Gets the latest model from a path.
 
     Args:
-        model_path: Path to a directory containing zipped models.
+        model_path: Path to a directory containing zipped models or
+                    uncompressed model packages.
 
     Returns:
         Path to latest model in the given directory.
@@ -59,6 +65,8 @@ def get_latest_model(model_path: Text = DEFAULT_MODELS_PATH) -> Optional[Text]:
         model_path = os.path.dirname(model_path)
 
     list_of_files = glob.glob(os.path.join(model_path, "*.tar.gz"))
+    list_of_files += [p for p in glob.glob(os.path.join(model_path, "*"))
+                      if is_uncompressed_package(p)]
 
     if len(list_of_files) == 0:
         return None
@@ -113,8 +121,11 @@ def unpack_model(model_file: Text, working_directory: Optional[Text] = None
                  ) -> Text:
     """Unpacks a zipped Rasa model.
 
+    Uncompressed model packages are not extracted, they are loaded in
+    place unless a `working_directory` is given.
+
     Args:
-        model_file: Path to zipped model.
+        model_file: Path to zipped model or uncompressed model package.
         working_directory: Location where the model should be unpacked to.
                            If `None` a temporary directory will be created.
 
@@ -124,6 +135,20 @@ def unpack_model(model_file: Text, working_directory: Optional[Text] = None
     """
     import tarfile
 
+    if is_uncompressed_package(model_file):
+        validate_uncompressed_package(model_file)
+        if working_directory is None:
+            return model_file
+
+        working_directory = str(working_directory)
+        for elem in os.scandir(model_file):
+            target = os.path.join(working_directory, elem.name)
+            if elem.is_dir():
+                shutil.copytree(elem.path, target)
+            else:
+                shutil.copy2(elem.path, target)
+        return working_directory
+
     if working_directory is None:
         working_directory = tempfile.mkdtemp()
 
@@ -140,6 +165,81 @@ def unpack_model(model_file: Text, working_directory: Optional[Text] = None
     return working_directory
 
 
+def is_uncompressed_package(path: Text) -> bool:
+    """Checks whether `path` is an uncompressed model package."""
+
+    return os.path.isfile(os.path.join(path, PACKAGE_INDEX_FILE_PATH))
+
+
+def create_uncompressed_package(training_directory: Text,
+                                output_path: Text) -> Text:
+    """Creates an uncompressed model package from trained model files.
+
+    The package is a directory with an index of the contained files. It
+    is loaded in place without extracting it, so large files like the
+    memorized turns of the memoization policies are memory mapped
+    directly from the package and shared between processes.
+
+    Args:
+        training_directory: Path to the directory which contains the trained
+                            model files.
+        output_path: Path of the package, a `.tar.gz` suffix is removed.
+
+    Returns:
+        Path to the model package.
+    """
+    from rasa.core.utils import dump_obj_as_json_to_file
+
+    if output_path.endswith(".tar.gz"):
+        output_path = output_path[:-len(".tar.gz")]
+
+    files = {}
+    for root, _, file_names in os.walk(training_directory):
+        for f in file_names:
+            path = os.path.join(root, f)
+            files[os.path.relpath(path, training_directory)] = \
+                os.path.getsize(path)
+
+    dump_obj_as_json_to_file(
+        os.path.join(training_directory, PACKAGE_INDEX_FILE_PATH),
+        {"format_version": PACKAGE_FORMAT_VERSION, "files": files})
+
+    shutil.move(training_directory, output_path)
+    return output_path
+
+
+def validate_uncompressed_package(package_path: Text) -> None:
+    """Checks that all files of the package index exist with their size.
+
+    Raises:
+        ValueError: if the package is incomplete.
+    """
+    from rasa.core.utils import read_json_file
+
+    index = read_json_file(os.path.join(package_path,
+                                        PACKAGE_INDEX_FILE_PATH))
+    if index.get("format_version") != PACKAGE_FORMAT_VERSION:
+        raise ValueError("Model package '{}' has the unsupported format "
+                         "version {}.".format(package_path,
+                                              index.get("format_version")))
+
+    for name, size in index["files"].items():
+        path = os.path.join(package_path, name)
+        if not os.path.isfile(path) or os.path.getsize(path) != size:
+            raise ValueError("Model package '{}' is incomplete, the file "
+                             "'{}' is missing or was changed."
+                             "".format(package_path, name))
+
+
+def remove_unpacked_model(unpacked_model_path: Text) -> None:
+    """Removes a model which was unpacked with `unpack_model`.
+
+    Uncompressed model packages are loaded in place and not removed."""
+
+    if not is_uncompressed_package(unpacked_model_path):
+        shutil.rmtree(unpacked_model_path)
+
+
 def get_model_subdirectories(unpacked_model_path: Text) -> Tuple[Text, Text]:
     """Returns paths for core and nlu model directories.
 
@@ -154,7 +254,8 @@ def get_model_subdirectories(unpacked_model_path: Text) -> Tuple[Text, Text]:
 
 
 def create_package_rasa(training_directory: Text, output_filename: Text,
-                        fingerprint: Optional[Fingerprint] = None) -> Text:
+                        fingerprint: Optional[Fingerprint] = None,
+                        compress: bool = True) -> Text:
     """Creates a zipped Rasa model from trained model files.
 
     Args:
@@ -162,6 +263,8 @@ def create_package_rasa(training_directory: Text, output_filename: Text,
                             model files.
         output_filename: Name of the zipped model file to be created.
         fingerprint: A unique fingerprint to identify the model version.
+        compress: If `False` an uncompressed model package is created
+                  instead, see `create_uncompressed_package`.
 
     Returns:
         Path to zipped model.
@@ -176,6 +279,10 @@ def create_package_rasa(training_directory: Text, output_filename: Text,
     if not os.path.exists(output_directory):
         os.makedirs(output_directory)
 
+    if not compress:
+        return create_uncompressed_package(training_directory,
+                                           output_filename)
+
     with tarfile.open(output_filename, "w:gz") as tar:
         for elem in os.scandir(training_directory):
             tar.add(elem.path, arcname=elem.name)
@@ -1,11 +1,11 @@
 import logging
 import os
-import shutil
 import typing
 from typing import Dict, Text
 
 from rasa.cli.utils import minimal_kwargs
-from rasa.model import get_model, get_model_subdirectories
+from rasa.model import (
+    get_model, get_model_subdirectories, remove_unpacked_model)
 
 logger = logging.getLogger(__name__)
 
@@ -49,14 +49,18 @@ def run(model: Text, endpoints: Text, connector: Text = None,
                                     credentials_file=credentials,
                                     endpoints=_endpoints,
                                     **kwargs)
-    shutil.rmtree(model_path)
+    remove_unpacked_model(model_path)
 
 
 def create_agent(model: Text,
                  endpoints: Text = None) -> 'Agent':
+    from rasa.core.agent import Agent
     from rasa.core.interpreter import RasaNLUInterpreter
     from rasa.core.tracker_store import TrackerStore
     from rasa.core import broker
+    from rasa.core.lock_store import LockStore
+    from rasa.core.parse_cache import ParseCache
+    from rasa.core.reminders import ReminderStore
     from rasa.core.utils import AvailableEndpoints
 
     core_path, nlu_path = get_model_subdirectories(model)
@@ -75,7 +79,15 @@ def create_agent(model: Text,
                                                      _endpoints.tracker_store,
                                                      _broker)
 
+    _lock_store = LockStore.find_lock_store(_endpoints.lock_store)
+    _reminder_store = ReminderStore.find_reminder_store(
+        _endpoints.reminder_store)
+    _parse_cache = ParseCache.find_parse_cache(_endpoints.parse_cache)
+
     return Agent.load(core_path,
                       generator=_endpoints.nlg,
                       tracker_store=_tracker_store,
-                      action_endpoint=_endpoints.action)
+                      action_endpoint=_endpoints.action,
+                      lock_store=_lock_store,
+                      reminder_store=_reminder_store,
+                      parse_cache=_parse_cache)
@@ -34,9 +34,9 @@ def test_core(model: Text, stories: Text, endpoints: Text = None,
     if os.path.isfile(model):
         model_path = get_model(model)
 
+    loop = asyncio.get_event_loop()
     if model_path:
         # Single model: Normal evaluation
-        loop = asyncio.get_event_loop()
         model_path = get_model(model)
         core_path, nlu_path = get_model_subdirectories(model_path)
 
@@ -52,7 +52,9 @@ def test_core(model: Text, stories: Text, endpoints: Text = None,
     else:
         from rasa.core.test import compare, plot_curve
 
-        compare(model, stories, output)
+        loop.run_until_complete(
+            compare(model, stories, output,
+                    num_workers=kwargs.get("num_workers", 1)))
 
         story_n_path = os.path.join(model, 'num_stories.json')
 
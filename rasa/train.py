@@ -2,7 +2,7 @@ import asyncio
 import os
 import tempfile
 import typing
-from typing import Text, Optional, List, Union
+from typing import Text, Optional, List, Union, Dict
 
 from rasa import model, data
 from rasa.cli.utils import create_output_path, print_success
@@ -16,17 +16,22 @@ def train(domain: Text,
           config: Text,
           training_files: Union[Text, List[Text]],
           output: Text = DEFAULT_MODELS_PATH,
-          force_training: bool = False) -> Optional[Text]:
+          force_training: bool = False,
+          kwargs: Optional[Dict] = None,
+          uncompressed: bool = False) -> Optional[Text]:
     loop = asyncio.get_event_loop()
     return loop.run_until_complete(train_async(domain, config, training_files,
-                                               output, force_training))
+                                               output, force_training,
+                                               kwargs, uncompressed))
 
 
 async def train_async(domain: Text,
                       config: Text,
                       training_files: Union[Text, List[Text]],
                       output: Text = DEFAULT_MODELS_PATH,
-                      force_training: bool = False) -> Optional[Text]:
+                      force_training: bool = False,
+                      kwargs: Optional[Dict] = None,
+                      uncompressed: bool = False) -> Optional[Text]:
     """Trains a Rasa model (Core and NLU).
 
     Args:
@@ -35,6 +40,9 @@ async def train_async(domain: Text,
         training_files: Paths to the training data for Core and NLU.
         output: Output path.
         force_training: If `True` retrain model even if data has not changed.
+        kwargs: Additional training parameters for Core.
+        uncompressed: If `True` the model is stored as an uncompressed
+            model package instead of an archive.
 
     Returns:
         Path of the trained model archive.
@@ -44,6 +52,7 @@ async def train_async(domain: Text,
     old_model = model.get_latest_model(output)
     retrain_core = True
     retrain_nlu = True
+    old_core = None
 
     story_directory, nlu_data_directory = data.get_core_nlu_directories(
         training_files)
@@ -51,7 +60,9 @@ async def train_async(domain: Text,
                                               nlu_data_directory,
                                               story_directory)
     if not force_training and old_model:
-        unpacked = model.unpack_model(old_model)
+        # parts of the old model are moved into the new one, so
+        # uncompressed packages have to be copied
+        unpacked = model.unpack_model(old_model, tempfile.mkdtemp())
         old_core, old_nlu = model.get_model_subdirectories(unpacked)
         last_fingerprint = model.fingerprint_from_path(unpacked)
 
@@ -65,8 +76,10 @@ async def train_async(domain: Text,
             retrain_nlu = not model.merge_model(old_nlu, target_path)
 
     if force_training or retrain_core:
+        # policies which did not change are copied from the old model
         await train_core_async(domain, config, story_directory,
-                               output, train_path)
+                               output, train_path, kwargs,
+                               previous_model_path=old_core)
     else:
         print("Dialogue data / configuration did not change. "
               "No need to retrain dialogue model.")
@@ -79,7 +92,9 @@ async def train_async(domain: Text,
 
     if retrain_core or retrain_nlu:
         output = create_output_path(output)
-        model.create_package_rasa(train_path, output, new_fingerprint)
+        output = model.create_package_rasa(train_path, output,
+                                           new_fingerprint,
+                                           compress=not uncompressed)
 
         print("Train path: '{}'.".format(train_path))
 
@@ -97,17 +112,24 @@ def train_core(domain: Text,
                config: Text,
                stories: Text,
                output: Text,
-               train_path: Optional[Text]) -> Optional[Text]:
+               train_path: Optional[Text],
+               kwargs: Optional[Dict] = None,
+               previous_model_path: Optional[Text] = None) -> Optional[Text]:
     loop = asyncio.get_event_loop()
     return loop.run_until_complete(train_core_async(domain, config, stories,
-                                                    output, train_path))
+                                                    output, train_path,
+                                                    kwargs,
+                                                    previous_model_path))
 
 
 async def train_core_async(domain: Text,
                            config: Text,
                            stories: Text,
                            output: Text,
-                           train_path: Optional[Text]) -> Optional[Text]:
+                           train_path: Optional[Text],
+                           kwargs: Optional[Dict] = None,
+                           previous_model_path: Optional[Text] = None
+                           ) -> Optional[Text]:
     """Trains a Core model.
 
     Args:
@@ -117,6 +139,10 @@ async def train_core_async(domain: Text,
         output: Output path.
         train_path: If `None` the model will be trained in a temporary
             directory, otherwise in the provided directory.
+        kwargs: Additional training parameters, e.g. `cache_dir`.
+        previous_model_path: Path to the unpacked Core model of a previous
+            training. Policies whose configuration and training data did
+            not change are taken from this model instead of being retrained.
 
     Returns:
         If `train_path` is given it returns the path to the model archive,
@@ -129,7 +155,9 @@ async def train_core_async(domain: Text,
     core_model = await rasa.core.train(
         domain_file=domain, stories_file=stories,
         output_path=os.path.join(train_path, "core"),
-        policy_config=config)
+        policy_config=config,
+        kwargs=kwargs,
+        previous_model_path=previous_model_path)
 
     if not train_path:
         # Only Core was trained.
@@ -95,7 +95,7 @@ setup(
         "Programming Language :: Python :: 3.7",
         "Topic :: Software Development :: Libraries",
     ],
-    packages=find_packages(exclude=["tests", "tools"]),
+    packages=find_packages(exclude=["tests", "tools", "benchmarks"]),
     entry_points={
         'console_scripts': ['rasa=rasa.__main__:main'],
     },
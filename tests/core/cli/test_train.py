@@ -0,0 +1,24 @@
+import argparse
+
+import rasa
+import rasa.cli.interactive as interactive
+import rasa.cli.train as train
+
+
+def test_interactive_trains_with_default_core_arguments(monkeypatch):
+    parser = argparse.ArgumentParser()
+    interactive.add_subparser(parser.add_subparsers(), parents=[])
+    args = parser.parse_args(["interactive",
+                              "--domain", "data/test_domains/default.yml",
+                              "--config",
+                              "data/test_config/max_hist_config.yml",
+                              "--data",
+                              "data/test_stories/stories_defaultdomain.md"])
+
+    calls = []
+    monkeypatch.setattr(rasa, "train",
+                        lambda *args: calls.append(args) or "model.tar.gz")
+
+    assert train.train(args) == "model.tar.gz"
+    core_arguments = calls[0][5]
+    assert core_arguments == {"cache_dir": None, "num_workers": 1}
@@ -128,12 +128,13 @@ async def default_processor(default_domain, default_nlg):
 
     training_data = await agent.load_data(DEFAULT_STORIES_FILE)
     agent.train(training_data)
-    tracker_store = InMemoryTrackerStore(default_domain)
+    # reminders are fired by the agent, which uses its own tracker store
     return MessageProcessor(agent.interpreter,
                             agent.policy_ensemble,
                             default_domain,
-                            tracker_store,
-                            default_nlg)
+                            agent.tracker_store,
+                            default_nlg,
+                            reminder_scheduler=agent.reminder_scheduler)
 
 
 @pytest.fixture(scope="session")
@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from rasa.core.admission import AdmissionController
+from rasa.core.agent import Agent
+from rasa.core.channels import CollectingOutputChannel, UserMessage
+from rasa.core.channels.channel import InputChannel
+from rasa.core.exceptions import OverloadedError
+from rasa.core.interpreter import RegexInterpreter
+from rasa.core.policies.memoization import MemoizationPolicy
+from tests.core.conftest import DEFAULT_STORIES_FILE
+
+
+async def _turn(controller, processed, i, duration=0.01):
+    async with controller.admit():
+        processed.append(("start", i))
+        await asyncio.sleep(duration)
+        processed.append(("end", i))
+
+
+async def _run_turns(controller, processed, durations):
+    # `asyncio.gather` doesn't start its coroutines in order
+    tasks = [asyncio.ensure_future(_turn(controller, processed, i, d))
+             for i, d in enumerate(durations)]
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def test_waiting_turns_are_admitted_in_order():
+    controller = AdmissionController(max_concurrent_turns=1)
+    processed = []
+
+    await _run_turns(controller, processed, [0.01] * 3)
+
+    assert processed == [("start", 0), ("end", 0),
+                         ("start", 1), ("end", 1),
+                         ("start", 2), ("end", 2)]
+    assert controller.num_processing == 0
+    assert controller.num_queued == 0
+    assert controller.num_queued_total == 2
+
+
+async def test_turns_are_rejected_if_queue_is_full():
+    controller = AdmissionController(max_concurrent_turns=1,
+                                     max_queued_turns=1)
+    processed = []
+
+    results = await _run_turns(controller, processed, [0.01] * 3)
+
+    assert isinstance(results[2], OverloadedError)
+    assert processed == [("start", 0), ("end", 0),
+                         ("start", 1), ("end", 1)]
+    assert controller.num_shed == 1
+
+
+async def test_turns_are_rejected_after_max_queue_time():
+    controller = AdmissionController(max_concurrent_turns=1,
+                                     max_queue_time=0.01,
+                                     fallback_utterance="Busy, sorry!")
+    processed = []
+
+    results = await _run_turns(controller, processed, [0.05, 0.01])
+
+    assert isinstance(results[1], OverloadedError)
+    assert results[1].fallback_utterance == "Busy, sorry!"
+    assert processed == [("start", 0), ("end", 0)]
+    assert controller.num_processing == 0
+    assert controller.num_queued == 0
+
+
+async def test_cancelled_turn_frees_its_place():
+    controller = AdmissionController(max_concurrent_turns=1)
+    processed = []
+
+    first = asyncio.ensure_future(_turn(controller, processed, 0))
+    second = asyncio.ensure_future(_turn(controller, processed, 1))
+    await asyncio.sleep(0)
+    second.cancel()
+    await first
+
+    with pytest.raises(asyncio.CancelledError):
+        await second
+    assert controller.num_processing == 0
+    assert controller.num_queued == 0
+
+
+def test_adaptive_limit():
+    controller = AdmissionController(max_concurrent_turns=10,
+                                     adaptive=True,
+                                     min_concurrent_turns=2,
+                                     target_latency=0.1)
+
+    # slow turns decrease the limit down to the minimum
+    for _ in range(50):
+        controller.num_processing += 1
+        controller.release(1.0)
+    assert int(controller.limit) == 2
+
+    # fast turns increase it while turns are waiting for a free place
+    controller.latency = 0.0
+    controller._waiters.append(asyncio.Future())
+    for _ in range(100):
+        controller.num_processing = 11
+        controller.release(0.0)
+    assert int(controller.limit) == 10
+
+
+async def test_agent_rejects_turns_if_overloaded(default_domain):
+    controller = AdmissionController(max_concurrent_turns=1,
+                                     max_queued_turns=0)
+    agent = Agent(default_domain,
+                  policies=[MemoizationPolicy()],
+                  interpreter=RegexInterpreter(),
+                  admission_controller=controller)
+    agent.train(await agent.load_data(DEFAULT_STORIES_FILE))
+
+    # another turn is processed
+    await controller.acquire()
+    with pytest.raises(OverloadedError):
+        await agent.handle_message(UserMessage("/greet", sender_id="user"))
+
+    controller.release(None)
+    responses = await agent.handle_message(UserMessage("/greet",
+                                                       sender_id="user"))
+    assert responses[0]["text"].startswith("hey there")
+    assert controller.num_processing == 0
+
+
+async def test_channel_sends_fallback_utterance_if_overloaded():
+    output = CollectingOutputChannel()
+    message = UserMessage("hi", output, sender_id="some user")
+
+    await InputChannel().on_overload(
+        message, OverloadedError("Overloaded.", "Busy, sorry!"))
+    assert output.latest_output()["text"] == "Busy, sorry!"
+
+
+async def test_channel_drops_message_without_fallback_utterance():
+    output = CollectingOutputChannel()
+    message = UserMessage("hi", output, sender_id="some user")
+
+    await InputChannel().on_overload(message, OverloadedError("Overloaded."))
+    assert output.messages == []
+
+
+async def test_rest_stream_ends_if_overloaded():
+    from rasa.core.channels.channel import RestInput
+
+    async def on_new_message(message):
+        raise OverloadedError("Overloaded.")
+
+    written = []
+
+    class Response(object):
+        async def write(self, data):
+            written.append(data)
+
+    stream = RestInput().stream_response(on_new_message, "hi", "some user")
+    await asyncio.wait_for(stream(Response()), timeout=5)
+
+    assert len(written) == 1
+    assert '"reason": "Overloaded"' in written[0]
@@ -787,3 +787,86 @@ def test_register_channel_without_route():
     routes_list = utils.list_routes(app)
     assert routes_list.get("custom_webhook_RestInput.receive").startswith(
         "/webhook")
+
+
+def _message_queue_channel(max_in_flight=2):
+    from rasa.core.channels.message_queue import MessageQueueInput
+
+    return MessageQueueInput.from_credentials({"type": "in_memory",
+                                               "max_in_flight": max_in_flight})
+
+
+async def _consume_until_acked(channel, on_new_message, num_messages):
+    import asyncio
+
+    channel.start(on_new_message)
+    while len(channel.message_queue.acked) < num_messages:
+        await asyncio.sleep(0.01)
+    await channel.stop()
+
+
+async def test_message_queue_channel_orders_conversations():
+    import asyncio
+
+    channel = _message_queue_channel(max_in_flight=2)
+    for i in range(3):
+        for sender in ["a", "b", "c"]:
+            channel.message_queue.put({"sender": sender,
+                                       "message": str(i)})
+
+    processed = []
+    in_flight = set()
+    max_in_flight = []
+
+    async def on_new_message(message):
+        in_flight.add(message.sender_id)
+        max_in_flight.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        processed.append((message.sender_id, message.text))
+        in_flight.discard(message.sender_id)
+
+    await _consume_until_acked(channel, on_new_message, 9)
+
+    assert max(max_in_flight) == 2
+    for sender in ["a", "b", "c"]:
+        assert [text for s, text in processed if s == sender] == [
+            "0", "1", "2"]
+    assert channel.conversations == {}
+
+
+async def test_message_queue_channel_dead_letters_failed_turns():
+    from rasa.core.channels.message_queue import ERROR_HEADER
+
+    channel = _message_queue_channel()
+    channel.message_queue.put({"sender": "a", "message": "fail"})
+    channel.message_queue.put({"sender": "a", "message": "hi"})
+    channel.message_queue.put({"message": "without sender"})
+
+    async def on_new_message(message):
+        if message.text == "fail":
+            raise ValueError("turn failed")
+
+    await _consume_until_acked(channel, on_new_message, 3)
+
+    dead_letters = channel.message_queue.messages(
+        channel.message_queue.dead_letter_queue)
+    reasons = [dead_letters.get_nowait().headers[ERROR_HEADER]
+               for _ in range(dead_letters.qsize())]
+    assert sorted(reasons) == ["InvalidMessage", "ValueError: turn failed"]
+
+
+async def test_message_queue_channel_publishes_responses(default_agent):
+    from rasa.core.channels.message_queue import DEFAULT_OUTPUT_QUEUE
+
+    channel = _message_queue_channel()
+    channel.message_queue.put({"sender": "queue_user", "message": "/greet"})
+
+    await _consume_until_acked(channel, default_agent.handle_message, 1)
+
+    tracker = default_agent.tracker_store.retrieve("queue_user")
+    assert tracker.latest_message.text == "/greet"
+
+    responses = channel.message_queue.messages(DEFAULT_OUTPUT_QUEUE)
+    response = json.loads(responses.get_nowait().body.decode("utf-8"))
+    assert response["recipient_id"] == "queue_user"
+    assert response["text"].startswith("hey there")
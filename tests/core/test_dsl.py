@@ -1,5 +1,6 @@
 import io
 import os
+import re
 
 import json
 from collections import Counter
@@ -8,6 +9,8 @@ import numpy as np
 
 from rasa.core import training
 from rasa.core.events import ActionExecuted, UserUttered
+from rasa.core.interpreter import NaturalLanguageInterpreter
+from rasa.core.training.dsl import StoryFileReader
 from rasa.core.training.structures import Story
 from rasa.core.featurizers import (
     MaxHistoryTrackerFeaturizer,
@@ -264,3 +267,84 @@ async def test_load_training_data_handles_hidden_files(tmpdir, default_domain):
 
     assert len(data.X) == 0
     assert len(data.y) == 0
+
+
+async def test_read_stories_in_worker_processes(default_domain):
+    story_steps = await StoryFileReader.read_from_folder(
+        "data/test_multifile_stories", default_domain)
+    parallel_steps = await StoryFileReader.read_from_folder(
+        "data/test_multifile_stories", default_domain, num_workers=2)
+
+    def story_strings(steps):
+        # generated checkpoint names are random
+        return [re.sub(r"GENR_OR_\w+", "GENR_OR", s.as_story_string())
+                for s in steps]
+
+    assert story_strings(story_steps) == story_strings(parallel_steps)
+
+
+def test_split_story_file_into_chunks():
+    lines = ["## story 1\n", "* greet\n", "  - utter_greet\n",
+             "## story 2\n", "* default\n",
+             "## story 3\n", "* goodbye\n"]
+
+    chunks = StoryFileReader._split_into_chunks("stories.md", lines, 3)
+
+    assert [(offset, chunk_lines[0]) for _, offset, chunk_lines in chunks] == \
+        [(0, "## story 1\n"), (3, "## story 2\n"), (5, "## story 3\n")]
+    assert sum(len(chunk_lines) for _, _, chunk_lines in chunks) == len(lines)
+
+
+class CountingInterpreter(NaturalLanguageInterpreter):
+    def __init__(self, intent="greet"):
+        self.intent = intent
+        self.parsed = []
+
+    async def parse(self, text, message_id=None):
+        self.parsed.append(text)
+        return {"text": text,
+                "intent": {"name": self.intent, "confidence": 1.0},
+                "entities": []}
+
+
+async def test_interpreter_parses_every_message_once(tmpdir, default_domain):
+    story_file = os.path.join(tmpdir.strpath, "stories.md")
+    with io.open(story_file, "w") as f:
+        f.write("## story 1\n"
+                "* greet: hello\n"
+                "  - utter_greet\n"
+                "## story 2\n"
+                "* greet: hello\n"
+                "  - utter_greet\n"
+                "* default: hello\n")
+
+    interpreter = CountingInterpreter()
+    story_steps = await StoryFileReader.read_from_folder(
+        story_file, default_domain, interpreter, use_e2e=True)
+
+    assert interpreter.parsed == ["hello"]
+
+    utterances = [e for s in story_steps for e in s.events
+                  if isinstance(e, UserUttered)]
+    assert [u.parse_data["true_intent"] for u in utterances] == \
+        ["greet", "greet", "default"]
+
+
+async def test_parse_memo_is_not_shared_between_interpreters(tmpdir,
+                                                             default_domain):
+    story_file = os.path.join(tmpdir.strpath, "stories.md")
+    with io.open(story_file, "w") as f:
+        f.write("## story 1\n"
+                "* greet: hello\n"
+                "  - utter_greet\n")
+
+    parse_cache = {}
+    for intent in ["greet", "default"]:
+        interpreter = CountingInterpreter(intent)
+        story_steps = await StoryFileReader.read_from_file(
+            story_file, default_domain, interpreter, use_e2e=True,
+            parse_cache=parse_cache)
+
+        assert interpreter.parsed == ["hello"]
+        utterance = story_steps[0].events[0]
+        assert utterance.parse_data["intent"]["name"] == intent
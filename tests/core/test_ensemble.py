@@ -1,5 +1,11 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
 import pytest
 
+from rasa.core import policies
 from rasa.core.policies import Policy
 from rasa.core.policies.ensemble import (PolicyEnsemble, InvalidPolicyConfig,
                                          SimplePolicyEnsemble)
@@ -149,3 +155,137 @@ def test_valid_policy_configurations(valid_config):
 def test_invalid_policy_configurations(invalid_config):
     with pytest.raises(InvalidPolicyConfig):
         PolicyEnsemble.from_dict(invalid_config)
+
+
+def test_fingerprint_policies():
+    config = {"policies": [{"name": "MemoizationPolicy", "max_history": 3},
+                           {"name": "KerasPolicy"}]}
+    ensemble = SimplePolicyEnsemble([WorkingPolicy()])
+
+    fingerprints = ensemble.fingerprint_policies(config, "data")
+    assert len(fingerprints) == 2
+    assert fingerprints == PolicyEnsemble.fingerprint_policies(config, "data")
+    assert ensemble.policy_fingerprints is None
+
+    config["policies"][0]["max_history"] = 5
+    changed = PolicyEnsemble.fingerprint_policies(config, "data")
+    assert changed[0] != fingerprints[0]
+    assert changed[1] == fingerprints[1]
+    assert PolicyEnsemble.fingerprint_policies(config, "other") != changed
+
+
+class FailingPolicy(WorkingPolicy):
+    def train(self, training_trackers, domain, **kwargs):
+        raise ValueError("Training failed on purpose.")
+
+
+class DyingPolicy(WorkingPolicy):
+    def train(self, training_trackers, domain, **kwargs):
+        os._exit(3)
+
+
+async def test_parallel_training(default_domain, tmpdir):
+    from rasa.core import training
+    from rasa.core.policies.keras_policy import KerasPolicy
+    from rasa.core.policies.memoization import MemoizationPolicy
+    from tests.core.conftest import DEFAULT_STORIES_FILE
+
+    trackers = await training.load_data(DEFAULT_STORIES_FILE, default_domain,
+                                        augmentation_factor=0)
+    ensemble = SimplePolicyEnsemble([MemoizationPolicy(max_history=3),
+                                     KerasPolicy(epochs=1)])
+    ensemble.train(trackers, default_domain, num_workers=2)
+
+    assert ensemble.policies[0].lookup
+    assert ensemble.policies[1].model is not None
+
+    ensemble.persist(tmpdir.strpath)
+    loaded = PolicyEnsemble.load(tmpdir.strpath)
+    assert loaded.policies[0].lookup == ensemble.policies[0].lookup
+
+    tracker = trackers[0]
+    probabilities, _ = ensemble.probabilities_using_best_policy(
+        tracker, default_domain)
+    assert len(probabilities) == default_domain.num_actions
+
+
+async def test_predict_batch(default_domain):
+    from rasa.core import training
+    from rasa.core.policies.fallback import FallbackPolicy
+    from rasa.core.policies.keras_policy import KerasPolicy
+    from rasa.core.policies.memoization import MemoizationPolicy
+    from tests.core.conftest import DEFAULT_STORIES_FILE
+
+    trackers = await training.load_data(DEFAULT_STORIES_FILE, default_domain,
+                                        augmentation_factor=0)
+    ensemble = SimplePolicyEnsemble([MemoizationPolicy(max_history=3),
+                                     KerasPolicy(epochs=1),
+                                     FallbackPolicy()])
+    ensemble.train(trackers, default_domain)
+
+    predictions = ensemble.predict_batch(trackers, default_domain)
+
+    assert len(predictions) == len(trackers)
+    for tracker, (probabilities, policy_name) in zip(trackers, predictions):
+        expected, expected_policy_name = \
+            ensemble.probabilities_using_best_policy(tracker, default_domain)
+        assert policy_name == expected_policy_name
+        assert np.allclose(probabilities, expected, atol=1e-6)
+
+
+async def test_parallel_training_reports_failed_policies(default_domain):
+    from rasa.core import training
+    from rasa.core.exceptions import PolicyTrainingError
+    from tests.core.conftest import DEFAULT_STORIES_FILE
+
+    trackers = await training.load_data(DEFAULT_STORIES_FILE, default_domain,
+                                        augmentation_factor=0)
+    ensemble = PolicyEnsemble([WorkingPolicy(priority=1),
+                               FailingPolicy(priority=2)])
+
+    with pytest.raises(PolicyTrainingError) as execinfo:
+        ensemble.train(trackers, default_domain, num_workers=2)
+
+    assert list(execinfo.value.errors) == ["policy_1_FailingPolicy"]
+    assert "Training failed on purpose." in \
+        execinfo.value.errors["policy_1_FailingPolicy"]
+
+
+async def test_parallel_training_reports_dead_workers(default_domain):
+    from rasa.core import training
+    from rasa.core.exceptions import PolicyTrainingError
+    from tests.core.conftest import DEFAULT_STORIES_FILE
+
+    trackers = await training.load_data(DEFAULT_STORIES_FILE, default_domain,
+                                        augmentation_factor=0)
+    ensemble = PolicyEnsemble([DyingPolicy(priority=1),
+                               WorkingPolicy(priority=2)])
+
+    with pytest.raises(PolicyTrainingError) as execinfo:
+        ensemble.train(trackers, default_domain, num_workers=2)
+
+    assert list(execinfo.value.errors) == ["policy_0_DyingPolicy"]
+    assert "exit code 3" in execinfo.value.errors["policy_0_DyingPolicy"]
+
+
+def test_policies_are_imported_lazily():
+    # importing the agent must not import tensorflow or scikit-learn, they
+    # are only needed once a policy which uses them is loaded
+    script = ("import sys\n"
+              "import rasa.core.agent\n"
+              "from rasa.core.policies import MemoizationPolicy\n"
+              "print(sorted(m for m in ['tensorflow', 'sklearn'] "
+              "if m in sys.modules))")
+    output = subprocess.check_output([sys.executable, "-c", script],
+                                     universal_newlines=True)
+
+    assert output.strip().splitlines()[-1] == "[]"
+
+
+def test_lazy_policy_attributes():
+    from rasa.core.policies.keras_policy import KerasPolicy
+
+    assert policies.KerasPolicy is KerasPolicy
+    assert "SklearnPolicy" in dir(policies)
+    with pytest.raises(AttributeError):
+        _ = policies.UnknownPolicy
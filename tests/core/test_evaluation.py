@@ -1,8 +1,9 @@
 import os
 
 from rasa.core.server import nlu_model_and_evaluation_files_from_archive
+from rasa.core import utils
 from rasa.core.test import (_generate_trackers, collect_story_predictions,
-                            test)
+                            compare, test)
 from rasa.model import add_evaluation_file_to_model
 # we need this import to ignore the warning...
 # noinspection PyUnresolvedReferences
@@ -42,6 +43,84 @@ async def test_action_evaluation_script(tmpdir, default_agent):
     assert num_stories == 3
 
 
+async def test_parallel_evaluation(default_agent_path):
+    from rasa.core.agent import Agent
+
+    agent = Agent.load(default_agent_path)
+    completed_trackers = await _generate_trackers(
+        DEFAULT_STORIES_FILE, agent, use_e2e=False)
+
+    story_evaluation, num_stories = collect_story_predictions(
+        completed_trackers, agent)
+    parallel_evaluation, parallel_num_stories = collect_story_predictions(
+        completed_trackers, agent, num_workers=2)
+
+    assert parallel_num_stories == num_stories
+    assert (parallel_evaluation.evaluation_store.serialise_targets() ==
+            story_evaluation.evaluation_store.serialise_targets())
+    assert (parallel_evaluation.evaluation_store.serialise_predictions() ==
+            story_evaluation.evaluation_store.serialise_predictions())
+    assert parallel_evaluation.action_list == story_evaluation.action_list
+
+
+async def test_batched_evaluation(default_agent, monkeypatch):
+    import sys
+
+    # `rasa.core.test` is shadowed by the `test` function of `rasa.core`
+    evaluation = sys.modules[collect_story_predictions.__module__]
+
+    completed_trackers = await _generate_trackers(
+        DEFAULT_STORIES_FILE, default_agent, use_e2e=False)
+
+    story_evaluation, _ = collect_story_predictions(
+        completed_trackers, default_agent)
+
+    # predict the actions of every story on its own
+    monkeypatch.setattr(evaluation, "PREDICTION_BATCH_SIZE", 1)
+    single_evaluation, _ = collect_story_predictions(
+        completed_trackers, default_agent)
+
+    assert (single_evaluation.evaluation_store.serialise_predictions() ==
+            story_evaluation.evaluation_store.serialise_predictions())
+    assert single_evaluation.action_list == story_evaluation.action_list
+
+
+async def test_resume_comparison(tmpdir, monkeypatch):
+    import sys
+    from rasa.core.train import train_comparison_models
+    from tests.core.conftest import DEFAULT_DOMAIN_PATH
+
+    policy_config = tmpdir.join("config.yml")
+    policy_config.write("policies:\n  - name: MemoizationPolicy\n")
+    models = tmpdir.join("models").strpath
+    output = tmpdir.join("results").strpath
+
+    await train_comparison_models(DEFAULT_STORIES_FILE, DEFAULT_DOMAIN_PATH,
+                                  models,
+                                  exclusion_percentages=[0, 50],
+                                  policy_configs=[policy_config.strpath],
+                                  runs=2,
+                                  kwargs={"augmentation_factor": 0})
+
+    await compare(models, DEFAULT_STORIES_FILE, output, num_workers=2)
+
+    results = utils.read_json_file(os.path.join(output, "results.json"))
+    assert len(results["MemoizationPolicy"]) == 2
+    assert all(len(run) == 2 for run in results["MemoizationPolicy"])
+
+    # a resumed comparison doesn't evaluate any model again
+    evaluation = sys.modules[compare.__module__]
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("Model was evaluated again.")
+
+    monkeypatch.setattr(evaluation, "_num_correct_stories", fail)
+    await compare(models, DEFAULT_STORIES_FILE, output)
+
+    assert utils.read_json_file(os.path.join(output,
+                                             "results.json")) == results
+
+
 async def test_end_to_end_evaluation_script(tmpdir, default_agent):
     completed_trackers = await _generate_trackers(
         END_TO_END_STORY_FILE, default_agent, use_e2e=True)
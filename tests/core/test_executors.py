@@ -0,0 +1,91 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from rasa.core import executors
+from rasa.core.agent import Agent
+from rasa.core.channels import UserMessage
+from rasa.core.exceptions import OverloadedError
+from rasa.core.executors import Executor
+from rasa.core.interpreter import RegexInterpreter
+from rasa.core.policies.memoization import MemoizationPolicy
+from tests.core.conftest import DEFAULT_STORIES_FILE
+
+
+@pytest.fixture
+def disable_executors():
+    yield
+    executors.disable()
+
+
+async def test_calls_run_on_the_loop_if_executor_is_disabled():
+    assert not executors.is_enabled(executors.PARSE)
+    assert await executors.run(executors.PARSE,
+                               threading.get_ident) == threading.get_ident()
+
+
+async def test_blocking_call_does_not_block_the_loop(disable_executors):
+    executors.enable(executors.PARSE, max_workers=1)
+    ticks = []
+
+    async def tick():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    start = time.perf_counter()
+    await asyncio.gather(executors.run(executors.PARSE, time.sleep, 0.2),
+                         tick())
+
+    assert len(ticks) == 5
+    assert ticks[-1] - start < 0.15
+
+
+async def test_calls_are_rejected_if_too_many_are_pending():
+    executor = Executor("test", max_workers=1, max_queued=2)
+    calls = [asyncio.ensure_future(executor.run(time.sleep, 0.05))
+             for _ in range(3)]
+
+    results = await asyncio.gather(*calls, return_exceptions=True)
+
+    assert results[:2] == [None, None]
+    assert isinstance(results[2], OverloadedError)
+    assert executor.num_rejected == 1
+    assert executor.num_pending == 0
+    executor.shutdown()
+
+
+async def test_calls_run_in_processes():
+    executor = Executor("test", max_workers=1, use_processes=True)
+    try:
+        assert await executor.run(os.getpid) != os.getpid()
+        with pytest.raises(ZeroDivisionError):
+            await executor.run(divmod, 1, 0)
+    finally:
+        executor.shutdown()
+
+
+async def test_actions_are_predicted_in_executor(default_domain,
+                                                 disable_executors):
+    agent = Agent(default_domain,
+                  policies=[MemoizationPolicy()],
+                  interpreter=RegexInterpreter())
+    agent.train(await agent.load_data(DEFAULT_STORIES_FILE))
+    executors.enable(executors.PREDICT, max_workers=1)
+
+    threads = set()
+    processor = agent.create_processor()
+    predict_next_action = processor.predict_next_action
+
+    def predict_in_thread(tracker):
+        threads.add(threading.get_ident())
+        return predict_next_action(tracker)
+
+    processor.predict_next_action = predict_in_thread
+    await processor.handle_message(UserMessage("/greet", sender_id="user"))
+
+    assert threads
+    assert threading.get_ident() not in threads
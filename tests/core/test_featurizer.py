@@ -1,5 +1,6 @@
 from rasa.core.featurizers import TrackerFeaturizer, \
-    BinarySingleStateFeaturizer, LabelTokenizerSingleStateFeaturizer
+    BinarySingleStateFeaturizer, LabelTokenizerSingleStateFeaturizer, \
+    MaxHistoryTrackerFeaturizer, FullDialogueTrackerFeaturizer
 import numpy as np
 
 
@@ -115,3 +116,143 @@ def test_label_tokenizer_featurizer_handles_probabilistic_intents():
     encoded = f.encode({"intent_a": 0.5, "prev_b": 0.2, "intent_d": 1.0,
                         "prev_action_listen": 1.0})
     assert (encoded == np.array([0.5, 1.0, 1.5, 0.0, 0.2])).all()
+
+
+def test_binary_featurizer_encode_states_equals_encode():
+    f = BinarySingleStateFeaturizer()
+    f.input_state_map = {"a": 0, "b": 3, "c": 2, "d": 1}
+    f.num_features = len(f.input_state_map)
+    states = [{"a": 1.0, "b": 1.0, "e": 1.0},
+              {"a": 1.0, "b": 0.2, "c": 0.0},
+              {"d": 1.0}]
+    encoded = f.encode_states(states)
+    assert encoded.dtype == np.float64
+    for row, state in zip(encoded, states):
+        assert (row == f.encode(state)).all()
+
+    assert f.encode_states([states[0]]).dtype == np.int32
+
+
+def test_binary_featurizer_encode_states_with_float_unknown_feature():
+    f = BinarySingleStateFeaturizer()
+    f.input_state_map = {"a": 0, "b": 3, "c": 2, "d": 1}
+    f.num_features = len(f.input_state_map)
+    states = [{"a": 1.0, "e": 0.5}, {"d": 1.0}]
+    encoded = f.encode_states(states)
+    expected = np.array([f.encode(state) for state in states])
+    assert encoded.dtype == expected.dtype == np.float64
+    assert (encoded == expected).all()
+
+
+def test_label_tokenizer_featurizer_encode_states_equals_encode():
+    f = LabelTokenizerSingleStateFeaturizer()
+    f.user_labels = ["intent_a", "intent_d"]
+    f.bot_labels = ["c", "b", "action_listen"]
+    f.user_vocab = {"intent": 2, "a": 0, "d": 1}
+    f.bot_vocab = {"b": 1, "c": 0, "action": 2, "listen": 3}
+    f.num_features = (len(f.user_vocab) +
+                      len(f.slot_labels) +
+                      len(f.bot_vocab))
+    states = [{"intent_a": 0.5, "prev_b": 0.2, "intent_d": 1.0,
+               "prev_action_listen": 1.0},
+              {"intent_a": 1.0, "prev_c": 1.0},
+              {"intent_d": 1.0, "prev_action_listen": 1.0, "e": 1.0}]
+    encoded = f.encode_states(states)
+    for row, state in zip(encoded, states):
+        assert (row == f.encode(state)).all()
+
+    assert f.encode_states(states[1:]).dtype == np.int32
+
+
+def test_tracker_featurizer_encodes_repeated_states_once():
+    f = BinarySingleStateFeaturizer()
+    f.input_state_map = {"a": 0, "b": 1}
+    f.num_features = len(f.input_state_map)
+    tracker_featurizer = MaxHistoryTrackerFeaturizer(f, max_history=2)
+
+    states = [[None, {"a": 1.0}],
+              [{"a": 1.0}, {"b": 1.0}],
+              [{"b": 1.0}, {"a": 1.0}]]
+    unique_states, indices = tracker_featurizer._intern_states(states)
+    assert len(unique_states) == 2
+    assert indices == [[-1, 0], [0, 1], [1, 0]]
+
+    X, true_lengths = tracker_featurizer._featurize_states(states)
+    assert X.shape == (3, 2, 2)
+    assert true_lengths == [2, 2, 2]
+    assert (X[0] == np.array([[-1, -1], [1, 0]])).all()
+    assert (X[2] == np.array([[0, 1], [1, 0]])).all()
+
+
+def test_sliding_windows_are_views_on_buffer():
+    buffer = np.arange(5)
+    windows = MaxHistoryTrackerFeaturizer._sliding_windows(buffer, 3)
+    assert windows.shape == (3, 3)
+    assert (windows[1] == np.array([1, 2, 3])).all()
+    assert windows.base is not None
+
+
+async def test_max_history_windows_equal_sliced_states(default_domain):
+    from rasa.core import training
+
+    trackers = await training.load_data(
+        "data/test_stories/stories_defaultdomain.md", default_domain,
+        augmentation_factor=0)
+
+    for remove_duplicates in [True, False]:
+        f = MaxHistoryTrackerFeaturizer(BinarySingleStateFeaturizer(),
+                                        max_history=3,
+                                        remove_duplicates=remove_duplicates)
+        data = f.featurize_trackers(trackers, default_domain)
+
+        states, actions = f.training_states_and_actions(trackers,
+                                                        default_domain)
+        X, _ = f._featurize_states(states)
+        y = f._featurize_labels(actions, default_domain)
+
+        assert (data.X == X).all()
+        assert (data.y == y).all()
+        assert data.true_length == [3] * len(actions)
+
+
+async def test_full_dialogue_buckets_are_padded_separately(default_domain):
+    from rasa.core import training
+
+    trackers = await training.load_data(
+        "data/test_stories/stories_defaultdomain.md", default_domain,
+        augmentation_factor=20)
+
+    f = FullDialogueTrackerFeaturizer(BinarySingleStateFeaturizer())
+    data = f.featurize_trackers(trackers, default_domain)
+    buckets = f.featurize_trackers_in_buckets(trackers, default_domain, 3)
+
+    assert len(buckets) == 3
+    assert sum(b.num_examples() for b in buckets) == data.num_examples()
+    assert buckets[-1].max_history() == data.max_history()
+    assert buckets[0].max_history() <= buckets[-1].max_history()
+    assert f.max_len == data.max_history()
+    for bucket in buckets:
+        assert bucket.X.shape[1] == max(bucket.true_length)
+        assert bucket.y.shape[:2] == bucket.X.shape[:2]
+
+
+async def test_full_dialogue_buckets_restore_max_len_on_failure(
+        default_domain, monkeypatch):
+    import pytest
+    from rasa.core import training
+
+    trackers = await training.load_data(
+        "data/test_stories/stories_defaultdomain.md", default_domain)
+
+    f = FullDialogueTrackerFeaturizer(BinarySingleStateFeaturizer())
+    f.featurize_trackers(trackers, default_domain)
+    max_len = f.max_len
+
+    def fail(*args, **kwargs):
+        raise ValueError("featurization failed")
+
+    monkeypatch.setattr(f, "_featurize_labels", fail)
+    with pytest.raises(ValueError):
+        f.featurize_trackers_in_buckets(trackers, default_domain, 3)
+
+    assert f.max_len == max_len
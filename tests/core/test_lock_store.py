@@ -0,0 +1,238 @@
+import asyncio
+import time
+
+import fakeredis
+import pytest
+
+from rasa.core.agent import Agent
+from rasa.core.channels import UserMessage
+from rasa.core.exceptions import LockError
+from rasa.core.lock_store import (
+    InMemoryLockStore, LockStore, RedisLockStore, TicketLock)
+from rasa.core.utils import EndpointConfig
+
+
+class FakeRedisLockStore(RedisLockStore):
+    def __init__(self):
+        # all fake redis clients share the same data, like the clients of
+        # several processes which use the same redis server
+        self.red = fakeredis.FakeStrictRedis()
+        self.key_prefix = "lock:"
+        LockStore.__init__(self)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def lock_store(request):
+    if request.param == "memory":
+        return InMemoryLockStore()
+
+    store = FakeRedisLockStore()
+    store.red.flushall()
+    return store
+
+
+def test_tickets_are_served_in_order():
+    lock = TicketLock("some id")
+    first = lock.issue_ticket(10)
+    second = lock.issue_ticket(10)
+
+    assert (first, second) == (0, 1)
+    assert not lock.is_locked(first)
+    assert lock.is_locked(second)
+
+    lock.remove_ticket(first)
+    assert not lock.is_locked(second)
+
+
+def test_expired_tickets_do_not_block():
+    lock = TicketLock("some id")
+    first = lock.issue_ticket(10)
+    second = lock.issue_ticket(10)
+
+    lock.tickets[0].expires = time.time() - 1
+    assert not lock.is_locked(second)
+    assert not lock.is_expired()
+
+    lock.tickets[1].expires = time.time() - 1
+    assert lock.is_expired()
+    assert lock.has_ticket(first)
+
+
+def test_lock_serialisation():
+    lock = TicketLock("some id")
+    lock.issue_ticket(10)
+    lock.issue_ticket(10)
+
+    loaded = TicketLock.loads(lock.dumps())
+
+    assert loaded.conversation_id == "some id"
+    assert [t.as_dict() for t in loaded.tickets] == [t.as_dict()
+                                                     for t in lock.tickets]
+
+
+def test_lock_is_deleted_after_last_ticket(lock_store):
+    ticket = lock_store.issue_ticket("some id")
+    assert lock_store.get_lock("some id").has_ticket(ticket)
+
+    lock_store.finish_serving("some id", ticket)
+    assert lock_store.get_lock("some id") is None
+
+
+async def _run_one_after_another(turn, num_turns):
+    """Starts the turns in order, but runs them concurrently."""
+
+    tasks = []
+    for i in range(num_turns):
+        tasks.append(asyncio.ensure_future(turn(i)))
+        # lets the turn take its ticket
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+
+
+async def test_turns_are_processed_in_order(lock_store):
+    processed = []
+
+    async def turn(i):
+        async with lock_store.lock("some id", wait_time=0.001):
+            processed.append(("start", i))
+            await asyncio.sleep(0.01)
+            processed.append(("end", i))
+
+    await _run_one_after_another(turn, 3)
+
+    assert processed == [("start", 0), ("end", 0),
+                         ("start", 1), ("end", 1),
+                         ("start", 2), ("end", 2)]
+    assert lock_store.get_lock("some id") is None
+    assert lock_store.num_waiting == 0
+    assert lock_store.num_processing == 0
+
+
+async def test_turns_are_ordered_across_redis_lock_stores():
+    # every lock store stands for a different process
+    stores = [FakeRedisLockStore() for _ in range(3)]
+    stores[0].red.flushall()
+    processed = []
+
+    async def turn(i):
+        async with stores[i].lock("some id", wait_time=0.001):
+            processed.append(("start", i))
+            await asyncio.sleep(0.01)
+            processed.append(("end", i))
+
+    await _run_one_after_another(turn, 3)
+
+    assert processed == [("start", 0), ("end", 0),
+                         ("start", 1), ("end", 1),
+                         ("start", 2), ("end", 2)]
+
+
+async def test_held_ticket_is_refreshed(lock_store):
+    processed = []
+
+    async def turn(i):
+        # the turns take longer than the lifetime of a ticket
+        async with lock_store.lock("some id", lock_lifetime=0.04,
+                                   wait_time=0.001):
+            processed.append(("start", i))
+            await asyncio.sleep(0.1)
+            processed.append(("end", i))
+
+    await _run_one_after_another(turn, 2)
+
+    assert processed == [("start", 0), ("end", 0),
+                         ("start", 1), ("end", 1)]
+
+
+async def test_in_memory_waiters_are_woken_up():
+    lock_store = InMemoryLockStore()
+
+    async def turn(i):
+        # waiting turns would sleep for a minute if they polled the lock
+        async with lock_store.lock("some id", wait_time=60):
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(_run_one_after_another(turn, 3), timeout=5)
+
+    assert not lock_store.waiters
+
+
+async def test_lock_all_holds_the_locks_of_all_conversations(lock_store):
+    processed = []
+
+    async def turn(i):
+        if i == 0:
+            lock = lock_store.lock_all(["b", "a", "b"], wait_time=0.001)
+        else:
+            lock = lock_store.lock("b", wait_time=0.001)
+        async with lock:
+            processed.append(("start", i))
+            await asyncio.sleep(0.01)
+            processed.append(("end", i))
+
+    await _run_one_after_another(turn, 2)
+
+    assert processed == [("start", 0), ("end", 0),
+                         ("start", 1), ("end", 1)]
+    assert lock_store.get_lock("a") is None
+    assert lock_store.get_lock("b") is None
+
+
+async def test_expired_lock_is_taken_over(lock_store):
+    # a process which died while holding the lock
+    lock_store.issue_ticket("some id", lock_lifetime=0.01)
+
+    await asyncio.sleep(0.02)
+    async with lock_store.lock("some id", wait_time=0.001) as lock:
+        assert lock.ticket == 1
+
+
+async def test_waiting_fails_if_ticket_is_lost(lock_store):
+    lock_store.issue_ticket("some id", lock_lifetime=10)
+
+    async def turn():
+        async with lock_store.lock("some id", wait_time=0.001):
+            pass
+
+    waiting = asyncio.ensure_future(turn())
+    await asyncio.sleep(0.005)
+    assert lock_store.num_waiting == 1
+
+    # e.g. all tickets expired while the process was stalled
+    lock_store.delete_lock("some id")
+
+    with pytest.raises(LockError):
+        await waiting
+
+    assert lock_store.get_lock("some id") is None
+    assert lock_store.num_waiting == 0
+
+
+def test_find_lock_store():
+    assert isinstance(LockStore.find_lock_store(None), InMemoryLockStore)
+
+    config = EndpointConfig("localhost", type="redis", port=6379, db=2)
+    lock_store = LockStore.find_lock_store(config)
+    assert isinstance(lock_store, RedisLockStore)
+    assert lock_store.red.connection_pool.connection_kwargs["db"] == 2
+    assert lock_store.lock_lifetime == 60
+
+    config = EndpointConfig("localhost", type="redis", lock_lifetime=300)
+    assert LockStore.find_lock_store(config).lock_lifetime == 300
+
+
+async def test_agent_uses_lock_store(default_agent):
+    lock_store = FakeRedisLockStore()
+    agent = Agent(default_agent.domain,
+                  default_agent.policy_ensemble,
+                  interpreter=default_agent.interpreter,
+                  lock_store=lock_store)
+
+    await asyncio.gather(*[
+        agent.handle_message(UserMessage("/greet", sender_id="lock_user"))
+        for _ in range(3)])
+
+    tracker = agent.tracker_store.retrieve("lock_user")
+    assert [e.as_dict().get("text") for e in tracker.events
+            if e.type_name == "user"] == ["/greet"] * 3
+    assert lock_store.get_lock("lock_user") is None
@@ -0,0 +1,82 @@
+import pytest
+
+from rasa.core import metrics
+
+
+@pytest.fixture
+def instrumentation():
+    yield metrics.enable(metrics.PrometheusInstrumentation(
+        buckets=(0.1, 1.0)))
+    metrics.disable()
+
+
+def test_measurements_are_ignored_if_disabled():
+    assert not metrics.is_enabled()
+
+    # nothing is allocated for a disabled measurement
+    assert (metrics.measure(metrics.STAGE_SECONDS, stage="a") is
+            metrics.measure(metrics.STAGE_SECONDS, stage="b"))
+    with metrics.measure(metrics.STAGE_SECONDS, stage="a"):
+        pass
+    metrics.increment(metrics.REMOTE_REQUEST_ERRORS, url="http://a")
+
+    assert metrics.instrumentation() is None
+
+
+def test_render_histogram(instrumentation):
+    metrics.observe(metrics.STAGE_SECONDS, 0.05, stage="parse_message")
+    metrics.observe(metrics.STAGE_SECONDS, 0.5, stage="parse_message")
+    metrics.observe(metrics.STAGE_SECONDS, 2, stage="parse_message")
+
+    lines = instrumentation.render().splitlines()
+
+    assert "# TYPE rasa_core_stage_seconds histogram" in lines
+    assert ('rasa_core_stage_seconds_bucket{stage="parse_message",le="0.1"} 1'
+            in lines)
+    assert ('rasa_core_stage_seconds_bucket{stage="parse_message",le="1.0"} 2'
+            in lines)
+    assert ('rasa_core_stage_seconds_bucket{stage="parse_message",le="+Inf"} '
+            '3' in lines)
+    assert 'rasa_core_stage_seconds_sum{stage="parse_message"} 2.55' in lines
+    assert 'rasa_core_stage_seconds_count{stage="parse_message"} 3' in lines
+
+
+def test_render_counters_and_gauges(instrumentation):
+    metrics.increment(metrics.REMOTE_REQUEST_ERRORS, url='http://a/"b"')
+    metrics.increment(metrics.REMOTE_REQUEST_ERRORS, url='http://a/"b"')
+    metrics.set_gauge(metrics.CONVERSATION_LOCKS, 3)
+    metrics.set_gauge(metrics.CONVERSATION_LOCKS, 2)
+
+    lines = instrumentation.render().splitlines()
+
+    assert "# TYPE rasa_core_remote_request_errors_total counter" in lines
+    assert ('rasa_core_remote_request_errors_total{url="http://a/\\"b\\""} 2.0'
+            in lines)
+    assert "# TYPE rasa_core_conversation_locks gauge" in lines
+    assert "rasa_core_conversation_locks 2.0" in lines
+
+
+async def test_timed_function_and_coroutine(instrumentation):
+    @metrics.timed(metrics.STAGE_SECONDS, stage="sync")
+    def add(a, b):
+        return a + b
+
+    @metrics.timed(metrics.STAGE_SECONDS, stage="async")
+    async def add_later(a, b):
+        return a + b
+
+    assert add(1, 2) == 3
+    assert await add_later(1, 2) == 3
+
+    histograms = instrumentation.histograms[metrics.STAGE_SECONDS]
+    assert sum(histograms[(("stage", "sync"),)].counts) == 1
+    assert sum(histograms[(("stage", "async"),)].counts) == 1
+
+
+def test_timed_function_without_metrics():
+    @metrics.timed(metrics.STAGE_SECONDS, stage="sync")
+    def fail():
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        fail()
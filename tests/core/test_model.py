@@ -16,7 +16,8 @@ from rasa.model import (
     FINGERPRINT_NLU_VERSION_KEY, FINGERPRINT_RASA_VERSION_KEY,
     FINGERPRINT_STORIES_KEY, FINGERPRINT_TRAINED_AT_KEY,
     core_fingerprint_changed, create_package_rasa, get_latest_model, get_model,
-    get_model_subdirectories, model_fingerprint, nlu_fingerprint_changed)
+    get_model_subdirectories, model_fingerprint, nlu_fingerprint_changed,
+    remove_unpacked_model, unpack_model)
 
 
 def test_get_latest_model(trained_model):
@@ -175,3 +176,35 @@ def test_rasa_packaging(trained_model, project, use_fingerprint):
     assert os.path.exists(os.path.join(unpacked, "nlu"))
 
     assert not os.path.exists(unpacked_model_path)
+
+
+def test_uncompressed_packaging(trained_model):
+    unpacked_model_path = get_model(trained_model)
+
+    output_path = os.path.join(tempfile.mkdtemp(), "test.tar.gz")
+    package = create_package_rasa(unpacked_model_path, output_path,
+                                  compress=False)
+
+    assert package == output_path[:-len(".tar.gz")]
+    assert get_latest_model(os.path.dirname(package)) == package
+    # the package is loaded in place
+    assert get_model(package) == package
+    assert os.path.exists(os.path.join(package, "core"))
+
+    copied = unpack_model(package, tempfile.mkdtemp())
+    assert os.path.exists(os.path.join(copied, "nlu"))
+
+    remove_unpacked_model(package)
+    assert os.path.exists(package)
+
+
+def test_incomplete_uncompressed_package(trained_model):
+    unpacked_model_path = get_model(trained_model)
+    package = create_package_rasa(unpacked_model_path,
+                                  os.path.join(tempfile.mkdtemp(), "model"),
+                                  compress=False)
+
+    os.remove(os.path.join(package, "core", "domain.yml"))
+
+    with pytest.raises(ValueError):
+        get_model(package)
@@ -0,0 +1,153 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from rasa.core.agent import Agent
+from rasa.core.interpreter import (
+    NaturalLanguageInterpreter, RasaNLUHttpInterpreter)
+from rasa.core.parse_cache import (
+    CachingInterpreter, InMemoryParseCache, ParseCache, RedisParseCache)
+from rasa.core.policies.memoization import MemoizationPolicy
+from rasa.core.utils import EndpointConfig
+
+
+class FakeRedisParseCache(RedisParseCache):
+    def __init__(self):
+        self.ttl = 60
+        self.red = fakeredis.FakeStrictRedis()
+        self.key_prefix = "parse:"
+
+
+class CountingInterpreter(NaturalLanguageInterpreter):
+    def __init__(self, duration=0.0, fail=False, message_ids=False):
+        self.duration = duration
+        self.fail = fail
+        self.message_ids = message_ids
+        self.parsed = []
+
+    async def parse(self, text, message_id=None):
+        self.parsed.append(text)
+        await asyncio.sleep(self.duration)
+        if self.fail:
+            return {"intent": {"name": "", "confidence": 0.0},
+                    "entities": [], "text": ""}
+        parse_data = {"intent": {"name": "greet", "confidence": 0.9},
+                      "entities": [], "text": text}
+        if self.message_ids:
+            parse_data["message_id"] = message_id
+        return parse_data
+
+
+@pytest.fixture(params=["memory", "redis"])
+def parse_cache(request):
+    if request.param == "memory":
+        return InMemoryParseCache()
+    cache = FakeRedisParseCache()
+    cache.red.flushall()
+    return cache
+
+
+async def test_results_are_cached_by_normalised_text(parse_cache):
+    interpreter = CountingInterpreter()
+    caching = CachingInterpreter(interpreter, parse_cache)
+
+    first = await caching.parse("hello world")
+    second = await caching.parse("  hello \n world ")
+
+    assert first["intent"] == second["intent"]
+    assert interpreter.parsed == ["hello world"]
+    assert caching.hit_rate == 0.5
+
+    # the cached result can't be changed by its users
+    second["intent"]["name"] = "changed"
+    third = await caching.parse("hello world")
+    assert third["intent"]["name"] == "greet"
+
+
+async def test_cached_results_keep_text_of_message(parse_cache):
+    interpreter = CountingInterpreter(duration=0.05, message_ids=True)
+    caching = CachingInterpreter(interpreter, parse_cache)
+
+    # the second message waits for the parse of the first one
+    parsing = [asyncio.ensure_future(caching.parse("  Hello   there",
+                                                   "id_1")),
+               asyncio.ensure_future(caching.parse("Hello there ", "id_2"))]
+    first, second = await asyncio.gather(*parsing)
+    third = await caching.parse("Hello\tthere", "id_3")
+
+    assert interpreter.parsed == ["  Hello   there"]
+    assert caching.num_hits == 2
+    assert [r["text"] for r in [first, second, third]] == \
+        ["  Hello   there", "Hello there ", "Hello\tthere"]
+    assert [r["message_id"] for r in [first, second, third]] == \
+        ["id_1", "id_2", "id_3"]
+
+
+async def test_identical_messages_are_parsed_once(parse_cache):
+    interpreter = CountingInterpreter(duration=0.05)
+    caching = CachingInterpreter(interpreter, parse_cache)
+
+    results = await asyncio.gather(*[caching.parse("hello")
+                                     for _ in range(3)])
+
+    assert interpreter.parsed == ["hello"]
+    assert all(r["intent"]["name"] == "greet" for r in results)
+    assert caching.num_hits == 2
+    assert caching.num_misses == 1
+
+
+async def test_failed_parses_are_not_cached(parse_cache):
+    interpreter = CountingInterpreter(fail=True)
+    caching = CachingInterpreter(interpreter, parse_cache)
+
+    await caching.parse("hello")
+    await caching.parse("hello")
+
+    assert interpreter.parsed == ["hello", "hello"]
+
+
+async def test_results_expire_and_least_recently_used_are_removed():
+    interpreter = CountingInterpreter()
+    cache = InMemoryParseCache(max_size=2)
+    caching = CachingInterpreter(interpreter, cache)
+
+    for text in ["a", "b", "a", "c", "a", "b"]:
+        await caching.parse(text)
+    assert interpreter.parsed == ["a", "b", "c", "b"]
+    assert len(cache) == 2
+
+    cache.ttl = -1
+    await caching.parse("d")
+    await caching.parse("d")
+    assert interpreter.parsed[-2:] == ["d", "d"]
+
+
+def test_cache_is_invalidated_if_model_is_replaced(default_domain):
+    cache = InMemoryParseCache()
+    agent = Agent(default_domain,
+                  policies=[MemoizationPolicy()],
+                  interpreter=RasaNLUHttpInterpreter(
+                      "model_a", EndpointConfig("http://nlu")),
+                  parse_cache=cache)
+    previous = agent.interpreter
+    assert isinstance(previous, CachingInterpreter)
+    cache.set("key", {"text": "hello"})
+
+    agent.update_model(agent.domain, agent.policy_ensemble, None,
+                       RasaNLUHttpInterpreter("model_b",
+                                              EndpointConfig("http://nlu")))
+
+    assert agent.interpreter.fingerprint != previous.fingerprint
+    assert agent.interpreter.interpreter.model_name == "model_b"
+    assert len(cache) == 0
+
+
+def test_find_parse_cache():
+    assert ParseCache.find_parse_cache(None) is None
+
+    cache = ParseCache.find_parse_cache(
+        EndpointConfig(type="in_memory", max_size=5, ttl=10))
+    assert isinstance(cache, InMemoryParseCache)
+    assert cache.max_size == 5
+    assert cache.ttl == 10
@@ -12,7 +12,8 @@ from rasa.core.channels import UserMessage
 from rasa.core.domain import Domain, InvalidDomain
 from rasa.core.events import ActionExecuted
 from rasa.core.featurizers import (
-    BinarySingleStateFeaturizer, MaxHistoryTrackerFeaturizer)
+    BinarySingleStateFeaturizer, MaxHistoryTrackerFeaturizer,
+    FullDialogueTrackerFeaturizer)
 from rasa.core.policies import TwoStageFallbackPolicy
 from rasa.core.policies.embedding_policy import EmbeddingPolicy
 from rasa.core.policies.fallback import FallbackPolicy
@@ -20,7 +21,7 @@ from rasa.core.policies.form_policy import FormPolicy
 from rasa.core.policies.keras_policy import KerasPolicy
 from rasa.core.policies.mapping_policy import MappingPolicy
 from rasa.core.policies.memoization import (
-    AugmentedMemoizationPolicy, MemoizationPolicy)
+    AugmentedMemoizationPolicy, MemoizationPolicy, MemoryMappedLookup)
 from rasa.core.policies.sklearn_policy import SklearnPolicy
 from rasa.core.trackers import DialogueStateTracker
 from tests.core.conftest import DEFAULT_DOMAIN_PATH, DEFAULT_STORIES_FILE
@@ -118,6 +119,18 @@ class PolicyTestCollection(object):
                 tracker, default_domain)
             assert predicted_probabilities == actual_probabilities
 
+    async def test_batch_prediction(self, trained_policy, default_domain):
+        trackers = await train_trackers(default_domain, augmentation_factor=20)
+
+        batch_probabilities = trained_policy.predict_action_probabilities_batch(
+            trackers, default_domain)
+
+        assert len(batch_probabilities) == len(trackers)
+        for tracker, probabilities in zip(trackers, batch_probabilities):
+            expected = trained_policy.predict_action_probabilities(
+                tracker, default_domain)
+            assert np.allclose(probabilities, expected, atol=1e-6)
+
     def test_prediction_on_empty_tracker(self, trained_policy, default_domain):
         tracker = DialogueStateTracker(UserMessage.DEFAULT_SENDER_ID,
                                        default_domain.slots)
@@ -153,6 +166,27 @@ class TestKerasPolicy(PolicyTestCollection):
         p = KerasPolicy(featurizer, priority)
         return p
 
+    async def test_concurrent_predictions_of_loaded_policy(
+            self, trained_policy, default_domain, tmpdir):
+        from concurrent.futures import ThreadPoolExecutor
+
+        trained_policy.persist(tmpdir.strpath)
+        loaded = KerasPolicy.load(tmpdir.strpath)
+        trackers = await train_trackers(default_domain, augmentation_factor=0)
+        expected = [trained_policy.predict_action_probabilities(
+            tracker, default_domain) for tracker in trackers]
+
+        def predict(tracker):
+            return loaded.predict_action_probabilities(tracker,
+                                                       default_domain)
+
+        # the first predictions of the loaded model run at the same time
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            predictions = list(pool.map(predict, trackers * 4))
+
+        for actual, probabilities in zip(predictions, expected * 4):
+            assert np.allclose(actual, probabilities, atol=1e-6)
+
 
 class TestKerasPolicyWithTfConfig(PolicyTestCollection):
 
@@ -170,6 +204,56 @@ class TestKerasPolicyWithTfConfig(PolicyTestCollection):
         assert loaded.session._config == session_config()
 
 
+class TestKerasPolicyWithLengthBuckets(PolicyTestCollection):
+
+    @pytest.fixture(scope="module")
+    def featurizer(self):
+        return FullDialogueTrackerFeaturizer(BinarySingleStateFeaturizer())
+
+    @pytest.fixture(scope="module")
+    def create_policy(self, featurizer, priority):
+        p = KerasPolicy(featurizer, priority, epochs=2, num_length_buckets=3)
+        return p
+
+
+class TestKerasPolicyWithEarlyStopping(PolicyTestCollection):
+
+    @pytest.fixture(scope="module")
+    def create_policy(self, featurizer, priority):
+        p = KerasPolicy(featurizer, priority, epochs=50,
+                        early_stopping=True, early_stopping_patience=2,
+                        early_stopping_min_delta=0.5)
+        return p
+
+    def test_early_stopping(self, trained_policy, tmpdir):
+        # the accuracy can't improve by more than `min_delta` twice
+        assert trained_policy.early_stopping_summary == {
+            "best_epoch": 1, "stopped_epoch": 3}
+        assert trained_policy.current_epoch == 3
+
+        trained_policy.persist(tmpdir.strpath)
+        loaded = trained_policy.__class__.load(tmpdir.strpath)
+        assert loaded.early_stopping_summary == \
+            trained_policy.early_stopping_summary
+
+
+def test_early_stopping_waits_for_patience():
+    from rasa.core.policies.early_stopping import EarlyStopping
+
+    early_stopping = EarlyStopping(patience=2, min_delta=0.01)
+
+    assert early_stopping.update(1, 0.5)
+    assert early_stopping.update(2, 0.6)
+    assert not early_stopping.update(3, 0.605)
+    assert not early_stopping.should_stop
+    assert early_stopping.update(4, 0.7)
+    assert not early_stopping.update(5, 0.7)
+    assert not early_stopping.update(6, 0.65)
+
+    assert early_stopping.should_stop
+    assert early_stopping.as_dict() == {"best_epoch": 4, "stopped_epoch": 6}
+
+
 class TestFallbackPolicy(PolicyTestCollection):
 
     @pytest.fixture(scope="module")
@@ -255,6 +339,33 @@ class TestMemoizationPolicy(PolicyTestCollection):
         recalled = trained_policy.recall(states, tracker, default_domain)
         assert recalled is not None
 
+    def test_persisted_lookup_is_loaded_as_dict(self, trained_policy,
+                                                tmpdir):
+        trained_policy.persist(tmpdir.strpath)
+        loaded = trained_policy.__class__.load(tmpdir.strpath)
+
+        assert isinstance(loaded.lookup, dict)
+        assert loaded.lookup == trained_policy.lookup
+
+    async def test_persisted_lookup_is_memory_mapped(self, trained_policy,
+                                                     default_domain, tmpdir):
+        from rasa.model import PACKAGE_INDEX_FILE_PATH
+
+        # policies of uncompressed packages are loaded in place
+        tmpdir.join(PACKAGE_INDEX_FILE_PATH).write("{}")
+        policy_path = tmpdir.join("core", "policy").strpath
+        trained_policy.persist(policy_path)
+        loaded = trained_policy.__class__.load(policy_path)
+
+        assert isinstance(loaded.lookup, MemoryMappedLookup)
+        assert loaded.lookup == trained_policy.lookup
+        assert loaded.lookup.get("unknown") is None
+
+        # online training needs a writable lookup
+        trackers = await train_trackers(default_domain, augmentation_factor=0)
+        loaded.continue_training(trackers, default_domain)
+        assert isinstance(loaded.lookup, dict)
+
 
 class TestAugmentedMemoizationPolicy(PolicyTestCollection):
 
@@ -431,6 +542,54 @@ class TestEmbeddingPolicyAttentionBoth(PolicyTestCollection):
         return p
 
 
+class TestEmbeddingPolicyWithLengthBuckets(PolicyTestCollection):
+
+    @pytest.fixture(scope="module")
+    def create_policy(self, featurizer, priority):
+        # use standard featurizer from EmbeddingPolicy,
+        # since it is using FullDialogueTrackerFeaturizer
+        p = EmbeddingPolicy(priority=priority, num_length_buckets=3)
+        return p
+
+
+class TestEmbeddingPolicyWithEarlyStopping(PolicyTestCollection):
+
+    @pytest.fixture(scope="module")
+    def create_policy(self, featurizer, priority):
+        # use standard featurizer from EmbeddingPolicy,
+        # since it is using FullDialogueTrackerFeaturizer
+        p = EmbeddingPolicy(priority=priority, epochs=50,
+                            early_stopping=True, early_stopping_patience=2,
+                            early_stopping_min_delta=0.5,
+                            validation_split=0.2)
+        return p
+
+    def test_early_stopping(self, trained_policy, tmpdir):
+        assert trained_policy.early_stopping_summary == {
+            "best_epoch": 1, "stopped_epoch": 3}
+
+        trained_policy.persist(tmpdir.strpath)
+        loaded = trained_policy.__class__.load(tmpdir.strpath)
+        assert loaded.early_stopping_summary == \
+            trained_policy.early_stopping_summary
+
+
+def test_embedding_policy_negatives_exclude_correct_action():
+    policy = EmbeddingPolicy(num_neg=4)
+    policy.encoded_all_actions = np.eye(5)
+
+    action_ids = np.random.randint(5, size=(50, 3))
+    batch_b = policy._create_batch_b(policy.encoded_all_actions[action_ids],
+                                     action_ids)
+
+    assert batch_b.shape == (50, 3, 5, 5)
+    assert np.all(batch_b[:, :, 0].argmax(-1) == action_ids)
+    negatives = batch_b[:, :, 1:].argmax(-1)
+    assert np.all(negatives != action_ids[:, :, np.newaxis])
+    # every wrong action can be sampled
+    assert set(np.unique(negatives)) == set(range(5))
+
+
 class TestEmbeddingPolicyWithTfConfig(PolicyTestCollection):
 
     @pytest.fixture(scope="module")
@@ -4,7 +4,7 @@ import uuid
 from aioresponses import aioresponses
 
 import asyncio
-from rasa.core import jobs
+import time
 from rasa.core import utils
 from rasa.core.channels import CollectingOutputChannel, UserMessage
 from rasa.core.dispatcher import Button, Dispatcher
@@ -12,7 +12,8 @@ from rasa.core.events import (
     ReminderScheduled, ReminderCancelled, UserUttered, ActionExecuted,
     BotUttered, Restarted)
 from rasa.core.processor import MessageProcessor
-from rasa.core.interpreter import RasaNLUHttpInterpreter
+from rasa.core.interpreter import RasaNLUHttpInterpreter, RegexInterpreter
+from rasa.core.tracker_store import InMemoryTrackerStore
 from rasa.core.utils import EndpointConfig
 
 from tests.core.utilities import json_of_latest_request, latest_request
@@ -140,13 +141,13 @@ async def test_reminder_cancelled(default_processor):
         default_processor.tracker_store.save(t)
         d = Dispatcher(sender_id, out, default_processor.nlg)
         await default_processor._schedule_reminders(t.events, t, d)
-    # check that the jobs were added
-    assert len((await jobs.scheduler()).get_jobs()) == 2
+    # check that the reminders were stored
+    assert len(default_processor.reminder_scheduler.store) == 2
 
     for t in trackers:
         await default_processor._cancel_reminders(t.events, t)
-    # check that only one job was removed
-    assert len((await jobs.scheduler()).get_jobs()) == 1
+    # check that only one reminder was removed
+    assert len(default_processor.reminder_scheduler.store) == 1
 
     # execute the jobs
     await asyncio.sleep(3)
@@ -203,3 +204,56 @@ async def test_logging_of_bot_utterances_on_tracker(
     default_processor.log_bot_utterances_on_tracker(
         tracker, default_dispatcher_collecting)
     assert not default_dispatcher_collecting.latest_bot_messages
+
+
+class SlowInterpreter(RegexInterpreter):
+    def __init__(self):
+        self.num_parsed = 0
+
+    async def parse(self, text, message_id=None):
+        self.num_parsed += 1
+        await asyncio.sleep(0.2)
+        return await super(SlowInterpreter, self).parse(text, message_id)
+
+
+class SlowTrackerStore(InMemoryTrackerStore):
+    retrieves_in_thread = True
+
+    def retrieve(self, sender_id):
+        time.sleep(0.2)
+        return super(SlowTrackerStore, self).retrieve(sender_id)
+
+
+async def test_message_is_parsed_while_tracker_is_retrieved(default_domain,
+                                                            default_nlg):
+    interpreter = SlowInterpreter()
+    processor = MessageProcessor(interpreter, None, default_domain,
+                                 SlowTrackerStore(default_domain),
+                                 default_nlg)
+
+    start = time.time()
+    tracker = await processor.log_message(UserMessage("greet"))
+
+    assert time.time() - start < 0.35
+    assert tracker.latest_message.intent["name"] == "greet"
+    assert interpreter.num_parsed == 1
+
+
+async def test_parsed_messages_skip_interpreter(default_domain, default_nlg):
+    interpreter = SlowInterpreter()
+    processor = MessageProcessor(interpreter, None, default_domain,
+                                 InMemoryTrackerStore(default_domain),
+                                 default_nlg)
+
+    parse_data = {"intent": {"name": "goodbye", "confidence": 1.0},
+                  "entities": []}
+    tracker = await processor.log_message(
+        UserMessage("bye", parse_data=parse_data, sender_id="some user"))
+    assert tracker.latest_message.intent["name"] == "goodbye"
+
+    tracker = await processor.log_message(
+        UserMessage('/greet{"name": "Core"}', sender_id="some user"))
+    assert tracker.latest_message.intent["name"] == "greet"
+    assert tracker.get_slot("name") == "Core"
+
+    assert interpreter.num_parsed == 0
@@ -0,0 +1,232 @@
+import asyncio
+import datetime
+import time
+import uuid
+
+import fakeredis
+import pytest
+
+from rasa.core.agent import Agent
+from rasa.core.channels import CollectingOutputChannel
+from rasa.core.events import ActionExecuted, ReminderScheduled, UserUttered
+from rasa.core.interpreter import RegexInterpreter
+from rasa.core.policies.memoization import MemoizationPolicy
+from rasa.core.reminders import (
+    InMemoryReminderStore, RedisReminderStore, Reminder, ReminderScheduler,
+    ReminderStore, SQLReminderStore)
+from rasa.core.utils import EndpointConfig
+from tests.core.conftest import DEFAULT_STORIES_FILE
+
+
+class FakeRedisReminderStore(RedisReminderStore):
+    def __init__(self):
+        # all fake redis clients share the same data, like the clients of
+        # several processes which use the same redis server
+        self.red = fakeredis.FakeStrictRedis()
+        self.key_prefix = "reminder:"
+
+
+@pytest.fixture(params=["memory", "redis", "sql"])
+def reminder_store(request, tmpdir):
+    if request.param == "memory":
+        return InMemoryReminderStore()
+    elif request.param == "redis":
+        store = FakeRedisReminderStore()
+        store.red.flushall()
+        return store
+    return SQLReminderStore(db=tmpdir.join("reminders.db").strpath)
+
+
+def _reminder(sender_id, action_name="utter_greet", delay=0.0, name=None):
+    event = ReminderScheduled(action_name,
+                              datetime.datetime.now() +
+                              datetime.timedelta(seconds=delay),
+                              name=name)
+    return Reminder.from_event(event, sender_id, "rest")
+
+
+def test_reminder_serialisation():
+    reminder = _reminder("some id", name="my_reminder")
+    loaded = Reminder.loads(reminder.dumps())
+
+    assert loaded.name == "my_reminder"
+    assert loaded.sender_id == "some id"
+    assert loaded.trigger_time == reminder.trigger_time
+    assert loaded.event() == reminder.event()
+    assert loaded.input_channel == "rest"
+
+
+def test_due_reminders_are_claimed_in_order(reminder_store):
+    for i, delay in enumerate([-1, -3, -2, 100]):
+        reminder_store.add(_reminder("user_{}".format(i), delay=delay,
+                                     name=str(i)))
+
+    assert len(reminder_store) == 4
+    assert reminder_store.next_due() < time.time()
+
+    claimed = reminder_store.claim_due(time.time(), limit=2)
+    assert [r.name for r in claimed] == ["1", "2"]
+    claimed = reminder_store.claim_due(time.time(), limit=2)
+    assert [r.name for r in claimed] == ["0"]
+
+    assert len(reminder_store) == 1
+    assert reminder_store.next_due() > time.time()
+    assert reminder_store.claim_due(time.time(), limit=2) == []
+
+
+def test_reminder_with_same_name_is_replaced(reminder_store):
+    reminder_store.add(_reminder("user_a", name="my_reminder"))
+    reminder_store.add(_reminder("user_b", "utter_goodbye", delay=-1,
+                                 name="my_reminder"))
+
+    assert len(reminder_store) == 1
+    assert reminder_store.cancel("user_a", "utter_greet") == []
+
+    claimed = reminder_store.claim_due(time.time(), limit=10)
+    assert [(r.sender_id, r.action_name) for r in claimed] == [
+        ("user_b", "utter_goodbye")]
+
+
+def test_cancel_reminders_of_conversation(reminder_store):
+    reminder_store.add(_reminder("user_a", name="1"))
+    reminder_store.add(_reminder("user_a", name="2"))
+    reminder_store.add(_reminder("user_a", "utter_goodbye", name="3"))
+    reminder_store.add(_reminder("user_b", name="4"))
+
+    assert sorted(reminder_store.cancel("user_a", "utter_greet")) == [
+        "1", "2"]
+    assert reminder_store.cancel("user_a", "utter_greet") == []
+
+    claimed = reminder_store.claim_due(time.time() + 1, limit=10)
+    assert sorted(r.name for r in claimed) == ["3", "4"]
+    assert reminder_store.next_due() is None
+
+
+def test_reminders_are_claimed_once_across_stores(tmpdir):
+    # every store stands for a different process
+    redis_stores = [FakeRedisReminderStore() for _ in range(2)]
+    redis_stores[0].red.flushall()
+    db = tmpdir.join("reminders.db").strpath
+    sql_stores = [SQLReminderStore(db=db) for _ in range(2)]
+
+    for stores in [redis_stores, sql_stores]:
+        for i in range(10):
+            stores[0].add(_reminder("user_{}".format(i), delay=-1))
+
+        claimed = (stores[1].claim_due(time.time(), limit=4) +
+                   stores[0].claim_due(time.time(), limit=10) +
+                   stores[1].claim_due(time.time(), limit=10))
+
+        assert sorted(r.sender_id for r in claimed) == sorted(
+            "user_{}".format(i) for i in range(10))
+
+
+def test_find_reminder_store(tmpdir):
+    assert isinstance(ReminderStore.find_reminder_store(None),
+                      InMemoryReminderStore)
+
+    config = EndpointConfig("localhost", type="redis", port=6379, db=3)
+    store = ReminderStore.find_reminder_store(config)
+    assert isinstance(store, RedisReminderStore)
+    assert store.red.connection_pool.connection_kwargs["db"] == 3
+
+    config = EndpointConfig(type="sql",
+                            db=tmpdir.join("reminders.db").strpath)
+    assert isinstance(ReminderStore.find_reminder_store(config),
+                      SQLReminderStore)
+
+
+async def test_scheduler_fires_due_reminders_in_batches():
+    fired = []
+
+    async def handle_reminder(event, sender_id, output_channel):
+        fired.append((event.name, sender_id, output_channel))
+
+    scheduler = ReminderScheduler(InMemoryReminderStore(), handle_reminder,
+                                  batch_size=2)
+    output_channel = CollectingOutputChannel()
+    for i in range(5):
+        scheduler.schedule(
+            ReminderScheduled("utter_greet", datetime.datetime.now(),
+                              name=str(i)),
+            "user_{}".format(i), output_channel)
+    # another process stored this reminder
+    scheduler.store.add(_reminder("user_5", delay=-1, name="5"))
+    scheduler.cancel("user_0", "utter_greet")
+    # fires the reminders here instead of in the background
+    scheduler.stop()
+
+    assert await scheduler.fire_due_reminders() == 5
+
+    assert sorted(name for name, _, _ in fired) == ["1", "2", "3", "4", "5"]
+    assert all(channel is output_channel
+               for name, _, channel in fired if name != "5")
+    assert isinstance(fired[-1][2], CollectingOutputChannel)
+
+
+async def test_scheduler_sleeps_until_a_reminder_is_scheduled():
+    fired = []
+
+    async def handle_reminder(event, sender_id, output_channel):
+        fired.append(event.name)
+
+    store = InMemoryReminderStore()
+    scheduler = ReminderScheduler(store, handle_reminder)
+    scheduler.start()
+    await asyncio.sleep(0.05)
+    # the store isn't checked again until something is scheduled
+    assert scheduler._sleeping_until == float("inf")
+
+    scheduler.schedule(
+        ReminderScheduled("utter_greet",
+                          datetime.datetime.now() +
+                          datetime.timedelta(seconds=0.2),
+                          name="later"),
+        "some_user", CollectingOutputChannel())
+    await asyncio.sleep(0.05)
+    assert scheduler._sleeping_until == store.next_due()
+    assert fired == []
+
+    await asyncio.sleep(0.3)
+    scheduler.stop()
+    assert fired == ["later"]
+
+
+async def test_processors_use_the_scheduler_of_the_agent(default_domain):
+    agent = Agent(default_domain,
+                  policies=[MemoizationPolicy()],
+                  interpreter=RegexInterpreter(),
+                  reminder_store=FakeRedisReminderStore())
+    agent.train(await agent.load_data(DEFAULT_STORIES_FILE))
+
+    processors = [agent.create_processor(), agent.create_processor()]
+    assert all(p.reminder_scheduler is agent.reminder_scheduler
+               for p in processors)
+
+
+async def test_stored_reminder_fires_after_restart(default_domain):
+    store = FakeRedisReminderStore()
+    store.red.flushall()
+    agent = Agent(default_domain,
+                  policies=[MemoizationPolicy()],
+                  interpreter=RegexInterpreter(),
+                  reminder_store=store)
+    agent.train(await agent.load_data(DEFAULT_STORIES_FILE))
+
+    sender_id = uuid.uuid4().hex
+    event = ReminderScheduled("utter_greet", datetime.datetime.now())
+    tracker = agent.tracker_store.get_or_create_tracker(sender_id)
+    tracker.update(UserUttered("test"))
+    tracker.update(ActionExecuted("action_reminder_reminder"))
+    tracker.update(event)
+    agent.tracker_store.save(tracker)
+    # stored by a process which stopped before the reminder was due
+    store.add(Reminder.from_event(event, sender_id))
+
+    agent.reminder_scheduler.start()
+    await asyncio.sleep(0.1)
+    agent.reminder_scheduler.stop()
+
+    tracker = agent.tracker_store.retrieve(sender_id)
+    assert ActionExecuted("utter_greet") in tracker.events
+    assert len(store) == 0
@@ -8,7 +8,7 @@ import pytest
 from freezegun import freeze_time
 
 import rasa.core
-from rasa.core import events, constants
+from rasa.core import events, constants, metrics, server
 from rasa.core.events import (
     UserUttered, BotUttered, SlotSet, Event)
 from rasa.model import unpack_model, add_evaluation_file_to_model
@@ -41,6 +41,12 @@ def secured_app(core_server_secured):
     return core_server_secured.test_client
 
 
+@pytest.fixture
+def app_with_metrics(prepared_agent):
+    yield server.create_app(prepared_agent, enable_metrics=True).test_client
+    metrics.disable()
+
+
 def test_root(app):
     _, response = app.get("/")
     content = response.text
@@ -99,6 +105,35 @@ def test_respond(app):
     assert content == [{'text': 'hey there!', 'recipient_id': 'myid'}]
 
 
+def test_metrics(app_with_metrics):
+    data = json.dumps({"query": "/greet"})
+    _, response = app_with_metrics.post(
+        "/conversations/metrics_id/respond",
+        data=data,
+        headers={"Content-Type": "application/json"})
+    assert response.status == 200
+
+    _, response = app_with_metrics.get("/metrics")
+    assert response.status == 200
+    assert response.content_type.startswith("text/plain")
+
+    lines = response.text.splitlines()
+    assert ('rasa_core_stage_seconds_count{stage="handle_message"} 1'
+            in lines)
+    for stage in ["get_tracker", "parse_message", "predict_next_action",
+                  "run_action", "save_tracker"]:
+        assert any(line.startswith(
+            'rasa_core_stage_seconds_count{{stage="{}"}}'.format(stage))
+            for line in lines)
+    assert any(line.startswith(
+        'rasa_core_policy_prediction_seconds_count{'
+        'policy="AugmentedMemoizationPolicy"}') for line in lines)
+    assert any(line.startswith(
+        'rasa_core_tracker_store_seconds_count{'
+        'operation="save",store="in_memory"}') for line in lines)
+    assert "rasa_core_conversation_locks 0.0" in lines
+
+
 def test_parse(app):
     data = json.dumps({"q": """/greet{"name": "Rasa"}"""})
     _, response = app.post("/parse",
@@ -175,6 +210,124 @@ def test_sorted_predict(app):
     assert scores == sorted_scores
 
 
+def _ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_batch_respond(app):
+    data = json.dumps({"messages": [
+        {"sender_id": "batch_a", "text": "/greet"},
+        {"sender_id": "batch_b", "text": "/greet"},
+        {"sender_id": "batch_a", "text": "/goodbye"}]})
+    _, response = app.post("/batch/respond?max_concurrent_senders=1",
+                           data=data,
+                           headers={"Content-Type": "application/json"})
+
+    assert response.status == 200
+    assert response.content_type == "application/x-ndjson"
+    results = _ndjson(response)
+    assert sorted(r["index"] for r in results) == [0, 1, 2]
+
+    # the messages of a sender are handled in order
+    indices_a = [r["index"] for r in results if r["sender_id"] == "batch_a"]
+    assert indices_a == [0, 2]
+    greeting = [r for r in results if r["index"] == 1][0]
+    assert greeting["responses"] == [{"text": "hey there!",
+                                      "recipient_id": "batch_b"}]
+
+
+def test_batch_messages_as_ndjson(app):
+    data = "\n".join(json.dumps(m) for m in [
+        {"sender_id": "batch_log", "text": "/greet"},
+        {"sender_id": "batch_log", "text": "/goodbye"}])
+    _, response = app.post("/batch/messages",
+                           data=data,
+                           headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status == 200
+    results = _ndjson(response)
+    assert [r["index"] for r in results] == [0, 1]
+    latest = results[1]["tracker"]["latest_message"]
+    assert latest["intent"]["name"] == "goodbye"
+
+
+def test_batch_with_invalid_body(app):
+    _, response = app.post("/batch/messages",
+                           data=json.dumps({"messages": "/greet"}),
+                           headers={"Content-Type": "application/json"})
+    assert response.status == 400
+
+
+def test_batch_predict_trackers(app):
+    trackers = [{"sender_id": "batch_{}".format(i),
+                 "events": [e.as_dict() for e in test_events[:i + 1]]}
+                for i in range(3)]
+    _, response = app.post("/batch/predict?batch_size=2",
+                           data=json.dumps({"trackers": trackers}),
+                           headers={"Content-Type": "application/json"})
+
+    assert response.status == 200
+    results = sorted(_ndjson(response), key=lambda r: r["index"])
+    assert [r["sender_id"] for r in results] == ["batch_0", "batch_1",
+                                                 "batch_2"]
+
+    # the batched predictions are the same as the single ones
+    for tracker, result in zip(trackers, results):
+        _, single = app.post("/predict",
+                             data=json.dumps(tracker["events"]),
+                             headers={"Content-Type": "application/json"})
+        assert result["scores"] == single.json["scores"]
+        assert result["policy"] == single.json["policy"]
+
+
+def test_batch_predict_reports_failed_trackers(app, monkeypatch):
+    policy_ensemble = app.app.agent.policy_ensemble
+    predict_batch = policy_ensemble.predict_batch
+
+    def predict_or_fail(trackers, domain):
+        if any(t.sender_id == "batch_bad" for t in trackers):
+            raise ValueError("Prediction failed on purpose.")
+        return predict_batch(trackers, domain)
+
+    monkeypatch.setattr(policy_ensemble, "predict_batch", predict_or_fail)
+
+    events = [e.as_dict() for e in test_events[:2]]
+    trackers = [{"sender_id": sender_id, "events": events}
+                for sender_id in ["batch_0", "batch_bad", "batch_2"]]
+    _, response = app.post("/batch/predict",
+                           data=json.dumps({"trackers": trackers}),
+                           headers={"Content-Type": "application/json"})
+
+    assert response.status == 200
+    results = sorted(_ndjson(response), key=lambda r: r["index"])
+    assert [r["sender_id"] for r in results] == ["batch_0", "batch_bad",
+                                                 "batch_2"]
+    assert results[1]["error"] == "ValueError"
+    assert "scores" in results[0] and "scores" in results[2]
+
+
+def test_batch_predict_conversations(app):
+    data = json.dumps([event.as_dict() for event in test_events[:3]])
+    _, response = app.put("/conversations/batchpredict/tracker/events",
+                          data=data,
+                          headers={"Content-Type": "application/json"})
+    assert response.status == 200
+
+    data = json.dumps({"conversations": [{"sender_id": "batchpredict"},
+                                         {"sender_id": "batchpredict_new"}]})
+    _, response = app.post("/batch/conversations/predict",
+                           data=data,
+                           headers={"Content-Type": "application/json"})
+
+    assert response.status == 200
+    results = _ndjson(response)
+    _, single = app.post("/conversations/batchpredict/predict")
+    assert results[0]["sender_id"] == "batchpredict"
+    assert results[0]["scores"] == single.json["scores"]
+    assert results[1]["sender_id"] == "batchpredict_new"
+    assert results[1]["tracker"]["sender_id"] == "batchpredict_new"
+
+
 def test_list_conversations(app):
     data = json.dumps({"query": "/greet"})
     _, response = app.post("/conversations/myid/respond",
@@ -213,6 +366,32 @@ def test_evaluate(app):
         "policy"}
 
 
+def test_evaluate_limits_num_workers(app, monkeypatch):
+    import multiprocessing
+    import rasa.core.server
+
+    calls = []
+
+    async def evaluate(stories, agent, **kwargs):
+        calls.append(kwargs)
+        return {}
+
+    monkeypatch.setattr(rasa.core.server, "test", evaluate)
+    _, response = app.post('/evaluate?num_workers=100000', data="")
+
+    assert response.status == 200
+    assert calls[0]["num_workers"] == multiprocessing.cpu_count()
+
+
+@pytest.mark.parametrize("num_workers", ["0", "-2", "many"])
+def test_evaluate_with_invalid_num_workers(app, num_workers):
+    _, response = app.post('/evaluate?num_workers={}'.format(num_workers),
+                           data="")
+    assert response.status == 400
+    assert response.json["details"] == {"parameter": "num_workers",
+                                        "in": "query"}
+
+
 def test_stack_training(app,
                         default_domain_path,
                         default_stories_file,
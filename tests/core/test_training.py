@@ -1,3 +1,6 @@
+import os
+
+import numpy as np
 import pytest
 
 from rasa.core.interpreter import RegexInterpreter
@@ -120,3 +123,221 @@ async def test_random_seed(tmpdir, config_file):
     probs_1 = processor_1.predict_next("1")
     probs_2 = processor_2.predict_next("2")
     assert probs_1["confidence"] == probs_2["confidence"]
+
+
+def test_bucketed_batch_ids_never_mix_buckets():
+    from rasa.core.training.data import bucketed_batch_ids
+
+    batches = bucketed_batch_ids([5, 3], batch_size=2)
+    assert len(batches) == 5
+
+    for bucket_idx, ids in [(0, np.arange(5)), (1, np.arange(3))]:
+        bucket_ids = np.concatenate([batch_ids
+                                     for idx, batch_ids in batches
+                                     if idx == bucket_idx])
+        assert sorted(bucket_ids) == list(ids)
+
+
+async def test_load_data_from_cache(default_domain, tmpdir):
+    from rasa.core.training import load_data
+
+    cache_dir = tmpdir.strpath
+    trackers = await load_data(DEFAULT_STORIES_FILE, default_domain,
+                               augmentation_factor=0, cache_dir=cache_dir)
+    assert len(tmpdir.listdir()) == 2
+
+    cached = await load_data(DEFAULT_STORIES_FILE, default_domain,
+                             augmentation_factor=0, cache_dir=cache_dir)
+
+    assert [t.sender_id for t in cached] == [t.sender_id for t in trackers]
+    assert [t.past_states(default_domain) for t in cached] == \
+        [t.past_states(default_domain) for t in trackers]
+    assert all(t.domain is default_domain for t in cached)
+
+
+def test_training_data_cache_evicts_least_recently_used(tmpdir):
+    from rasa.core.training.cache import TrainingDataCache
+
+    cache = TrainingDataCache(tmpdir.strpath, max_size=1500)
+    cache.store("trackers", "first", "a" * 500)
+    cache.store("trackers", "second", "b" * 500)
+    # make the second entry the least recently used one
+    os.utime(cache._entry_path("trackers", "second"), (0, 0))
+    assert cache.load("trackers", "first") == "a" * 500
+
+    cache.store("trackers", "third", "c" * 500)
+
+    assert cache.load("trackers", "second") is None
+    assert cache.load("trackers", "first") == "a" * 500
+    assert cache.load("trackers", "third") == "c" * 500
+
+
+async def test_training_reuses_unchanged_policies(tmpdir):
+    import filecmp
+    from rasa.core import utils
+    from rasa.core.policies.ensemble import PolicyEnsemble
+
+    def write_config(name, epochs):
+        path = tmpdir.join(name).strpath
+        utils.dump_obj_as_yaml_to_file(path, {"policies": [
+            {"name": "MemoizationPolicy", "max_history": 3},
+            {"name": "KerasPolicy", "epochs": epochs}]})
+        return path
+
+    first_model = tmpdir.join("first").strpath
+    await train(DEFAULT_DOMAIN_PATH, DEFAULT_STORIES_FILE, first_model,
+                policy_config=write_config("first.yml", 1),
+                interpreter=RegexInterpreter(),
+                kwargs={})
+
+    second_model = tmpdir.join("second").strpath
+    agent = await train(DEFAULT_DOMAIN_PATH, DEFAULT_STORIES_FILE,
+                        second_model,
+                        policy_config=write_config("second.yml", 2),
+                        interpreter=RegexInterpreter(),
+                        kwargs={},
+                        previous_model_path=first_model)
+
+    assert list(agent.policy_ensemble.persisted_policy_paths) == [0]
+
+    first = PolicyEnsemble.load_metadata(first_model)["policy_fingerprints"]
+    second = PolicyEnsemble.load_metadata(second_model)["policy_fingerprints"]
+    assert first[0] == second[0]
+    assert first[1] != second[1]
+
+    memo_dir = "policy_0_MemoizationPolicy"
+    comparison = filecmp.dircmp(os.path.join(first_model, memo_dir),
+                                os.path.join(second_model, memo_dir))
+    assert not comparison.diff_files
+    assert Agent.load(second_model).policy_ensemble.policies[0].lookup
+
+
+async def test_changed_max_history_invalidates_all_policies(tmpdir):
+    from rasa.core import utils
+    from rasa.core.policies.ensemble import PolicyEnsemble
+
+    def write_config(name, max_history):
+        path = tmpdir.join(name).strpath
+        utils.dump_obj_as_yaml_to_file(path, {"policies": [
+            {"name": "MemoizationPolicy", "max_history": 3},
+            {"name": "AugmentedMemoizationPolicy",
+             "max_history": max_history}]})
+        return path
+
+    first_model = tmpdir.join("first").strpath
+    await train(DEFAULT_DOMAIN_PATH, DEFAULT_STORIES_FILE, first_model,
+                policy_config=write_config("first.yml", 2),
+                interpreter=RegexInterpreter(),
+                kwargs={})
+
+    # the generated trackers depend on the largest max history
+    second_model = tmpdir.join("second").strpath
+    agent = await train(DEFAULT_DOMAIN_PATH, DEFAULT_STORIES_FILE,
+                        second_model,
+                        policy_config=write_config("second.yml", 5),
+                        interpreter=RegexInterpreter(),
+                        kwargs={},
+                        previous_model_path=first_model)
+
+    assert not agent.policy_ensemble.persisted_policy_paths
+
+    first = PolicyEnsemble.load_metadata(first_model)["policy_fingerprints"]
+    second = PolicyEnsemble.load_metadata(second_model)["policy_fingerprints"]
+    assert first[0] != second[0]
+
+
+def test_prefetch_yields_all_items_in_order():
+    from rasa.core.training.data import prefetch
+
+    assert list(prefetch(iter(range(100)), buffer_size=3)) == list(range(100))
+
+
+def test_prefetch_raises_errors_of_the_producer():
+    from rasa.core.training.data import prefetch
+
+    def failing():
+        yield 1
+        raise ValueError("producer failed")
+
+    items = prefetch(failing())
+    assert next(items) == 1
+    with pytest.raises(ValueError):
+        next(items)
+
+
+async def test_train_comparison_models(tmpdir):
+    from rasa.core.train import train_comparison_models, COMPARISON_DATA_DIR
+
+    policy_configs = []
+    for policy_name in ["MemoizationPolicy", "AugmentedMemoizationPolicy"]:
+        config_file = tmpdir.join(policy_name + ".yml")
+        config_file.write("policies:\n  - name: {}\n".format(policy_name))
+        policy_configs.append(config_file.strpath)
+    output = tmpdir.join("comparison").strpath
+
+    await train_comparison_models(DEFAULT_STORIES_FILE, DEFAULT_DOMAIN_PATH,
+                                  output,
+                                  exclusion_percentages=[0, 50],
+                                  policy_configs=policy_configs,
+                                  kwargs={"augmentation_factor": 0,
+                                          "num_workers": 2},
+                                  seed=42)
+
+    run_dir = os.path.join(output, "run_1")
+    assert sorted(os.listdir(run_dir)) == ["AugmentedMemoizationPolicy1",
+                                           "AugmentedMemoizationPolicy2",
+                                           "MemoizationPolicy1",
+                                           "MemoizationPolicy2"]
+
+    # both policies share the data of an exclusion percentage
+    data_files = os.listdir(os.path.join(output, COMPARISON_DATA_DIR))
+    assert len([f for f in data_files if f.startswith("story_graph")]) == 2
+    assert len([f for f in data_files if f.startswith("trackers")]) == 2
+
+
+async def test_comparison_seed_keeps_global_random_state(tmpdir):
+    import random
+    from rasa.core.policies.memoization import MemoizationPolicy
+    from rasa.core.train import _comparison_training_data
+
+    random.seed(1)
+    expected = random.random()
+
+    random.seed(1)
+    await _comparison_training_data(DEFAULT_STORIES_FILE, DEFAULT_DOMAIN_PATH,
+                                    [MemoizationPolicy()], tmpdir.strpath,
+                                    run=0, exclusion_percentage=50, seed=42,
+                                    data_load_args={"augmentation_factor": 0})
+
+    assert random.random() == expected
+
+
+async def test_resume_comparison_training(tmpdir):
+    import shutil
+    from rasa.core.train import train_comparison_models
+
+    policy_config = tmpdir.join("config.yml")
+    policy_config.write("policies:\n  - name: MemoizationPolicy\n")
+    output = tmpdir.join("comparison").strpath
+
+    async def train_models():
+        await train_comparison_models(DEFAULT_STORIES_FILE,
+                                      DEFAULT_DOMAIN_PATH,
+                                      output,
+                                      exclusion_percentages=[0, 50],
+                                      policy_configs=[policy_config.strpath],
+                                      kwargs={"augmentation_factor": 0})
+
+    await train_models()
+
+    trained_model = os.path.join(output, "run_1", "MemoizationPolicy1")
+    trained_at = os.path.getmtime(os.path.join(trained_model,
+                                               "metadata.json"))
+    interrupted_model = os.path.join(output, "run_1", "MemoizationPolicy2")
+    shutil.rmtree(interrupted_model)
+
+    await train_models()
+
+    assert os.path.isdir(interrupted_model)
+    assert os.path.getmtime(os.path.join(trained_model,
+                                         "metadata.json")) == trained_at
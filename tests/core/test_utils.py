@@ -74,7 +74,11 @@ def test_list_routes(default_agent):
                                   'get_domain',
                                   'continue_training',
                                   'status',
-                                  'tracker_predict'}
+                                  'tracker_predict',
+                                  'log_messages',
+                                  'respond_to_messages',
+                                  'predict_conversations',
+                                  'predict_trackers'}
 
 
 def test_cap_length():
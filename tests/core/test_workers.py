@@ -0,0 +1,279 @@
+import json
+from urllib.parse import urlencode
+
+import pytest
+from sanic import Sanic, response
+from sanic.request import Request
+
+from rasa.core.workers import (
+    HashRing, Worker, WorkerPool, WORKER_ROUTE_PREFIX, create_router_app,
+    sender_id_from_request, unroutable_channels)
+
+
+def test_hash_ring_is_consistent():
+    ring = HashRing([0, 1, 2])
+    keys = ["sender-{}".format(i) for i in range(3000)]
+    owners = {key: ring.node(key) for key in keys}
+
+    assert owners == {key: HashRing([0, 1, 2]).node(key) for key in keys}
+    # the conversations are spread evenly across the workers
+    for node in [0, 1, 2]:
+        assert list(owners.values()).count(node) > 700
+
+    # only the conversations of a removed worker move
+    smaller_ring = HashRing([0, 1])
+    assert all(smaller_ring.node(key) == node
+               for key, node in owners.items() if node != 2)
+
+
+def _request(path, method="GET", body=b"",
+             content_type="application/json"):
+    request = Request(path.encode("utf-8"), {"Content-Type": content_type},
+                      "1.1", method, None)
+    request.body = body
+    return request
+
+
+def test_sender_id_from_request():
+    assert sender_id_from_request(
+        _request("/conversations/some%20user/tracker")) == "some user"
+    assert sender_id_from_request(_request(
+        "/webhooks/rest/webhook", "POST",
+        json.dumps({"sender": "some user", "message": "hi"}).encode()
+    )) == "some user"
+    assert sender_id_from_request(_request(
+        "/webhooks/callback/webhook", "POST",
+        json.dumps({"sender_id": 42}).encode())) == "42"
+
+    assert sender_id_from_request(_request("/status")) is None
+    assert sender_id_from_request(
+        _request("/webhooks/x/webhook", "POST", b"no json")) is None
+
+
+@pytest.mark.parametrize("channel, payload, sender_id", [
+    ("facebook", {"entry": [{"messaging": [{"sender": {"id": "fb user"}}]}]},
+     "fb user"),
+    ("slack", {"event": {"user": "slack user"}}, "slack user"),
+    ("telegram", {"message": {"chat": {"id": 42}}}, "42"),
+    ("telegram", {"callback_query": {"message": {"chat": {"id": 43}}}},
+     "43"),
+    ("mattermost", {"user_id": "mm user"}, "mm user"),
+    ("botframework", {"from": {"id": "bf user"}}, "bf user"),
+    ("rocketchat", {"channel_id": "rc user"}, "rc user"),
+    ("webexteams", {"data": {"personId": "webex user"}}, "webex user"),
+    ("facebook", {"object": "page"}, None),
+])
+def test_sender_id_from_channel_webhooks(channel, payload, sender_id):
+    request = _request("/webhooks/{}/webhook".format(channel), "POST",
+                       json.dumps(payload).encode())
+    assert sender_id_from_request(request) == sender_id
+
+
+def test_sender_id_from_form_webhooks():
+    twilio = _request("/webhooks/twilio/webhook", "POST",
+                      b"From=%2B4912345&Body=hi",
+                      "application/x-www-form-urlencoded")
+    assert sender_id_from_request(twilio) == "+4912345"
+
+    slack_payload = json.dumps({"user": {"id": "slack user"}})
+    slack = _request("/webhooks/slack/webhook", "POST",
+                     urlencode({"payload": slack_payload}).encode(),
+                     "application/x-www-form-urlencoded")
+    assert sender_id_from_request(slack) == "slack user"
+
+
+def test_unroutable_channels(tmpdir):
+    credentials = tmpdir.join("credentials.yml")
+    credentials.write("rest:\nfacebook:\n  verify: x\nsocketio:\n")
+
+    assert unroutable_channels(None, credentials.strpath) == ["socketio"]
+    assert unroutable_channels("socketio", None) == ["socketio"]
+    assert unroutable_channels("twilio", None) == []
+    assert unroutable_channels(None, None) == []
+
+
+def _worker_app(name):
+    app = Sanic(name, configure_logging=False)
+
+    @app.post("/batch/messages")
+    async def messages(request):
+        if request.raw_args.get("token") != "secret":
+            return response.text("unauthorized", 401)
+
+        items = request.json["messages"]
+
+        async def write(resp):
+            for i, item in reversed(list(enumerate(items))):
+                await resp.write(json.dumps({"index": i,
+                                             "sender_id": item["sender_id"],
+                                             "text": item["text"],
+                                             "worker": name}) + "\n")
+
+        return response.stream(write, content_type="application/x-ndjson")
+
+    @app.route("/<path:path>", methods=["GET", "POST"])
+    async def echo(request, path):
+        return response.json({"worker": name,
+                              "path": request.path,
+                              "query": request.query_string,
+                              "body": request.body.decode("utf-8")})
+
+    return app
+
+
+async def _router_client(test_server, test_client, available=True):
+    client, _ = await _router_client_and_pool(test_server, test_client,
+                                              available)
+    return client
+
+
+async def _router_client_and_pool(test_server, test_client, available=True):
+    workers = []
+    for i in range(2):
+        server = await test_server(_worker_app("worker_{}".format(i)))
+        worker = Worker(i, "http://127.0.0.1:{}".format(server.port))
+        worker.available = available
+        workers.append(worker)
+
+    pool = WorkerPool(workers, "secret", start_timeout=0.1)
+    return await test_client(create_router_app(pool)), pool
+
+
+async def test_router_forwards_conversations_to_same_worker(test_server,
+                                                            test_client):
+    client = await _router_client(test_server, test_client)
+
+    for i in range(10):
+        sender_id = "user_{}".format(i)
+        resp = await client.get("/conversations/{}/tracker?include_events=ALL"
+                                "".format(sender_id))
+        content = await resp.json()
+        assert content["path"] == "/conversations/{}/tracker".format(
+            sender_id)
+        assert content["query"] == "include_events=ALL"
+
+        payload = json.dumps({"sender": sender_id, "message": "hi"})
+        resp = await client.post("/webhooks/rest/webhook", data=payload)
+        forwarded = await resp.json()
+        assert forwarded["body"] == payload
+        assert forwarded["worker"] == content["worker"]
+
+
+async def test_router_splits_batches_by_worker(test_server, test_client):
+    client, pool = await _router_client_and_pool(test_server, test_client)
+
+    messages = [{"sender_id": "user_{}".format(i % 10), "text": str(i)}
+                for i in range(30)]
+    resp = await client.post("/batch/messages?token=secret",
+                             data=json.dumps({"messages": messages}))
+    assert resp.status == 200
+    assert resp.headers["Content-Type"] == "application/x-ndjson"
+    results = [json.loads(line) for line in (await resp.text()).splitlines()]
+
+    assert sorted(r["index"] for r in results) == list(range(30))
+    for result in results:
+        message = messages[result["index"]]
+        assert result["sender_id"] == message["sender_id"]
+        assert result["text"] == message["text"]
+        assert result["worker"] == "worker_{}".format(
+            pool.worker_for(message["sender_id"]).index)
+    assert len({r["worker"] for r in results}) == 2
+
+
+async def test_router_returns_errors_of_batch_workers(test_server,
+                                                      test_client):
+    client = await _router_client(test_server, test_client)
+
+    messages = [{"sender_id": "user_{}".format(i), "text": "hi"}
+                for i in range(10)]
+    resp = await client.post("/batch/messages",
+                             data=json.dumps({"messages": messages}))
+    assert resp.status == 401
+    assert await resp.text() == "unauthorized"
+
+
+async def test_router_streams_worker_responses(test_server, test_client):
+    import asyncio
+
+    first_line_received = asyncio.Event()
+    app = Sanic("streaming_worker", configure_logging=False)
+
+    @app.route("/stream")
+    async def stream(request):
+        async def write(resp):
+            await resp.write("first\n")
+            # the router has to pass the first line on before the rest
+            await asyncio.wait_for(first_line_received.wait(), 10)
+            await resp.write("second\n")
+
+        return response.stream(write, status=202,
+                               headers={"X-Worker": "streaming"},
+                               content_type="application/x-ndjson")
+
+    server = await test_server(app)
+    worker = Worker(0, "http://127.0.0.1:{}".format(server.port))
+    worker.available = True
+    pool = WorkerPool([worker], "secret", start_timeout=0.1)
+    client = await test_client(create_router_app(pool))
+
+    resp = await client.get("/stream")
+    assert resp.status == 202
+    assert resp.headers["X-Worker"] == "streaming"
+    assert resp.headers["Content-Type"] == "application/x-ndjson"
+    assert await resp.content.readline() == b"first\n"
+    first_line_received.set()
+    assert await resp.content.readline() == b"second\n"
+
+
+async def test_router_doesnt_expose_worker_routes(test_server, test_client):
+    client = await _router_client(test_server, test_client)
+
+    resp = await client.get(WORKER_ROUTE_PREFIX + "/status")
+    assert resp.status == 404
+
+
+async def test_unavailable_worker(test_server, test_client):
+    client = await _router_client(test_server, test_client, available=False)
+
+    resp = await client.get("/conversations/some_user/tracker")
+    assert resp.status == 503
+    assert (await resp.json())["reason"] == "WorkerUnavailable"
+
+
+async def test_pulled_model_directories_are_removed(tmpdir, monkeypatch):
+    import os
+    import tempfile
+    import rasa.core.agent
+    from rasa.core.utils import EndpointConfig
+
+    directories = []
+
+    def mkdtemp():
+        directories.append(tmpdir.mkdir(str(len(directories))).strpath)
+        return directories[-1]
+
+    results = iter(["first", None, ValueError("server error"), "second"])
+
+    async def pull_model(model_server, model_directory, fingerprint):
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(tempfile, "mkdtemp", mkdtemp)
+    monkeypatch.setattr(rasa.core.agent, "_pull_model_and_fingerprint",
+                        pull_model)
+    pool = WorkerPool([], "token",
+                      model_server=EndpointConfig("http://server"))
+
+    assert await pool.pull_model()
+    # unchanged and failed pulls don't leave their directory behind
+    assert not await pool.pull_model()
+    assert not await pool.pull_model()
+    assert [os.path.exists(d) for d in directories] == [True, False, False]
+
+    assert await pool.pull_model()
+    assert pool.model_directory == directories[3]
+
+    await pool.stop()
+    assert not any(os.path.exists(d) for d in directories)